@@ -0,0 +1,199 @@
+"""
+Compara o motor pandas com o motor SQL (DuckDB, metalab.motor_sql).
+
+Para cada escala e combinação de filtros executa nos dois motores os filtros
+(alunos, inscrições, avaliações e respostas), as métricas, as contagens de
+cada gráfico, a tabela status x curso, a série mensal e as contagens das
+avaliações; mede o tempo de cada etapa e confere se os resultados são
+idênticos (mesmos valores, índices, ordem e tipos):
+
+    python benchmarks/bench_motor_sql.py                        # 10k, 100k e 1M inscrições
+    python benchmarks/bench_motor_sql.py --escalas 10000 --varredura
+
+--varredura testa, além das combinações fixas, cada valor de cada filtro.
+Termina com código 1 se algum resultado divergir. Requer o pacote duckdb.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from bench_pipeline import (COMBINACOES_FILTROS, DIRETORIO_RESULTADOS, ESCALAS_PADRAO, ambiente, contar_todas_respostas,
+                            medir, preparar_csvs, valores_filtros)
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from metalab import agregados, motor_sql  # noqa: E402
+from metalab.carregamento import carregar_csvs  # noqa: E402
+from metalab.colunas import (COLUNA_CANAIS_INSCRICAO, COLUNA_HORARIO, COLUNA_REGIAO_INSCRICAO,  # noqa: E402
+                             coluna_raca, coluna_sabendo_curso, coluna_sexo)
+from metalab.filtros import (aplicar_filtros, filtrar_avaliacoes, filtrar_respostas_long,  # noqa: E402
+                             selecionar_avaliacoes)
+from metalab.indices import construir_indices, opcoes_filtro  # noqa: E402
+from metalab.preprocessamento import fazer_pivot_avaliacoes, numerar_avaliacoes, preprocessar_dados  # noqa: E402
+
+# Contagens dos gráficos: nome -> (tabela, função que acha a coluna)
+CONTAGENS = {
+    'sexo': ('alunos', coluna_sexo),
+    'raca': ('alunos', coluna_raca),
+    'status': ('alunos', lambda df: 'STATUS' if 'STATUS' in df.columns else None),
+    'local': ('alunos', lambda df: 'LOCAL' if 'LOCAL' in df.columns else None),
+    'canais_inscricao': ('inscricoes', lambda df: COLUNA_CANAIS_INSCRICAO if COLUNA_CANAIS_INSCRICAO in df.columns else None),
+    'regiao': ('inscricoes', lambda df: COLUNA_REGIAO_INSCRICAO if COLUNA_REGIAO_INSCRICAO in df.columns else None),
+    'canais_avaliacao': ('avaliacoes', coluna_sabendo_curso),
+    'horario': ('avaliacoes', lambda df: COLUNA_HORARIO if COLUNA_HORARIO in df.columns else None),
+}
+
+
+def identicos(esperado, obtido):
+    """Compara resultados dos dois motores (DataFrame, Series, dict ou escalar); retorna a diferença ou None"""
+    try:
+        if isinstance(esperado, pd.DataFrame):
+            pd.testing.assert_frame_equal(esperado, obtido)
+        elif isinstance(esperado, pd.Series):
+            pd.testing.assert_series_equal(esperado, obtido)
+        elif isinstance(esperado, dict):
+            if set(esperado) != set(obtido):
+                return f'chaves diferentes: {sorted(set(esperado) ^ set(obtido))}'
+            for chave in esperado:
+                diferenca = identicos(esperado[chave], obtido[chave])
+                if diferenca:
+                    return f'{chave}: {diferenca}'
+        elif isinstance(esperado, tuple):
+            for item_esperado, item_obtido in zip(esperado, obtido):
+                diferenca = identicos(item_esperado, item_obtido)
+                if diferenca:
+                    return diferenca
+        elif esperado != obtido:
+            return f'{esperado!r} != {obtido!r}'
+    except AssertionError as e:
+        return str(e).strip().splitlines()[0] if str(e).strip() else 'diferente'
+    return None
+
+
+def combinacoes(indices, varredura):
+    """Combinações fixas (bench_pipeline) e, com varredura, cada valor de cada filtro"""
+    for nome, combinacao in COMBINACOES_FILTROS.items():
+        yield nome, valores_filtros(combinacao, indices)
+    if varredura:
+        for posicao, dimensao in enumerate(('ciclo', 'local', 'status', 'genero')):
+            for valor in (opcoes_filtro(indices, dimensao) or ['Todos'])[1:]:
+                selecao = ['Todos'] * 4
+                selecao[posicao] = valor
+                yield f'{dimensao}={valor}', tuple(selecao)
+
+
+def executar_escala(linhas, args, registrar):
+    diretorio = preparar_csvs(linhas, args.cache, args.semente)
+    inscricoes, avaliacoes_long, alunos = carregar_csvs(diretorio)
+    inscricoes, alunos = preprocessar_dados(inscricoes, alunos)
+    avaliacoes_long = numerar_avaliacoes(avaliacoes_long)
+    avaliacoes = fazer_pivot_avaliacoes(avaliacoes_long)
+    indices = construir_indices({'alunos': alunos, 'inscricoes': inscricoes})
+    originais = {'alunos': alunos, 'inscricoes': inscricoes, 'avaliacoes': avaliacoes, 'avaliacoes_long': avaliacoes_long}
+
+    motor, metricas = medir(lambda: motor_sql.criar_motor(originais), 1, memoria=False)
+    registrar(linhas, '-', 'criar_motor', None, metricas['tempo_ms'], None)
+
+    for nome_filtro, (ciclo, local, status, genero) in combinacoes(indices, args.varredura):
+        def filtrar_pandas():
+            alunos_f, inscricoes_f = aplicar_filtros(alunos, inscricoes, ciclo, local, status, genero)
+            filtradas = filtrar_avaliacoes(avaliacoes, alunos_f, inscricoes_f, alunos, inscricoes, ciclo)
+            avaliacoes_f = selecionar_avaliacoes(avaliacoes, filtradas, ciclo)
+            return {'alunos': alunos_f, 'inscricoes': inscricoes_f, 'avaliacoes': avaliacoes_f,
+                    'avaliacoes_long': filtrar_respostas_long(avaliacoes_long, avaliacoes, avaliacoes_f)}
+
+        def selecionar_sql():
+            selecao = motor_sql.aplicar_filtros(motor, ciclo, local, status, genero)
+            selecao = motor_sql.filtrar_avaliacoes(motor, selecao, ciclo)
+            return motor_sql.filtrar_respostas_long(motor, selecao)
+
+        selecao = selecionar_sql()
+
+        def filtrar_sql():
+            selecao_filtros = selecionar_sql()
+            return {nome: motor_sql.recortar(motor, selecao_filtros, nome, df) for nome, df in originais.items()}
+
+        dados, _ = medir(filtrar_pandas, 1, memoria=False)
+        perguntas = list(contar_todas_respostas(dados['avaliacoes'], dados['avaliacoes_long']))
+        etapas = {
+            'filtros': (filtrar_pandas, filtrar_sql),
+            'metricas': (lambda: agregados.calcular_metricas(dados['alunos'], dados['inscricoes']),
+                         lambda: motor_sql.calcular_metricas(motor, selecao)),
+            'renda': (lambda: agregados.contar_renda(dados['alunos']),
+                      lambda: agregados.contar_renda(dados['alunos'], motor_sql.contador(motor, selecao, 'alunos'))),
+            'status_curso': (lambda: agregados.tabela_cruzada(dados['alunos'], 'CURSO', 'STATUS'),
+                             lambda: motor_sql.tabela_cruzada(motor, 'alunos', selecao['alunos'], 'CURSO', 'STATUS')),
+            'por_mes': (lambda: agregados.inscricoes_por_mes(dados['inscricoes']),
+                        lambda: motor_sql.inscricoes_por_mes(motor, selecao['inscricoes'])),
+            'contar_respostas': (
+                lambda: contar_todas_respostas(dados['avaliacoes'], dados['avaliacoes_long']),
+                lambda: {pergunta: motor_sql.contar_respostas_avaliacao(motor, selecao, pergunta)
+                         for pergunta in perguntas}),
+        }
+        for nome, (tabela, localizar) in CONTAGENS.items():
+            coluna = localizar(dados[tabela])
+            if coluna is not None:
+                etapas[f'contar_{nome}'] = (
+                    lambda tabela=tabela, coluna=coluna: agregados.contar_valores(dados[tabela], coluna),
+                    lambda tabela=tabela, coluna=coluna: motor_sql.contar_valores(motor, tabela, selecao[tabela], coluna))
+
+        for etapa, (com_pandas, com_sql) in etapas.items():
+            esperado, tempo_pandas = medir(com_pandas, args.repeticoes, memoria=False)
+            obtido, tempo_sql = medir(com_sql, args.repeticoes, memoria=False)
+            registrar(linhas, nome_filtro, etapa, tempo_pandas['tempo_ms'], tempo_sql['tempo_ms'],
+                      identicos(esperado, obtido))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Motor pandas x motor SQL (DuckDB) do Dashboard Metalab.')
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS_PADRAO,
+                        help='números de inscrições (padrão: 10000 100000 1000000)')
+    parser.add_argument('--varredura', action='store_true', help='testa também cada valor de cada filtro')
+    parser.add_argument('--repeticoes', type=int, default=3, help='execuções cronometradas por etapa (padrão: 3)')
+    parser.add_argument('--semente', type=int, default=0, help='semente dos dados sintéticos (padrão: 0)')
+    parser.add_argument('--cache', default=os.path.join(DIRETORIO_RESULTADOS, 'dados'),
+                        help='pasta dos CSVs sintéticos gerados (padrão: benchmarks/resultados/dados)')
+    parser.add_argument('--saida', help='arquivo JSON de resultados (padrão: benchmarks/resultados/motor-<data>.json)')
+    args = parser.parse_args(argv)
+
+    if not motor_sql.duckdb_disponivel():
+        parser.error('o pacote duckdb não está instalado (pip install duckdb)')
+
+    resultados = []
+
+    def registrar(escala, filtro, etapa, pandas_ms, sql_ms, diferenca):
+        resultados.append({'escala': escala, 'filtro': filtro, 'etapa': etapa, 'pandas_ms': pandas_ms,
+                           'duckdb_ms': sql_ms, 'identico': diferenca is None, 'diferenca': diferenca})
+        pandas_texto = f'{pandas_ms:>10.1f}' if pandas_ms is not None else ' ' * 10
+        razao = f'{pandas_ms / sql_ms:>7.1f}x' if pandas_ms and sql_ms else ' ' * 8
+        situacao = 'ok' if diferenca is None else f'DIFERENTE: {diferenca}'
+        print(f'{escala:>10,}  {filtro:<24.24}{etapa:<22}{pandas_texto} ms {sql_ms:>10.1f} ms {razao}  {situacao}',
+              flush=True)
+
+    print(f'{"escala":>10}  {"filtro":<24}{"etapa":<22}{"pandas":>13} {"duckdb":>13} {"razão":>8}')
+    for linhas in args.escalas:
+        executar_escala(linhas, args, registrar)
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f'motor-{datetime.now():%Y%m%d-%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    execucao = {'criado_em': datetime.now().isoformat(timespec='seconds'),
+                'ambiente': dict(ambiente(), duckdb=__import__('duckdb').__version__), 'resultados': resultados}
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(execucao, f, ensure_ascii=False, indent=1)
+    print(f'resultados em {saida}')
+
+    divergentes = [r for r in resultados if r['diferenca']]
+    if divergentes:
+        print(f'\n{len(divergentes)} resultado(s) diferente(s) entre os motores', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
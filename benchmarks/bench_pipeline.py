@@ -0,0 +1,271 @@
+"""
+Benchmarks do pipeline de dados do Dashboard Metalab.
+
+Mede cada etapa isoladamente (carregar, preprocessar, pivot, aplicar_filtros,
+filtrar_avaliacoes, contar_respostas e cada construtor de gráfico) sobre dados
+sintéticos (metalab.sintetico) em várias escalas e combinações de filtros:
+
+    python benchmarks/bench_pipeline.py                          # 10k, 100k e 1M inscrições
+    python benchmarks/bench_pipeline.py --escalas 10000 --repeticoes 5
+    python benchmarks/bench_pipeline.py --salvar-baseline        # grava benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/baseline.json
+
+Para cada etapa registra a mediana e o mínimo do tempo de parede e, numa
+execução extra com tracemalloc, o pico de memória alocada, a memória retida
+pelo resultado e o número de blocos alocados. Os resultados vão para um JSON
+em benchmarks/resultados/; com --baseline, etapas mais lentas que a tolerância
+são listadas como regressão e o comando termina com código 1.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from metalab import graficos  # noqa: E402
+from metalab.agregados import contar_respostas_avaliacao, inscricoes_por_mes  # noqa: E402
+from metalab.carregamento import carregar_csvs  # noqa: E402
+from metalab.colunas import (PERGUNTA_ESPACO, PERGUNTA_INSTALACOES, coluna_avaliacao_curso,  # noqa: E402
+                             coluna_avaliacao_professor, coluna_expectativas, coluna_indicacao,
+                             coluna_sabendo_curso, coluna_suporte)
+from metalab.filtros import (aplicar_filtros, filtrar_avaliacoes, filtrar_respostas_long,  # noqa: E402
+                             selecionar_avaliacoes)
+from metalab.indices import construir_indices, opcoes_filtro  # noqa: E402
+from metalab.preprocessamento import fazer_pivot_avaliacoes, numerar_avaliacoes, preprocessar_dados  # noqa: E402
+from metalab.sintetico import gerar_tabelas, salvar_csvs  # noqa: E402
+from metalab.tema import registrar_tema_metalab  # noqa: E402
+
+ESCALAS_PADRAO = [10_000, 100_000, 1_000_000]
+DIRETORIO_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+DIRETORIO_RESULTADOS = os.path.join(DIRETORIO_BENCHMARKS, 'resultados')
+BASELINE_PADRAO = os.path.join(DIRETORIO_BENCHMARKS, 'baseline.json')
+TOLERANCIA_PADRAO = 0.25  # 25% mais lento que a baseline = regressão
+MINIMO_MS_PADRAO = 5.0    # Diferenças abaixo disso são ruído
+
+# Filtros medidos: nome -> dimensões selecionadas ('primeiro' = primeira opção do sidebar)
+COMBINACOES_FILTROS = {
+    'sem_filtro': {},
+    'ciclo': {'ciclo': 'primeiro'},
+    'ciclo_local': {'ciclo': 'primeiro', 'local': 'primeiro'},
+    'status': {'status': 'CURSANDO'},
+    'genero': {'genero': 'primeiro'},
+}
+
+# Gráficos medidos: nome -> função(dados) com os dados filtrados da combinação
+GRAFICOS = {
+    'grafico_sexo': lambda d: graficos.grafico_sexo(d['alunos']),
+    'grafico_idade': lambda d: graficos.grafico_idade(d['alunos']),
+    'grafico_raca': lambda d: graficos.grafico_raca(d['alunos']),
+    'grafico_renda': lambda d: graficos.grafico_renda(d['alunos']),
+    'grafico_canais_inscricao': lambda d: graficos.grafico_canais_inscricao(d['inscricoes']),
+    'grafico_canais_avaliacao': lambda d: graficos.grafico_canais_avaliacao(d['avaliacoes']),
+    'grafico_status': lambda d: graficos.grafico_status(d['alunos']),
+    'grafico_status_curso': lambda d: graficos.grafico_status_curso(d['alunos']),
+    'grafico_regiao': lambda d: graficos.grafico_regiao(d['inscricoes']),
+    'grafico_local': lambda d: graficos.grafico_local(d['alunos']),
+    'grafico_temporal': lambda d: graficos.grafico_temporal(inscricoes_por_mes(d['inscricoes'])),
+    'grafico_horario': lambda d: graficos.grafico_horario(d['avaliacoes']),
+}
+
+
+def medir(funcao, repeticoes, memoria=True):
+    """
+    Executa funcao `repeticoes` vezes medindo o tempo de parede e, se memoria,
+    mais uma vez com tracemalloc. Retorna (resultado, métricas).
+    """
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        resultado = None
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    metricas = {
+        'repeticoes': repeticoes,
+        'tempo_ms': round(statistics.median(tempos), 3),
+        'tempo_min_ms': round(min(tempos), 3),
+    }
+    if memoria:
+        resultado = None
+        gc.collect()
+        tracemalloc.start()
+        resultado = funcao()
+        retido, pico = tracemalloc.get_traced_memory()
+        blocos = sum(estatistica.count for estatistica in tracemalloc.take_snapshot().statistics('filename'))
+        tracemalloc.stop()
+        metricas.update({
+            'pico_mb': round(pico / 1024 ** 2, 3),
+            'retido_mb': round(retido / 1024 ** 2, 3),
+            'blocos': blocos,
+        })
+    return resultado, metricas
+
+
+def preparar_csvs(linhas, diretorio_cache, semente=0):
+    """CSVs sintéticos da escala (gerados uma vez e reaproveitados entre execuções)"""
+    diretorio = os.path.join(diretorio_cache, f'{linhas}-s{semente}')
+    marcador = os.path.join(diretorio, '.completo')
+    if not os.path.exists(marcador):
+        salvar_csvs(gerar_tabelas(linhas, semente=semente), diretorio)
+        open(marcador, 'w').close()
+    return diretorio
+
+
+def valores_filtros(combinacao, indices):
+    """Traduz a combinação em (ciclo, local, status, genero) com valores existentes nos dados"""
+    selecao = {'ciclo': 'Todos', 'local': 'Todos', 'status': 'Todos', 'genero': 'Todos'}
+    for dimensao, valor in combinacao.items():
+        if valor == 'primeiro':
+            opcoes = opcoes_filtro(indices, dimensao) or ['Todos']
+            valor = opcoes[1] if len(opcoes) > 1 else 'Todos'
+        selecao[dimensao] = valor
+    return selecao['ciclo'], selecao['local'], selecao['status'], selecao['genero']
+
+
+def contar_todas_respostas(avaliacoes, avaliacoes_long):
+    """Contagens das perguntas exibidas na seção de avaliações"""
+    perguntas = [localizar(avaliacoes) for localizar in (coluna_avaliacao_curso, coluna_avaliacao_professor,
+                                                           coluna_sabendo_curso, coluna_expectativas,
+                                                           coluna_indicacao, coluna_suporte)]
+    perguntas += [p for p in (PERGUNTA_ESPACO, PERGUNTA_INSTALACOES) if p in avaliacoes.columns]
+    return {pergunta: contar_respostas_avaliacao(pergunta, avaliacoes, avaliacoes_long)
+            for pergunta in perguntas if pergunta}
+
+
+def executar_escala(linhas, args, registrar):
+    """Mede todas as etapas numa escala; registrar(estagio, filtro, metricas) guarda cada medição"""
+    diretorio = preparar_csvs(linhas, args.cache, args.semente)
+
+    def etapa(estagio, funcao, filtro='-'):
+        resultado, metricas = medir(funcao, args.repeticoes, memoria=not args.sem_memoria)
+        registrar(estagio, linhas, filtro, metricas)
+        return resultado
+
+    inscricoes, avaliacoes_long, alunos = etapa('carregar', lambda: carregar_csvs(diretorio))
+    inscricoes, alunos = etapa('preprocessar', lambda: preprocessar_dados(inscricoes, alunos))
+    avaliacoes_long = numerar_avaliacoes(avaliacoes_long)
+    avaliacoes = etapa('pivot', lambda: fazer_pivot_avaliacoes(avaliacoes_long))
+    indices = construir_indices({'alunos': alunos, 'inscricoes': inscricoes})
+
+    for nome_filtro, combinacao in COMBINACOES_FILTROS.items():
+        if args.filtros and nome_filtro not in args.filtros:
+            continue
+        ciclo, local, status, genero = valores_filtros(combinacao, indices)
+
+        alunos_f, inscricoes_f = etapa(
+            'aplicar_filtros', lambda: aplicar_filtros(alunos, inscricoes, ciclo, local, status, genero), nome_filtro)
+
+        def avaliacoes_da_selecao():
+            filtradas = filtrar_avaliacoes(avaliacoes, alunos_f, inscricoes_f, alunos, inscricoes, ciclo)
+            return selecionar_avaliacoes(avaliacoes, filtradas, ciclo)
+        avaliacoes_f = etapa('filtrar_avaliacoes', avaliacoes_da_selecao, nome_filtro)
+        long_f = filtrar_respostas_long(avaliacoes_long, avaliacoes, avaliacoes_f)
+
+        etapa('contar_respostas', lambda: contar_todas_respostas(avaliacoes_f, long_f), nome_filtro)
+
+        dados = {'alunos': alunos_f, 'inscricoes': inscricoes_f, 'avaliacoes': avaliacoes_f}
+        for nome_grafico, construir in GRAFICOS.items():
+            etapa(nome_grafico, lambda: construir(dados), nome_filtro)
+
+
+def chave(resultado):
+    return resultado['estagio'], resultado['escala'], resultado['filtro']
+
+
+def comparar(resultados, baseline, tolerancia, minimo_ms):
+    """Medições mais lentas que a baseline além da tolerância (e acima do ruído)"""
+    base = {chave(r): r for r in baseline['resultados']}
+    regressoes = []
+    for atual in resultados:
+        anterior = base.get(chave(atual))
+        if anterior is None:
+            continue
+        diferenca = atual['tempo_ms'] - anterior['tempo_ms']
+        if diferenca > minimo_ms and atual['tempo_ms'] > anterior['tempo_ms'] * (1 + tolerancia):
+            regressoes.append(dict(atual, baseline_ms=anterior['tempo_ms'],
+                                   variacao=round(atual['tempo_ms'] / anterior['tempo_ms'] - 1, 3)))
+    return regressoes
+
+
+def ambiente():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks do pipeline de dados do Dashboard Metalab.')
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS_PADRAO,
+                        help='números de inscrições (padrão: 10000 100000 1000000)')
+    parser.add_argument('--filtros', nargs='+', choices=list(COMBINACOES_FILTROS),
+                        help='combinações de filtros medidas (padrão: todas)')
+    parser.add_argument('--repeticoes', type=int, default=3, help='execuções cronometradas por etapa (padrão: 3)')
+    parser.add_argument('--sem-memoria', action='store_true', help='não mede memória (sem a execução com tracemalloc)')
+    parser.add_argument('--semente', type=int, default=0, help='semente dos dados sintéticos (padrão: 0)')
+    parser.add_argument('--cache', default=os.path.join(DIRETORIO_RESULTADOS, 'dados'),
+                        help='pasta dos CSVs sintéticos gerados (padrão: benchmarks/resultados/dados)')
+    parser.add_argument('--saida', help='arquivo JSON de resultados (padrão: benchmarks/resultados/<data>.json)')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--salvar-baseline', action='store_true', help=f'grava os resultados em {BASELINE_PADRAO}')
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO,
+                        help='aumento de tempo tolerado sobre a baseline (padrão: 0.25 = 25%%)')
+    parser.add_argument('--minimo-ms', type=float, default=MINIMO_MS_PADRAO,
+                        help='diferença mínima em ms para contar como regressão (padrão: 5)')
+    args = parser.parse_args(argv)
+
+    registrar_tema_metalab()
+    # Aquecer o Plotly: a primeira figura carrega validadores e templates sob demanda
+    graficos.grafico_status(pd.DataFrame({'STATUS': ['CURSANDO']}))
+    resultados = []
+
+    def registrar(estagio, escala, filtro, metricas):
+        resultados.append(dict(estagio=estagio, escala=escala, filtro=filtro, **metricas))
+        memoria = f"{metricas['pico_mb']:>10.1f} MB pico" if 'pico_mb' in metricas else ''
+        print(f'{escala:>10,}  {filtro:<12}{estagio:<26}{metricas["tempo_ms"]:>11.1f} ms{memoria}', flush=True)
+
+    for linhas in args.escalas:
+        executar_escala(linhas, args, registrar)
+
+    execucao = {'criado_em': datetime.now().isoformat(timespec='seconds'), 'ambiente': ambiente(),
+                'resultados': resultados}
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f'{datetime.now():%Y%m%d-%H%M%S}.json')
+    destinos = [saida] + ([BASELINE_PADRAO] if args.salvar_baseline else [])
+    for destino in destinos:
+        os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+        with open(destino, 'w', encoding='utf-8') as f:
+            json.dump(execucao, f, ensure_ascii=False, indent=1)
+    print(f'resultados em {", ".join(destinos)}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerancia, args.minimo_ms)
+        if regressoes:
+            print(f'\n{len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}:')
+            for r in regressoes:
+                print(f"{r['escala']:>10,}  {r['filtro']:<12}{r['estagio']:<26}"
+                      f"{r['baseline_ms']:>9.1f} -> {r['tempo_ms']:.1f} ms (+{r['variacao']:.0%})")
+            return 1
+        print('sem regressões em relação à baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
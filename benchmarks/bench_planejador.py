@@ -0,0 +1,142 @@
+"""
+Compara as contagens dos gráficos uma a uma com o planejador de agregações
+(metalab.planejador).
+
+Para cada escala e combinação de filtros calcula os pedidos de todos os
+gráficos (contagens, status x curso, métricas, respostas das avaliações e a
+matriz pergunta x resposta) de duas formas: cada pedido pela sua função
+(contar_valores, tabela_cruzada, contar_respostas_avaliacao), como sem o
+planejador, e num plano só, com os códigos das colunas já fatorados no
+snapshot. Registra o tempo de cada forma, as varreduras (uma por pedido x uma
+passada por tabela) e se os resultados são idênticos (mesmos valores, índices,
+ordem e tipos). A matriz, montada com as contagens das perguntas nas duas
+formas, fica fora do tempo:
+
+    python benchmarks/bench_planejador.py                 # 10k, 100k e 1M inscrições
+    python benchmarks/bench_planejador.py --escalas 100000 --varredura
+
+A fatoração das colunas (uma vez por snapshot) aparece na linha 'fatorar'.
+Termina com código 1 se algum resultado divergir.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from bench_pipeline import (DIRETORIO_RESULTADOS, ESCALAS_PADRAO, ambiente, contar_todas_respostas, medir,
+                            preparar_csvs)
+from bench_motor_sql import CONTAGENS, combinacoes, identicos
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from metalab import planejador  # noqa: E402
+from metalab.carregamento import carregar_csvs  # noqa: E402
+from metalab.colunas import coluna_renda  # noqa: E402
+from metalab.filtros import (aplicar_filtros, filtrar_avaliacoes, filtrar_respostas_long,  # noqa: E402
+                             selecionar_avaliacoes)
+from metalab.indices import construir_indices  # noqa: E402
+from metalab.normalizacao import normalizar_categoria_renda  # noqa: E402
+from metalab.preprocessamento import fazer_pivot_avaliacoes, numerar_avaliacoes, preprocessar_dados  # noqa: E402
+
+
+def pedidos_graficos(dados):
+    """Pedidos dos gráficos e das métricas do dashboard sobre as tabelas filtradas"""
+    pedidos = [planejador.contagem(tabela, localizar(dados[tabela])) for tabela, localizar in CONTAGENS.values()]
+    pedidos += [planejador.contagem('alunos', coluna_renda(dados['alunos']), normalizar_categoria_renda),
+                planejador.contagem('alunos', 'STATUS_NORMALIZADO'),
+                planejador.cruzamento('alunos', 'CURSO', 'STATUS')]
+    perguntas = list(contar_todas_respostas(dados['avaliacoes'], dados['avaliacoes_long']))
+    pedidos += [planejador.respostas(pergunta) for pergunta in perguntas]
+    pedidos.append(planejador.matriz(dict(zip(perguntas, perguntas))))
+    return pedidos
+
+
+def executar_escala(linhas, args, registrar):
+    diretorio = preparar_csvs(linhas, args.cache, args.semente)
+    inscricoes, avaliacoes_long, alunos = carregar_csvs(diretorio)
+    inscricoes, alunos = preprocessar_dados(inscricoes, alunos)
+    avaliacoes_long = numerar_avaliacoes(avaliacoes_long)
+    avaliacoes = fazer_pivot_avaliacoes(avaliacoes_long)
+    indices = construir_indices({'alunos': alunos, 'inscricoes': inscricoes})
+    originais = {'alunos': alunos, 'inscricoes': inscricoes, 'avaliacoes': avaliacoes, 'avaliacoes_long': avaliacoes_long}
+
+    estado = {}
+    relatorio, metricas = medir(lambda: planejador.executar_plano(pedidos_graficos(originais), originais, originais,
+                                                                  estado, {}), 1, memoria=False)
+    registrar(linhas, '-', 'fatorar', None, metricas['tempo_ms'], None, relatorio)
+
+    for nome_filtro, (ciclo, local, status, genero) in combinacoes(indices, args.varredura):
+        alunos_f, inscricoes_f = aplicar_filtros(alunos, inscricoes, ciclo, local, status, genero)
+        filtradas = filtrar_avaliacoes(avaliacoes, alunos_f, inscricoes_f, alunos, inscricoes, ciclo)
+        avaliacoes_f = selecionar_avaliacoes(avaliacoes, filtradas, ciclo)
+        dados = {'alunos': alunos_f, 'inscricoes': inscricoes_f, 'avaliacoes': avaliacoes_f,
+                 'avaliacoes_long': filtrar_respostas_long(avaliacoes_long, avaliacoes, avaliacoes_f)}
+        pedidos = pedidos_graficos(dados)
+        unicos = [pedido for lista in planejador.planejar(pedidos).values() for pedido in lista]
+
+        esperado, tempo_graficos = medir(
+            lambda: {pedido: planejador.referencia(pedido, dados) for pedido in unicos if pedido[0] != 'matriz'},
+            args.repeticoes, memoria=False)
+        esperado.update({pedido: planejador.referencia(pedido, dados) for pedido in unicos if pedido[0] == 'matriz'})
+
+        def planejar():
+            resultados = {}
+            return resultados, planejador.executar_plano(pedidos, dados, originais, estado, resultados)
+
+        (obtido, relatorio), tempo_plano = medir(planejar, args.repeticoes, memoria=False)
+        diferenca = identicos({repr(p): esperado[p] for p in unicos}, {repr(p): obtido.get(p) for p in unicos})
+        registrar(linhas, nome_filtro, 'agregacoes', tempo_graficos['tempo_ms'], tempo_plano['tempo_ms'],
+                  diferenca, relatorio)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Contagens por gráfico x planejador de agregações do Dashboard Metalab.')
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS_PADRAO,
+                        help='números de inscrições (padrão: 10000 100000 1000000)')
+    parser.add_argument('--varredura', action='store_true', help='testa também cada valor de cada filtro')
+    parser.add_argument('--repeticoes', type=int, default=3, help='execuções cronometradas por etapa (padrão: 3)')
+    parser.add_argument('--semente', type=int, default=0, help='semente dos dados sintéticos (padrão: 0)')
+    parser.add_argument('--cache', default=os.path.join(DIRETORIO_RESULTADOS, 'dados'),
+                        help='pasta dos CSVs sintéticos gerados (padrão: benchmarks/resultados/dados)')
+    parser.add_argument('--saida', help='arquivo JSON de resultados (padrão: benchmarks/resultados/planejador-<data>.json)')
+    args = parser.parse_args(argv)
+
+    resultados = []
+
+    def registrar(escala, filtro, etapa, graficos_ms, plano_ms, diferenca, relatorio):
+        resultados.append({'escala': escala, 'filtro': filtro, 'etapa': etapa, 'por_grafico_ms': graficos_ms,
+                           'planejador_ms': plano_ms, 'varreduras': relatorio['unicos'],
+                           'passadas': relatorio['passadas'], 'recuos': relatorio['recuos'],
+                           'identico': diferenca is None, 'diferenca': diferenca})
+        graficos_texto = f'{graficos_ms:>10.1f}' if graficos_ms is not None else ' ' * 10
+        razao = f'{graficos_ms / plano_ms:>7.1f}x' if graficos_ms and plano_ms else ' ' * 8
+        situacao = 'ok' if diferenca is None else f'DIFERENTE: {diferenca}'
+        print(f'{escala:>10,}  {filtro:<24.24}{etapa:<12}{graficos_texto} ms {plano_ms:>10.1f} ms {razao}'
+              f'{relatorio["unicos"]:>7} {relatorio["passadas"]:>8}  {situacao}', flush=True)
+
+    print(f'{"escala":>10}  {"filtro":<24}{"etapa":<12}{"por gráfico":>13} {"planejador":>13} {"razão":>8}'
+          f'{"varred.":>7} {"passadas":>8}')
+    for linhas in args.escalas:
+        executar_escala(linhas, args, registrar)
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f'planejador-{datetime.now():%Y%m%d-%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    execucao = {'criado_em': datetime.now().isoformat(timespec='seconds'), 'ambiente': ambiente(),
+                'resultados': resultados}
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(execucao, f, ensure_ascii=False, indent=1)
+    print(f'resultados em {saida}')
+
+    divergentes = [r for r in resultados if r['diferenca']]
+    if divergentes:
+        print(f'\n{len(divergentes)} resultado(s) diferente(s) entre as contagens por gráfico e o planejador',
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Memória de várias réplicas do app mapeando o mesmo snapshot (metalab.bundle).
+
+Para cada escala grava o bundle dos CSVs sintéticos com e sem o texto.arrow e
+sobe N processos (réplicas) em cada modo. Cada réplica abre o bundle, lê todas
+as colunas (hash de cada tabela) e, com todas as réplicas vivas ao mesmo
+tempo, lê /proc/self/smaps_rollup. Modos:
+
+- object: colunas de texto decodificadas do dicionário em cada processo;
+- arrow: o mesmo em strings do Arrow (METALAB_TEXTO=arrow, bundle sem texto.arrow);
+- arrow mapeado: colunas de texto mapeadas do texto.arrow (sem cópia).
+
+Registra, por modo, o RSS e a memória privada média de cada réplica e o PSS
+somado (a memória da máquina gasta pelo conjunto), já descontando um processo
+com os mesmos imports e sem dados. Confere também se as réplicas dos dois
+modos Arrow leem exatamente os mesmos dados:
+
+    python benchmarks/bench_replicas.py                       # 10k, 100k e 1M inscrições, 4 réplicas
+    python benchmarks/bench_replicas.py --escalas 100000 --replicas 8
+
+Só Linux (smaps_rollup). Requer o pacote pyarrow. Termina com código 1 se os
+dados dos modos Arrow divergirem.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from bench_pipeline import DIRETORIO_RESULTADOS, ESCALAS_PADRAO, ambiente, preparar_csvs
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from metalab.bundle import abrir_bundle  # noqa: E402
+from metalab.construcao import construir_snapshot  # noqa: E402
+
+# Modo -> (bundle com texto.arrow, texto_arrow na abertura); None: processo sem dados
+MODOS = {
+    'sem dados': None,
+    'object': (False, False),
+    'arrow': (False, True),
+    'arrow mapeado': (True, True),
+}
+
+
+def memoria_processo():
+    """Campos de /proc/self/smaps_rollup em MB (Rss, Pss, Private_*, Shared_*)"""
+    memoria = {}
+    with open('/proc/self/smaps_rollup', encoding='ascii') as f:
+        for linha in f:
+            partes = linha.split()
+            if len(partes) == 3 and partes[2] == 'kB':
+                memoria[partes[0].rstrip(':')] = int(partes[1]) / 1024
+    return memoria
+
+
+def replica(diretorio, texto_arrow, barreira, fila):
+    """Corpo de uma réplica: abre o bundle, lê todas as colunas e mede a memória com todas vivas"""
+    assinatura = None
+    if diretorio is not None:
+        dados = abrir_bundle(diretorio, texto_arrow=texto_arrow)
+        assinatura = {nome: int(pd.util.hash_pandas_object(df, index=True).sum())
+                      for nome, df in dados['tabelas'].items()}
+    barreira.wait()
+    memoria = memoria_processo()
+    barreira.wait()  # Ninguém sai antes de todas medirem
+    fila.put({'assinatura': assinatura, 'rss': memoria['Rss'], 'pss': memoria['Pss'],
+              'privada': memoria.get('Private_Clean', 0) + memoria.get('Private_Dirty', 0)})
+
+
+def medir_replicas(diretorio, texto_arrow, replicas):
+    contexto = multiprocessing.get_context('spawn')
+    barreira = contexto.Barrier(replicas)
+    fila = contexto.Queue()
+    processos = [contexto.Process(target=replica, args=(diretorio, texto_arrow, barreira, fila))
+                 for _ in range(replicas)]
+    for processo in processos:
+        processo.start()
+    medidas = [fila.get() for _ in processos]
+    for processo in processos:
+        processo.join()
+    return medidas
+
+
+def executar_escala(linhas, args, registrar):
+    diretorio = preparar_csvs(linhas, args.cache, args.semente)
+    bundles = {}
+    for com_texto in (False, True):
+        saida = os.path.join(args.cache, f'bundle-{linhas}-{"arrow" if com_texto else "npy"}')
+        bundles[com_texto] = construir_snapshot({}, diretorio, saida, manter=1, texto_arrow=com_texto)['caminho']
+
+    base = None
+    assinaturas = {}
+    for modo, configuracao in MODOS.items():
+        if configuracao is None:
+            medidas = medir_replicas(None, False, args.replicas)
+        else:
+            com_texto, texto_arrow = configuracao
+            medidas = medir_replicas(os.path.dirname(bundles[com_texto]), texto_arrow, args.replicas)
+        resumo = {
+            'rss_mb': sum(m['rss'] for m in medidas) / len(medidas),
+            'privada_mb': sum(m['privada'] for m in medidas) / len(medidas),
+            'pss_total_mb': sum(m['pss'] for m in medidas),
+        }
+        if base is None:
+            base = resumo
+        else:
+            resumo = {nome: valor - base[nome] for nome, valor in resumo.items()}
+            assinaturas[modo] = medidas[0]['assinatura']
+            if any(m['assinatura'] != medidas[0]['assinatura'] for m in medidas):
+                assinaturas[modo] = None
+        registrar(linhas, modo, resumo)
+    return assinaturas['arrow'] is not None and assinaturas['arrow'] == assinaturas['arrow mapeado']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Memória de réplicas do Dashboard Metalab mapeando o mesmo bundle.')
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS_PADRAO,
+                        help='números de inscrições (padrão: 10000 100000 1000000)')
+    parser.add_argument('--replicas', type=int, default=4, help='processos por modo (padrão: 4)')
+    parser.add_argument('--semente', type=int, default=0, help='semente dos dados sintéticos (padrão: 0)')
+    parser.add_argument('--cache', default=os.path.join(DIRETORIO_RESULTADOS, 'dados'),
+                        help='pasta dos CSVs sintéticos e dos bundles gerados (padrão: benchmarks/resultados/dados)')
+    parser.add_argument('--saida', help='arquivo JSON de resultados (padrão: benchmarks/resultados/replicas-<data>.json)')
+    args = parser.parse_args(argv)
+
+    resultados = []
+
+    def registrar(escala, modo, resumo):
+        resultados.append({'escala': escala, 'modo': modo, 'replicas': args.replicas, **resumo})
+        print(f'{escala:>10,}  {modo:<16}{resumo["rss_mb"]:>10.1f} MB {resumo["privada_mb"]:>10.1f} MB'
+              f'{resumo["pss_total_mb"]:>12.1f} MB', flush=True)
+
+    print(f'{args.replicas} réplicas por modo ("sem dados" em valores absolutos; os demais descontam esse processo)')
+    print(f'{"escala":>10}  {"modo":<16}{"RSS/réplica":>13} {"privada/rép.":>13}{"PSS total":>15}')
+    divergentes = [linhas for linhas in args.escalas if not executar_escala(linhas, args, registrar)]
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f'replicas-{datetime.now():%Y%m%d-%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    execucao = {'criado_em': datetime.now().isoformat(timespec='seconds'), 'ambiente': ambiente(),
+                'resultados': resultados, 'divergentes': divergentes}
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(execucao, f, ensure_ascii=False, indent=1)
+    print(f'resultados em {saida}')
+
+    if divergentes:
+        print(f'\ndados diferentes entre os modos arrow e arrow mapeado nas escalas {divergentes}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
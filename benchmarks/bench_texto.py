@@ -0,0 +1,201 @@
+"""
+Compara colunas de texto object (padrão) com strings do Arrow (metalab.texto).
+
+Para cada escala carrega os mesmos CSVs sintéticos nos dois modos, roda o
+pipeline (preprocessar, pivot, índices), os filtros de cada combinação e as
+contagens, e registra:
+
+- memória de cada tabela (memory_usage(deep=True); o tracemalloc não enxerga
+  os buffers do Arrow);
+- tempo de cada etapa nos dois modos;
+- se os resultados são os mesmos (mesmas linhas e contagens; o dtype dos
+  rótulos de texto muda de propósito);
+- colunas que voltaram a object no modo Arrow, em cada tabela e resultado.
+
+    python benchmarks/bench_texto.py                    # 10k, 100k e 1M inscrições
+    python benchmarks/bench_texto.py --escalas 100000
+
+Termina com código 1 se algum resultado divergir ou alguma coluna de texto
+voltar a object. Requer o pacote pyarrow.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from bench_pipeline import (COMBINACOES_FILTROS, DIRETORIO_RESULTADOS, ESCALAS_PADRAO, ambiente, contar_todas_respostas,
+                            medir, preparar_csvs, valores_filtros)
+from bench_motor_sql import CONTAGENS
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from metalab import agregados  # noqa: E402
+from metalab.carregamento import carregar_csvs  # noqa: E402
+from metalab.filtros import (aplicar_filtros, filtrar_avaliacoes, filtrar_respostas_long,  # noqa: E402
+                             selecionar_avaliacoes)
+from metalab.indices import construir_indices  # noqa: E402
+from metalab.preprocessamento import fazer_pivot_avaliacoes, numerar_avaliacoes, preprocessar_dados  # noqa: E402
+from metalab.texto import texto_arrow_disponivel  # noqa: E402
+
+MODOS = ('object', 'arrow')
+TABELAS = ('inscricoes', 'alunos', 'avaliacoes_long', 'avaliacoes')
+
+
+def memoria_mb(df):
+    return round(df.memory_usage(deep=True, index=True).sum() / 1024 ** 2, 3)
+
+
+def colunas_object(resultado):
+    """Colunas (ou índices de contagem) object num resultado; vazio se nada voltou a object"""
+    if isinstance(resultado, pd.DataFrame):
+        return [str(col) for col in resultado.columns if resultado[col].dtype == object]
+    if isinstance(resultado, pd.Series):
+        return ['<valores>'] * (resultado.dtype == object) + ['<índice>'] * (resultado.index.dtype == object)
+    if isinstance(resultado, dict):
+        return [f'{chave}.{coluna}' for chave, valor in resultado.items() for coluna in colunas_object(valor)]
+    return []
+
+
+def mesmos_valores(esperado, obtido):
+    """Compara os resultados dos dois modos sem exigir o mesmo dtype; retorna a diferença ou None"""
+    try:
+        if isinstance(esperado, pd.DataFrame):
+            pd.testing.assert_frame_equal(esperado, obtido, check_dtype=False, check_index_type=False,
+                                          check_column_type=False)
+        elif isinstance(esperado, pd.Series):
+            pd.testing.assert_series_equal(esperado, obtido, check_dtype=False, check_index_type=False)
+        elif isinstance(esperado, dict):
+            if set(esperado) != set(obtido):
+                return f'chaves diferentes: {sorted(set(esperado) ^ set(obtido), key=str)}'
+            for chave in esperado:
+                diferenca = mesmos_valores(esperado[chave], obtido[chave])
+                if diferenca:
+                    return f'{chave}: {diferenca}'
+        elif esperado != obtido:
+            return f'{esperado!r} != {obtido!r}'
+    except AssertionError as e:
+        return str(e).strip().splitlines()[0] if str(e).strip() else 'diferente'
+    return None
+
+
+def montar_pipeline(diretorio, modo):
+    """Carrega e processa os CSVs num modo; retorna (tabelas, tempos por etapa)"""
+    tempos = {}
+    (inscricoes, avaliacoes_long, alunos), metricas = medir(
+        lambda: carregar_csvs(diretorio, texto_arrow=(modo == 'arrow')), 1, memoria=False)
+    tempos['carregar'] = metricas['tempo_ms']
+    (inscricoes, alunos), metricas = medir(lambda: preprocessar_dados(inscricoes, alunos), 1, memoria=False)
+    tempos['preprocessar'] = metricas['tempo_ms']
+    avaliacoes_long, metricas = medir(lambda: numerar_avaliacoes(avaliacoes_long), 1, memoria=False)
+    tempos['numerar'] = metricas['tempo_ms']
+    avaliacoes, metricas = medir(lambda: fazer_pivot_avaliacoes(avaliacoes_long), 1, memoria=False)
+    tempos['pivot'] = metricas['tempo_ms']
+    indices, metricas = medir(lambda: construir_indices({'alunos': alunos, 'inscricoes': inscricoes}), 1, memoria=False)
+    tempos['indices'] = metricas['tempo_ms']
+    tabelas = {'inscricoes': inscricoes, 'alunos': alunos, 'avaliacoes_long': avaliacoes_long,
+               'avaliacoes': avaliacoes, 'indices': indices}
+    return tabelas, tempos
+
+
+def etapas_filtro(tabelas, selecao):
+    """Etapas cronometradas de uma combinação de filtros: nome -> função"""
+    ciclo, local, status, genero = selecao
+    alunos, inscricoes = tabelas['alunos'], tabelas['inscricoes']
+    avaliacoes, avaliacoes_long = tabelas['avaliacoes'], tabelas['avaliacoes_long']
+
+    def filtrar():
+        alunos_f, inscricoes_f = aplicar_filtros(alunos, inscricoes, ciclo, local, status, genero)
+        filtradas = filtrar_avaliacoes(avaliacoes, alunos_f, inscricoes_f, alunos, inscricoes, ciclo)
+        avaliacoes_f = selecionar_avaliacoes(avaliacoes, filtradas, ciclo)
+        return {'alunos': alunos_f, 'inscricoes': inscricoes_f, 'avaliacoes': avaliacoes_f,
+                'avaliacoes_long': filtrar_respostas_long(avaliacoes_long, avaliacoes, avaliacoes_f)}
+
+    dados = filtrar()
+    etapas = {
+        'filtros': filtrar,
+        'metricas': lambda: agregados.calcular_metricas(dados['alunos'], dados['inscricoes']),
+        'renda': lambda: agregados.contar_renda(dados['alunos']),
+        'resumo_status': lambda: agregados.resumo_status(dados['alunos'])[0],
+        'contar_respostas': lambda: contar_todas_respostas(dados['avaliacoes'], dados['avaliacoes_long']),
+    }
+    for nome, (tabela, localizar) in CONTAGENS.items():
+        coluna = localizar(dados[tabela])
+        if coluna is not None:
+            etapas[f'contar_{nome}'] = lambda tabela=tabela, coluna=coluna: agregados.contar_valores(dados[tabela], coluna)
+    return etapas
+
+
+def executar_escala(linhas, args, registrar):
+    diretorio = preparar_csvs(linhas, args.cache, args.semente)
+    pipelines = {modo: montar_pipeline(diretorio, modo) for modo in MODOS}
+
+    for etapa in pipelines['object'][1]:
+        registrar(linhas, '-', etapa, pipelines['object'][1][etapa], pipelines['arrow'][1][etapa], None, [])
+    for tabela in TABELAS:
+        objeto, arrow = (pipelines[modo][0][tabela] for modo in MODOS)
+        registrar(linhas, '-', f'memoria_{tabela}', memoria_mb(objeto), memoria_mb(arrow),
+                  mesmos_valores(objeto, arrow), colunas_object(arrow), unidade='MB')
+
+    for nome_filtro, combinacao in COMBINACOES_FILTROS.items():
+        selecao = valores_filtros(combinacao, pipelines['object'][0]['indices'])
+        etapas = {modo: etapas_filtro(pipelines[modo][0], selecao) for modo in MODOS}
+        for etapa, com_objeto in etapas['object'].items():
+            esperado, tempo_objeto = medir(com_objeto, args.repeticoes, memoria=False)
+            obtido, tempo_arrow = medir(etapas['arrow'][etapa], args.repeticoes, memoria=False)
+            registrar(linhas, nome_filtro, etapa, tempo_objeto['tempo_ms'], tempo_arrow['tempo_ms'],
+                      mesmos_valores(esperado, obtido), colunas_object(obtido))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Colunas de texto object x Arrow no Dashboard Metalab.')
+    parser.add_argument('--escalas', type=int, nargs='+', default=ESCALAS_PADRAO,
+                        help='números de inscrições (padrão: 10000 100000 1000000)')
+    parser.add_argument('--repeticoes', type=int, default=3, help='execuções cronometradas por etapa (padrão: 3)')
+    parser.add_argument('--semente', type=int, default=0, help='semente dos dados sintéticos (padrão: 0)')
+    parser.add_argument('--cache', default=os.path.join(DIRETORIO_RESULTADOS, 'dados'),
+                        help='pasta dos CSVs sintéticos gerados (padrão: benchmarks/resultados/dados)')
+    parser.add_argument('--saida', help='arquivo JSON de resultados (padrão: benchmarks/resultados/texto-<data>.json)')
+    args = parser.parse_args(argv)
+
+    if not texto_arrow_disponivel():
+        parser.error('o pacote pyarrow não está instalado (pip install pyarrow)')
+
+    resultados = []
+
+    def registrar(escala, filtro, etapa, objeto, arrow, diferenca, fallbacks, unidade='ms'):
+        resultados.append({'escala': escala, 'filtro': filtro, 'etapa': etapa, 'unidade': unidade,
+                           'object': objeto, 'arrow': arrow, 'identico': diferenca is None,
+                           'diferenca': diferenca, 'colunas_object': fallbacks})
+        razao = f'{objeto / arrow:>7.1f}x' if objeto and arrow else ' ' * 8
+        situacao = 'ok' if diferenca is None else f'DIFERENTE: {diferenca}'
+        if fallbacks:
+            situacao += f'  OBJECT: {", ".join(fallbacks[:5])}'
+        print(f'{escala:>10,}  {filtro:<14}{etapa:<26}{objeto:>10.1f} {unidade:<2} {arrow:>10.1f} {unidade:<2} '
+              f'{razao}  {situacao}', flush=True)
+
+    print(f'{"escala":>10}  {"filtro":<14}{"etapa":<26}{"object":>13} {"arrow":>13} {"razão":>8}')
+    for linhas in args.escalas:
+        executar_escala(linhas, args, registrar)
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f'texto-{datetime.now():%Y%m%d-%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    execucao = {'criado_em': datetime.now().isoformat(timespec='seconds'),
+                'ambiente': dict(ambiente(), pyarrow=__import__('pyarrow').__version__), 'resultados': resultados}
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(execucao, f, ensure_ascii=False, indent=1)
+    print(f'resultados em {saida}')
+
+    problemas = [r for r in resultados if r['diferenca'] or r['colunas_object']]
+    if problemas:
+        print(f'\n{len(problemas)} resultado(s) diferente(s) ou com texto em object', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,62 +1,86 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
+from collections import OrderedDict
 from datetime import datetime
-import gc  # Garbage collector para liberar memória
 import warnings
-import re  # Para expressões regulares na normalização
+import re
+import os
+import io
+import time
+import base64
+import hashlib
+import tempfile
+import threading
+
+from metalab import motor_sql, planejador, preprocessamento
+from metalab.agregados import (calcular_metricas, contar_respostas_avaliacao, contar_valores, inscricoes_por_mes,
+                               matriz_respostas, resumo_status, tabela_cruzada)
+from metalab.armazem import abrir_armazem, consultar_inscricoes, consultar_respostas, versao_armazem
+from metalab.bundle import abrir_bundle, versao_atual
+from metalab.busca import buscar, construir_indice_busca, frequencia_termos, resultados_busca
+from metalab.canais import coocorrencia_canais, construir_canais
+from metalab.carga_unica import (calcular_uma_vez, carregado_em, carregar_uma_vez, descartar_carga,
+                                 janela_validade)
+from metalab.carregamento import LIMITES_DASHBOARD, carregar_csvs, carregar_google_sheets
+from metalab.colunas import (COLUNA_CANAIS_INSCRICAO, COLUNA_HORARIO, COLUNA_REGIAO_INSCRICAO,
+                             PALAVRAS_AVALIACAO_CURSO, PALAVRAS_IDADE, PALAVRAS_PROF, PERGUNTA_ESPACO,
+                             PERGUNTA_INSTALACOES, coluna_avaliacao_curso, coluna_avaliacao_professor,
+                             coluna_expectativas, coluna_indicacao, coluna_raca, coluna_renda, coluna_sabendo_curso,
+                             coluna_sexo, coluna_suporte, colunas_relacionadas)
+from metalab.comparacao import METRICAS_COMPARACAO, comparar_ciclos, diferencas
+from metalab.construcao import ETAPAS_CONSTRUCAO, acompanhar_construcao
+from metalab.filtros import aplicar_filtros, filtrar_avaliacoes, filtrar_respostas_long, selecionar_avaliacoes
+from metalab.graficos import (grafico_canais_avaliacao, grafico_canais_inscricao, grafico_comparacao, grafico_conversao,
+                              grafico_coocorrencia_canais, grafico_funil, grafico_horario, grafico_idade, grafico_local,
+                              grafico_matriz_respostas, grafico_raca, grafico_regiao, grafico_renda, grafico_respostas,
+                              grafico_satisfacao, grafico_sexo, grafico_status, grafico_status_curso,
+                              grafico_perfil, grafico_temporal, grafico_termos)
+from metalab.funil import DIMENSOES_FUNIL, construir_funil, contar_funil, funil_por_dimensao
+from metalab.indices import construir_indices, opcoes_filtro
+from metalab.normalizacao import normalizar_categoria_renda
+from metalab.payload import otimizar_figura, tamanho_payload
+from metalab.perf import etapa, finalizar_perfil, iniciar_perfil, percentis, registrar_historico, secao
+from metalab.preprocessamento import fazer_pivot_avaliacoes, numerar_avaliacoes
+from metalab.regioes import construir_regioes
+from metalab.telemetria import (chamar_cacheada, combinacao_filtros, contar_execucao, diretorio_telemetria,
+                                estatisticas_cache, registrar_agregacoes, registrar_aquecimento, registrar_dados,
+                                registrar_rerun)
+from metalab.tema import (ESCALA_AZUL, ESCALA_AZUL_CLARA, ESCALA_SATISFACAO, registrar_tema_metalab)
+from metalab.temporal import GRANULARIDADES, agregar_serie, construir_temporal, serie_diaria
+from metalab.texto import texto_arrow_disponivel
+from metalab.visoes import (aquecer, combinacoes_aquecimento, contagem_memorizada, cruzamento_memorizado,
+                            memorizar)
+
 warnings.filterwarnings('ignore')  # Suprimir avisos desnecessários
 
 # Google Sheets disponível via URLs públicas (não precisa de bibliotecas extras)
 
-# Tema customizado para os gráficos - fundo transparente igual à tela
-px.defaults.template = "plotly"
-
-# Função para aplicar tema escuro consistente nos gráficos
-def aplicar_tema_escuro(fig):
-    """Aplica tema escuro consistente nos gráficos com fundo igual à tela"""
-    fig.update_layout(
-        plot_bgcolor='rgba(30, 30, 46, 0)',  # Transparente - igual ao fundo da tela
-        paper_bgcolor='rgba(30, 30, 46, 0)',  # Transparente - igual ao fundo da tela
-        font=dict(color='#e0e0e0', size=12),
-        xaxis=dict(
-            gridcolor='rgba(92, 107, 192, 0.2)', 
-            linecolor='rgba(92, 107, 192, 0.5)',
-            showgrid=True
-        ),
-        yaxis=dict(
-            gridcolor='rgba(92, 107, 192, 0.2)', 
-            linecolor='rgba(92, 107, 192, 0.5)',
-            showgrid=True
-        ),
-        legend=dict(
-            bgcolor='rgba(0,0,0,0)', 
-            font=dict(color='#e0e0e0'),
-            bordercolor='rgba(92, 107, 192, 0.3)',
-            borderwidth=1
-        ),
-        title=dict(font=dict(color='#90caf9'))
-    )
-    return fig
-
-# Cores do projeto Metalab Marketing Digital - Tema Escuro
-CORES_METALAB = {
-    'primary': '#1a237e',      # Azul escuro
-    'secondary': '#3949ab',     # Azul médio
-    'accent': '#5c6bc0',        # Azul claro
-    'light': '#90caf9',         # Azul claro brilhante
-    'success': '#66bb6a',       # Verde claro
-    'warning': '#ffa726',       # Laranja claro
-    'error': '#ef5350',         # Vermelho claro
-    'bg-dark': '#1e1e2e',       # Fundo escuro
-    'card-dark': '#2d2d44',     # Card escuro
-}
+# Tema customizado para os gráficos - registrado uma vez, usado por todas as figuras
+registrar_tema_metalab()
 
-# Paleta de cores para gráficos - Tema Escuro
-PALETA_METALAB = ['#5c6bc0', '#90caf9', '#7986cb', '#9fa8da', '#b39ddb']
+# ==========================================
+# OTIMIZAÇÃO DO PAYLOAD DOS GRÁFICOS
+# ==========================================
+def exibir_grafico(fig, key=None, nome=None, otimizada=False):
+    """
+    Otimiza o payload da figura (se ainda não otimizada) e exibe com st.plotly_chart.
+    
+    Com ?payload=1 na URL registra os bytes antes/depois de cada gráfico para o
+    relatório exibido na sidebar ao final da página.
+    """
+    with etapa(f"gráfico: {nome or key or fig.layout.title.text or 'sem título'}"):
+        if st.session_state.get('relatorio_payload_ativo'):
+            bytes_original = tamanho_payload(fig)
+            otimizar_figura(fig)
+            st.session_state.relatorio_payload.append({
+                'Gráfico': nome or key or fig.layout.title.text or 'sem título',
+                'Bytes original': bytes_original,
+                'Bytes otimizado': tamanho_payload(fig)
+            })
+        elif not otimizada:
+            otimizar_figura(fig)
+        with etapa('st.plotly_chart'):
+            st.plotly_chart(fig, use_container_width=True, key=key)
 
 # Configuração da página - Responsivo
 st.set_page_config(
@@ -71,9 +95,31 @@ st.set_page_config(
     }
 )
 
+# Relatório de payload (ativado com ?payload=1 na URL) - recomeça a cada rerun
+st.session_state.relatorio_payload_ativo = st.query_params.get('payload') == '1'
+st.session_state.relatorio_payload = []
+
+def perfil_habilitado():
+    """Painel de desempenho: ?perf=1 na URL ou `perf = true` na seção [debug] dos secrets"""
+    if st.query_params.get('perf') == '1':
+        return True
+    try:
+        return bool(st.secrets.get('debug', {}).get('perf', False))
+    except Exception:
+        return False
+
+# Perfil de desempenho do rerun (etapas medidas com metalab.perf): exibido no painel ao final
+# da página e/ou exportado para a pasta de telemetria (METALAB_TELEMETRIA)
+painel_perfil = perfil_habilitado()
+telemetria_ativa = diretorio_telemetria() is not None
+perfil_rerun = iniciar_perfil(painel_perfil or telemetria_ativa)
+secao('cabeçalho')
+
+# ==========================================
+# ASSETS ESTÁTICOS (CSS, créditos e logo)
+# ==========================================
 # CSS personalizado - Tema Escuro Metalab + Responsividade Mobile
-st.markdown("""
-    <style>
+CSS_METALAB = """
     /* Retângulos de créditos full width */
     .creditos-topo, .creditos-rodape {
         position: relative;
@@ -327,76 +373,165 @@ st.markdown("""
             font-size: 0.85rem !important;
         }
     }
-    </style>
-""", unsafe_allow_html=True)
+"""
 
-# Créditos no início - Retângulo preto full width no topo (antes da logo)
-st.markdown("""
-<style>
-    .creditos-topo {
-        position: relative;
-        width: 100vw;
-        left: 50%;
-        right: 50%;
-        margin-left: -50vw;
-        margin-right: -50vw;
-        background: #000000;
-        padding: 0.8rem 1rem;
-        text-align: center;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        gap: 0.5rem;
-        margin-top: -1rem;
-        margin-bottom: 1rem;
-    }
-</style>
-<div class="creditos-topo">
-    <svg width="20" height="20" viewBox="0 0 24 24" fill="white" style="vertical-align: middle;">
+# Ícone do GitHub usado nos créditos do topo e do rodapé
+SVG_GITHUB = """<svg width="20" height="20" viewBox="0 0 24 24" fill="white" style="vertical-align: middle;">
         <path d="M12 0c-6.626 0-12 5.373-12 12 0 5.302 3.438 9.8 8.207 11.387.599.111.793-.261.793-.577v-2.234c-3.338.726-4.033-1.416-4.033-1.416-.546-1.387-1.333-1.756-1.333-1.756-1.089-.745.083-.729.083-.729 1.205.084 1.839 1.237 1.839 1.237 1.07 1.834 2.807 1.304 3.492.997.107-.775.418-1.305.762-1.604-2.665-.305-5.467-1.334-5.467-5.931 0-1.311.469-2.381 1.236-3.221-.124-.303-.535-1.524.117-3.176 0 0 1.008-.322 3.301 1.23.957-.266 1.983-.399 3.003-.404 1.02.005 2.047.138 3.006.404 2.291-1.552 3.297-1.23 3.297-1.23.653 1.653.242 2.874.118 3.176.77.84 1.235 1.911 1.235 3.221 0 4.609-2.807 5.624-5.479 5.921.43.372.823 1.102.823 2.222v3.293c0 .319.192.694.801.576 4.765-1.589 8.199-6.086 8.199-11.386 0-6.627-5.373-12-12-12z"/>
-    </svg>
-    <p style='color: #ffffff; margin: 0; font-size: 1rem; font-weight: 500;'>
-        Criado por Vinicius Mendes | <a href="https://github.com/evinicim" target="_blank" style="color: #ffffff; text-decoration: none; font-weight: 600;">@evinicim</a>
-    </p>
-</div>
-""", unsafe_allow_html=True)
+    </svg>"""
+
+# Caminhos possíveis da logo (primeiro encontrado é usado)
+LOGO_PATHS = ('assets/Logo2.png', 'assets/Logo3.png', 'Logo2.png', 'Logo3.png')
+# Largura máxima da logo enviada ao navegador (a coluna central nunca passa disso)
+LARGURA_MAX_LOGO = 800
+# Pasta servida pelo Streamlit em app/static/ quando server.enableStaticServing está ativo
+PASTA_ESTATICA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+def minificar_css(css):
+    """Remove comentários e espaços redundantes do CSS (sem tocar em strings entre aspas)"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    partes = re.split(r'("[^"]*"|\'[^\']*\')', css)
+    for i in range(0, len(partes), 2):
+        parte = re.sub(r'\s+', ' ', partes[i])
+        partes[i] = re.sub(r'\s*([{};:,>])\s*', r'\1', parte)
+    return ''.join(partes).replace(';}', '}').strip()
+
+@st.cache_resource(show_spinner=False)
+def carregar_css():
+    """CSS minificado, montado uma única vez por processo"""
+    return minificar_css(CSS_METALAB)
+
+def html_creditos(classe):
+    """Retângulo preto full width com os créditos (topo ou rodapé)"""
+    return (
+        f'<div class="{classe}">{SVG_GITHUB}'
+        '<p style="color: #ffffff; margin: 0; font-size: 1rem; font-weight: 500;">'
+        'Criado por Vinicius Mendes | <a href="https://github.com/evinicim" target="_blank" '
+        'style="color: #ffffff; text-decoration: none; font-weight: 600;">@evinicim</a></p></div>'
+    )
+
+def redimensionar_imagem(conteudo, largura_max):
+    """Reduz a imagem para `largura_max` pixels de largura (requer Pillow; sem ele retorna o original)"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return conteudo
+    try:
+        with Image.open(io.BytesIO(conteudo)) as imagem:
+            if imagem.width <= largura_max:
+                return conteudo
+            altura = round(imagem.height * largura_max / imagem.width)
+            reduzida = imagem.resize((largura_max, altura), Image.LANCZOS)
+            saida = io.BytesIO()
+            reduzida.save(saida, format='PNG', optimize=True)
+    except Exception:
+        return conteudo
+    # Só usar a versão reduzida se realmente ficou menor
+    return saida.getvalue() if saida.tell() < len(conteudo) else conteudo
+
+@st.cache_resource(show_spinner=False)
+def carregar_logo(largura_max=LARGURA_MAX_LOGO):
+    """
+    Carrega, reduz e prepara a logo uma única vez por processo.
+    
+    Com server.enableStaticServing ativo, a imagem é gravada em static/ com o hash
+    do conteúdo no nome e referenciada como app/static/<arquivo>?v=<hash>; o
+    parâmetro v faz o servidor responder com cache de longa duração, então o
+    navegador baixa a logo uma vez. Sem static serving, cai para data URI em base64.
+    """
+    for logo_path in LOGO_PATHS:
+        if not os.path.exists(logo_path):
+            continue
+        try:
+            with open(logo_path, "rb") as img_file:
+                conteudo = redimensionar_imagem(img_file.read(), largura_max)
+        except OSError:
+            continue
+        
+        hash_conteudo = hashlib.sha256(conteudo).hexdigest()[:12]
+        logo = {'caminho': logo_path, 'hash': hash_conteudo, 'bytes': len(conteudo), 'src': None}
+        
+        if st.get_option('server.enableStaticServing'):
+            nome_arquivo = f"logo-{hash_conteudo}.png"
+            try:
+                os.makedirs(PASTA_ESTATICA, exist_ok=True)
+                destino = os.path.join(PASTA_ESTATICA, nome_arquivo)
+                if not os.path.exists(destino):
+                    with open(destino, 'wb') as arquivo:
+                        arquivo.write(conteudo)
+                logo['src'] = f"app/static/{nome_arquivo}?v={hash_conteudo}"
+            except OSError:
+                pass
+        
+        if logo['src'] is None:
+            logo['src'] = f"data:image/png;base64,{base64.b64encode(conteudo).decode()}"
+        return logo
+    return None
+
+# Cabeçalho: CSS, créditos no topo (antes da logo), logo e título
+inicio_cabecalho = time.perf_counter()
+html_cabecalho = [
+    f"<style>{carregar_css()}</style>",
+    html_creditos('creditos-topo')
+]
+st.markdown(html_cabecalho[0], unsafe_allow_html=True)
+st.markdown(html_cabecalho[1], unsafe_allow_html=True)
 
 # Logo e Título - Responsivo (com fundo branco)
-import os
-import base64
-logo_paths = ['assets/Logo2.png', 'assets/Logo3.png', 'Logo2.png', 'Logo3.png']
-logo_found = False
-for logo_path in logo_paths:
-    if os.path.exists(logo_path):
+logo = carregar_logo()
+if logo:
+    # Usar coluna única no mobile, centralizada
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
         try:
-            # Usar coluna única no mobile, centralizada
-            col1, col2, col3 = st.columns([1, 2, 1])
-            with col2:
-                # Converter imagem para base64 e incorporar diretamente no HTML
-                with open(logo_path, "rb") as img_file:
-                    img_base64 = base64.b64encode(img_file.read()).decode()
-                
-                # Container com fundo branco e imagem dentro
-                st.markdown(f"""
-                <div class="logo-container">
-                    <img src="data:image/png;base64,{img_base64}" style="max-width: 100%; height: auto; display: block; margin: 0 auto;" />
-                </div>
-                """, unsafe_allow_html=True)
-            logo_found = True
-            break
-        except Exception as e:
+            # Container com fundo branco e imagem dentro
+            html_logo = f'<div class="logo-container"><img src="{logo["src"]}" style="max-width: 100%; height: auto; display: block; margin: 0 auto;" /></div>'
+            st.markdown(html_logo, unsafe_allow_html=True)
+            html_cabecalho.append(html_logo)
+        except Exception:
             # Fallback: usar método Streamlit padrão sem fundo branco
-            try:
-                col1, col2, col3 = st.columns([1, 2, 1])
-                with col2:
-                    st.image(logo_path, use_container_width=True)
-                logo_found = True
-                break
-            except:
-                continue
+            st.image(logo['caminho'], use_container_width=True)
+
+html_cabecalho.append('<h1 class="main-header">📊 Dashboard Metalab Marketing Digital</h1>')
+html_cabecalho.append('<p style="text-align: center; color: #90caf9; font-size: 1.1rem; margin-bottom: 2rem;">Análise de Dados e Resultados</p>')
+st.markdown(html_cabecalho[-2], unsafe_allow_html=True)
+st.markdown(html_cabecalho[-1], unsafe_allow_html=True)
+
+if st.session_state.relatorio_payload_ativo:
+    st.session_state.relatorio_cabecalho = {
+        'ms': (time.perf_counter() - inicio_cabecalho) * 1000,
+        'bytes': sum(len(html.encode('utf-8')) for html in html_cabecalho),
+        'logo': logo
+    }
 
-st.markdown('<h1 class="main-header">📊 Dashboard Metalab Marketing Digital</h1>', unsafe_allow_html=True)
-st.markdown('<p style="text-align: center; color: #90caf9; font-size: 1.1rem; margin-bottom: 2rem;">Análise de Dados e Resultados</p>', unsafe_allow_html=True)
+# ==========================================
+# CARREGAMENTO DOS DADOS
+# ==========================================
+secao('dados')
+# Caminho do bundle gerado por precompute_metalab.py (pasta com o arquivo ATUAL)
+DIRETORIO_BUNDLE = os.getenv('METALAB_BUNDLE', os.path.join('dados', 'bundle'))
+
+# Colunas de texto: object (padrão) ou strings do Arrow (METALAB_TEXTO=arrow, ver metalab.texto)
+TEXTO_ARROW = os.getenv('METALAB_TEXTO', 'object').lower() == 'arrow'
+if TEXTO_ARROW and not texto_arrow_disponivel():
+    st.sidebar.warning("⚠️ METALAB_TEXTO=arrow, mas o pacote pyarrow não está instalado. Usando colunas object.")
+    TEXTO_ARROW = False
+
+# Bundle pré-processado: só mapeia os arquivos em memória, uma vez por processo e versão
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_bundle(diretorio, versao, texto_arrow):
+    """Abre a versão do bundle offline (tabelas já processadas, índices e agregados)"""
+    contar_execucao('carregar_bundle')
+    return abrir_bundle(diretorio, versao, texto_arrow)
+
+# Armazém SQLite com o histórico (precompute_metalab.py --armazem); configurado, tem precedência sobre o bundle
+CAMINHO_ARMAZEM = os.getenv('METALAB_ARMAZEM')
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_armazem(caminho, versao, texto_arrow):
+    """Abre a versão do armazém: alunos e pivot das avaliações em memória; inscrições e respostas ficam no SQLite"""
+    contar_execucao('carregar_armazem')
+    return abrir_armazem(caminho, texto_arrow)
 
 # Função para carregar do Google Sheets via URL pública (muito mais rápido)
 @st.cache_data(ttl=3600, max_entries=1, show_spinner=False)  # Cache por 1 hora
@@ -404,304 +539,29 @@ def load_from_google_sheets():
     """Carrega dados do Google Sheets se configurado (método simples sem autenticação)"""
     try:
         # Verificar se há configuração de Google Sheets nos secrets
-        secrets = st.secrets.get("google_sheets", {})
-        
-        # Suporta planilha única com múltiplas abas OU planilhas separadas
-        sheet_id = secrets.get("SHEET_ID")  # Planilha única
-        sheet_id_inscricoes = secrets.get("SHEET_ID_INSCRICOES")  # Planilha separada
-        sheet_id_avaliacoes = secrets.get("SHEET_ID_AVALIACOES")
-        sheet_id_alunos = secrets.get("SHEET_ID_ALUNOS")
-        
-        # Se usar planilha única (recomendado)
-        if sheet_id:
-            gid_inscricoes = secrets.get("GID_INSCRICOES", "0")
-            gid_avaliacoes = secrets.get("GID_AVALIACOES", "0")
-            gid_alunos = secrets.get("GID_ALUNOS", "0")
-            
-            # Carregar inscrições
-            url_inscricoes = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid_inscricoes}"
-            inscricoes = pd.read_csv(url_inscricoes, encoding='utf-8', low_memory=False)
-            
-            # Carregar avaliações
-            url_avaliacoes = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid_avaliacoes}"
-            avaliacoes = pd.read_csv(url_avaliacoes, encoding='utf-8', low_memory=False)
-            
-            # Carregar alunos
-            url_alunos = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid_alunos}"
-            alunos = pd.read_csv(url_alunos, encoding='utf-8', low_memory=False, sep=',')
-            
-            return inscricoes, avaliacoes, alunos
-        
-        # Se usar planilhas separadas (fallback)
-        elif all([sheet_id_inscricoes, sheet_id_avaliacoes, sheet_id_alunos]):
-            aba_inscricoes = secrets.get("ABA_INSCRICOES", "0")
-            url_inscricoes = f"https://docs.google.com/spreadsheets/d/{sheet_id_inscricoes}/export?format=csv&gid={aba_inscricoes}"
-            inscricoes = pd.read_csv(url_inscricoes, encoding='utf-8', low_memory=False)
-            
-            aba_avaliacoes = secrets.get("ABA_AVALIACOES", "0")
-            url_avaliacoes = f"https://docs.google.com/spreadsheets/d/{sheet_id_avaliacoes}/export?format=csv&gid={aba_avaliacoes}"
-            avaliacoes = pd.read_csv(url_avaliacoes, encoding='utf-8', low_memory=False)
-            
-            aba_alunos = secrets.get("ABA_ALUNOS", "0")
-            url_alunos = f"https://docs.google.com/spreadsheets/d/{sheet_id_alunos}/export?format=csv&gid={aba_alunos}"
-            alunos = pd.read_csv(url_alunos, encoding='utf-8', low_memory=False, sep=',')
-            
-            return inscricoes, avaliacoes, alunos
-        else:
-            return None, None, None
-    except Exception as e:
-        # Se falhar, retornar None para usar CSV como fallback
+        config = dict(st.secrets.get("google_sheets", {}))
+    except Exception:
         return None, None, None
+    return carregar_google_sheets(config, TEXTO_ARROW)
+
+# Validade dos dados carregados sem bundle: a versão muda a cada janela de 24 horas
+TTL_DADOS = 86400
 
-# Carregar dados com tratamento de erros robusto e cache agressivo
-@st.cache_data(ttl=86400, max_entries=1, show_spinner=False)  # Cache por 24 horas
+# Carregar dados com tratamento de erros robusto; chamada por carregar_uma_vez (uma carga por processo e versão)
 def load_data():
     """
     Carrega dados do Google Sheets (se configurado) ou CSV como fallback.
     Google Sheets é muito mais rápido que CSV.
     """
-    import os
-    
+    contar_execucao('load_data')
     # Tentar carregar do Google Sheets primeiro (muito mais rápido)
     inscricoes_gs, avaliacoes_gs, alunos_gs = load_from_google_sheets()
     if inscricoes_gs is not None and avaliacoes_gs is not None and alunos_gs is not None:
         return inscricoes_gs, avaliacoes_gs, alunos_gs
     
     # Se Google Sheets não disponível, usar CSV como fallback
-    data_dir = os.getenv('DATA_DIR', 'dados')
-    
     try:
-        # Carregar inscrições - procurar primeiro em dados/, depois na raiz
-        inscricoes_path = os.path.join('dados', 'Metalab_inscricoes_.csv')
-        if not os.path.exists(inscricoes_path):
-            inscricoes_path = 'Metalab_inscricoes_.csv'
-        
-        # Tentar diferentes encodings
-        inscricoes = None
-        encodings_tentados = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        for encoding in encodings_tentados:
-            try:
-                inscricoes = pd.read_csv(
-                    inscricoes_path, 
-                    encoding=encoding, 
-                    low_memory=False
-                )
-                break
-            except Exception:
-                continue
-        
-        if inscricoes is None:
-            # Última tentativa com tratamento de erros
-            try:
-                inscricoes = pd.read_csv(inscricoes_path, encoding='utf-8', low_memory=False, on_bad_lines='skip', errors='ignore')
-            except TypeError:
-                # Versão antiga do pandas não tem on_bad_lines
-                inscricoes = pd.read_csv(inscricoes_path, encoding='utf-8', low_memory=False, error_bad_lines=False, warn_bad_lines=False)
-        
-        # Limitar tamanho se muito grande (proteção contra crashes)
-        if len(inscricoes) > 20000:  # Reduzido de 50000 para melhor performance
-            inscricoes = inscricoes.head(20000)
-        gc.collect()  # Liberar memória
-        
-        # Carregar avaliações - procurar primeiro em dados/, depois na raiz
-        # Tentar diferentes nomes possíveis
-        avaliacoes_path = os.path.join('dados', 'Avaliacao_metalab.csv')
-        formato_long = False
-        if not os.path.exists(avaliacoes_path):
-            avaliacoes_path = os.path.join('dados', 'Avaliacao_programando_google_planilha.csv')
-        if not os.path.exists(avaliacoes_path):
-            avaliacoes_path = 'Avaliacao_metalab.csv'
-        if not os.path.exists(avaliacoes_path):
-            avaliacoes_path = 'Avaliacao_programando_google_planilha.csv'
-        
-        # Tentar diferentes encodings e separadores
-        avaliacoes = None
-        encodings_tentados = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        separadores_tentados = [';', ',', None]  # Ponto e vírgula primeiro (mais comum no Brasil)
-        
-        for encoding in encodings_tentados:
-            for sep in separadores_tentados:
-                try:
-                    if sep is None:
-                        avaliacoes = pd.read_csv(avaliacoes_path, encoding=encoding, sep=None, engine='python', low_memory=False)
-                    else:
-                        avaliacoes = pd.read_csv(avaliacoes_path, encoding=encoding, sep=sep, low_memory=False)
-                    
-                    # Verificar se é formato longo (tem coluna 'Pergunta')
-                    colunas_lower = [str(col).lower() for col in avaliacoes.columns]
-                    if 'pergunta' in colunas_lower and ('nome exibido' in colunas_lower or 'resposta de texto livre' in colunas_lower or 'resposta' in ' '.join(colunas_lower)):
-                        formato_long = True
-                        break
-                except Exception:
-                    continue
-            if avaliacoes is not None and formato_long:
-                break
-        
-        # Se ainda não conseguiu carregar, tentar última opção
-        if avaliacoes is None:
-            try:
-                try:
-                    avaliacoes = pd.read_csv(avaliacoes_path, encoding='utf-8', sep=';', low_memory=False, on_bad_lines='skip')
-                except TypeError:
-                    # Versão antiga do pandas não tem on_bad_lines
-                    avaliacoes = pd.read_csv(avaliacoes_path, encoding='utf-8', sep=';', low_memory=False, error_bad_lines=False, warn_bad_lines=False)
-                colunas_lower = [col.lower() for col in avaliacoes.columns]
-                if 'pergunta' in colunas_lower:
-                    formato_long = True
-            except Exception:
-                avaliacoes = pd.DataFrame()  # DataFrame vazio como fallback
-        
-        # Se for formato longo, transformar para formato largo (wide) - OTIMIZADO
-        # Verificar novamente se é formato longo (pode ter sido carregado com encoding diferente)
-        if not formato_long and avaliacoes is not None and len(avaliacoes) > 0:
-            colunas_lower = [str(col).lower() for col in avaliacoes.columns]
-            if 'pergunta' in colunas_lower:
-                formato_long = True
-        
-        if formato_long and len(avaliacoes) > 0:
-            # Limitar dados antes do pivot para melhor performance
-            if len(avaliacoes) > 10000:
-                # Se muito grande, usar apenas amostra para pivot
-                avaliacoes = avaliacoes.head(10000)
-            
-            # Identificar coluna de identificador (pode ter caracteres especiais)
-            id_col = None
-            for col in avaliacoes.columns:
-                col_lower = str(col).lower()
-                if any(palavra in col_lower for palavra in ['usuário', 'usuario', 'opinião', 'opiniao', 'pesquisa']):
-                    id_col = col
-                    break
-            
-            # Encontrar coluna de Pergunta (pode ter variações)
-            coluna_pergunta = None
-            for col in avaliacoes.columns:
-                if 'pergunta' in str(col).lower():
-                    coluna_pergunta = col
-                    break
-            
-            # Se não encontrou coluna_pergunta, tentar buscar de forma mais ampla
-            if coluna_pergunta is None:
-                for col in avaliacoes.columns:
-                    col_str = str(col).lower()
-                    if 'pergunta' in col_str or 'question' in col_str:
-                        coluna_pergunta = col
-                        break
-            
-            if coluna_pergunta:
-                # Criar índice único de forma mais eficiente
-                primeira_pergunta = avaliacoes[coluna_pergunta].iloc[0]
-                if id_col:
-                    avaliacoes['avaliacao_id'] = (avaliacoes[coluna_pergunta] == primeira_pergunta).groupby(avaliacoes[id_col], sort=False).cumsum()
-                else:
-                    avaliacoes['avaliacao_id'] = (avaliacoes[coluna_pergunta] == primeira_pergunta).cumsum()
-                
-                # Escolher coluna de valor (buscar variações)
-                valor_col = None
-                for col in avaliacoes.columns:
-                    col_lower = col.lower()
-                    if 'resposta de texto livre' in col_lower or 'resposta' in col_lower:
-                        if avaliacoes[col].notna().sum() > len(avaliacoes) * 0.1:
-                            valor_col = col
-                            break
-                
-                # Se não encontrou resposta de texto livre, usar Nome exibido
-                if valor_col is None:
-                    for col in avaliacoes.columns:
-                        if 'nome exibido' in col.lower():
-                            valor_col = col
-                            break
-                
-                if valor_col:
-                    # Pivot otimizado: usar apenas colunas necessárias e limitar
-                    try:
-                        # Garantir que avaliacao_id existe e é único
-                        if 'avaliacao_id' not in avaliacoes.columns:
-                            primeira_pergunta = avaliacoes[coluna_pergunta].iloc[0]
-                            if id_col:
-                                avaliacoes['avaliacao_id'] = (avaliacoes[coluna_pergunta] == primeira_pergunta).groupby(avaliacoes[id_col], sort=False).cumsum()
-                            else:
-                                avaliacoes['avaliacao_id'] = (avaliacoes[coluna_pergunta] == primeira_pergunta).cumsum()
-                        
-                        # Remover duplicatas antes do pivot
-                        colunas_pivot = ['avaliacao_id', coluna_pergunta, valor_col]
-                        avaliacoes_para_pivot = avaliacoes[colunas_pivot].copy()
-                        
-                        # Remover linhas com valores nulos críticos
-                        avaliacoes_para_pivot = avaliacoes_para_pivot.dropna(subset=[coluna_pergunta, valor_col])
-                        
-                        # Tentar pivot simples primeiro
-                        try:
-                            avaliacoes_pivot = avaliacoes_para_pivot.pivot(
-                                index='avaliacao_id',
-                                columns=coluna_pergunta,
-                                values=valor_col
-                            )
-                            avaliacoes = avaliacoes_pivot.reset_index(drop=True)
-                            avaliacoes.columns.name = None
-                            gc.collect()
-                        except Exception as e_pivot:
-                            # Se pivot falhar, usar pivot_table como fallback (mais robusto)
-                            try:
-                                avaliacoes_pivot = avaliacoes_para_pivot.pivot_table(
-                                    index='avaliacao_id',
-                                    columns=coluna_pergunta,
-                                    values=valor_col,
-                                    aggfunc='first',  # Pegar primeiro valor se houver duplicatas
-                                    fill_value=None
-                                )
-                                avaliacoes = avaliacoes_pivot.reset_index(drop=True)
-                                avaliacoes.columns.name = None
-                                gc.collect()
-                            except Exception as e_pivot_table:
-                                # Se ainda falhar, tentar método alternativo usando groupby
-                                try:
-                                    avaliacoes_grouped = avaliacoes_para_pivot.groupby(['avaliacao_id', coluna_pergunta])[valor_col].first().unstack(fill_value=None)
-                                    avaliacoes = avaliacoes_grouped.reset_index(drop=True)
-                                    avaliacoes.columns.name = None
-                                    gc.collect()
-                                except Exception as e_groupby:
-                                    # Se ainda falhar, manter formato longo e mostrar aviso
-                                    pass
-                    except Exception as e:
-                        # Se ainda falhar, manter formato longo
-                        pass
-        
-        # Carregar dados dos alunos - procurar primeiro em dados/, depois na raiz
-        alunos_path = os.path.join('dados', 'Metalab_Mcom_DadosAlunos.csv')
-        if not os.path.exists(alunos_path):
-            alunos_path = 'Metalab_Mcom_DadosAlunos.csv'
-        
-        # Tentar diferentes encodings
-        alunos = None
-        encodings_tentados = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        for encoding in encodings_tentados:
-            try:
-                alunos = pd.read_csv(
-                    alunos_path, 
-                    encoding=encoding, 
-                    low_memory=False, 
-                    sep=','
-                )
-                break
-            except Exception:
-                continue
-        
-        if alunos is None:
-            # Última tentativa com tratamento de erros
-            try:
-                alunos = pd.read_csv(alunos_path, encoding='utf-8', low_memory=False, sep=',', on_bad_lines='skip', errors='ignore')
-            except TypeError:
-                # Versão antiga do pandas não tem on_bad_lines
-                alunos = pd.read_csv(alunos_path, encoding='utf-8', low_memory=False, sep=',', error_bad_lines=False, warn_bad_lines=False)
-        
-        # Limitar tamanho se muito grande (proteção contra crashes)
-        if len(alunos) > 20000:  # Reduzido de 50000 para melhor performance
-            alunos = alunos.head(20000)
-        
-        # Liberar memória após carregar
-        gc.collect()
-        
-        return inscricoes, avaliacoes, alunos
+        return carregar_csvs(os.getenv('DATA_DIR', 'dados'), limites=LIMITES_DASHBOARD, texto_arrow=TEXTO_ARROW)
     except FileNotFoundError as e:
         st.error(f"⚠️ Arquivo de dados não encontrado: {e}")
         st.info("""
@@ -711,16 +571,22 @@ def load_data():
            - Avaliacao_metalab.csv (ou Avaliacao_programando_google_planilha.csv)
            - Metalab_Mcom_DadosAlunos.csv
         2. Ou configure a variável de ambiente DATA_DIR com o caminho dos arquivos
+        3. Ou gere o bundle offline: python precompute_metalab.py
         """)
         return None, None, None
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
         return None, None, None
 
-# Carregar dados (sem spinner para melhor performance)
-try:
-    inscricoes, avaliacoes, alunos = load_data()
-    
+# Função para pré-processar dados (com cache agressivo)
+@st.cache_data(ttl=TTL_DADOS, max_entries=2, show_spinner=False)  # Cache por 24 horas
+def preprocessar_dados(_inscricoes, _avaliacoes, _alunos, versao):
+    """Pré-processa dados para melhor performance (ver metalab.preprocessamento; versao identifica a carga)"""
+    contar_execucao('preprocessar_dados')
+    return preprocessamento.preprocessar_dados(_inscricoes, _alunos)
+
+def verificar_tabelas(inscricoes, avaliacoes, alunos):
+    """Interrompe a página se alguma tabela não carregou ou veio vazia"""
     if inscricoes is None or avaliacoes is None or alunos is None:
         st.error("⚠️ Erro ao carregar dados. Verifique se os arquivos CSV estão na pasta dados/")
         st.stop()
@@ -729,188 +595,262 @@ try:
     if len(inscricoes) == 0 or len(alunos) == 0:
         st.error("⚠️ Arquivos de dados estão vazios. Verifique os arquivos CSV.")
         st.stop()
-        
-except Exception as e:
-    st.error(f"⚠️ Erro crítico ao carregar dados: {str(e)}")
-    st.info("""
-    **Solução:**
-    1. Verifique se os arquivos CSV estão na pasta dados/
-    2. Verifique se os arquivos não estão corrompidos
-    3. Tente limpar o cache: Menu → Settings → Clear cache
-    4. Recarregue a página
-    """)
-    st.stop()
 
-# Função para pré-processar dados (com cache agressivo)
-@st.cache_data(ttl=86400, max_entries=1, show_spinner=False)  # Cache por 24 horas
-def preprocessar_dados(_inscricoes, _avaliacoes, _alunos):
-    """Pré-processa dados para melhor performance"""
-    inscricoes_proc = _inscricoes.copy()
-    alunos_proc = _alunos.copy()
-    
-    # Limpar colunas de inscrições
-    if 'Carimbo de data/hora' in inscricoes_proc.columns:
-        inscricoes_proc['Data_Inscricao'] = pd.to_datetime(inscricoes_proc['Carimbo de data/hora'], errors='coerce')
-        inscricoes_proc['Ano'] = inscricoes_proc['Data_Inscricao'].dt.year
-        inscricoes_proc['Mes'] = inscricoes_proc['Data_Inscricao'].dt.month
-    
-    # Preparar dados de alunos (otimizado com vectorização)
-    if 'STATUS' in alunos_proc.columns:
-        alunos_proc['STATUS'] = alunos_proc['STATUS'].astype(str).str.upper().str.strip()
-        
-        # Otimizar: usar vectorização ao invés de apply (muito mais rápido)
-        mask_concluido = alunos_proc['STATUS'].str.contains('CONCLUIDO|CONCLUÍDO', case=False, na=False, regex=True)
-        mask_cursando = alunos_proc['STATUS'].str.contains('CURSANDO|EM CURSO|EM ANDAMENTO', case=False, na=False, regex=True)
-        mask_desistente = alunos_proc['STATUS'].str.contains('DESISTENTE', case=False, na=False, regex=True)
-        
-        alunos_proc['STATUS_NORMALIZADO'] = 'OUTROS'
-        alunos_proc.loc[mask_concluido, 'STATUS_NORMALIZADO'] = 'CONCLUÍDO'
-        alunos_proc.loc[mask_cursando, 'STATUS_NORMALIZADO'] = 'CURSANDO'
-        alunos_proc.loc[mask_desistente, 'STATUS_NORMALIZADO'] = 'DESISTENTE'
-    else:
-        alunos_proc['STATUS_NORMALIZADO'] = 'OUTROS'
-    
-    return inscricoes_proc, alunos_proc
+# Preferir o armazém SQLite, se configurado, e depois o bundle offline; sem eles, carregar e processar no próprio app
+dados_armazem = None
+versao_armazem_atual = versao_armazem(CAMINHO_ARMAZEM)
+if versao_armazem_atual:
+    try:
+        with etapa('abrir armazém'):
+            dados_armazem = chamar_cacheada(carregar_armazem, 'carregar_armazem', CAMINHO_ARMAZEM, versao_armazem_atual,
+                                            TEXTO_ARROW)
+    except Exception as e:
+        st.warning(f"⚠️ Armazém {CAMINHO_ARMAZEM} inválido ({e}). Carregando os dados de outra fonte.")
+elif CAMINHO_ARMAZEM:
+    st.warning(f"⚠️ Armazém {CAMINHO_ARMAZEM} não encontrado. Gere-o com: python precompute_metalab.py --armazem {CAMINHO_ARMAZEM}")
 
-# Função para fazer pivot das avaliações (converter de longo para largo)
-def fazer_pivot_avaliacoes(_avaliacoes):
-    """Converte avaliações de formato longo para formato largo (wide)"""
-    if _avaliacoes is None or len(_avaliacoes) == 0:
-        return _avaliacoes
-    
-    # Verificar se já está em formato largo (não tem coluna 'Pergunta')
-    colunas_lower = [str(col).lower() for col in _avaliacoes.columns]
-    if 'pergunta' not in colunas_lower:
-        return _avaliacoes  # Já está em formato largo
-    
-    # Está em formato longo, fazer pivot
+dados_bundle = None
+versao_bundle = versao_atual(DIRETORIO_BUNDLE) if dados_armazem is None else None
+if versao_bundle:
     try:
-        # Encontrar colunas necessárias
-        coluna_pergunta = None
-        for col in _avaliacoes.columns:
-            if 'pergunta' in str(col).lower():
-                coluna_pergunta = col
-                break
-        
-        id_col = None
-        for col in _avaliacoes.columns:
-            col_lower = str(col).lower()
-            if any(palavra in col_lower for palavra in ['usuário', 'usuario', 'opinião', 'opiniao', 'pesquisa']):
-                id_col = col
-                break
-        
-        valor_col = None
-        for col in _avaliacoes.columns:
-            col_lower = str(col).lower()
-            if 'resposta de texto livre' in col_lower:
-                if _avaliacoes[col].notna().sum() > len(_avaliacoes) * 0.1:
-                    valor_col = col
-                    break
-        
-        if valor_col is None:
-            for col in _avaliacoes.columns:
-                if 'nome exibido' in str(col).lower():
-                    valor_col = col
-                    break
-        
-        if coluna_pergunta and valor_col:
-            # Criar ID único baseado na primeira pergunta
-            primeira_pergunta = _avaliacoes[coluna_pergunta].iloc[0]
-            if id_col:
-                _avaliacoes['avaliacao_id'] = (_avaliacoes[coluna_pergunta] == primeira_pergunta).groupby(_avaliacoes[id_col], sort=False).cumsum()
-            else:
-                _avaliacoes['avaliacao_id'] = (_avaliacoes[coluna_pergunta] == primeira_pergunta).cumsum()
-            
-            # Extrair CICLO antes do pivot (se a pergunta CICLO existir)
-            ciclo_values = {}
-            perguntas_unicas = _avaliacoes[coluna_pergunta].unique()
-            for pergunta in perguntas_unicas:
-                pergunta_str = str(pergunta).upper().strip()
-                # Verificar se a pergunta é exatamente "CICLO" ou contém "CICLO"
-                if pergunta_str == 'CICLO' or 'CICLO' in pergunta_str:
-                    # Encontrar avaliações com pergunta CICLO
-                    mask_ciclo = _avaliacoes[coluna_pergunta].astype(str).str.upper().str.strip() == pergunta_str
-                    if mask_ciclo.any():
-                        ciclo_data = _avaliacoes[mask_ciclo][['avaliacao_id', valor_col]].copy()
-                        ciclo_data = ciclo_data.rename(columns={valor_col: 'CICLO'})
-                        ciclo_data = ciclo_data.dropna(subset=['CICLO'])
-                        # Filtrar valores inválidos (como "Ignorados", "nan", etc)
-                        ciclo_data = ciclo_data[~ciclo_data['CICLO'].astype(str).str.upper().str.strip().isin(['IGNORADOS', 'NAN', 'NONE', '', 'NULL'])]
-                        # Mapear avaliacao_id para ciclo (normalizar removendo .0)
-                        for idx, row in ciclo_data.iterrows():
-                            ciclo_val = str(row['CICLO']).strip()
-                            # Remover .0 do final se houver
-                            if ciclo_val.endswith('.0'):
-                                ciclo_val = ciclo_val[:-2]
-                            if ciclo_val and ciclo_val.upper() not in ['IGNORADOS', 'NAN', 'NONE', 'NULL']:
-                                ciclo_values[row['avaliacao_id']] = ciclo_val.strip()
-                    break
-            
-            # Preservar coluna Pesquisa antes do pivot (se existir)
-            pesquisa_values = {}
-            if 'Pesquisa' in _avaliacoes.columns:
-                # Mapear avaliacao_id para Pesquisa (usar o primeiro valor de cada avaliacao_id)
-                pesquisa_data = _avaliacoes[['avaliacao_id', 'Pesquisa']].copy()
-                # Remover duplicatas mantendo o primeiro valor de cada avaliacao_id
-                pesquisa_data = pesquisa_data.drop_duplicates(subset=['avaliacao_id'], keep='first')
-                for idx, row in pesquisa_data.iterrows():
-                    if pd.notna(row['Pesquisa']):
-                        pesquisa_values[row['avaliacao_id']] = row['Pesquisa']
-            
-            # Fazer pivot usando pivot_table
-            avaliacoes_para_pivot = _avaliacoes[['avaliacao_id', coluna_pergunta, valor_col]].copy()
-            avaliacoes_para_pivot = avaliacoes_para_pivot.dropna(subset=[coluna_pergunta, valor_col])
-            
-            avaliacoes_pivot = avaliacoes_para_pivot.pivot_table(
-                index='avaliacao_id',
-                columns=coluna_pergunta,
-                values=valor_col,
-                aggfunc='first',
-                fill_value=None
-            )
-            
-            # Adicionar coluna CICLO se foi extraída (antes de reset_index)
-            if ciclo_values:
-                ciclos_list = [ciclo_values.get(idx, None) for idx in avaliacoes_pivot.index]
-                avaliacoes_pivot['CICLO'] = ciclos_list
-                # Preencher valores faltantes
-                avaliacoes_pivot['CICLO'] = avaliacoes_pivot['CICLO'].fillna(method='ffill').fillna(method='bfill')
-            
-            # Adicionar coluna Pesquisa se foi preservada
-            if pesquisa_values:
-                pesquisas_list = [pesquisa_values.get(idx, None) for idx in avaliacoes_pivot.index]
-                avaliacoes_pivot['Pesquisa'] = pesquisas_list
-                # Preencher valores faltantes
-                avaliacoes_pivot['Pesquisa'] = avaliacoes_pivot['Pesquisa'].fillna(method='ffill').fillna(method='bfill')
-            
-            avaliacoes_pivot = avaliacoes_pivot.reset_index(drop=True)
-            avaliacoes_pivot.columns.name = None
-            
-            return avaliacoes_pivot
+        with etapa('carregar bundle'):
+            dados_bundle = chamar_cacheada(carregar_bundle, 'carregar_bundle', DIRETORIO_BUNDLE, versao_bundle, TEXTO_ARROW)
     except Exception as e:
-        pass
+        st.warning(f"⚠️ Bundle {versao_bundle} inválido ({e}). Carregando os dados diretamente.")
+
+# Sem armazém nem bundle, o snapshot é construído num processo trabalhador (metalab.construcao), fora do GIL
+# do servidor, e publicado como bundle numa pasta própria; o app só mapeia a versão pronta.
+# METALAB_CONSTRUCAO=local carrega e processa os dados no próprio servidor, como antes
+CONSTRUCAO_LOCAL = os.getenv('METALAB_CONSTRUCAO', 'processo').lower() == 'local'
+DIRETORIO_CONSTRUCAO = os.getenv('METALAB_CONSTRUCAO_DIR') or os.path.join(
+    tempfile.gettempdir(),
+    'metalab-snapshot-' + hashlib.sha1(os.path.abspath(os.getenv('DATA_DIR', 'dados')).encode('utf-8')).hexdigest()[:8])
+# Intervalo (segundos) entre os reruns que atualizam o progresso da primeira construção
+INTERVALO_PROGRESSO = 0.5
+
+def config_google_sheets():
+    """Seção [google_sheets] dos secrets, repassada ao trabalhador (vazia se não configurada)"""
+    try:
+        return dict(st.secrets.get("google_sheets", {}))
+    except Exception:
+        return {}
+
+def descrever_progresso(progresso):
+    """Etapa atual e etapas concluídas da construção, para o texto do progresso"""
+    concluidas = len(progresso.get('etapas', {}))
+    return concluidas, f"{progresso.get('etapa') or 'iniciando'} ({concluidas}/{len(ETAPAS_CONSTRUCAO)})"
+
+if dados_armazem is None and dados_bundle is None and not CONSTRUCAO_LOCAL:
+    with etapa('construção do snapshot'):
+        construcao = acompanhar_construcao(DIRETORIO_CONSTRUCAO, janela_validade(TTL_DADOS),
+                                           os.getenv('DATA_DIR', 'dados'), config_google_sheets(), LIMITES_DASHBOARD,
+                                           texto_arrow=TEXTO_ARROW)
+    progresso_construcao = construcao['progresso'] or {}
+    if construcao['versao']:
+        # Versão pronta (da janela atual ou, durante a reconstrução, a anterior)
+        try:
+            with etapa('carregar bundle'):
+                dados_bundle = chamar_cacheada(carregar_bundle, 'carregar_bundle', DIRETORIO_CONSTRUCAO,
+                                               construcao['versao'], TEXTO_ARROW)
+            versao_bundle = construcao['versao']
+        except Exception as e:
+            st.warning(f"⚠️ Snapshot {construcao['versao']} inválido ({e}). Carregando os dados diretamente.")
+        if construcao['construindo']:
+            st.sidebar.caption(f"🔄 Atualizando os dados em segundo plano: "
+                               f"{descrever_progresso(progresso_construcao)[1]}")
+    elif construcao['construindo']:
+        # Primeira construção: mostrar o progresso e reexecutar até a versão ser publicada
+        concluidas, texto = descrever_progresso(progresso_construcao)
+        st.progress(concluidas / len(ETAPAS_CONSTRUCAO), text=f"⏳ Preparando os dados: {texto}")
+        time.sleep(INTERVALO_PROGRESSO)
+        st.rerun()
+    # Se o trabalhador falhou sem versão pronta, os dados são carregados aqui mesmo (com as mensagens de erro de sempre)
+
+if dados_armazem is not None:
+    if dados_armazem['linhas'].get('inscricoes', 0) == 0 or len(dados_armazem['alunos']) == 0:
+        st.error("⚠️ O armazém não tem inscrições ou alunos. Gere-o novamente com precompute_metalab.py --armazem.")
+        st.stop()
+    alunos_originais = dados_armazem['alunos']
+    avaliacoes_pivotadas = dados_armazem['avaliacoes']
+    indices_filtros = dados_armazem['indices']
+    # Inscrições e respostas ficam no SQLite: são buscadas já filtradas, depois do sidebar
+    inscricoes_originais = avaliacoes_originais_long = None
+elif dados_bundle is not None:
+    tabelas_bundle = dados_bundle['tabelas']
+    verificar_tabelas(tabelas_bundle['inscricoes'], tabelas_bundle['avaliacoes'], tabelas_bundle['alunos'])
+    inscricoes_originais = tabelas_bundle['inscricoes']
+    alunos_originais = tabelas_bundle['alunos']
+    avaliacoes_originais_long = tabelas_bundle['avaliacoes_long']
+    avaliacoes_pivotadas = tabelas_bundle['avaliacoes']
+    indices_filtros = dados_bundle['indices']
+else:
+    # Carregar dados (sem spinner para melhor performance)
+    try:
+        # Na virada da janela, só uma sessão carrega a versão nova; as outras seguem com a anterior
+        with etapa('carregar'):
+            (inscricoes, avaliacoes, alunos), versao_carga = carregar_uma_vez('load_data', janela_validade(TTL_DADOS),
+                                                                              load_data)
+        if inscricoes is None or avaliacoes is None or alunos is None:
+            descartar_carga('load_data')  # Tentar de novo no próximo rerun, sem guardar a falha
+        verificar_tabelas(inscricoes, avaliacoes, alunos)
+    except Exception as e:
+        st.error(f"⚠️ Erro crítico ao carregar dados: {str(e)}")
+        st.info("""
+        **Solução:**
+        1. Verifique se os arquivos CSV estão na pasta dados/
+        2. Verifique se os arquivos não estão corrompidos
+        3. Tente limpar o cache: Menu → Settings → Clear cache
+        4. Recarregue a página
+        """)
+        st.stop()
     
-    return _avaliacoes  # Se falhar, retornar original
-
-# Pré-processar dados uma vez (com cache, sem spinner)
-inscricoes_originais, alunos_originais = preprocessar_dados(inscricoes, avaliacoes, alunos)
-
-# Manter uma cópia do DataFrame original de avaliações ANTES do pivot para contar todas as respostas
-avaliacoes_originais_long = avaliacoes.copy() if avaliacoes is not None else None
-
-# Fazer pivot das avaliações ANTES dos filtros
-avaliacoes_pivotadas = fazer_pivot_avaliacoes(avaliacoes)
-
-# Manter cópia original das avaliações (já pivotadas) para filtros
-avaliacoes_originais = avaliacoes_pivotadas.copy() if avaliacoes_pivotadas is not None else avaliacoes_pivotadas
-
-# Criar cópias para filtros (sem cache - serão modificadas pelos filtros)
-inscricoes = inscricoes_originais.copy()
-alunos = alunos_originais.copy()
+    # Pré-processar dados uma vez (com cache, sem spinner)
+    with etapa('preprocessar'):
+        inscricoes_originais, alunos_originais = chamar_cacheada(preprocessar_dados, 'preprocessar_dados',
+                                                                 inscricoes, avaliacoes, alunos, versao_carga)
+    
+    # Manter o DataFrame original de avaliações (formato longo) para contar todas as respostas;
+    # avaliacao_id liga cada resposta à linha do pivot
+    # Fazer pivot das avaliações ANTES dos filtros
+    with etapa('pivot'):
+        avaliacoes_originais_long = numerar_avaliacoes(avaliacoes)
+        avaliacoes_pivotadas = fazer_pivot_avaliacoes(avaliacoes_originais_long)
+    
+    # Índices das dimensões de filtro (opções do sidebar)
+    with etapa('índices'):
+        indices_filtros = construir_indices({'alunos': alunos_originais, 'inscricoes': inscricoes_originais})
+
+# Avaliações (já pivotadas) antes dos filtros; os filtros só selecionam linhas, sem copiar os dados
+avaliacoes_originais = avaliacoes_pivotadas
+
+# Índice invertido dos comentários (metalab.busca): vem pronto do armazém ou do bundle; sem eles,
+# é montado uma vez por processo e carga dos dados
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_indice_busca(_avaliacoes_long, versao):
+    """Índice de busca nas respostas de texto livre (versao só identifica a carga no cache)"""
+    contar_execucao('carregar_indice_busca')
+    return construir_indice_busca(_avaliacoes_long)
+
+if dados_armazem is not None:
+    indice_busca = dados_armazem['busca']
+elif dados_bundle is not None:
+    indice_busca = dados_bundle['busca']
+else:
+    with etapa('índice de busca'):
+        indice_busca = chamar_cacheada(carregar_indice_busca, 'carregar_indice_busca',
+                                       avaliacoes_originais_long, versao_carga)
+
+# Canais de comunicação separados em pares (linha, canal) (metalab.canais): também vêm prontos do
+# armazém ou do bundle; sem eles, são separados uma vez por processo e carga dos dados
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_canais(_inscricoes, versao):
+    """Tabela de canais das inscrições originais (versao só identifica a carga no cache)"""
+    contar_execucao('carregar_canais')
+    return construir_canais(_inscricoes)
+
+if dados_armazem is not None:
+    canais_inscricoes = dados_armazem['canais']
+elif dados_bundle is not None:
+    canais_inscricoes = dados_bundle['canais']
+else:
+    with etapa('canais'):
+        canais_inscricoes = chamar_cacheada(carregar_canais, 'carregar_canais',
+                                            inscricoes_originais, versao_carga)
+
+# Etapa de cada inscrição no funil (metalab.funil): a junção inscrição -> aluno pelas chaves de
+# identificação é feita uma vez por snapshot (armazém, bundle ou carga dos dados)
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_funil(_inscricoes, _alunos, versao):
+    """Funil das inscrições originais (versao só identifica a carga no cache)"""
+    contar_execucao('carregar_funil')
+    return construir_funil(_inscricoes, _alunos)
+
+if dados_armazem is not None:
+    funil_inscricoes = dados_armazem['funil']
+elif dados_bundle is not None:
+    funil_inscricoes = dados_bundle['funil']
+else:
+    with etapa('funil'):
+        funil_inscricoes = chamar_cacheada(carregar_funil, 'carregar_funil', inscricoes_originais, alunos_originais,
+                                           versao_carga)
+
+# Dia de cada inscrição (metalab.temporal): a série diária de qualquer filtro é um bincount sobre esses dias
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_temporal(_inscricoes, versao):
+    """Dias das inscrições originais (versao só identifica a carga no cache)"""
+    contar_execucao('carregar_temporal')
+    return construir_temporal(_inscricoes)
+
+if dados_armazem is not None:
+    temporal_inscricoes = dados_armazem['temporal']
+    versao_snapshot = dados_armazem['versao']
+elif dados_bundle is not None:
+    temporal_inscricoes = dados_bundle['temporal']
+    versao_snapshot = versao_bundle
+else:
+    versao_snapshot = versao_carga
+    with etapa('temporal'):
+        temporal_inscricoes = chamar_cacheada(carregar_temporal, 'carregar_temporal', inscricoes_originais,
+                                              versao_snapshot)
+
+# Palavras de local de cada inscrição (metalab.regioes): o filtro de local vira uma indexação nos códigos
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_regioes(_inscricoes, _alunos, versao):
+    """Regiões das inscrições originais (versao só identifica a carga no cache)"""
+    contar_execucao('carregar_regioes')
+    return construir_regioes(_inscricoes, _alunos)
+
+if dados_armazem is not None:
+    regioes_inscricoes = dados_armazem['regioes']
+elif dados_bundle is not None:
+    regioes_inscricoes = dados_bundle['regioes']
+else:
+    with etapa('regiões'):
+        regioes_inscricoes = chamar_cacheada(carregar_regioes, 'carregar_regioes', inscricoes_originais,
+                                             alunos_originais, versao_snapshot)
+
+# Motor de consulta: pandas (padrão) ou DuckDB embutido (METALAB_MOTOR=duckdb, ver metalab.motor_sql)
+MOTOR_CONSULTA = os.getenv('METALAB_MOTOR', 'pandas').lower()
+
+# Banco DuckDB com as tabelas do snapshot: montado uma vez por processo e versão dos dados
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_motor_sql(_tabelas, versao):
+    """Carrega as tabelas originais no DuckDB em memória (versao só identifica o snapshot no cache)"""
+    contar_execucao('carregar_motor_sql')
+    return motor_sql.criar_motor(_tabelas)
+
+motor = None
+if MOTOR_CONSULTA == 'duckdb':
+    if dados_armazem is not None:
+        st.sidebar.warning("⚠️ Com o armazém SQLite os filtros já rodam no SQL; METALAB_MOTOR=duckdb ignorado.")
+    elif motor_sql.duckdb_disponivel():
+        versao_dados = versao_bundle if dados_bundle is not None else versao_carga
+        with etapa('carregar motor sql'):
+            motor = chamar_cacheada(carregar_motor_sql, 'carregar_motor_sql',
+                                    {'alunos': alunos_originais, 'inscricoes': inscricoes_originais,
+                                     'avaliacoes': avaliacoes_originais, 'avaliacoes_long': avaliacoes_originais_long},
+                                    versao_dados)
+    else:
+        st.sidebar.warning("⚠️ METALAB_MOTOR=duckdb, mas o pacote duckdb não está instalado. Usando o pandas.")
+
+if telemetria_ativa:
+    # Idade dos dados: ingestão do armazém, criação do bundle ou carga em uso do load_data
+    if dados_armazem is not None:
+        gerado_em = datetime.fromisoformat(dados_armazem['metadados']['criado_em']).timestamp()
+        registrar_dados({'inscricoes': dados_armazem['linhas']['inscricoes'], 'alunos': len(alunos_originais),
+                         'avaliacoes': dados_armazem['linhas'].get('avaliacoes_long', 0)}, gerado_em)
+    else:
+        if dados_bundle is not None:
+            gerado_em = datetime.fromisoformat(dados_bundle['manifesto']['criado_em']).timestamp()
+        else:
+            gerado_em = carregado_em('load_data')
+        registrar_dados({'inscricoes': len(inscricoes_originais), 'alunos': len(alunos_originais),
+                         'avaliacoes': len(avaliacoes_originais_long)}, gerado_em)
 
 # ==========================================
 # SIDEBAR - FILTROS
 # ==========================================
+secao('filtros')
 st.sidebar.title("🔍 Filtros")
 
 # Inicializar session state para filtros interativos
@@ -927,222 +867,9 @@ if 'filtro_status' not in st.session_state:
 if 'filtro_genero' not in st.session_state:
     st.session_state.filtro_genero = 'Todos'
 
-# Função auxiliar para relacionar locais de forma inteligente
-def relacionar_locais(local_aluno, colunas_inscricoes):
-    """Relaciona local de aluno com colunas de inscrições usando nomes de regiões"""
-    if pd.isna(local_aluno) or local_aluno == '':
-        return False
-    
-    local_aluno_str = str(local_aluno).upper().strip()
-    
-    # Lista de palavras-chave comuns de regiões do DF
-    regioes_df = ['PLANALTINA', 'GAMA', 'CEILANDIA', 'CEILÂNDIA', 'TAGUATINGA', 'SAMAMBAIA', 
-                   'BRAZLANDIA', 'BRAZLÂNDIA', 'SOBRADINHO', 'SOBRADINHO II', 'SOBRADINHO 2',
-                   'GUARA', 'GUARÁ', 'CRUZEIRO', 'SUDOESTE', 'NORTE', 'SUL', 'LESTE', 'OESTE',
-                   'ASA NORTE', 'ASA SUL', 'LAGO NORTE', 'LAGO SUL', 'AGUAS CLARAS', 'ÁGUAS CLARAS',
-                   'RIACHO FUNDO', 'SANTA MARIA', 'RECANTO DAS EMAS', 'CANDANGOLANDIA', 'CANDANGOLÂNDIA']
-    
-    # Extrair palavras-chave do local do aluno
-    palavras_chave = []
-    for regiao in regioes_df:
-        if regiao in local_aluno_str:
-            palavras_chave.append(regiao)
-    
-    # Se não encontrou palavras-chave conhecidas, usar o próprio nome
-    if not palavras_chave:
-        palavras_chave = [local_aluno_str]
-    
-    # Procurar em todas as colunas de inscrições que podem conter local
-    for col in colunas_inscricoes:
-        col_lower = col.lower()
-        if any(palavra in col_lower for palavra in ['local', 'região', 'regiao', 'cidade', 'endereco', 'endereço', 'bairro']):
-            return True
-    
-    return False
-
-# Função para aplicar filtros (sem cache - filtros mudam dinamicamente)
-def aplicar_filtros(_alunos, _inscricoes, ciclo_selecionado, local_selecionado, status_selecionado, genero_selecionado):
-    """Aplica filtros aos dados de alunos e inscrições com proteção contra erros - FILTROS RELACIONADOS"""
-    try:
-        alunos_filtrados = _alunos.copy()
-        inscricoes_filtradas = _inscricoes.copy()
-    except Exception as e:
-        st.error(f"Erro ao copiar dados: {e}")
-        return _alunos, _inscricoes  # Retornar dados originais em caso de erro
-    
-    # Filtro por ciclo (afeta alunos e pode afetar inscrições relacionadas)
-    if ciclo_selecionado != 'Todos' and 'CICLO' in alunos_filtrados.columns:
-        alunos_filtrados = alunos_filtrados[alunos_filtrados['CICLO'].astype(str) == ciclo_selecionado]
-        
-        # Se houver coluna de ciclo nas inscrições, filtrar também
-        if 'CICLO' in inscricoes_filtradas.columns:
-            inscricoes_filtradas = inscricoes_filtradas[inscricoes_filtradas['CICLO'].astype(str) == ciclo_selecionado]
-        else:
-            # Tentar relacionar por outras colunas que possam conter ciclo
-            for col in inscricoes_filtradas.columns:
-                if 'ciclo' in col.lower():
-                    inscricoes_filtradas = inscricoes_filtradas[inscricoes_filtradas[col].astype(str) == str(ciclo_selecionado)]
-                    break
-        
-        # RELACIONAR CICLO COM INSCRIÇÕES: Tentar relacionar alunos filtrados com inscrições
-        colunas_relacao = []
-        palavras_chave_relacao = ['email', 'e-mail', 'nome', 'cpf', 'telefone', 'celular', 'whatsapp']
-        
-        for col_aluno in alunos_filtrados.columns:
-            col_aluno_lower = col_aluno.lower()
-            for col_inscricao in inscricoes_filtradas.columns:
-                col_inscricao_lower = col_inscricao.lower()
-                if (col_aluno_lower == col_inscricao_lower or 
-                    any(palavra in col_aluno_lower and palavra in col_inscricao_lower for palavra in palavras_chave_relacao)):
-                    colunas_relacao.append((col_aluno, col_inscricao))
-                    break
-        
-        # Se encontrou colunas de relação, filtrar inscrições relacionadas
-        if colunas_relacao:
-            valores_relacao = set()
-            for col_aluno, col_inscricao in colunas_relacao:
-                valores = alunos_filtrados[col_aluno].dropna().astype(str).str.strip().str.upper()
-                valores_relacao.update(valores.unique())
-            
-            if valores_relacao:
-                mask_inscricoes = pd.Series([False] * len(inscricoes_filtradas))
-                for col_aluno, col_inscricao in colunas_relacao:
-                    valores_inscricao = inscricoes_filtradas[col_inscricao].astype(str).str.strip().str.upper()
-                    mask_inscricoes |= valores_inscricao.isin(valores_relacao)
-                inscricoes_filtradas = inscricoes_filtradas[mask_inscricoes]
-    
-    # Filtro por local - RELAÇÃO INTELIGENTE com inscrições usando nomes de regiões
-    if local_selecionado != 'Todos' and 'LOCAL' in alunos_filtrados.columns:
-        alunos_filtrados = alunos_filtrados[alunos_filtrados['LOCAL'] == local_selecionado]
-        
-        # Normalizar local selecionado para busca
-        local_selecionado_upper = str(local_selecionado).upper().strip()
-        
-        # Extrair palavras-chave do local (ex: "Planaltina", "Gama", etc)
-        palavras_chave_local = []
-        regioes_df = ['PLANALTINA', 'GAMA', 'CEILANDIA', 'CEILÂNDIA', 'TAGUATINGA', 'SAMAMBAIA', 
-                      'BRAZLANDIA', 'BRAZLÂNDIA', 'SOBRADINHO', 'GUARA', 'GUARÁ', 'CRUZEIRO',
-                      'AGUAS CLARAS', 'ÁGUAS CLARAS', 'RIACHO FUNDO', 'SANTA MARIA', 
-                      'RECANTO DAS EMAS', 'CANDANGOLANDIA', 'CANDANGOLÂNDIA']
-        
-        for regiao in regioes_df:
-            if regiao in local_selecionado_upper:
-                palavras_chave_local.append(regiao)
-        
-        # Se não encontrou palavras-chave conhecidas, usar o próprio nome
-        if not palavras_chave_local:
-            palavras_chave_local = [local_selecionado_upper]
-        
-        # Filtrar inscrições por local usando busca inteligente
-        # 1. Se houver coluna LOCAL exata nas inscrições
-        if 'LOCAL' in inscricoes_filtradas.columns:
-            mask_local = pd.Series([False] * len(inscricoes_filtradas))
-            for palavra in palavras_chave_local:
-                mask_local |= inscricoes_filtradas['LOCAL'].astype(str).str.upper().str.contains(
-                    palavra, case=False, na=False, regex=False
-                )
-            inscricoes_filtradas = inscricoes_filtradas[mask_local]
-        
-        # 2. Buscar em outras colunas que possam conter local/região
-        colunas_local = []
-        for col in inscricoes_filtradas.columns:
-            col_lower = col.lower()
-            if any(palavra in col_lower for palavra in ['local', 'região', 'regiao', 'cidade', 'endereco', 'endereço', 'bairro', 'endereco completo', 'endereço completo']):
-                colunas_local.append(col)
-        
-        # Aplicar busca em todas as colunas de local encontradas
-        if colunas_local:
-            mask_inscricoes_local = pd.Series([False] * len(inscricoes_filtradas))
-            for col in colunas_local:
-                for palavra in palavras_chave_local:
-                    mask_inscricoes_local |= inscricoes_filtradas[col].astype(str).str.upper().str.contains(
-                        palavra, case=False, na=False, regex=False
-                    )
-            if mask_inscricoes_local.sum() > 0:
-                inscricoes_filtradas = inscricoes_filtradas[mask_inscricoes_local]
-    
-    # Filtro por status (incluindo filtro interativo de gráfico)
-    status_final = status_selecionado
-    if st.session_state.filtro_status_clicado:
-        status_final = st.session_state.filtro_status_clicado
-    
-    # Aplicar filtro de status apenas se não for 'Todos'
-    if status_final != 'Todos':
-        if 'STATUS_NORMALIZADO' in alunos_filtrados.columns:
-            if status_final == 'CURSANDO':
-                alunos_filtrados = alunos_filtrados[alunos_filtrados['STATUS_NORMALIZADO'] == 'CURSANDO']
-            elif status_final == 'CONCLUÍDO':
-                alunos_filtrados = alunos_filtrados[alunos_filtrados['STATUS_NORMALIZADO'] == 'CONCLUÍDO']
-            elif status_final == 'CURSANDO + CONCLUÍDO':
-                alunos_filtrados = alunos_filtrados[alunos_filtrados['STATUS_NORMALIZADO'].isin(['CURSANDO', 'CONCLUÍDO'])]
-        elif 'STATUS' in alunos_filtrados.columns:
-            # Normalizar STATUS para comparação (case-insensitive e com regex)
-            status_upper = alunos_filtrados['STATUS'].astype(str).str.upper().str.strip()
-            if status_final == 'CONCLUÍDO' or status_final == 'CONCLUIDO':
-                alunos_filtrados = alunos_filtrados[status_upper.str.contains('CONCLUIDO|CONCLUÍDO', case=False, na=False, regex=True)]
-            elif status_final == 'CURSANDO':
-                alunos_filtrados = alunos_filtrados[status_upper.str.contains('CURSANDO|EM CURSO|EM ANDAMENTO', case=False, na=False, regex=True)]
-            elif status_final == 'CONCLUIDO + CURSANDO' or status_final == 'CURSANDO + CONCLUÍDO':
-                alunos_filtrados = alunos_filtrados[status_upper.str.contains('CONCLUIDO|CONCLUÍDO|CURSANDO|EM CURSO', case=False, na=False, regex=True)]
-            elif status_final == 'DESISTENTE':
-                alunos_filtrados = alunos_filtrados[status_upper.str.contains('DESISTENTE', case=False, na=False, regex=True)]
-            else:
-                # Tentar match exato
-                alunos_filtrados = alunos_filtrados[status_upper == status_final.upper()]
-        
-        # RELACIONAR STATUS COM INSCRIÇÕES: Se filtrar por status, tentar relacionar com inscrições
-        # Buscar colunas que possam relacionar alunos com inscrições (email, nome, CPF, etc)
-        colunas_relacao = []
-        palavras_chave_relacao = ['email', 'e-mail', 'nome', 'cpf', 'telefone', 'celular', 'whatsapp']
-        
-        for col_aluno in alunos_filtrados.columns:
-            col_aluno_lower = col_aluno.lower()
-            for col_inscricao in inscricoes_filtradas.columns:
-                col_inscricao_lower = col_inscricao.lower()
-                # Match exato ou match por palavra-chave
-                if (col_aluno_lower == col_inscricao_lower or 
-                    any(palavra in col_aluno_lower and palavra in col_inscricao_lower for palavra in palavras_chave_relacao)):
-                    colunas_relacao.append((col_aluno, col_inscricao))
-                    break
-        
-        # Se encontrou colunas de relação, filtrar inscrições relacionadas
-        if colunas_relacao:
-            # Pegar valores únicos dos alunos filtrados para relacionar
-            valores_relacao = set()
-            for col_aluno, col_inscricao in colunas_relacao:
-                valores = alunos_filtrados[col_aluno].dropna().astype(str).str.strip().str.upper()
-                valores_relacao.update(valores.unique())
-            
-            # Filtrar inscrições que têm esses valores
-            if valores_relacao:
-                mask_inscricoes = pd.Series([False] * len(inscricoes_filtradas))
-                for col_aluno, col_inscricao in colunas_relacao:
-                    valores_inscricao = inscricoes_filtradas[col_inscricao].astype(str).str.strip().str.upper()
-                    mask_inscricoes |= valores_inscricao.isin(valores_relacao)
-                inscricoes_filtradas = inscricoes_filtradas[mask_inscricoes]
-    
-    # Filtro por gênero - RELACIONADO: afeta inscrições E pode afetar alunos relacionados
-    genero_final = genero_selecionado
-    if st.session_state.filtro_genero_clicado:
-        genero_final = st.session_state.filtro_genero_clicado
-    
-    # Aplicar filtro de gênero nas inscrições
-    if genero_final != 'Todos':
-        # Filtrar inscrições por gênero
-        if 'Sexo:' in inscricoes_filtradas.columns:
-            inscricoes_filtradas = inscricoes_filtradas[inscricoes_filtradas['Sexo:'].astype(str).str.upper().str.strip() == genero_final.upper().strip()]
-        
-        # Se houver coluna de gênero/sexo nos alunos, filtrar também
-        for col in alunos_filtrados.columns:
-            if 'sexo' in col.lower() or 'genero' in col.lower() or 'gênero' in col.lower():
-                alunos_filtrados = alunos_filtrados[alunos_filtrados[col].astype(str).str.upper().str.strip() == genero_final.upper().strip()]
-                break
-    
-    return alunos_filtrados, inscricoes_filtradas
-
 # Filtro por ciclo (se disponível) - usar dados originais para opções
-if 'CICLO' in alunos_originais.columns:
-    ciclos_disponiveis = ['Todos'] + sorted(alunos_originais['CICLO'].dropna().unique().astype(str).tolist())
+ciclos_disponiveis = opcoes_filtro(indices_filtros, 'ciclo')
+if ciclos_disponiveis:
     # Usar session_state para controlar o valor
     if st.session_state.filtro_ciclo not in ciclos_disponiveis:
         st.session_state.filtro_ciclo = 'Todos'
@@ -1159,8 +886,8 @@ else:
     st.session_state.filtro_ciclo = 'Todos'
 
 # Filtro por local - usar dados originais para opções
-if 'LOCAL' in alunos_originais.columns:
-    locais_disponiveis = ['Todos'] + sorted(alunos_originais['LOCAL'].dropna().unique().tolist())
+locais_disponiveis = opcoes_filtro(indices_filtros, 'local')
+if locais_disponiveis:
     # Usar session_state para controlar o valor
     if st.session_state.filtro_local not in locais_disponiveis:
         st.session_state.filtro_local = 'Todos'
@@ -1178,7 +905,7 @@ else:
 
 # Filtro por status - Foco em Cursando e Concluído - usar dados originais para opções
 if 'STATUS_NORMALIZADO' in alunos_originais.columns:
-    status_opcoes = ['Todos', 'CURSANDO', 'CONCLUÍDO', 'CURSANDO + CONCLUÍDO']
+    status_opcoes = opcoes_status = ['Todos', 'CURSANDO', 'CONCLUÍDO', 'CURSANDO + CONCLUÍDO']
     # Usar session_state para controlar o valor
     if st.session_state.filtro_status not in status_opcoes:
         st.session_state.filtro_status = 'Todos'
@@ -1193,7 +920,7 @@ if 'STATUS_NORMALIZADO' in alunos_originais.columns:
     )
     st.session_state.filtro_status = status_selecionado
 elif 'STATUS' in alunos_originais.columns:
-    status_disponiveis = ['Todos', 'CONCLUIDO', 'CURSANDO', 'CONCLUIDO + CURSANDO'] + \
+    status_disponiveis = opcoes_status = ['Todos', 'CONCLUIDO', 'CURSANDO', 'CONCLUIDO + CURSANDO'] + \
                          [s for s in sorted(alunos_originais['STATUS'].dropna().unique().tolist()) 
                           if s not in ['CONCLUIDO', 'CURSANDO']]
     # Usar session_state para controlar o valor
@@ -1210,10 +937,11 @@ elif 'STATUS' in alunos_originais.columns:
 else:
     status_selecionado = 'Todos'
     st.session_state.filtro_status = 'Todos'
+    opcoes_status = None
 
 # Filtro por gênero - usar dados originais para opções
-if 'Sexo:' in inscricoes_originais.columns:
-    generos_disponiveis = ['Todos'] + sorted(inscricoes_originais['Sexo:'].dropna().unique().tolist())
+generos_disponiveis = opcoes_filtro(indices_filtros, 'genero')
+if generos_disponiveis:
     # Usar session_state para controlar o valor
     if st.session_state.filtro_genero not in generos_disponiveis:
         st.session_state.filtro_genero = 'Todos'
@@ -1232,252 +960,346 @@ else:
     st.session_state.filtro_genero = 'Todos'
 
 
-# Função para filtrar avaliações baseado nos filtros aplicados
-def filtrar_avaliacoes(_avaliacoes, _alunos_filtrados, _inscricoes_filtradas, _alunos_originais, _inscricoes_originais, ciclo_selecionado):
-    """Filtra avaliações baseado nos filtros aplicados em alunos e inscrições"""
-    if _avaliacoes is None or len(_avaliacoes) == 0:
-        return _avaliacoes
-    
-    avaliacoes_filtradas = _avaliacoes.copy()
-    
-    # Função auxiliar para normalizar valores de ciclo (remover .0, espaços, etc)
-    def normalizar_ciclo(valor):
-        if pd.isna(valor):
-            return None
-        valor_str = str(valor).strip()
-        # Remover .0 do final se houver
-        if valor_str.endswith('.0'):
-            valor_str = valor_str[:-2]
-        # Remover espaços e converter para string limpa
-        return valor_str.strip()
-    
-    # Função para extrair ciclo da coluna Pesquisa
-    def extrair_ciclo_da_pesquisa(valor):
-        """Extrai o número do ciclo do nome da pesquisa"""
-        if pd.isna(valor):
-            return None
-        valor_str = str(valor).upper().strip()
-        # Se contém "X CICLO" (ex: "2 CICLO", "3 CICLO")
-        match = re.search(r'(\d+)\s*CICLO', valor_str)
-        if match:
-            return match.group(1)
-        # Se não tem número de ciclo explícito, é ciclo 1
-        if 'AVALIAÇÃO' in valor_str and ('MCOM' in valor_str or 'MKT DIGITAL' in valor_str):
-            # Verificar se não tem número de ciclo
-            if not re.search(r'\d+\s*CICLO', valor_str):
-                return '1'
-        return None
-    
-    # Aplicar filtro de ciclo primeiro (se houver coluna CICLO nas avaliações)
-    if ciclo_selecionado != 'Todos':
-        ciclo_selecionado_normalizado = normalizar_ciclo(ciclo_selecionado)
-        mask_ciclo = pd.Series([False] * len(avaliacoes_filtradas))
-        
-        # 1. Tentar filtrar pela coluna CICLO se existir
-        if 'CICLO' in avaliacoes_filtradas.columns:
-            ciclos_normalizados = avaliacoes_filtradas['CICLO'].apply(normalizar_ciclo)
-            mask_ciclo |= (ciclos_normalizados == ciclo_selecionado_normalizado)
-        
-        # 2. Tentar filtrar pela coluna Pesquisa (prioridade alta)
-        if 'Pesquisa' in avaliacoes_filtradas.columns:
-            ciclos_pesquisa = avaliacoes_filtradas['Pesquisa'].apply(extrair_ciclo_da_pesquisa)
-            # Normalizar valores None para evitar problemas na comparação
-            ciclos_pesquisa_normalizados = ciclos_pesquisa.apply(lambda x: normalizar_ciclo(x) if x is not None else None)
-            mask_pesquisa = (ciclos_pesquisa_normalizados == ciclo_selecionado_normalizado)
-            mask_ciclo |= mask_pesquisa
-        
-        # 3. Tentar encontrar ciclo em outras colunas
-        for col in avaliacoes_filtradas.columns:
-            col_lower = str(col).lower()
-            if 'ciclo' in col_lower and col != 'CICLO' and col != 'Pesquisa':
-                valores_normalizados = avaliacoes_filtradas[col].apply(normalizar_ciclo)
-                mask_ciclo |= (valores_normalizados == ciclo_selecionado_normalizado)
-        
-        # Aplicar o filtro se encontrou algum match
-        if mask_ciclo.any():
-            avaliacoes_filtradas = avaliacoes_filtradas[mask_ciclo].copy()
-        elif 'Pesquisa' in avaliacoes_filtradas.columns:
-            # Se não encontrou nenhum match, tentar busca mais detalhada na coluna Pesquisa
-            mask_ciclo_detalhado = pd.Series([False] * len(avaliacoes_filtradas))
-            for idx in range(len(avaliacoes_filtradas)):
-                pesquisa_val = avaliacoes_filtradas['Pesquisa'].iloc[idx]
-                ciclo_extraido = extrair_ciclo_da_pesquisa(pesquisa_val)
-                if ciclo_extraido is not None:
-                    ciclo_extraido_norm = normalizar_ciclo(ciclo_extraido)
-                    if ciclo_extraido_norm == ciclo_selecionado_normalizado:
-                        mask_ciclo_detalhado.iloc[idx] = True
-            if mask_ciclo_detalhado.any():
-                avaliacoes_filtradas = avaliacoes_filtradas[mask_ciclo_detalhado].copy()
-    
-    # Se não há outros filtros aplicados além do ciclo, retornar avaliações filtradas por ciclo
-    if len(_alunos_filtrados) == len(_alunos_originais) and len(_inscricoes_filtradas) == len(_inscricoes_originais):
-        return avaliacoes_filtradas
-    
-    # Função auxiliar para normalizar valores de ciclo (remover .0, espaços, etc)
-    def normalizar_ciclo_fallback(valor):
-        if pd.isna(valor):
-            return None
-        valor_str = str(valor).strip()
-        # Remover .0 do final se houver
-        if valor_str.endswith('.0'):
-            valor_str = valor_str[:-2]
-        return valor_str.strip()
-    
-    # Função para extrair ciclo da coluna Pesquisa (fallback)
-    def extrair_ciclo_da_pesquisa_fallback(valor):
-        """Extrai o número do ciclo do nome da pesquisa"""
-        if pd.isna(valor):
-            return None
-        valor_str = str(valor).upper().strip()
-        # Se contém "X CICLO" (ex: "2 CICLO", "3 CICLO")
-        match = re.search(r'(\d+)\s*CICLO', valor_str)
-        if match:
-            return match.group(1)
-        # Se não tem número de ciclo explícito, é ciclo 1
-        if 'AVALIAÇÃO' in valor_str and ('MCOM' in valor_str or 'MKT DIGITAL' in valor_str):
-            # Verificar se não tem número de ciclo
-            if not re.search(r'\d+\s*CICLO', valor_str):
-                return '1'
+def filtrar_dados(ciclo, local, status, genero, status_clicado=None, genero_clicado=None):
+    """
+    Filtros do sidebar sobre os dados originais: devolve a seleção do motor SQL
+    (None no pandas), alunos, inscrições, avaliações e respostas no formato longo.
+    """
+    selecao = None
+    if motor is not None:
+        # Mesmos filtros em SQL: a seleção guarda o predicado de cada tabela; recortar() devolve as linhas
+        with etapa('aplicar_filtros'):
+            selecao = motor_sql.aplicar_filtros(motor, ciclo, local, status, genero,
+                                                status_clicado=status_clicado, genero_clicado=genero_clicado)
+            alunos = motor_sql.recortar(motor, selecao, 'alunos', alunos_originais)
+            inscricoes = motor_sql.recortar(motor, selecao, 'inscricoes', inscricoes_originais)
+
+        with etapa('filtrar_avaliacoes'):
+            selecao = motor_sql.filtrar_avaliacoes(motor, selecao, ciclo)
+            avaliacoes = motor_sql.recortar(motor, selecao, 'avaliacoes', avaliacoes_originais)
+
+        with etapa('filtrar_respostas_long'):
+            selecao = motor_sql.filtrar_respostas_long(motor, selecao)
+            avaliacoes_long = motor_sql.recortar(motor, selecao, 'avaliacoes_long', avaliacoes_originais_long)
+    else:
+        # Aplicar filtros nos dados ORIGINAIS (sem cache - filtros mudam dinamicamente)
+        with etapa('aplicar_filtros'):
+            if dados_armazem is not None:
+                # Do armazém vêm só as inscrições candidatas (ciclo e gênero já filtrados no SQLite)
+                with etapa('consultar armazém'):
+                    inscricoes_base = consultar_inscricoes(dados_armazem, ciclo, local, genero_clicado or genero)
+            else:
+                inscricoes_base = inscricoes_originais
+            alunos, inscricoes = aplicar_filtros(
+                alunos_originais, inscricoes_base, ciclo, local, status, genero,
+                status_clicado=status_clicado, genero_clicado=genero_clicado, regioes=regioes_inscricoes
+            )
+
+        # Filtrar avaliações baseado nos filtros aplicados (com fallback para o ciclo selecionado)
+        with etapa('filtrar_avaliacoes'):
+            linhas_inscricoes = dados_armazem['linhas']['inscricoes'] if dados_armazem is not None else inscricoes_originais
+            avaliacoes_filtradas = filtrar_avaliacoes(avaliacoes_originais, alunos, inscricoes, alunos_originais, linhas_inscricoes, ciclo)
+            avaliacoes = selecionar_avaliacoes(avaliacoes_originais, avaliacoes_filtradas, ciclo)
+
+        # Respostas (formato longo) das avaliações exibidas, para as contagens acompanharem os filtros
+        with etapa('filtrar_respostas_long'):
+            if dados_armazem is not None:
+                todas = avaliacoes is None or len(avaliacoes) == len(avaliacoes_originais)
+                avaliacoes_long = consultar_respostas(dados_armazem, None if todas else avaliacoes.index)
+            else:
+                avaliacoes_long = filtrar_respostas_long(avaliacoes_originais_long, avaliacoes_originais, avaliacoes)
+    return selecao, alunos, inscricoes, avaliacoes, avaliacoes_long
+
+
+# Combinações de filtro guardadas por processo e orçamento do aquecimento em segundos (METALAB_AQUECIMENTO=0 desliga)
+LIMITE_VISOES = 64
+# (curto: roda no processo do app e disputa o GIL com os reruns das sessões; ver metalab.visoes)
+ORCAMENTO_AQUECIMENTO_S = float(os.getenv('METALAB_AQUECIMENTO', '5'))
+
+# Estado do planejador de agregações no snapshot: códigos das colunas pedidas
+@st.cache_resource(max_entries=2, show_spinner=False)
+def estado_planejador(versao):
+    """Estado do planejador (versao só identifica o snapshot no cache), preenchido pelos planos"""
+    return {}
+
+
+# Visões materializadas (metalab.visoes): tabelas filtradas, métricas e contagens dos gráficos de cada
+# combinação de filtros, compartilhadas pelas sessões do processo enquanto o snapshot não muda.
+# A memória é um OrderedDict comum (e não um cache do Streamlit) para o aquecimento, que roda numa thread
+# sem o contexto do Streamlit, preenchê-la chamando só funções comuns
+@st.cache_resource(max_entries=2, show_spinner=False)
+def visoes_snapshot(versao):
+    """Visões do snapshot, combinação -> visão, até LIMITE_VISOES (versao só identifica o snapshot no cache)"""
+    return OrderedDict()
+
+
+def visao_filtros(visoes, estado, ciclo, local, status, genero, status_clicado=None, genero_clicado=None,
+                  execucao='visao_filtros'):
+    """
+    Visão da combinação de filtros, calculada uma vez por snapshot em visoes
+    (de visoes_snapshot), mesmo com o aquecimento e as sessões pedindo-a ao
+    mesmo tempo. estado: estado_planejador do snapshot. execucao: nome sob o
+    qual o cálculo é contado na telemetria (o aquecimento conta à parte, para
+    não virar falha de cache das sessões).
+    """
+    chave = (ciclo, local, status, genero, status_clicado, genero_clicado)
+    return calcular_uma_vez(visoes, chave, lambda: calcular_visao(estado, *chave, execucao=execucao),
+                            LIMITE_VISOES)[0]
+
+
+def calcular_visao(estado, ciclo, local, status, genero, status_clicado=None, genero_clicado=None,
+                   execucao='visao_filtros'):
+    """
+    Filtros, métricas e agregações de uma combinação. No pandas, as agregações
+    declaradas em AGREGADOS_VISAO saem de um plano (metalab.planejador) antes
+    das métricas e dos gráficos; o relatório fica em visao['plano']. O motor
+    SQL conta cada pedido com um GROUP BY.
+    """
+    contar_execucao(execucao)
+    selecao, alunos, inscricoes, avaliacoes, avaliacoes_long = filtrar_dados(
+        ciclo, local, status, genero, status_clicado, genero_clicado)
+    visao = {'selecao': selecao, 'alunos': alunos, 'inscricoes': inscricoes, 'avaliacoes': avaliacoes,
+             'avaliacoes_long': avaliacoes_long, 'contagens': {}, 'figuras': {}, 'plano': None}
+    if motor is not None:
+        visao['metricas'] = motor_sql.calcular_metricas(motor, selecao)
+        return visao
+
+    with etapa('planejador de agregações'):
+        pedidos, falhas = pedidos_visao(visao)
+        visao['plano'] = planejador.executar_plano(
+            pedidos, {tabela: visao[tabela] for tabela in TABELAS_VISAO},
+            {'alunos': alunos_originais, 'inscricoes': inscricoes_originais, 'avaliacoes': avaliacoes_originais,
+             'avaliacoes_long': avaliacoes_originais_long},
+            estado, visao['contagens'])
+        if falhas:
+            visao['plano']['recuos']['declaracao'] = len(falhas)
+        visao['plano']['calculado_em'] = time.perf_counter()
+        registrar_agregacoes(visao['plano'])
+    visao['metricas'] = calcular_metricas(alunos, inscricoes, contar=contar_em(visao, 'alunos'))
+    return visao
+
+
+def contar_em(visao, tabela):
+    """Contagem usada pelos gráficos da tabela: GROUP BY no motor SQL ou value_counts do pandas, guardada na visão"""
+    contar = motor_sql.contador(motor, visao['selecao'], tabela) if motor is not None else contar_valores
+    return contagem_memorizada(visao['contagens'], tabela, contar)
+
+
+def cruzar_em(visao, tabela):
+    """Tabela cruzada usada pelos gráficos da tabela (motor SQL ou pd.crosstab), guardada na visão"""
+    cruzar = motor_sql.cruzador(motor, visao['selecao'], tabela) if motor is not None else tabela_cruzada
+    return cruzamento_memorizado(visao['contagens'], tabela, cruzar)
+
+
+def contar_respostas(visao, pergunta):
+    """Contagem das respostas de uma pergunta nas avaliações filtradas, guardada na visão"""
+    if motor is not None:
+        return memorizar(visao['contagens'], planejador.respostas(pergunta),
+                         lambda: motor_sql.contar_respostas_avaliacao(motor, visao['selecao'], pergunta))
+    return memorizar(visao['contagens'], planejador.respostas(pergunta),
+                     lambda: contar_respostas_avaliacao(pergunta, visao['avaliacoes'], visao['avaliacoes_long']))
+
+
+# Perguntas da seção de avaliações: título -> (coluna da pergunta nas avaliações, rótulo, escala, horizontal)
+PERGUNTAS_AVALIACAO = {
+    "Avaliação Geral do Curso": (coluna_avaliacao_curso, 'Avaliação', ESCALA_SATISFACAO, False),
+    "Avaliação do Professor": (coluna_avaliacao_professor, 'Avaliação', ESCALA_AZUL, False),
+    "Como Ficou Sabendo do Curso?": (coluna_sabendo_curso, 'Canal de Divulgação', ESCALA_AZUL_CLARA, True),
+    "O Conteúdo Atendeu Minhas Expectativas?": (coluna_expectativas, 'Resposta', ESCALA_SATISFACAO, False),
+    "Você Indicaria o Curso para Familiares e Amigos?": (coluna_indicacao, 'Resposta', ESCALA_SATISFACAO, True),
+    "Suporte da Coordenação Pedagógica": (coluna_suporte, 'Resposta', ESCALA_AZUL, False),
+}
+# Perguntas de satisfação (colunas fixas): título -> pergunta
+PERGUNTAS_SATISFACAO = {"Satisfação com Espaço Físico": PERGUNTA_ESPACO,
+                        "Satisfação com Instalações": PERGUNTA_INSTALACOES}
+# Perguntas de PERGUNTAS_AVALIACAO que não são de escala (ficam fora da matriz de avaliações)
+PERGUNTAS_FORA_DA_MATRIZ = {"Como Ficou Sabendo do Curso?"}
+
+
+def perguntas_matriz(avaliacoes):
+    """Perguntas de escala presentes nas avaliações (título -> pergunta), linhas da matriz de avaliações"""
+    perguntas = {titulo: localizar(avaliacoes) for titulo, (localizar, _, _, _) in PERGUNTAS_AVALIACAO.items()
+                 if titulo not in PERGUNTAS_FORA_DA_MATRIZ}
+    perguntas.update({titulo: pergunta for titulo, pergunta in PERGUNTAS_SATISFACAO.items()
+                      if pergunta in avaliacoes.columns})
+    return perguntas
+
+
+def matriz_em(visao):
+    """Matriz pergunta x resposta das perguntas de escala, com as mesmas contagens dos gráficos de cada pergunta"""
+    perguntas = perguntas_matriz(visao['avaliacoes'])
+    return memorizar(visao['contagens'], planejador.matriz(perguntas),
+                     lambda: matriz_respostas({titulo: contar_respostas(visao, pergunta)
+                                               for titulo, pergunta in perguntas.items() if pergunta}))
+
+
+def grafico_pergunta(visao, titulo):
+    """Barras das respostas da pergunta de PERGUNTAS_AVALIACAO; None se a pergunta não existe"""
+    localizar, rotulo_resposta, escala, horizontal = PERGUNTAS_AVALIACAO[titulo]
+    coluna = localizar(visao['avaliacoes'])
+    if not coluna:
         return None
-    
-    # Se após filtrar por ciclo não há dados, tentar buscar ciclo em colunas do pivot
-    if len(avaliacoes_filtradas) == 0 and ciclo_selecionado != 'Todos':
-        ciclo_selecionado_normalizado = normalizar_ciclo_fallback(ciclo_selecionado)
-        mask_ciclo_fallback = pd.Series([False] * len(_avaliacoes))
-        
-        # Tentar encontrar ciclo na coluna Pesquisa primeiro
-        if 'Pesquisa' in _avaliacoes.columns:
-            ciclos_pesquisa = _avaliacoes['Pesquisa'].apply(extrair_ciclo_da_pesquisa_fallback)
-            mask_ciclo_fallback |= (ciclos_pesquisa == ciclo_selecionado_normalizado)
-        
-        # Tentar encontrar coluna que contém ciclo (pode ser uma das perguntas pivotadas)
-        for col in _avaliacoes.columns:
-            col_lower = str(col).lower()
-            if 'ciclo' in col_lower and col != 'Pesquisa':
-                valores_normalizados = _avaliacoes[col].apply(normalizar_ciclo_fallback)
-                mask_ciclo_fallback |= (valores_normalizados == ciclo_selecionado_normalizado)
-        
-        if mask_ciclo_fallback.any():
-            avaliacoes_filtradas = _avaliacoes[mask_ciclo_fallback]
-        
-        # Se ainda não encontrou, retornar todas (melhor que nada quando filtramos apenas por ciclo)
-        if len(avaliacoes_filtradas) == 0:
-            # Se só filtramos por ciclo e não há outros filtros, retornar todas
-            if len(_alunos_filtrados) == len(_alunos_originais) and len(_inscricoes_filtradas) == len(_inscricoes_originais):
-                return _avaliacoes
-            return avaliacoes_filtradas
-    
-    # Tentar relacionar avaliações com alunos/inscrições filtrados através de colunas comuns
-    # Buscar colunas que possam relacionar (email, nome, CPF, etc)
-    valores_relacao = set()
-    palavras_chave_relacao = ['email', 'e-mail', 'nome', 'cpf', 'telefone', 'celular', 'whatsapp']
-    
-    # Buscar valores de identificação em alunos filtrados
-    for col_aluno in _alunos_filtrados.columns:
-        col_aluno_lower = str(col_aluno).lower()
-        if any(palavra in col_aluno_lower for palavra in palavras_chave_relacao):
-            valores = _alunos_filtrados[col_aluno].dropna().astype(str).str.strip().str.upper()
-            valores_relacao.update(valores.unique())
-    
-    # Buscar valores de identificação em inscrições filtradas
-    for col_inscricao in _inscricoes_filtradas.columns:
-        col_inscricao_lower = str(col_inscricao).lower()
-        if any(palavra in col_inscricao_lower for palavra in palavras_chave_relacao):
-            valores = _inscricoes_filtradas[col_inscricao].dropna().astype(str).str.strip().str.upper()
-            valores_relacao.update(valores.unique())
-    
-    # Tentar encontrar coluna de identificação nas avaliações para relacionar
-    id_col_avaliacoes = None
-    palavras_chave_id = ['usuário', 'usuario', 'opinião', 'opiniao', 'pesquisa', 'email', 'e-mail', 'nome']
-    
-    for col in avaliacoes_filtradas.columns:
-        col_lower = str(col).lower()
-        if any(palavra in col_lower for palavra in palavras_chave_id):
-            id_col_avaliacoes = col
-            break
-    
-    # Se encontrou coluna de identificação e valores para relacionar, filtrar
-    if id_col_avaliacoes and valores_relacao:
-        valores_avaliacoes = avaliacoes_filtradas[id_col_avaliacoes].astype(str).str.strip().str.upper()
-        mask = valores_avaliacoes.isin(valores_relacao)
-        avaliacoes_filtradas = avaliacoes_filtradas[mask]
-    
-    # Se não conseguiu relacionar com alunos/inscrições, mas filtrou por ciclo, manter filtro de ciclo
-    # Se não há outros filtros além do ciclo, já retornamos acima
-    # Se há outros filtros mas não conseguiu relacionar, retornar avaliações filtradas apenas por ciclo
-    if len(avaliacoes_filtradas) == 0 and ciclo_selecionado != 'Todos':
-        # Tentar filtrar novamente apenas por ciclo usando a coluna Pesquisa
-        if 'Pesquisa' in _avaliacoes.columns:
-            ciclos_pesquisa = _avaliacoes['Pesquisa'].apply(extrair_ciclo_da_pesquisa)
-            # Normalizar valores None
-            ciclos_pesquisa_normalizados = ciclos_pesquisa.apply(lambda x: normalizar_ciclo(x) if x is not None else None)
-            mask_ciclo_pesquisa = (ciclos_pesquisa_normalizados == ciclo_selecionado_normalizado)
-            if mask_ciclo_pesquisa.any():
-                avaliacoes_filtradas = _avaliacoes[mask_ciclo_pesquisa].copy()
-                return avaliacoes_filtradas
-        
-        # Se ainda não encontrou, tentar pela coluna CICLO diretamente
-        if 'CICLO' in _avaliacoes.columns:
-            ciclos_normalizados = _avaliacoes['CICLO'].apply(normalizar_ciclo)
-            mask_ciclo_direto = (ciclos_normalizados == ciclo_selecionado_normalizado)
-            if mask_ciclo_direto.any():
-                avaliacoes_filtradas = _avaliacoes[mask_ciclo_direto].copy()
-                return avaliacoes_filtradas
-    
-    return avaliacoes_filtradas
-
-# Aplicar filtros nos dados ORIGINAIS (sem cache - filtros mudam dinamicamente)
-alunos_filtrados, inscricoes_filtradas = aplicar_filtros(alunos_originais, inscricoes_originais, ciclo_selecionado, local_selecionado, status_selecionado, genero_selecionado)
-
-# Filtrar avaliações baseado nos filtros aplicados
-avaliacoes_filtradas = filtrar_avaliacoes(avaliacoes_originais, alunos_filtrados, inscricoes_filtradas, alunos_originais, inscricoes_originais, ciclo_selecionado)
-
-# Usar dados filtrados para o restante do dashboard
-alunos = alunos_filtrados
-inscricoes = inscricoes_filtradas
-
-# Garantir que avaliações filtradas sejam usadas
-if avaliacoes_filtradas is not None and len(avaliacoes_filtradas) > 0:
-    avaliacoes = avaliacoes_filtradas
-elif ciclo_selecionado != 'Todos' and avaliacoes_originais is not None and len(avaliacoes_originais) > 0:
-    # Se não encontrou dados filtrados mas há filtro de ciclo, tentar filtrar diretamente
-    def extrair_ciclo_pesquisa_simples(valor):
-        if pd.isna(valor):
-            return None
-        valor_str = str(valor).upper().strip()
-        match = re.search(r'(\d+)\s*CICLO', valor_str)
-        if match:
-            return match.group(1)
-        if 'AVALIAÇÃO' in valor_str and ('MCOM' in valor_str or 'MKT DIGITAL' in valor_str):
-            if not re.search(r'\d+\s*CICLO', valor_str):
-                return '1'
+    return grafico_respostas(contar_respostas(visao, coluna), titulo, rotulo_resposta, escala, horizontal=horizontal)
+
+
+def grafico_pergunta_satisfacao(visao, titulo):
+    """Pizza da pergunta de PERGUNTAS_SATISFACAO; None se a pergunta não existe"""
+    pergunta = PERGUNTAS_SATISFACAO[titulo]
+    if pergunta not in visao['avaliacoes'].columns:
         return None
-    
-    ciclo_selecionado_norm = str(ciclo_selecionado).strip()
-    if ciclo_selecionado_norm.endswith('.0'):
-        ciclo_selecionado_norm = ciclo_selecionado_norm[:-2]
-    
-    # Tentar filtrar pela coluna Pesquisa
-    if 'Pesquisa' in avaliacoes_originais.columns:
-        ciclos_pesquisa = avaliacoes_originais['Pesquisa'].apply(extrair_ciclo_pesquisa_simples)
-        mask = ciclos_pesquisa == ciclo_selecionado_norm
-        if mask.any():
-            avaliacoes = avaliacoes_originais[mask]
-        else:
-            avaliacoes = avaliacoes_originais
-    # Tentar filtrar pela coluna CICLO se existir
-    elif 'CICLO' in avaliacoes_originais.columns:
-        ciclos_normalizados = avaliacoes_originais['CICLO'].astype(str).str.strip()
-        ciclos_normalizados = ciclos_normalizados.str.replace('.0', '', regex=False)
-        mask = ciclos_normalizados == ciclo_selecionado_norm
-        if mask.any():
-            avaliacoes = avaliacoes_originais[mask]
-        else:
-            avaliacoes = avaliacoes_originais
-    else:
-        avaliacoes = avaliacoes_originais
+    return grafico_satisfacao(contar_respostas(visao, pergunta), titulo)
+
+
+# Gráficos que dependem só da visão (e das estruturas do snapshot): nome -> construtor(visao)
+GRAFICOS_VISAO = {
+    'sexo': lambda visao: grafico_sexo(visao['alunos'], contar=contar_em(visao, 'alunos')),
+    'idade': lambda visao: grafico_idade(visao['alunos']),
+    'raca': lambda visao: grafico_raca(visao['alunos'], contar=contar_em(visao, 'alunos')),
+    'renda': lambda visao: grafico_renda(visao['alunos'], contar=contar_em(visao, 'alunos')),
+    'canais_inscricao': lambda visao: grafico_canais_inscricao(visao['inscricoes'], canais=canais_inscricoes),
+    'canais_avaliacao': lambda visao: grafico_canais_avaliacao(visao['avaliacoes'], contar=contar_em(visao, 'avaliacoes')),
+    'coocorrencia_canais': lambda visao: grafico_coocorrencia_canais(
+        coocorrencia_canais(canais_inscricoes, visao['inscricoes'])),
+    'status': lambda visao: grafico_status(visao['alunos'], contar=contar_em(visao, 'alunos')),
+    'status_curso': lambda visao: grafico_status_curso(visao['alunos'], cruzar=cruzar_em(visao, 'alunos')),
+    **{titulo: lambda visao, titulo=titulo: grafico_pergunta(visao, titulo) for titulo in PERGUNTAS_AVALIACAO},
+    **{titulo: lambda visao, titulo=titulo: grafico_pergunta_satisfacao(visao, titulo) for titulo in PERGUNTAS_SATISFACAO},
+    'matriz_avaliacoes': lambda visao: grafico_matriz_respostas(matriz_em(visao)),
+    'regiao': lambda visao: grafico_regiao(visao['inscricoes'], contar=contar_em(visao, 'inscricoes')),
+    'local': lambda visao: grafico_local(visao['alunos'], contar=contar_em(visao, 'alunos')),
+    'horario': lambda visao: grafico_horario(visao['avaliacoes'], contar=contar_em(visao, 'avaliacoes')),
+}
+
+
+def _se_coluna(df, coluna, pedido):
+    """[pedido] se df tem a coluna, senão nenhum"""
+    return [pedido] if coluna in df.columns else []
+
+
+def pedidos_visao(visao):
+    """
+    Pedidos de AGREGADOS_VISAO para a visão e os nomes das declarações que
+    falharam (tabela ou coluna ausente): essas ficam para o gráfico, que
+    calcula sozinho ou mostra o erro
+    """
+    pedidos = []
+    falhas = []
+    for nome, declarar in AGREGADOS_VISAO.items():
+        try:
+            pedidos += declarar(visao)
+        except (KeyError, AttributeError):
+            falhas.append(nome)
+    return pedidos, falhas
+
+
+# Tabelas da visão sobre as quais o planejador agrega
+TABELAS_VISAO = ('alunos', 'inscricoes', 'avaliacoes', 'avaliacoes_long')
+
+# Agregações que os gráficos de GRAFICOS_VISAO e os cards de métricas pedem ao planejador: nome -> pedidos(visao)
+AGREGADOS_VISAO = {
+    'metricas': lambda visao: _se_coluna(visao['alunos'], 'STATUS_NORMALIZADO',
+                                         planejador.contagem('alunos', 'STATUS_NORMALIZADO')),
+    'sexo': lambda visao: [planejador.contagem('alunos', coluna_sexo(visao['alunos']))],
+    'raca': lambda visao: [planejador.contagem('alunos', coluna_raca(visao['alunos']))],
+    'renda': lambda visao: [planejador.contagem('alunos', coluna_renda(visao['alunos']), normalizar_categoria_renda)],
+    'canais_avaliacao': lambda visao: [planejador.contagem('avaliacoes', coluna_sabendo_curso(visao['avaliacoes']))],
+    'status': lambda visao: _se_coluna(visao['alunos'], 'STATUS', planejador.contagem('alunos', 'STATUS')),
+    'status_curso': lambda visao: _se_coluna(visao['alunos'], 'CURSO',
+                                             planejador.cruzamento('alunos', 'CURSO', 'STATUS')),
+    **{titulo: lambda visao, localizar=localizar: [planejador.respostas(localizar(visao['avaliacoes']))]
+       for titulo, (localizar, _, _, _) in PERGUNTAS_AVALIACAO.items()},
+    **{titulo: lambda visao, pergunta=pergunta: _se_coluna(visao['avaliacoes'], pergunta,
+                                                           planejador.respostas(pergunta))
+       for titulo, pergunta in PERGUNTAS_SATISFACAO.items()},
+    'matriz_avaliacoes': lambda visao: [planejador.matriz(perguntas_matriz(visao['avaliacoes']))],
+    'regiao': lambda visao: _se_coluna(visao['inscricoes'], COLUNA_REGIAO_INSCRICAO,
+                                       planejador.contagem('inscricoes', COLUNA_REGIAO_INSCRICAO)),
+    'local': lambda visao: _se_coluna(visao['alunos'], 'LOCAL', planejador.contagem('alunos', 'LOCAL')),
+    'horario': lambda visao: _se_coluna(visao['avaliacoes'], COLUNA_HORARIO,
+                                        planejador.contagem('avaliacoes', COLUNA_HORARIO)),
+}
+
+
+def figura_visao(visao, nome, medir_payload=False):
+    """
+    Figura de GRAFICOS_VISAO construída e otimizada uma vez por visão (depois só
+    reenviada). Com medir_payload (?payload=1 na sessão) é sempre construída,
+    para o relatório medir a figura antes da otimização.
+    """
+    if medir_payload:
+        return GRAFICOS_VISAO[nome](visao)
+
+    def construir():
+        fig = GRAFICOS_VISAO[nome](visao)
+        if fig:
+            otimizar_figura(fig)
+        return fig
+    return memorizar(visao['figuras'], nome, construir)
+
+
+def preparar_visao(combinacao, visoes, estado):
+    """Aquecimento de uma combinação: a visão, suas contagens e as figuras de GRAFICOS_VISAO"""
+    visao = visao_filtros(visoes, estado, combinacao['ciclo'], combinacao['local'], combinacao['status'],
+                          combinacao['genero'], execucao='visao_filtros_aquecimento')
+    for nome in GRAFICOS_VISAO:
+        try:
+            figura_visao(visao, nome)
+        except Exception:
+            pass  # O rerun tenta de novo e mostra o aviso da seção
+
+
+# Aquecimento: uma vez por processo e snapshot, em segundo plano, as visões de 'Todos' e de cada filtro isolado
+@st.cache_resource(max_entries=2, show_spinner=False)
+def aquecer_visoes(versao, _combinacoes, _visoes, _estado):
+    """
+    Inicia o aquecimento (versao só identifica o snapshot no cache); o relatório é preenchido ao terminar.
+    A thread recebe as memórias do snapshot (_visoes, _estado) e não chama nenhuma API do Streamlit
+    """
+    relatorio = {}
+
+    def rodar():
+        inicio = time.perf_counter()
+        try:
+            relatorio.update(aquecer(_combinacoes, lambda combinacao: preparar_visao(combinacao, _visoes, _estado),
+                                     ORCAMENTO_AQUECIMENTO_S))
+        except Exception as e:
+            # Falha fora das combinações: o relatório sai assim mesmo, senão o painel fica "em andamento"
+            relatorio.update(combinacoes=len(_combinacoes), aquecidas=0, falhas=len(_combinacoes),
+                             erro=f'{type(e).__name__}: {e}', ms=round((time.perf_counter() - inicio) * 1000, 1),
+                             orcamento_esgotado=False)
+        finally:
+            registrar_aquecimento(relatorio)
+
+    threading.Thread(target=rodar, name='metalab-aquecimento', daemon=True).start()
+    return relatorio
+
+
+visoes = visoes_snapshot(versao_snapshot)
+estado_agregacoes = estado_planejador(versao_snapshot)
+if ORCAMENTO_AQUECIMENTO_S > 0:
+    relatorio_aquecimento = aquecer_visoes(versao_snapshot, combinacoes_aquecimento(
+        {'ciclo': ciclos_disponiveis, 'local': locais_disponiveis, 'status': opcoes_status,
+         'genero': generos_disponiveis}), visoes, estado_agregacoes)
+else:
+    relatorio_aquecimento = None
+
+inicio_visao = time.perf_counter()
+with etapa('visão dos filtros'):
+    visao = chamar_cacheada(visao_filtros, 'visao_filtros', visoes, estado_agregacoes, ciclo_selecionado,
+                            local_selecionado, status_selecionado, genero_selecionado,
+                            st.session_state.filtro_status_clicado, st.session_state.filtro_genero_clicado)
+# Agregações deste rerun: o plano da visão se ela foi calculada agora; com a visão em cache, nenhuma passada
+if visao['plano'] is None:
+    agregacoes_rerun = None
+elif visao['plano']['calculado_em'] >= inicio_visao:
+    agregacoes_rerun = {chave: valor for chave, valor in visao['plano'].items() if chave != 'calculado_em'}
 else:
-    avaliacoes = avaliacoes_originais
+    agregacoes_rerun = {'pedidos': visao['plano']['pedidos'], 'unicos': visao['plano']['unicos'], 'calculados': 0,
+                        'passadas': 0, 'ms': 0.0, 'recuos': {}, 'erros': 0, 'visao_em_cache': True}
+# Com ?payload=1 as figuras da visão são reconstruídas, para o relatório medir o payload antes da otimização
+payload_ativo = st.session_state.relatorio_payload_ativo
+selecao, alunos, inscricoes, avaliacoes, avaliacoes_long = (
+    visao['selecao'], visao['alunos'], visao['inscricoes'], visao['avaliacoes'], visao['avaliacoes_long'])
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 📊 Informações")
@@ -1516,31 +1338,21 @@ def criar_card_metrica(titulo, valor, cor_borda, cor_texto, subtitulo=None):
 # ==========================================
 # SEÇÃO 1: MÉTRICAS PRINCIPAIS
 # ==========================================
+secao('métricas')
 st.markdown("---")
 st.markdown("## 📈 Métricas Principais")
 
-# Calcular métricas ANTES de exibir (usando dados FILTRADOS)
-total_inscricoes = len(inscricoes)
-total_alunos = len(alunos)
-
-# Calcular status dos alunos (usando dados FILTRADOS)
-if 'STATUS_NORMALIZADO' in alunos.columns:
-    # Usar STATUS_NORMALIZADO se disponível (mais confiável)
-    formados = len(alunos[alunos['STATUS_NORMALIZADO'] == 'CONCLUÍDO'])
-    desistentes = len(alunos[alunos['STATUS_NORMALIZADO'] == 'DESISTENTE'])
-    cursando = len(alunos[alunos['STATUS_NORMALIZADO'] == 'CURSANDO'])
-    taxa_desistencia = (desistentes / total_alunos * 100) if total_alunos > 0 else 0
-elif 'STATUS' in alunos.columns:
-    # Usar STATUS original com múltiplas variações
-    formados = len(alunos[alunos['STATUS'].astype(str).str.upper().str.contains('CONCLUIDO|CONCLUÍDO', case=False, na=False, regex=True)])
-    desistentes = len(alunos[alunos['STATUS'].astype(str).str.upper().str.contains('DESISTENTE', case=False, na=False, regex=True)])
-    cursando = len(alunos[alunos['STATUS'].astype(str).str.upper().str.contains('CURSANDO|EM CURSO|EM ANDAMENTO', case=False, na=False, regex=True)])
-    taxa_desistencia = (desistentes / total_alunos * 100) if total_alunos > 0 else 0
+# Métricas dos dados FILTRADOS (calculadas com a visão); sem filtros ativos, usar as pré-calculadas no bundle
+if dados_bundle is not None and not filtros_ativos and 'metricas' in dados_bundle['agregados']:
+    metricas = dados_bundle['agregados']['metricas']
 else:
-    formados = 0
-    desistentes = 0
-    cursando = 0
-    taxa_desistencia = 0
+    metricas = visao['metricas']
+total_inscricoes = metricas['total_inscricoes']
+total_alunos = metricas['total_alunos']
+formados = metricas['formados']
+desistentes = metricas['desistentes']
+cursando = metricas['cursando']
+taxa_desistencia = metricas['taxa_desistencia']
 
 # Layout responsivo: 5 colunas no desktop, empilhado no mobile
 col1, col2, col3, col4, col5 = st.columns(5)
@@ -1589,577 +1401,52 @@ with col5:
 # ==========================================
 # SEÇÃO 2: PERFIL DOS ALUNOS
 # ==========================================
+secao('perfil dos alunos')
 st.markdown("---")
 st.markdown("## 👥 Perfil dos Alunos")
 
 col1, col2 = st.columns(2)
 
-# Função para criar gráficos SEM cache (para permitir filtros dinâmicos)
-def criar_grafico_sexo(_alunos):
-    """Cria gráfico de distribuição por sexo usando dados de ALUNOS (DadosMetalab) - SEM CACHE para permitir filtros"""
-    if _alunos is None or len(_alunos) == 0:
-        return None
-    
-    # Procurar coluna de sexo/gênero nos dados de alunos
-    coluna_sexo = None
-    for col in _alunos.columns:
-        if 'sexo' in col.lower() or 'genero' in col.lower() or 'gênero' in col.lower():
-            coluna_sexo = col
-            break
-    
-    if coluna_sexo is None:
-        return None
-    
-    sexo_counts = _alunos[coluna_sexo].value_counts()
-    if len(sexo_counts) == 0:
-        return None
-    fig = px.pie(
-        values=sexo_counts.values,
-        names=sexo_counts.index,
-        title="Distribuição por Sexo",
-        color_discrete_sequence=PALETA_METALAB
-    )
-    fig.update_traces(textposition='inside', textinfo='percent+label', textfont=dict(color='white'))
-    fig.update_traces(hovertemplate="Sexo: %{label}<br>Quantidade: %{value}<extra></extra>")
-    return aplicar_tema_escuro(fig)
-
-def criar_grafico_idade(_alunos):
-    """Cria gráfico de distribuição por idade agrupada em faixas etárias usando dados de ALUNOS (DadosMetalab)"""
-    if _alunos is None or len(_alunos) == 0:
-        return None
-    
-    idades_numericas = None
-    
-    # PRIORIDADE 1: Procurar coluna de idade direta (se existir)
-    coluna_idade = None
-    for col in _alunos.columns:
-        col_lower = col.lower().strip()
-        if any(palavra in col_lower for palavra in ['idade', 'age']):
-            # Verificar se a coluna parece conter idades (números)
-            amostra = _alunos[col].dropna().head(10)
-            if len(amostra) > 0:
-                valores_numericos = pd.to_numeric(amostra, errors='coerce').dropna()
-                if len(valores_numericos) > 0:
-                    valores_validos = valores_numericos[(valores_numericos >= 10) & (valores_numericos <= 100)]
-                    if len(valores_validos) > 0:
-                        coluna_idade = col
-                        break
-    
-    # Se encontrou coluna de idade direta, usar ela
-    if coluna_idade:
-        idades = _alunos[coluna_idade].dropna()
-        if len(idades) > 0:
-            idades_numericas = pd.to_numeric(idades, errors='coerce').dropna()
-            # Se não conseguiu converter, tentar extrair números do texto
-            if len(idades_numericas) == 0:
-                idades_numericas = idades.astype(str).str.extract(r'(\d+)')[0]
-                idades_numericas = pd.to_numeric(idades_numericas, errors='coerce').dropna()
-    
-    # PRIORIDADE 2: Se não encontrou idade direta, calcular a partir de DATA DE NASCIMENTO
-    if idades_numericas is None or len(idades_numericas) == 0:
-        # Procurar coluna de data de nascimento (busca mais ampla)
-        coluna_nascimento = None
-        palavras_chave_nasc = ['data de nascimento', 'data nascimento', 'nascimento', 'nasc', 'birth', 'birthday', 'data nasc', 'dt nascimento', 'dt nasc', 'datanascimento']
-        
-        # Priorizar busca exata por "DATA DE NASCIMENTO"
-        for col in _alunos.columns:
-            col_lower = col.lower().strip()
-            if 'data de nascimento' in col_lower or col_lower == 'data de nascimento':
-                coluna_nascimento = col
-                break
-        
-        # Se não encontrou exato, buscar por outras variações
-        if coluna_nascimento is None:
-            for col in _alunos.columns:
-                col_lower = col.lower().strip()
-                # Buscar por qualquer palavra-chave relacionada a nascimento
-                if any(palavra in col_lower for palavra in palavras_chave_nasc):
-                    coluna_nascimento = col
-                    break
-        
-        # Se encontrou coluna de nascimento, calcular idade
-        if coluna_nascimento:
-            # Tentar múltiplos formatos de data
-            datas_nasc = None
-            
-            # Método 1: Tentar com inferência automática (dayfirst=True para formato brasileiro)
-            try:
-                datas_nasc = pd.to_datetime(_alunos[coluna_nascimento], errors='coerce', dayfirst=True, infer_datetime_format=True)
-            except:
-                pass
-            
-            # Método 2: Se falhou, tentar formato brasileiro comum (DD/MM/YYYY)
-            if datas_nasc is None or datas_nasc.isna().all():
-                try:
-                    datas_nasc = pd.to_datetime(_alunos[coluna_nascimento], errors='coerce', format='%d/%m/%Y')
-                except:
-                    pass
-            
-            # Método 3: Tentar formato ISO (YYYY-MM-DD)
-            if datas_nasc is None or datas_nasc.isna().all():
-                try:
-                    datas_nasc = pd.to_datetime(_alunos[coluna_nascimento], errors='coerce', format='%Y-%m-%d')
-                except:
-                    pass
-            
-            # Método 4: Tentar sem especificar formato (pandas tenta inferir)
-            if datas_nasc is None or datas_nasc.isna().all():
-                try:
-                    datas_nasc = pd.to_datetime(_alunos[coluna_nascimento], errors='coerce')
-                except:
-                    pass
-            
-            # Se conseguiu converter pelo menos algumas datas
-            if datas_nasc is not None:
-                # Filtrar apenas datas válidas
-                datas_validas = datas_nasc.dropna()
-                
-                if len(datas_validas) > 0:
-                    # Calcular idade atual
-                    hoje = pd.Timestamp.now()
-                    
-                    # Calcular diferença em anos, ajustando para aniversário
-                    # Se ainda não fez aniversário este ano, subtrair 1
-                    idades_calculadas = hoje.year - datas_validas.dt.year
-                    # Ajustar se ainda não fez aniversário
-                    mask_nao_aniversario = (hoje.month < datas_validas.dt.month) | (
-                        (hoje.month == datas_validas.dt.month) & (hoje.day < datas_validas.dt.day)
-                    )
-                    idades_calculadas = idades_calculadas - mask_nao_aniversario.astype(int)
-                    
-                    # Filtrar idades válidas (entre 10 e 100 anos)
-                    idades_numericas = idades_calculadas[(idades_calculadas >= 10) & (idades_calculadas <= 100)]
-                    
-                    if len(idades_numericas) == 0:
-                        idades_numericas = None
-                else:
-                    idades_numericas = None
-            else:
-                idades_numericas = None
-    
-    # Se ainda não conseguiu calcular idades, retornar None
-    if idades_numericas is None or len(idades_numericas) == 0:
-        return None
-    
-    # Filtrar idades razoáveis (entre 10 e 100 anos) - garantir novamente
-    idades_numericas = idades_numericas[(idades_numericas >= 10) & (idades_numericas <= 100)]
-    
-    if len(idades_numericas) == 0:
-        return None
-    
-    # Criar faixas etárias
-    bins = [0, 18, 25, 30, 35, 40, 45, 50, 60, 100]
-    labels = ['Até 18', '19-25', '26-30', '31-35', '36-40', '41-45', '46-50', '51-60', 'Acima de 60']
-    
-    # Agrupar idades em faixas
-    idades_faixas = pd.cut(idades_numericas, bins=bins, labels=labels, include_lowest=True)
-    idade_counts = idades_faixas.value_counts().sort_index()
-    
-    # Remover faixas vazias
-    idade_counts = idade_counts[idade_counts > 0]
-    
-    if len(idade_counts) == 0:
-        return None
-    
-    fig = px.bar(
-        x=idade_counts.index.astype(str),
-        y=idade_counts.values,
-        title="Distribuição por Idade",
-        labels={'x': 'Faixa Etária', 'y': 'Quantidade'},
-        color=idade_counts.values,
-        color_continuous_scale=['#1a237e', '#3949ab', '#5c6bc0', '#7986cb', '#90caf9']
-    )
-    fig.update_traces(
-        hovertemplate="Faixa Etária: %{x} anos<br>Quantidade: %{y}<extra></extra>",
-        marker_line_color='rgba(92, 107, 192, 0.5)',
-        marker_line_width=1
-    )
-    fig.update_layout(
-        xaxis=dict(title="Faixa Etária (anos)", tickangle=-45),
-        yaxis=dict(title="Quantidade de Alunos")
-    )
-    return aplicar_tema_escuro(fig)
-
-def criar_grafico_raca(_alunos):
-    """Cria gráfico de distribuição por raça/cor usando dados de ALUNOS (DadosMetalab) - SEM CACHE para permitir filtros"""
-    if _alunos is None or len(_alunos) == 0:
-        return None
-    
-    # Procurar coluna de raça/cor nos dados de alunos
-    coluna_raca = None
-    for col in _alunos.columns:
-        if 'ibge' in col.lower() or 'raça' in col.lower() or 'raca' in col.lower() or 'cor' in col.lower() or 'autodeclara' in col.lower():
-            coluna_raca = col
-            break
-    
-    if coluna_raca is None:
-        return None
-    
-    raca_counts = _alunos[coluna_raca].value_counts()
-    if len(raca_counts) == 0:
-        return None
-    fig = px.bar(
-        x=raca_counts.values,
-        y=raca_counts.index,
-        orientation='h',
-        title="Distribuição por Raça/Cor (IBGE)",
-        labels={'x': 'Quantidade', 'y': 'Raça/Cor'},
-        color=raca_counts.values,
-        color_continuous_scale=['#1a237e', '#3949ab', '#5c6bc0', '#7986cb', '#90caf9']
-    )
-    fig.update_traces(hovertemplate="Raça/Cor: %{y}<br>Quantidade: %{x}<extra></extra>")
-    return aplicar_tema_escuro(fig)
-
-def contar_respostas_avaliacao(pergunta_texto, avaliacoes_pivot, avaliacoes_long=None):
-    """
-    Conta todas as respostas de uma pergunta, usando o DataFrame original (long) se disponível,
-    ou o DataFrame pivotado como fallback.
-    
-    Args:
-        pergunta_texto: Texto da pergunta para buscar
-        avaliacoes_pivot: DataFrame pivotado (formato largo)
-        avaliacoes_long: DataFrame original (formato longo) - opcional
-    
-    Returns:
-        Series com value_counts das respostas normalizadas
-    """
-    # Se temos o DataFrame original (long), contar diretamente dele
-    if avaliacoes_long is not None and len(avaliacoes_long) > 0:
-        # Verificar se está em formato longo (tem coluna 'Pergunta')
-        colunas_lower = [str(col).lower() for col in avaliacoes_long.columns]
-        if 'pergunta' in colunas_lower:
-            # Encontrar coluna de pergunta
-            coluna_pergunta = None
-            for col in avaliacoes_long.columns:
-                if 'pergunta' in str(col).lower():
-                    coluna_pergunta = col
-                    break
-            
-            # Encontrar coluna de valor (Nome exibido ou Resposta de texto livre)
-            valor_col = None
-            for col in avaliacoes_long.columns:
-                col_lower = str(col).lower()
-                if 'nome exibido' in col_lower:
-                    valor_col = col
-                    break
-                elif 'resposta de texto livre' in col_lower:
-                    if avaliacoes_long[col].notna().sum() > len(avaliacoes_long) * 0.1:
-                        valor_col = col
-                        break
-            
-            if coluna_pergunta and valor_col:
-                # Filtrar pela pergunta específica
-                # Extrair palavras-chave do texto da pergunta
-                palavras_chave = [p for p in pergunta_texto.lower().split() if len(p) > 3]  # Palavras com mais de 3 caracteres
-                
-                # Buscar perguntas que contenham pelo menos uma palavra-chave importante
-                mask_pergunta = pd.Series([False] * len(avaliacoes_long))
-                perguntas_unicas = avaliacoes_long[coluna_pergunta].unique()
-                
-                for pergunta in perguntas_unicas:
-                    pergunta_lower = str(pergunta).lower()
-                    # Verificar se a pergunta contém palavras-chave importantes
-                    palavras_encontradas = sum(1 for palavra in palavras_chave if palavra in pergunta_lower)
-                    # Ou verificar se o texto completo está contido
-                    if pergunta_texto.lower() in pergunta_lower or palavras_encontradas >= min(2, len(palavras_chave)):
-                        mask_pergunta |= (avaliacoes_long[coluna_pergunta] == pergunta)
-                
-                if mask_pergunta.any():
-                    # Obter todas as respostas para essa pergunta
-                    respostas = avaliacoes_long.loc[mask_pergunta, valor_col].dropna()
-                    
-                    if len(respostas) > 0:
-                        # Normalizar respostas
-                        respostas_normalizadas = respostas.apply(normalizar_resposta_avaliacao)
-                        respostas_validas = respostas_normalizadas[respostas_normalizadas.notna()]
-                        return respostas_validas.value_counts()
-    
-    # Fallback: usar DataFrame pivotado
-    if avaliacoes_pivot is not None and len(avaliacoes_pivot) > 0:
-        # Buscar coluna que corresponde à pergunta
-        for col in avaliacoes_pivot.columns:
-            if pergunta_texto.lower() in str(col).lower():
-                respostas = avaliacoes_pivot[col].dropna()
-                if len(respostas) > 0:
-                    respostas_normalizadas = respostas.apply(normalizar_resposta_avaliacao)
-                    respostas_validas = respostas_normalizadas[respostas_normalizadas.notna()]
-                    return respostas_validas.value_counts()
-    
-    return pd.Series(dtype=int)
-
-def remover_acentos(texto):
-    """Remove acentos de um texto de forma robusta"""
-    if pd.isna(texto):
-        return texto
-    
-    texto_str = str(texto).lower()
-    # Mapeamento completo de acentos
-    acentos = {
-        'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a', 'ä': 'a',
-        'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
-        'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
-        'ó': 'o', 'ò': 'o', 'õ': 'o', 'ô': 'o', 'ö': 'o',
-        'ú': 'u', 'ù': 'u', 'û': 'u', 'ü': 'u',
-        'ç': 'c', 'ć': 'c', 'č': 'c',
-        'ñ': 'n', 'ń': 'n',
-        'ý': 'y', 'ÿ': 'y'
-    }
-    resultado = texto_str
-    for acento, sem_acento in acentos.items():
-        resultado = resultado.replace(acento, sem_acento)
-    return resultado
-
-def normalizar_resposta_avaliacao(valor):
-    """Normaliza respostas de avaliações para agrupar variações similares"""
-    if pd.isna(valor) or valor == '':
-        return None
-    
-    # Converter para string e normalizar
-    valor_str = str(valor).strip()
-    
-    if not valor_str:
-        return None
-    
-    # Remover acentos e converter para minúsculas
-    valor_normalizado = remover_acentos(valor_str.lower())
-    
-    # Normalizar espaços múltiplos
-    valor_normalizado = re.sub(r'\s+', ' ', valor_normalizado).strip()
-    
-    # Mapear variações comuns para valores padronizados (ordem importa - mais específico primeiro)
-    mapeamento_especifico = [
-        ('superou as expectativas', 'Sim'),
-        ('ficou abaixo das expectativas', 'Não'),
-        ('atendeu completamente', 'Sim'),
-        ('atendeu parcialmente', 'Parcialmente'),
-        ('nao atendeu', 'Não'),
-        ('sim, indicaria', 'Sim'),
-        ('nao indicaria', 'Não'),
-        ('sim, com certeza', 'Sim'),
-        ('com certeza', 'Sim'),
-        ('definitivamente', 'Sim'),
-        ('nao tenho certeza', 'Talvez'),
-        ('pode ser', 'Talvez'),
-        ('provavelmente', 'Talvez'),
-        ('muito ruim', 'Ruim'),
-        ('muito bom', 'Ótimo'),
-    ]
-    
-    # Verificar correspondências específicas primeiro
-    for chave, valor_padrao in mapeamento_especifico:
-        if chave in valor_normalizado:
-            return valor_padrao
-    
-    # Mapeamento simples (exato ou início da palavra)
-    mapeamento_simples = {
-        'otimo': 'Ótimo',
-        'excelente': 'Ótimo',
-        'bom': 'Bom',
-        'regular': 'Regular',
-        'ruim': 'Ruim',
-        'pessimo': 'Ruim',
-        'sim': 'Sim',
-        'nao': 'Não',
-        'talvez': 'Talvez',
-        'atendeu': 'Sim',
-        'superou': 'Sim',
-        'ficou abaixo': 'Não',
-    }
-    
-    # Verificar correspondências simples (palavra completa ou início)
-    for chave, valor_padrao in mapeamento_simples.items():
-        if valor_normalizado == chave or valor_normalizado.startswith(chave + ' ') or valor_normalizado.endswith(' ' + chave):
-            return valor_padrao
-    
-    # Se não encontrou correspondência, capitalizar primeira letra de cada palavra
-    palavras = valor_normalizado.split()
-    if palavras:
-        resultado = ' '.join(palavra.capitalize() for palavra in palavras)
-        return resultado
-    
-    return valor_str  # Retornar original se não conseguir normalizar
-
-def normalizar_categoria_renda(valor):
-    """Normaliza e padroniza categorias de renda para agrupar duplicatas de forma robusta"""
-    if pd.isna(valor) or valor == '':
-        return None
-    
-    # Converter para string e normalizar
-    valor_str = str(valor).strip()
-    
-    # Remover acentos e converter para minúsculas
-    valor_normalizado = remover_acentos(valor_str)
-    
-    # Normalizar espaços múltiplos
-    valor_normalizado = re.sub(r'\s+', ' ', valor_normalizado).strip()
-    
-    # Remover palavras comuns que podem variar
-    valor_normalizado = valor_normalizado.replace('recebe', '').replace('de', '').strip()
-    valor_normalizado = re.sub(r'\s+', ' ', valor_normalizado).strip()
-    
-    # Padrões de correspondência (em ordem de especificidade)
-    
-    # 1. Não possui renda mensal (mais específico primeiro)
-    padroes_sem_renda = [
-        'nao possui renda mensal', 'nao possui renda', 'sem renda mensal', 
-        'sem renda', 'sem renda familiar', 'nao tem renda'
-    ]
-    if any(padrao in valor_normalizado for padrao in padroes_sem_renda):
-        return 'Não possui renda mensal'
-    
-    # 2. Até meio salário mínimo
-    padroes_meio = ['meio salario', '0.5 salario', 'ate meio', 'até meio']
-    if any(padrao in valor_normalizado for padrao in padroes_meio) and 'salario' in valor_normalizado:
-        return 'Até meio salário mínimo'
-    
-    # 3. Até um salário mínimo
-    padroes_um = ['ate um', 'até um', 'ate 1', 'até 1', 'um salario', '1 salario']
-    if any(padrao in valor_normalizado for padrao in padroes_um) and 'salario' in valor_normalizado and 'meio' not in valor_normalizado:
-        return 'Até um salário mínimo'
-    
-    # 4. De 1 a 2 salários mínimos
-    padroes_1_2 = ['1 a 2', '1-2', '1 ate 2', '1 até 2', 'um a dois']
-    if any(padrao in valor_normalizado for padrao in padroes_1_2) and 'salario' in valor_normalizado:
-        return 'De 1 a 2 salários mínimos'
-    
-    # 5. De 2 a 3 salários mínimos (NOVO - estava faltando!)
-    padroes_2_3 = ['2 a 3', '2-3', '2 ate 3', '2 até 3', 'dois a tres', 'dois a três']
-    if any(padrao in valor_normalizado for padrao in padroes_2_3) and 'salario' in valor_normalizado:
-        return 'De 2 a 3 salários mínimos'
-    
-    # 6. De 3 a 4 salários mínimos
-    padroes_3_4 = ['3 a 4', '3-4', '3 ate 4', '3 até 4', 'tres a quatro', 'três a quatro']
-    if any(padrao in valor_normalizado for padrao in padroes_3_4) and 'salario' in valor_normalizado:
-        return 'De 3 a 4 salários mínimos'
-    
-    # 7. Acima de 5 salários mínimos
-    padroes_5_mais = ['acima de 5', 'mais de 5', 'acima 5', 'mais 5', '5 ou mais', '5+']
-    if any(padrao in valor_normalizado for padrao in padroes_5_mais) and 'salario' in valor_normalizado:
-        return 'Acima de 5 salários mínimos'
-    
-    # 8. Correspondência por números e palavras-chave (fallback mais inteligente)
-    # Extrair números do texto
-    numeros = re.findall(r'\d+', valor_normalizado)
-    
-    if 'salario' in valor_normalizado or 'salários' in valor_normalizado:
-        if 'meio' in valor_normalizado or '0.5' in valor_normalizado:
-            return 'Até meio salário mínimo'
-        elif 'um' in valor_normalizado or '1' in valor_normalizado:
-            if '2' not in valor_normalizado and '3' not in valor_normalizado:
-                return 'Até um salário mínimo'
-        elif len(numeros) >= 2:
-            num1, num2 = int(numeros[0]), int(numeros[1])
-            if num1 == 1 and num2 == 2:
-                return 'De 1 a 2 salários mínimos'
-            elif num1 == 2 and num2 == 3:
-                return 'De 2 a 3 salários mínimos'
-            elif num1 == 3 and num2 == 4:
-                return 'De 3 a 4 salários mínimos'
-        elif len(numeros) == 1:
-            num = int(numeros[0])
-            if num >= 5:
-                return 'Acima de 5 salários mínimos'
-    
-    # Se não encontrou padrão conhecido, retornar o valor original capitalizado
-    return valor_str.title()
-
-def criar_grafico_renda(_alunos):
-    """Cria gráfico de distribuição por renda usando dados de ALUNOS (DadosMetalab) - SEM CACHE para permitir filtros"""
-    if _alunos is None or len(_alunos) == 0:
-        return None
-    
-    # Procurar coluna de renda nos dados de alunos
-    coluna_renda = None
-    for col in _alunos.columns:
-        if 'renda' in col.lower() or 'salario' in col.lower() or 'salário' in col.lower() or 'familiar' in col.lower():
-            coluna_renda = col
-            break
-    
-    if coluna_renda is None:
-        return None
-    
-    # Normalizar e padronizar categorias de renda
-    renda_normalizada = _alunos[coluna_renda].apply(normalizar_categoria_renda)
-    renda_normalizada = renda_normalizada.dropna()
-    
-    if len(renda_normalizada) == 0:
-        return None
-    
-    # Contar valores normalizados
-    renda_counts = renda_normalizada.value_counts()
-    
-    # Ordenar por ordem lógica de renda (do menor para o maior)
-    ordem_categorias = [
-        'Não possui renda mensal',
-        'Até meio salário mínimo',
-        'Até um salário mínimo',
-        'De 1 a 2 salários mínimos',
-        'De 2 a 3 salários mínimos',
-        'De 3 a 4 salários mínimos',
-        'Acima de 5 salários mínimos'
-    ]
-    
-    # Reordenar mantendo apenas as categorias que existem
-    renda_counts_ordenado = renda_counts.reindex([cat for cat in ordem_categorias if cat in renda_counts.index])
-    # Adicionar categorias que não estão na lista de ordem (caso apareçam outras)
-    outras_categorias = renda_counts.index[~renda_counts.index.isin(ordem_categorias)]
-    if len(outras_categorias) > 0:
-        renda_counts_ordenado = pd.concat([renda_counts_ordenado, renda_counts[outras_categorias]])
-    
-    if len(renda_counts_ordenado) == 0:
-        return None
-    
-    fig = px.bar(
-        x=renda_counts_ordenado.values,
-        y=renda_counts_ordenado.index,
-        orientation='h',
-        title="Distribuição por Renda Familiar",
-        labels={'x': 'Quantidade', 'y': 'Renda'},
-        color=renda_counts_ordenado.values,
-        color_continuous_scale=['#2e7d32', '#43a047', '#66bb6a', '#81c784', '#a5d6a7']
-    )
-    fig.update_traces(hovertemplate="Renda: %{y}<br>Quantidade: %{x}<extra></extra>")
-    return aplicar_tema_escuro(fig)
-
 with col1:
     # Distribuição por Sexo (usa dados de ALUNOS - DadosMetalab FILTRADOS)
-    fig_sexo = criar_grafico_sexo(alunos)
+    fig_sexo = figura_visao(visao, 'sexo', payload_ativo)
     if fig_sexo:
-        st.plotly_chart(fig_sexo, use_container_width=True, key="sexo_chart")
+        exibir_grafico(fig_sexo, key="sexo_chart", otimizada=True)
     else:
         st.info("Não há dados de sexo disponíveis nos dados de alunos.")
     
     # Distribuição por Idade (usa dados de ALUNOS - DadosMetalab FILTRADOS)
     st.markdown("### Distribuição por Idade")
-    fig_idade = criar_grafico_idade(alunos)
+    fig_idade = figura_visao(visao, 'idade', payload_ativo)
     if fig_idade:
-        st.plotly_chart(fig_idade, use_container_width=True)
+        exibir_grafico(fig_idade, otimizada=True)
     else:
         # Debug: mostrar colunas disponíveis para ajudar a identificar o problema
-        colunas_possiveis = [col for col in alunos.columns if any(palavra in col.lower() for palavra in ['idade', 'age', 'anos', 'nascimento', 'nasc', 'year'])]
+        colunas_possiveis = colunas_relacionadas(alunos, PALAVRAS_IDADE, limite=5)
         if colunas_possiveis:
-            st.warning(f"Não foi possível processar dados de idade. Colunas encontradas relacionadas: {', '.join(colunas_possiveis[:5])}")
+            st.warning(f"Não foi possível processar dados de idade. Colunas encontradas relacionadas: {', '.join(colunas_possiveis)}")
         else:
             st.warning("Não há dados de idade disponíveis para exibição. Verifique se há colunas de idade nos dados de alunos.")
 
 with col2:
     # Distribuição por Raça/Cor (usa dados de ALUNOS - DadosMetalab FILTRADOS)
-    fig_raca = criar_grafico_raca(alunos)
+    fig_raca = figura_visao(visao, 'raca', payload_ativo)
     if fig_raca:
-        st.plotly_chart(fig_raca, use_container_width=True)
+        exibir_grafico(fig_raca, otimizada=True)
     else:
         st.info("Não há dados de raça/cor disponíveis nos dados de alunos.")
     
     # Distribuição por Renda Familiar (usa dados de ALUNOS - DadosMetalab FILTRADOS)
-    fig_renda = criar_grafico_renda(alunos)
+    fig_renda = figura_visao(visao, 'renda', payload_ativo)
     if fig_renda:
-        st.plotly_chart(fig_renda, use_container_width=True)
+        exibir_grafico(fig_renda, otimizada=True)
     else:
         st.info("Não há dados de renda disponíveis nos dados de alunos.")
 
 # ==========================================
 # SEÇÃO 3: CANAIS DE DIVULGAÇÃO
 # ==========================================
+secao('canais')
 st.markdown("---")
 st.markdown("## 📢 Canais de Divulgação e Acesso")
 
@@ -2167,21 +1454,10 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Canais de inscrição (usa dados FILTRADOS)
-    if len(inscricoes) > 0 and 'Quais foram os canais de comunicação pelos quais você tomou conhecimento do curso MetaLab?' in inscricoes.columns:
-        canais_inscricao = inscricoes['Quais foram os canais de comunicação pelos quais você tomou conhecimento do curso MetaLab?'].value_counts()
-        if len(canais_inscricao) > 0:
-            fig_canais = px.bar(
-                x=canais_inscricao.values,
-                y=canais_inscricao.index,
-                orientation='h',
-                title="Canais de Comunicação - Inscrições",
-                labels={'x': 'Quantidade', 'y': 'Canal'},
-                color=canais_inscricao.values,
-                color_continuous_scale=['#e65100', '#f57c00', '#ff9800', '#ffb74d', '#ffcc80']
-            )
-            fig_canais.update_traces(hovertemplate="Canal: %{y}<br>Quantidade: %{x}<extra></extra>")
-            fig_canais = aplicar_tema_escuro(fig_canais)
-            st.plotly_chart(fig_canais, use_container_width=True)
+    if len(inscricoes) > 0 and COLUNA_CANAIS_INSCRICAO in inscricoes.columns:
+        fig_canais = figura_visao(visao, 'canais_inscricao', payload_ativo)
+        if fig_canais:
+            exibir_grafico(fig_canais, otimizada=True)
         else:
             st.info("Não há dados de canais para os filtros selecionados.")
     else:
@@ -2189,153 +1465,51 @@ with col1:
 
 with col2:
     # Canais de avaliação - procurar por diferentes variações do nome
-    coluna_canal = None
-    for col in avaliacoes.columns:
-        if 'sabendo' in col.lower() and 'curso' in col.lower():
-            coluna_canal = col
-            break
-    
-    if coluna_canal:
-        canais_avaliacao = avaliacoes[coluna_canal].value_counts()
-        fig_canais_av = px.pie(
-            values=canais_avaliacao.values,
-            names=canais_avaliacao.index,
-            title="Canais de Divulgação - Avaliações",
-            color_discrete_sequence=PALETA_METALAB
-        )
-        fig_canais_av.update_traces(textposition='inside', textinfo='percent+label', textfont=dict(color='white'))
-        fig_canais_av = aplicar_tema_escuro(fig_canais_av)
-        st.plotly_chart(fig_canais_av, use_container_width=True)
+    fig_canais_av = figura_visao(visao, 'canais_avaliacao', payload_ativo)
+    if fig_canais_av:
+        exibir_grafico(fig_canais_av, otimizada=True)
+
+# Canais citados juntos nas inscrições (a partir dos pares (linha, canal))
+if canais_inscricoes is not None and len(inscricoes) > 0:
+    with etapa('coocorrência de canais'):
+        fig_coocorrencia = figura_visao(visao, 'coocorrencia_canais', payload_ativo)
+    if fig_coocorrencia:
+        exibir_grafico(fig_coocorrencia, key="coocorrencia_canais_chart", otimizada=True)
 
 # ==========================================
 # SEÇÃO 4: STATUS DOS ALUNOS
 # ==========================================
+secao('status')
 st.markdown("---")
 st.markdown("## 📊 Status dos Alunos")
 
+# O detalhamento usa todos os alunos: uma tabela por snapshot, igual em qualquer filtro
+@st.cache_data(max_entries=2, show_spinner=False)
+def carregar_resumo_status(_alunos, versao):
+    """Resumo de agregados.resumo_status dos alunos originais (versao só identifica o snapshot no cache)"""
+    contar_execucao('carregar_resumo_status')
+    return resumo_status(_alunos)
+
 if 'STATUS' in alunos.columns:
     col1, col2 = st.columns(2)
     
     with col1:
-        status_counts = alunos['STATUS'].value_counts()
-        fig_status = px.pie(
-            values=status_counts.values,
-            names=status_counts.index,
-            title="Distribuição de Status",
-            color_discrete_map={
-                'CONCLUIDO': CORES_METALAB['success'],
-                'DESISTENTE': CORES_METALAB['error'],
-                'EM CURSO': CORES_METALAB['light'],
-                'CURSANDO': CORES_METALAB['light'],
-                'OUTROS': '#90caf9'
-            }
-        )
-        fig_status.update_traces(textposition='inside', textinfo='percent+label', textfont=dict(color='white'))
-        fig_status = aplicar_tema_escuro(fig_status)
         st.caption("💡 Use o filtro de Status na sidebar para filtrar os dados")
-        st.plotly_chart(fig_status, use_container_width=True, key="status_chart")
+        exibir_grafico(figura_visao(visao, 'status', payload_ativo), key="status_chart", otimizada=True)
     
     with col2:
         # Status por Curso
-        if 'CURSO' in alunos.columns:
-            status_curso = pd.crosstab(alunos['CURSO'], alunos['STATUS'])
-            fig_status_curso = px.bar(
-                status_curso,
-                title="Status por Curso",
-                labels={'value': 'Quantidade', 'index': 'Curso'},
-                barmode='group',
-                color_discrete_map={
-                    'CONCLUIDO': CORES_METALAB['success'],
-                    'DESISTENTE': CORES_METALAB['error'],
-                    'EM CURSO': CORES_METALAB['light'],
-                    'CURSANDO': CORES_METALAB['light']
-                }
-            )
-            fig_status_curso = aplicar_tema_escuro(fig_status_curso)
-            st.plotly_chart(fig_status_curso, use_container_width=True)
+        fig_status_curso = figura_visao(visao, 'status_curso', payload_ativo)
+        if fig_status_curso:
+            exibir_grafico(fig_status_curso, otimizada=True)
     
     # Tabela detalhada de status
     st.markdown("### Detalhamento por Status")
     
-    # Função para normalizar e padronizar status
-    def normalizar_status(status):
-        """Normaliza e padroniza status para agrupar variações"""
-        if pd.isna(status) or status == '' or str(status).upper().strip() in ['NAN', 'NONE', 'NULL', 'N/A', 'NA']:
-            return 'SEM STATUS'
-        
-        status_str = str(status).upper().strip()
-        
-        # Padronizar CONCLUÍDO/CONCLUIDO
-        if 'CONCLUIDO' in status_str or 'CONCLUÍDO' in status_str or 'CONCLU' in status_str:
-            return 'CONCLUÍDO'
-        
-        # Padronizar CURSANDO/EM CURSO
-        if 'CURSANDO' in status_str or 'EM CURSO' in status_str or 'EM ANDAMENTO' in status_str or 'ANDAMENTO' in status_str:
-            return 'CURSANDO'
-        
-        # Padronizar DESISTENTE
-        if 'DESISTENTE' in status_str or 'DESISTIU' in status_str or 'DESISTENCIA' in status_str:
-            return 'DESISTENTE'
-        
-        # Padronizar NÃO COMPARECEU
-        if 'NÃO COMPARECEU' in status_str or 'NAO COMPARECEU' in status_str or 'NÃO COMPARECEU' in status_str or 'FALTOU' in status_str:
-            return 'NÃO COMPARECEU'
-        
-        # Retornar status original se não encontrou padrão conhecido
-        return status_str
-    
-    # Criar coluna de status normalizado para análise
     # IMPORTANTE: Usar alunos_originais para garantir que todos os alunos sejam contados
-    alunos_com_status_normalizado = alunos_originais.copy()
-    
-    # Garantir que a coluna STATUS existe
-    if 'STATUS' not in alunos_com_status_normalizado.columns:
-        # Tentar encontrar coluna de status com variações
-        for col in alunos_com_status_normalizado.columns:
-            if 'status' in str(col).lower():
-                alunos_com_status_normalizado['STATUS'] = alunos_com_status_normalizado[col]
-                break
-    
-    # Aplicar normalização de status
-    if 'STATUS' in alunos_com_status_normalizado.columns:
-        alunos_com_status_normalizado['STATUS_NORMALIZADO'] = alunos_com_status_normalizado['STATUS'].apply(normalizar_status)
-    else:
-        # Se não houver coluna STATUS, criar uma coluna padrão
-        alunos_com_status_normalizado['STATUS'] = 'SEM STATUS'
-        alunos_com_status_normalizado['STATUS_NORMALIZADO'] = 'SEM STATUS'
-    
-    # Criar resumo usando status normalizado
-    # Usar size() para contar TODOS os registros, não apenas uma coluna específica
-    status_summary = alunos_com_status_normalizado.groupby('STATUS_NORMALIZADO').size().reset_index(name='Quantidade')
-    status_summary = status_summary.set_index('STATUS_NORMALIZADO')
-    
-    # Adicionar coluna de principais cursos se existir
-    if 'CURSO' in alunos_com_status_normalizado.columns:
-        cursos_por_status = alunos_com_status_normalizado.groupby('STATUS_NORMALIZADO')['CURSO'].apply(
-            lambda x: ', '.join(x.value_counts().head(3).index.astype(str))
-        )
-        status_summary['Principais Cursos'] = status_summary.index.map(cursos_por_status)
-    else:
-        status_summary['Principais Cursos'] = 'N/A'
-    
-    # Ordenar por quantidade (decrescente)
-    status_summary = status_summary.sort_values('Quantidade', ascending=False)
-    
-    # Calcular totais
-    total_alunos = len(alunos_originais)
-    total_summary = status_summary['Quantidade'].sum()
-    
-    # Se houver diferença, adicionar linha "OUTROS" ou "SEM STATUS" para garantir que todos sejam contados
-    if total_alunos != total_summary:
-        diferenca = total_alunos - total_summary
-        # Adicionar linha para alunos não contados
-        if diferenca > 0:
-            outros_data = {'Quantidade': diferenca}
-            if 'Principais Cursos' in status_summary.columns:
-                outros_data['Principais Cursos'] = 'N/A'
-            outros_df = pd.DataFrame([outros_data], index=['OUTROS/NÃO CLASSIFICADOS'])
-            status_summary = pd.concat([status_summary, outros_df])
-            total_summary = status_summary['Quantidade'].sum()
+    with etapa('resumo_status'):
+        status_summary, total_alunos, total_summary = chamar_cacheada(carregar_resumo_status, 'carregar_resumo_status',
+                                                                      alunos_originais, versao_snapshot)
     
     # Mostrar resumo
     st.dataframe(status_summary, use_container_width=True)
@@ -2345,270 +1519,115 @@ if 'STATUS' in alunos.columns:
     if total_alunos != total_summary:
         st.warning(f"⚠️ Ainda há diferença de {total_alunos - total_summary} aluno(s). Verifique duplicatas ou dados inconsistentes.")
 
+# Funil de conversão (etapas ligadas no snapshot; com os filtros, só contagens sobre as inscrições)
+if funil_inscricoes is not None:
+    secao('funil')
+    st.markdown("---")
+    st.markdown("## 🔁 Funil: Inscrição → Matrícula → Conclusão")
+    st.caption("Inscrições ligadas aos alunos pelo e-mail, CPF ou telefone (o nome só quando não há outra chave); "
+               "a conclusão vem do status do aluno.")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        with etapa('contar funil'):
+            contagens_funil = contar_funil(funil_inscricoes, inscricoes)
+        fig_funil = grafico_funil(contagens_funil)
+        if fig_funil:
+            exibir_grafico(fig_funil, key="funil_chart")
+        else:
+            st.info("Não há inscrições para os filtros selecionados.")
+
+    with col2:
+        dimensoes_funil = {rotulo: dimensao for dimensao, (_, _, rotulo) in DIMENSOES_FUNIL.items()}
+        rotulo_funil = st.radio("Conversão por", list(dimensoes_funil), horizontal=True, key='dimensao_funil')
+        with etapa('conversão por dimensão'):
+            tabela_funil = funil_por_dimensao(funil_inscricoes, inscricoes, dimensoes_funil[rotulo_funil],
+                                              canais_inscricoes)
+        fig_conversao = grafico_conversao(tabela_funil)
+        if fig_conversao:
+            exibir_grafico(fig_conversao, key="conversao_chart")
+        else:
+            st.info(f"Não há dados de {rotulo_funil.lower()} para o funil.")
+
+    if tabela_funil is not None and len(tabela_funil) > 0:
+        st.dataframe(tabela_funil, use_container_width=True)
+
 # ==========================================
 # SEÇÃO 5: AVALIAÇÕES DETALHADAS
 # ==========================================
+secao('avaliações')
 st.markdown("---")
 st.markdown("## ⭐ Avaliações dos Alunos")
 
-# Garantir que a filtragem por ciclo funcione mesmo se a função filtrar_avaliacoes não funcionou
-if ciclo_selecionado != 'Todos' and avaliacoes is not None and len(avaliacoes) > 0:
-    # Verificar se realmente filtrou (comparar tamanho com originais)
-    if len(avaliacoes) == len(avaliacoes_originais) and 'Pesquisa' in avaliacoes.columns:
-        # Se não filtrou, aplicar filtro diretamente aqui
-        def extrair_ciclo_final(valor):
-            if pd.isna(valor):
-                return None
-            valor_str = str(valor).upper().strip()
-            match = re.search(r'(\d+)\s*CICLO', valor_str)
-            if match:
-                return match.group(1)
-            if 'AVALIAÇÃO' in valor_str and ('MCOM' in valor_str or 'MKT DIGITAL' in valor_str):
-                if not re.search(r'\d+\s*CICLO', valor_str):
-                    return '1'
-            return None
-        
-        ciclo_selecionado_final = str(ciclo_selecionado).strip()
-        if ciclo_selecionado_final.endswith('.0'):
-            ciclo_selecionado_final = ciclo_selecionado_final[:-2]
-        
-        ciclos_finais = avaliacoes['Pesquisa'].apply(extrair_ciclo_final)
-        mask_final = (ciclos_finais == ciclo_selecionado_final)
-        if mask_final.any():
-            avaliacoes = avaliacoes[mask_final].copy()
-
-# Verificar se há dados de avaliações disponíveis
-debug_avaliacoes = False
-if len(avaliacoes.columns) > 0:
-    colunas_lower = [str(col).lower() for col in avaliacoes.columns]
-    # Verificar se há colunas relacionadas às perguntas esperadas
-    tem_avaliacao_curso = any('considerei' in c or 'curso' in c for c in colunas_lower)
-    tem_avaliacao_prof = any('educador' in c or 'professor' in c for c in colunas_lower)
-    tem_curso_realizado = any('curso realizou' in c or 'qual curso' in c for c in colunas_lower)
-    tem_intencao = any('pretende' in c or 'intencao' in c for c in colunas_lower)
-    tem_suporte = any('suporte' in c for c in colunas_lower)
-    
-    if not (tem_avaliacao_curso or tem_avaliacao_prof or tem_curso_realizado or tem_intencao or tem_suporte):
-        debug_avaliacoes = True
+# Visão geral: todas as perguntas de escala numa matriz pergunta x resposta (mesmas contagens dos gráficos abaixo)
+try:
+    fig_matriz = figura_visao(visao, 'matriz_avaliacoes', payload_ativo)
+    if fig_matriz:
+        exibir_grafico(fig_matriz, key="matriz_avaliacoes_chart", otimizada=True)
+except Exception as e:
+    st.warning(f"Não foi possível criar a visão geral das avaliações: {str(e)}")
+
+def exibir_respostas(coluna, titulo):
+    """Conta as respostas da pergunta (formato longo filtrado) e exibe as barras (PERGUNTAS_AVALIACAO); retorna as contagens"""
+    with etapa(f'contar_respostas_avaliacao: {titulo}'):
+        contagens = contar_respostas(visao, coluna)
+    fig = figura_visao(visao, titulo, payload_ativo)
+    if fig:
+        exibir_grafico(fig, nome=titulo, otimizada=True)
+    return contagens
 
 col1, col2 = st.columns(2)
 
 with col1:
-    # Avaliação Geral do Curso
-    # Procurar coluna de avaliação do curso (busca mais ampla nas perguntas que viraram colunas)
-    coluna_avaliacao_curso = None
-    palavras_chave_avaliacao_curso = ['considerei', 'considerou', 'avaliacao', 'avaliação', 'avaliar', 'avaliou', 'curso', 'meta', 'metalab']
-    
-    # Buscar em todas as colunas (que são as perguntas após o pivot)
-    for col in avaliacoes.columns:
-        col_lower = str(col).lower()
-        # Verificar se contém palavras-chave relacionadas a avaliação E curso
-        tem_avaliacao = any(palavra in col_lower for palavra in ['considerei', 'considerou', 'avaliacao', 'avaliação', 'avaliar', 'avaliou'])
-        tem_curso = any(palavra in col_lower for palavra in ['curso', 'meta', 'metalab'])
-        
-        if tem_avaliacao and tem_curso:
-            coluna_avaliacao_curso = col
-            break
-        # Também aceitar se tiver várias palavras-chave mesmo sem ambas
-        elif sum(1 for palavra in palavras_chave_avaliacao_curso if palavra in col_lower) >= 2:
-            coluna_avaliacao_curso = col
-            break
-    
-    if coluna_avaliacao_curso:
+    # Avaliação Geral do Curso (busca ampla nas perguntas que viraram colunas)
+    coluna_av_curso = coluna_avaliacao_curso(avaliacoes)
+    if coluna_av_curso:
         try:
             # Contar todas as respostas do DataFrame original (formato longo) se disponível
-            avaliacao_curso = contar_respostas_avaliacao(coluna_avaliacao_curso, avaliacoes, avaliacoes_originais_long)
-            
-            if len(avaliacao_curso) > 0:
-                # Total é a soma de todas as contagens
-                total_respostas = avaliacao_curso.sum()
-                fig_av_curso = px.bar(
-                    x=avaliacao_curso.index,
-                    y=avaliacao_curso.values,
-                    title=f"Avaliação Geral do Curso (Total: {total_respostas} respostas)",
-                    labels={'x': 'Avaliação', 'y': 'Quantidade de Respostas'},
-                    color=avaliacao_curso.values,
-                    color_continuous_scale=['#c62828', '#ef5350', '#ffa726', '#66bb6a', '#2e7d32'],
-                    text=avaliacao_curso.values
-                )
-                fig_av_curso.update_traces(
-                    texttemplate='%{text} respostas<br>(%{customdata:.1f}%)',
-                    textposition='outside',
-                    textfont=dict(size=14),
-                    hovertemplate='<b>%{x}</b><br>Quantidade: %{y} respostas<br>Percentual: %{customdata:.1f}%<extra></extra>',
-                    customdata=(avaliacao_curso.values / total_respostas * 100)
-                )
-                fig_av_curso.update_layout(
-                    title_font_size=18,
-                    xaxis_title_font_size=14,
-                    yaxis_title_font_size=14,
-                    font=dict(size=13)
-                )
-                fig_av_curso = aplicar_tema_escuro(fig_av_curso)
-                st.plotly_chart(fig_av_curso, use_container_width=True)
-            else:
+            if len(exibir_respostas(coluna_av_curso, "Avaliação Geral do Curso")) == 0:
                 st.info("Não há dados de avaliação do curso disponíveis.")
         except Exception as e:
             st.warning(f"Não foi possível criar gráfico de avaliação do curso: {str(e)}")
     else:
         # Debug: mostrar colunas disponíveis
-        colunas_relacionadas = [col for col in avaliacoes.columns if any(palavra in str(col).lower() for palavra in palavras_chave_avaliacao_curso)]
-        if colunas_relacionadas:
-            st.info(f"Coluna de avaliação do curso não encontrada. Colunas relacionadas encontradas: {', '.join(colunas_relacionadas[:3])}")
+        relacionadas = colunas_relacionadas(avaliacoes, PALAVRAS_AVALIACAO_CURSO)
+        if relacionadas:
+            st.info(f"Coluna de avaliação do curso não encontrada. Colunas relacionadas encontradas: {', '.join(relacionadas)}")
         else:
-# Removido debug - não mostrar mensagens desnecessárias
             st.info("Coluna de avaliação do curso não encontrada nos dados de avaliações.")
     
     # Avaliação do Professor
-    # Procurar coluna de avaliação do professor/educador (busca mais ampla)
-    coluna_avaliacao_prof = None
-    palavras_chave_avaliacao_prof = ['avalie', 'avaliar', 'avaliou', 'avaliação', 'avaliacao']
-    palavras_chave_prof = ['professor', 'educador', 'educadora', 'instrutor', 'instrutora', 'docente', 'educador social']
-    
-    for col in avaliacoes.columns:
-        col_lower = str(col).lower()
-        tem_avaliacao = any(palavra in col_lower for palavra in palavras_chave_avaliacao_prof)
-        tem_prof = any(palavra in col_lower for palavra in palavras_chave_prof)
-        
-        if tem_avaliacao and tem_prof:
-            coluna_avaliacao_prof = col
-            break
-    
-    if coluna_avaliacao_prof:
+    coluna_av_prof = coluna_avaliacao_professor(avaliacoes)
+    if coluna_av_prof:
         try:
-            # Contar todas as respostas do DataFrame original (formato longo) se disponível
-            avaliacao_prof = contar_respostas_avaliacao(coluna_avaliacao_prof, avaliacoes, avaliacoes_originais_long)
-            
-            if len(avaliacao_prof) > 0:
-                total_respostas = avaliacao_prof.sum()
-                fig_av_prof = px.bar(
-                    x=avaliacao_prof.index,
-                    y=avaliacao_prof.values,
-                    title=f"Avaliação do Professor (Total: {total_respostas} respostas)",
-                    labels={'x': 'Avaliação', 'y': 'Quantidade de Respostas'},
-                    color=avaliacao_prof.values,
-                    color_continuous_scale=['#1a237e', '#3949ab', '#5c6bc0', '#7986cb', '#90caf9'],
-                    text=avaliacao_prof.values
-                )
-                fig_av_prof.update_traces(
-                    texttemplate='%{text} respostas<br>(%{customdata:.1f}%)',
-                    textposition='outside',
-                    textfont=dict(size=14),
-                    hovertemplate='<b>%{x}</b><br>Quantidade: %{y} respostas<br>Percentual: %{customdata:.1f}%<extra></extra>',
-                    customdata=(avaliacao_prof.values / total_respostas * 100)
-                )
-                fig_av_prof.update_layout(
-                    title_font_size=18,
-                    xaxis_title_font_size=14,
-                    yaxis_title_font_size=14,
-                    font=dict(size=13)
-                )
-                fig_av_prof = aplicar_tema_escuro(fig_av_prof)
-                st.plotly_chart(fig_av_prof, use_container_width=True)
-            else:
+            if len(exibir_respostas(coluna_av_prof, "Avaliação do Professor")) == 0:
                 st.info("Não há dados de avaliação do professor disponíveis.")
         except Exception as e:
             st.warning(f"Não foi possível criar gráfico de avaliação do professor: {str(e)}")
     else:
         # Debug: mostrar colunas relacionadas
-        colunas_relacionadas = [col for col in avaliacoes.columns if any(palavra in str(col).lower() for palavra in palavras_chave_prof)]
-        if colunas_relacionadas:
-            st.info(f"Coluna de avaliação do professor não encontrada. Colunas relacionadas: {', '.join(colunas_relacionadas[:3])}")
+        relacionadas = colunas_relacionadas(avaliacoes, PALAVRAS_PROF)
+        if relacionadas:
+            st.info(f"Coluna de avaliação do professor não encontrada. Colunas relacionadas: {', '.join(relacionadas)}")
         else:
             st.info("Coluna de avaliação do professor não encontrada nos dados de avaliações.")
 
 with col2:
-    # Satisfação com Espaço Físico
-    pergunta_espaco = 'No que se refere ao espaço físico (Laboratório de Informática), qual seu nível de satisfação?'
-    if pergunta_espaco in avaliacoes.columns:
-        satisfacao_espaco = contar_respostas_avaliacao(pergunta_espaco, avaliacoes, avaliacoes_originais_long)
-        total_respostas = satisfacao_espaco.sum() if len(satisfacao_espaco) > 0 else 0
-        fig_sat_espaco = px.pie(
-            values=satisfacao_espaco.values,
-            names=satisfacao_espaco.index,
-            title=f"Satisfação com Espaço Físico (Total: {total_respostas} respostas)",
-            color_discrete_sequence=PALETA_METALAB
-        )
-        fig_sat_espaco.update_traces(
-            textposition='inside',
-            textinfo='label+value+percent',
-            texttemplate='%{label}<br>%{value} respostas<br>(%{percent})',
-            textfont=dict(color='white', size=13),
-            hovertemplate='<b>%{label}</b><br>Quantidade: %{value} respostas<br>Percentual: %{percent}<extra></extra>'
-        )
-        fig_sat_espaco.update_layout(
-            title_font_size=18,
-            font=dict(size=13)
-        )
-        fig_sat_espaco = aplicar_tema_escuro(fig_sat_espaco)
-        st.plotly_chart(fig_sat_espaco, use_container_width=True)
-    
-    # Satisfação com Instalações
-    pergunta_inst = 'Avalie seu nível de satisfação em relação as demais instalações da ONG (hall de entrada, banheiro, recepção, auditório):'
-    if pergunta_inst in avaliacoes.columns:
-        satisfacao_inst = contar_respostas_avaliacao(pergunta_inst, avaliacoes, avaliacoes_originais_long)
-        total_respostas = satisfacao_inst.sum() if len(satisfacao_inst) > 0 else 0
-        fig_sat_inst = px.pie(
-            values=satisfacao_inst.values,
-            names=satisfacao_inst.index,
-            title=f"Satisfação com Instalações (Total: {total_respostas} respostas)",
-            color_discrete_sequence=PALETA_METALAB
-        )
-        fig_sat_inst.update_traces(
-            textposition='inside',
-            textinfo='label+value+percent',
-            texttemplate='%{label}<br>%{value} respostas<br>(%{percent})',
-            textfont=dict(color='white', size=13),
-            hovertemplate='<b>%{label}</b><br>Quantidade: %{value} respostas<br>Percentual: %{percent}<extra></extra>'
-        )
-        fig_sat_inst.update_layout(
-            title_font_size=18,
-            font=dict(size=13)
-        )
-        fig_sat_inst = aplicar_tema_escuro(fig_sat_inst)
-        st.plotly_chart(fig_sat_inst, use_container_width=True)
+    # Satisfação com Espaço Físico e com as demais Instalações
+    for titulo, pergunta in PERGUNTAS_SATISFACAO.items():
+        if pergunta in avaliacoes.columns:
+            with etapa(f'contar_respostas_avaliacao: {titulo}'):
+                contar_respostas(visao, pergunta)
+            exibir_grafico(figura_visao(visao, titulo, payload_ativo), nome=titulo, otimizada=True)
 
 # Análise de Canais de Divulgação (das avaliações)
 st.markdown("### Como Ficou Sabendo do Curso?")
-coluna_sabendo_curso = None
-for col in avaliacoes.columns:
-    if 'sabendo' in str(col).lower() and 'curso' in str(col).lower():
-        coluna_sabendo_curso = col
-        break
-
-if coluna_sabendo_curso:
+coluna_sabendo = coluna_sabendo_curso(avaliacoes)
+if coluna_sabendo:
     try:
-        sabendo_curso = contar_respostas_avaliacao(coluna_sabendo_curso, avaliacoes, avaliacoes_originais_long)
-        if len(sabendo_curso) > 0:
-            total_respostas = sabendo_curso.sum()
-            # Ordenar por quantidade (maior para menor)
-            sabendo_curso_ordenado = sabendo_curso.sort_values(ascending=True)
-            fig_sabendo = px.bar(
-                x=sabendo_curso_ordenado.values,
-                y=sabendo_curso_ordenado.index,
-                orientation='h',
-                title=f"Como Ficou Sabendo do Curso? (Total: {total_respostas} respostas)",
-                labels={'x': 'Quantidade de Respostas', 'y': 'Canal de Divulgação'},
-                color=sabendo_curso_ordenado.values,
-                color_continuous_scale=['#1a237e', '#3949ab', '#5c6bc0', '#7986cb', '#90caf9', '#b3d9ff'],
-                text=sabendo_curso_ordenado.values
-            )
-            fig_sabendo.update_traces(
-                texttemplate='%{text} respostas<br>(%{customdata:.1f}%)',
-                textposition='outside',
-                textfont=dict(size=14),
-                hovertemplate='<b>%{y}</b><br>Quantidade: %{x} respostas<br>Percentual: %{customdata:.1f}%<extra></extra>',
-                customdata=(sabendo_curso_ordenado.values / total_respostas * 100)
-            )
-            fig_sabendo.update_layout(
-                title_font_size=18,
-                xaxis_title_font_size=14,
-                yaxis_title_font_size=14,
-                font=dict(size=13)
-            )
-            fig_sabendo = aplicar_tema_escuro(fig_sabendo)
-            st.plotly_chart(fig_sabendo, use_container_width=True)
-    except Exception as e:
+        exibir_respostas(coluna_sabendo, "Como Ficou Sabendo do Curso?")
+    except Exception:
         pass
 
 # Análise de Expectativas e Outras Métricas
@@ -2617,138 +1636,65 @@ col1, col2 = st.columns(2)
 
 with col1:
     # O Conteúdo Atendeu Minhas Expectativas?
-    coluna_expectativas = None
-    for col in avaliacoes.columns:
-        col_lower = str(col).lower()
-        if 'expectativas' in col_lower or ('conteudo' in col_lower and 'atendeu' in col_lower):
-            coluna_expectativas = col
-            break
-    
-    if coluna_expectativas:
+    coluna_exp = coluna_expectativas(avaliacoes)
+    if coluna_exp:
         try:
-            expectativas = contar_respostas_avaliacao(coluna_expectativas, avaliacoes, avaliacoes_originais_long)
-            if len(expectativas) > 0:
-                total_respostas = expectativas.sum()
-                fig_expectativas = px.bar(
-                    x=expectativas.index,
-                    y=expectativas.values,
-                    title=f"O Conteúdo Atendeu Minhas Expectativas? (Total: {total_respostas} respostas)",
-                    labels={'x': 'Resposta', 'y': 'Quantidade de Respostas'},
-                    color=expectativas.values,
-                    color_continuous_scale=['#c62828', '#ef5350', '#ffa726', '#66bb6a', '#2e7d32'],
-                    text=expectativas.values
-                )
-                fig_expectativas.update_traces(
-                    texttemplate='%{text} respostas<br>(%{customdata:.1f}%)',
-                    textposition='outside',
-                    textfont=dict(size=14),
-                    hovertemplate='<b>%{x}</b><br>Quantidade: %{y} respostas<br>Percentual: %{customdata:.1f}%<extra></extra>',
-                    customdata=(expectativas.values / total_respostas * 100)
-                )
-                fig_expectativas.update_layout(
-                    title_font_size=18,
-                    xaxis_title_font_size=14,
-                    yaxis_title_font_size=14,
-                    font=dict(size=13)
-                )
-                fig_expectativas = aplicar_tema_escuro(fig_expectativas)
-                st.plotly_chart(fig_expectativas, use_container_width=True)
-        except Exception as e:
+            exibir_respostas(coluna_exp, "O Conteúdo Atendeu Minhas Expectativas?")
+        except Exception:
             pass
     
 with col2:
     # Você Indicaria o Curso?
-    coluna_indicacao = None
-    for col in avaliacoes.columns:
-        col_lower = str(col).lower()
-        if 'indicaria' in col_lower or ('indicaria' in col_lower and 'curso' in col_lower):
-            coluna_indicacao = col
-            break
-    
-    if coluna_indicacao:
+    coluna_ind = coluna_indicacao(avaliacoes)
+    if coluna_ind:
         try:
-            indicacao = contar_respostas_avaliacao(coluna_indicacao, avaliacoes, avaliacoes_originais_long)
-            if len(indicacao) > 0:
-                total_respostas = indicacao.sum()
-                # Ordenar por quantidade (maior para menor)
-                indicacao_ordenado = indicacao.sort_values(ascending=True)
-                fig_indicacao = px.bar(
-                    x=indicacao_ordenado.values,
-                    y=indicacao_ordenado.index,
-                    orientation='h',
-                    title=f"Você Indicaria o Curso para Familiares e Amigos? (Total: {total_respostas} respostas)",
-                    labels={'x': 'Quantidade de Respostas', 'y': 'Resposta'},
-                    color=indicacao_ordenado.values,
-                    color_continuous_scale=['#c62828', '#ef5350', '#ffa726', '#66bb6a', '#2e7d32'],
-                    text=indicacao_ordenado.values
-                )
-                fig_indicacao.update_traces(
-                    texttemplate='%{text} respostas<br>(%{customdata:.1f}%)',
-                    textposition='outside',
-                    textfont=dict(size=14),
-                    hovertemplate='<b>%{y}</b><br>Quantidade: %{x} respostas<br>Percentual: %{customdata:.1f}%<extra></extra>',
-                    customdata=(indicacao_ordenado.values / total_respostas * 100)
-                )
-                fig_indicacao.update_layout(
-                    title_font_size=18,
-                    xaxis_title_font_size=14,
-                    yaxis_title_font_size=14,
-                    font=dict(size=13)
-                )
-                fig_indicacao = aplicar_tema_escuro(fig_indicacao)
-                st.plotly_chart(fig_indicacao, use_container_width=True)
-        except Exception as e:
+            exibir_respostas(coluna_ind, "Você Indicaria o Curso para Familiares e Amigos?")
+        except Exception:
             pass
     
     # Suporte Pedagógico
-    coluna_suporte = None
-    palavras_chave_suporte = ['suporte', 'coordenacao', 'coordenação', 'pedagogica', 'pedagógica', 'recebi suporte']
-    
-    for col in avaliacoes.columns:
-        col_lower = str(col).lower()
-        if any(palavra in col_lower for palavra in ['recebi suporte', 'suporte coordenacao', 'suporte coordenação', 'suporte pedagogica', 'suporte pedagógica']):
-            coluna_suporte = col
-            break
-        elif any(palavra in col_lower for palavra in ['suporte']) and any(palavra in col_lower for palavra in ['coordenacao', 'coordenação', 'pedagogica', 'pedagógica']):
-            coluna_suporte = col
-            break
-    
-    if coluna_suporte:
+    coluna_sup = coluna_suporte(avaliacoes)
+    if coluna_sup:
         try:
-            suporte_ped = contar_respostas_avaliacao(coluna_suporte, avaliacoes, avaliacoes_originais_long)
-            if len(suporte_ped) > 0:
-                total_respostas = suporte_ped.sum()
-                fig_suporte = px.bar(
-                    x=suporte_ped.index,
-                    y=suporte_ped.values,
-                    title=f"Suporte da Coordenação Pedagógica (Total: {total_respostas} respostas)",
-                    labels={'x': 'Resposta', 'y': 'Quantidade de Respostas'},
-                    color=suporte_ped.values,
-                    color_continuous_scale=['#1a237e', '#3949ab', '#5c6bc0', '#7986cb', '#90caf9'],
-                    text=suporte_ped.values
-                )
-                fig_suporte.update_traces(
-                    texttemplate='%{text} respostas<br>(%{customdata:.1f}%)',
-                    textposition='outside',
-                    textfont=dict(size=14),
-                    hovertemplate='<b>%{x}</b><br>Quantidade: %{y} respostas<br>Percentual: %{customdata:.1f}%<extra></extra>',
-                    customdata=(suporte_ped.values / total_respostas * 100)
-                )
-                fig_suporte.update_layout(
-                    title_font_size=18,
-                    xaxis_title_font_size=14,
-                    yaxis_title_font_size=14,
-                    font=dict(size=13)
-                )
-                fig_suporte = aplicar_tema_escuro(fig_suporte)
-                st.plotly_chart(fig_suporte, use_container_width=True)
-        except Exception as e:
+            exibir_respostas(coluna_sup, "Suporte da Coordenação Pedagógica")
+        except Exception:
             pass
 
+# Busca nos comentários (índice invertido montado no snapshot, restrito às avaliações filtradas)
+if indice_busca is not None:
+    secao('busca nos comentários')
+    st.markdown("### 🔎 Busca nos Comentários")
+    consulta_busca = st.text_input(
+        "Buscar nos comentários",
+        key='busca_comentarios',
+        placeholder="professor OU suporte, horario -ruim, prof*",
+        help="Termos separados por espaço precisam aparecer juntos; OU junta alternativas; "
+             "-termo (ou NAO termo) exclui; termo* busca pelo começo da palavra. Acentos e maiúsculas são ignorados."
+    )
+    with etapa('buscar'):
+        todas_avaliacoes = avaliacoes is None or len(avaliacoes) == len(avaliacoes_originais)
+        documentos_busca = buscar(indice_busca, consulta_busca, None if todas_avaliacoes else avaliacoes.index)
+        frequencias_busca = frequencia_termos(indice_busca, documentos_busca)
+        tabela_busca = resultados_busca(indice_busca, documentos_busca, avaliacoes)
+
+    if len(documentos_busca) == 0:
+        st.info("Nenhum comentário encontrado para a busca com os filtros atuais.")
+    else:
+        st.caption(f"💬 **{len(documentos_busca):,}** comentário(s) encontrado(s)"
+                   + (f" - mostrando os primeiros {len(tabela_busca):,}" if len(tabela_busca) < len(documentos_busca) else ""))
+        col1, col2 = st.columns(2)
+        with col1:
+            fig_termos = grafico_termos(frequencias_busca)
+            if fig_termos:
+                exibir_grafico(fig_termos, key="termos_chart")
+        with col2:
+            st.dataframe(tabela_busca.drop(columns=['avaliacao_id']), use_container_width=True, hide_index=True)
+
 
 # ==========================================
 # SEÇÃO 6: ANÁLISE POR REGIÃO/LOCAL
 # ==========================================
+secao('região/local')
 st.markdown("---")
 st.markdown("## 📍 Análise por Região/Local")
 
@@ -2756,104 +1702,198 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Inscrições por Região
-    if 'SELECIONE A SUA REGIÃO MAIS PRÓXIMA PARA REALIZAR O CURSO:' in inscricoes.columns:
-        regiao_counts = inscricoes['SELECIONE A SUA REGIÃO MAIS PRÓXIMA PARA REALIZAR O CURSO:'].value_counts()
-        fig_regiao = px.bar(
-            x=regiao_counts.values,
-            y=regiao_counts.index,
-            orientation='h',
-            title="Inscrições por Região",
-            labels={'x': 'Quantidade', 'y': 'Região'},
-            color=regiao_counts.values,
-            color_continuous_scale=['#c62828', '#e53935', '#ef5350', '#e57373', '#ef9a9a']
-        )
-        fig_regiao = aplicar_tema_escuro(fig_regiao)
-        st.plotly_chart(fig_regiao, use_container_width=True)
+    fig_regiao = figura_visao(visao, 'regiao', payload_ativo)
+    if fig_regiao:
+        exibir_grafico(fig_regiao, otimizada=True)
 
 with col2:
     # Alunos por Local
-    if 'LOCAL' in alunos.columns:
-        local_counts = alunos['LOCAL'].value_counts()
-        fig_local = px.bar(
-            x=local_counts.values,
-            y=local_counts.index,
-            orientation='h',
-            title="Alunos por Local",
-            labels={'x': 'Quantidade', 'y': 'Local'},
-            color=local_counts.values,
-            color_continuous_scale=['#2e7d32', '#43a047', '#66bb6a', '#81c784', '#a5d6a7']
-        )
-        fig_local = aplicar_tema_escuro(fig_local)
-        st.plotly_chart(fig_local, use_container_width=True)
+    fig_local = figura_visao(visao, 'local', payload_ativo)
+    if fig_local:
+        exibir_grafico(fig_local, otimizada=True)
 
 # ==========================================
 # SEÇÃO 7: ANÁLISE TEMPORAL
 # ==========================================
+secao('temporal')
 st.markdown("---")
 st.markdown("## 📅 Análise Temporal")
 
 col1, col2 = st.columns(2)
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def serie_inscricoes(_temporal, _inscricoes, versao, filtros, granularidade, acumulado, media_movel):
+    """Série das inscrições filtradas, guardada por (versão, filtros, granularidade, acumulado, média móvel)"""
+    contar_execucao('serie_inscricoes')
+    return agregar_serie(serie_diaria(_temporal, _inscricoes), granularidade, acumulado, media_movel)
+
 with col1:
-    # Evolução de Inscrições
-    if 'Data_Inscricao' in inscricoes.columns and 'Ano' in inscricoes.columns and 'Mes' in inscricoes.columns:
-        # Filtrar apenas linhas com Ano e Mes válidos
-        inscricoes_validas = inscricoes.dropna(subset=['Ano', 'Mes'])
-        if len(inscricoes_validas) > 0:
-            inscricoes_por_mes = inscricoes_validas.groupby(['Ano', 'Mes']).size().reset_index(name='Quantidade')
-            # Criar data de forma mais segura
-            inscricoes_por_mes['Data'] = pd.to_datetime(
-                inscricoes_por_mes['Ano'].astype(str) + '-' + 
-                inscricoes_por_mes['Mes'].astype(str).str.zfill(2) + '-01',
-                errors='coerce'
-            )
-            inscricoes_por_mes = inscricoes_por_mes.dropna(subset=['Data']).sort_values('Data')
-        
-            if len(inscricoes_por_mes) > 0:
-                fig_temporal_insc = px.line(
-                    inscricoes_por_mes,
-                    x='Data',
-                    y='Quantidade',
-                    title="Evolução de Inscrições ao Longo do Tempo",
-                    markers=True,
-                    labels={'Quantidade': 'Número de Inscrições', 'Data': 'Data'}
-                )
-                fig_temporal_insc.update_traces(line_color='#90caf9', line_width=3)
-                fig_temporal_insc = aplicar_tema_escuro(fig_temporal_insc)
-                st.plotly_chart(fig_temporal_insc, use_container_width=True)
-            else:
-                st.warning("Não há dados temporais suficientes para exibir o gráfico.")
+    # Evolução de Inscrições: série diária do snapshot (metalab.temporal) na granularidade escolhida
+    if temporal_inscricoes is not None:
+        granularidades = {rotulo: granularidade for granularidade, rotulo in GRANULARIDADES.items()}
+        rotulo_granularidade = st.radio("Granularidade", list(granularidades), index=len(granularidades) - 1,
+                                        horizontal=True, key='granularidade_temporal')
+        col_acumulado, col_media = st.columns(2)
+        acumulado = col_acumulado.checkbox("Acumulado", key='temporal_acumulado')
+        media_movel = col_media.checkbox("Média móvel", key='temporal_media_movel')
+        filtros_serie = (ciclo_selecionado, local_selecionado, status_selecionado, genero_selecionado,
+                         st.session_state.filtro_status_clicado, st.session_state.filtro_genero_clicado)
+        with etapa('série temporal'):
+            por_periodo = chamar_cacheada(serie_inscricoes, 'serie_inscricoes', temporal_inscricoes, inscricoes,
+                                          versao_snapshot, filtros_serie, granularidades[rotulo_granularidade],
+                                          acumulado, media_movel)
+        if por_periodo is None:
+            st.warning("Não há dados de inscrição com data válida.")
         else:
+            exibir_grafico(grafico_temporal(por_periodo, acumulado=acumulado))
+    elif 'Data_Inscricao' in inscricoes.columns and 'Ano' in inscricoes.columns and 'Mes' in inscricoes.columns:
+        por_mes = (motor_sql.inscricoes_por_mes(motor, selecao['inscricoes']) if motor is not None
+                   else inscricoes_por_mes(inscricoes))
+        if por_mes is None:
             st.warning("Não há dados de inscrição com data válida.")
+        elif len(por_mes) > 0:
+            exibir_grafico(grafico_temporal(por_mes))
+        else:
+            st.warning("Não há dados temporais suficientes para exibir o gráfico.")
 
 with col2:
     # Distribuição por Horário
-    if 'Qual horário do curso?' in avaliacoes.columns:
-        horario_counts = avaliacoes['Qual horário do curso?'].value_counts()
-        fig_horario = px.bar(
-            x=horario_counts.index,
-            y=horario_counts.values,
-            title="Distribuição por Horário do Curso",
-            labels={'x': 'Horário', 'y': 'Quantidade'},
-            color=horario_counts.values,
-            color_continuous_scale=['#c62828', '#e53935', '#ef5350', '#e57373', '#ef9a9a']
-        )
-        fig_horario = aplicar_tema_escuro(fig_horario)
-        st.plotly_chart(fig_horario, use_container_width=True)
+    fig_horario = figura_visao(visao, 'horario', payload_ativo)
+    if fig_horario:
+        exibir_grafico(fig_horario, otimizada=True)
 
 
+# ==========================================
+# COMPARAÇÃO DE CICLOS
+# ==========================================
+# Todos os ciclos escolhidos numa passada agrupada (metalab.comparacao), com os demais filtros do sidebar
+ciclos_comparaveis = (ciclos_disponiveis or ['Todos'])[1:]
+if len(ciclos_comparaveis) > 1:
+    secao('comparação de ciclos')
+    st.markdown("---")
+    st.markdown("## 🔀 Comparação de Ciclos")
+    st.caption("Métricas e distribuições de cada ciclo com os demais filtros da sidebar (o filtro de ciclo é ignorado).")
+
+    ciclos_comparados = st.multiselect("Ciclos", ciclos_comparaveis, key='ciclos_comparacao')
+    if len(ciclos_comparados) < 2:
+        st.info("Escolha dois ou mais ciclos para comparar.")
+    else:
+        modo_comparacao = st.radio("Exibir", ["Lado a lado", f"Diferença para {ciclos_comparados[0]}"],
+                                   horizontal=True, key='modo_comparacao')
+        deltas = modo_comparacao != "Lado a lado"
+        if ciclo_selecionado == 'Todos':
+            dados_comparacao = (alunos, inscricoes, avaliacoes, avaliacoes_long)
+        else:
+            with etapa('filtrar sem ciclo'):
+                visao_sem_ciclo = chamar_cacheada(visao_filtros, 'visao_filtros', visoes, estado_agregacoes,
+                                                  'Todos', local_selecionado, status_selecionado, genero_selecionado,
+                                                  st.session_state.filtro_status_clicado,
+                                                  st.session_state.filtro_genero_clicado)
+                dados_comparacao = tuple(visao_sem_ciclo[tabela] for tabela in
+                                         ('alunos', 'inscricoes', 'avaliacoes', 'avaliacoes_long'))
+        alunos_comp, inscricoes_comp, avaliacoes_comp, avaliacoes_long_comp = dados_comparacao
+
+        perguntas_comparacao = {}
+        if avaliacoes_comp is not None:
+            for titulo, pergunta in (("Avaliação Geral do Curso", coluna_avaliacao_curso(avaliacoes_comp)),
+                                     ("Avaliação do Professor", coluna_avaliacao_professor(avaliacoes_comp)),
+                                     ("Satisfação com Espaço Físico", PERGUNTA_ESPACO),
+                                     ("Satisfação com Instalações", PERGUNTA_INSTALACOES),
+                                     ("O Conteúdo Atendeu Minhas Expectativas?", coluna_expectativas(avaliacoes_comp)),
+                                     ("Você Indicaria o Curso para Familiares e Amigos?", coluna_indicacao(avaliacoes_comp)),
+                                     ("Suporte da Coordenação Pedagógica", coluna_suporte(avaliacoes_comp))):
+                if pergunta:
+                    perguntas_comparacao[titulo] = pergunta
+
+        with etapa('comparar_ciclos'):
+            comparacao = comparar_ciclos(ciclos_comparados, alunos_comp, inscricoes_comp, avaliacoes_comp,
+                                         avaliacoes_long_comp, perguntas_comparacao, alunos_originais=alunos_originais)
+
+        metricas_comparacao = comparacao['metricas'].T.rename(index=METRICAS_COMPARACAO).round(1)
+        if deltas:
+            metricas_comparacao = diferencas(metricas_comparacao)
+        st.dataframe(metricas_comparacao, use_container_width=True)
+
+        distribuicoes = [(f"{nome} por Ciclo", tabela) for nome, tabela in comparacao['perfil'].items()]
+        distribuicoes += list(comparacao['avaliacoes'].items())
+        for posicao in range(0, len(distribuicoes), 2):
+            colunas = st.columns(2)
+            for coluna, (titulo, tabela) in zip(colunas, distribuicoes[posicao:posicao + 2]):
+                with coluna:
+                    fig_comparacao = grafico_comparacao(tabela, titulo, deltas=deltas)
+                    if fig_comparacao:
+                        exibir_grafico(fig_comparacao, nome=titulo)
+
+
+secao('relatórios')
+# Relatório de payload dos gráficos (apenas com ?payload=1)
+if st.session_state.relatorio_payload_ativo and st.session_state.relatorio_payload:
+    relatorio = pd.DataFrame(st.session_state.relatorio_payload)
+    total_original = int(relatorio['Bytes original'].sum())
+    total_otimizado = int(relatorio['Bytes otimizado'].sum())
+    reducao = (1 - total_otimizado / total_original) * 100 if total_original > 0 else 0
+    with st.sidebar.expander("📦 Payload dos Gráficos", expanded=True):
+        st.caption(f"**Página:** {total_original / 1024:,.1f} KB → {total_otimizado / 1024:,.1f} KB ({reducao:.0f}% menor) em {len(relatorio)} gráficos")
+        cabecalho = st.session_state.get('relatorio_cabecalho')
+        if cabecalho:
+            origem_logo = 'static serving (cache longo)' if cabecalho['logo'] and cabecalho['logo']['src'].startswith('app/static/') else 'data URI'
+            st.caption(f"**Cabeçalho:** {cabecalho['bytes'] / 1024:,.1f} KB em {cabecalho['ms']:.1f} ms por rerun | logo via {origem_logo}")
+        st.dataframe(relatorio.set_index('Gráfico'), use_container_width=True)
+
+# Telemetria (METALAB_TELEMETRIA) e painel de desempenho (apenas com ?perf=1 ou [debug] perf = true nos secrets)
+if perfil_rerun is not None:
+    resultado_perfil = finalizar_perfil(perfil_rerun)
+if telemetria_ativa:
+    try:
+        registrar_rerun(resultado_perfil,
+                        combinacao_filtros(ciclo_selecionado, local_selecionado,
+                                           st.session_state.filtro_status_clicado or status_selecionado,
+                                           st.session_state.filtro_genero_clicado or genero_selecionado),
+                        extras={'bundle': versao_bundle if dados_bundle is not None else None,
+                                'agregacoes': agregacoes_rerun})
+    except OSError as e:
+        st.sidebar.warning(f"⚠️ Não foi possível gravar a telemetria: {e}")
+if painel_perfil:
+    historico_perfil = registrar_historico(st.session_state.setdefault('historico_perfil', []), resultado_perfil)
+    with st.expander(f"⏱️ Desempenho: {resultado_perfil['total_ms']:,.0f} ms neste rerun", expanded=True):
+        st.plotly_chart(grafico_perfil(resultado_perfil), use_container_width=True)
+        st.caption(f"p50/p95 dos últimos {len(historico_perfil)} reruns desta sessão (ms somados por etapa)")
+        st.dataframe(percentis(historico_perfil), use_container_width=True)
+        uso_visoes = estatisticas_cache('visao_filtros')
+        acertos_visoes = uso_visoes['chamadas'] - uso_visoes['execucoes']
+        if relatorio_aquecimento is None:
+            texto_aquecimento = "desligado (METALAB_AQUECIMENTO=0)"
+        elif relatorio_aquecimento:
+            texto_aquecimento = (f"{relatorio_aquecimento['aquecidas']} de {relatorio_aquecimento['combinacoes']} "
+                                 f"combinações em {relatorio_aquecimento['ms']:,.0f} ms")
+            if relatorio_aquecimento['falhas']:
+                texto_aquecimento += (f" ({relatorio_aquecimento['falhas']} com erro, a primeira: "
+                                      f"{relatorio_aquecimento['erro']})")
+        else:
+            texto_aquecimento = "em andamento"
+        st.caption(f"**Aquecimento das visões:** {texto_aquecimento} | **acertos das visões no processo:** "
+                   f"{acertos_visoes:,} de {uso_visoes['chamadas']:,} "
+                   f"({100 * acertos_visoes / max(uso_visoes['chamadas'], 1):.0f}%)")
+        if agregacoes_rerun is None:
+            texto_agregacoes = "motor SQL (um GROUP BY por contagem)"
+        elif agregacoes_rerun.get('visao_em_cache'):
+            texto_agregacoes = (f"{agregacoes_rerun['pedidos']} pedidos já calculados na visão em cache "
+                                f"(nenhuma passada neste rerun)")
+        else:
+            texto_agregacoes = (f"{agregacoes_rerun['pedidos']} pedidos, {agregacoes_rerun['unicos']} únicos, "
+                                f"{agregacoes_rerun['calculados']} calculados em {agregacoes_rerun['passadas']} "
+                                f"passadas ({agregacoes_rerun['ms']:,.1f} ms)")
+            if agregacoes_rerun['recuos']:
+                motivos = ', '.join(f"{motivo}: {quantidade}"
+                                    for motivo, quantidade in sorted(agregacoes_rerun['recuos'].items()))
+                texto_agregacoes += f" | pela referência: {motivos}"
+            if agregacoes_rerun['erros']:
+                texto_agregacoes += f" | {agregacoes_rerun['erros']} com erro (mostrado no gráfico)"
+        st.caption(f"**Agregações dos gráficos:** {texto_agregacoes}")
+
 # ==========================================
 # RODAPÉ
 # ==========================================
 # Créditos no final - Retângulo preto full width
-st.markdown("""
-<div class="creditos-rodape">
-    <svg width="20" height="20" viewBox="0 0 24 24" fill="white" style="vertical-align: middle;">
-        <path d="M12 0c-6.626 0-12 5.373-12 12 0 5.302 3.438 9.8 8.207 11.387.599.111.793-.261.793-.577v-2.234c-3.338.726-4.033-1.416-4.033-1.416-.546-1.387-1.333-1.756-1.333-1.756-1.089-.745.083-.729.083-.729 1.205.084 1.839 1.237 1.839 1.237 1.07 1.834 2.807 1.304 3.492.997.107-.775.418-1.305.762-1.604-2.665-.305-5.467-1.334-5.467-5.931 0-1.311.469-2.381 1.236-3.221-.124-.303-.535-1.524.117-3.176 0 0 1.008-.322 3.301 1.23.957-.266 1.983-.399 3.003-.404 1.02.005 2.047.138 3.006.404 2.291-1.552 3.297-1.23 3.297-1.23.653 1.653.242 2.874.118 3.176.77.84 1.235 1.911 1.235 3.221 0 4.609-2.807 5.624-5.479 5.921.43.372.823 1.102.823 2.222v3.293c0 .319.192.694.801.576 4.765-1.589 8.199-6.086 8.199-11.386 0-6.627-5.373-12-12-12z"/>
-    </svg>
-    <p style='color: #ffffff; margin: 0; font-size: 1rem; font-weight: 500;'>
-        Criado por Vinicius Mendes | <a href="https://github.com/evinicim" target="_blank" style="color: #ffffff; text-decoration: none; font-weight: 600;">@evinicim</a>
-    </p>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(html_creditos('creditos-rodape'), unsafe_allow_html=True)
 
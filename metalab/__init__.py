@@ -0,0 +1,22 @@
+"""
+Camada de dados e cálculo do Dashboard Metalab - Python puro, sem dependência
+do Streamlit.
+
+O dashboard (dashboard_metalab.py) é só a camada de exibição sobre este pacote:
+widgets, mensagens e cache do Streamlit. O pré-processamento offline
+(precompute_metalab.py) usa os mesmos módulos para gerar o bundle versionado.
+
+Módulos:
+- carregamento: leitura do Google Sheets e dos CSVs locais
+- preprocessamento: datas, status normalizado e pivot das avaliações
+- normalizacao: respostas das avaliações, faixas de renda e status
+- colunas: localização das colunas por palavras-chave
+- filtros: filtros do sidebar sobre alunos, inscrições e avaliações
+- indices: códigos das dimensões de filtro (ciclo, local, status, gênero)
+- agregados: métricas, contagens das avaliações, idades, renda e status
+- graficos: figuras Plotly de cada seção
+- tema: cores e templates Plotly do tema escuro
+- payload: redução do JSON das figuras enviado ao navegador
+- bundle: gravação e leitura (memory-map) do bundle versionado
+- sintetico: gerador de CSVs sintéticos no formato das planilhas
+"""
@@ -0,0 +1,396 @@
+"""
+Agregações do dashboard: métricas, contagens das avaliações, faixas etárias,
+renda, resumo de status e série mensal de inscrições.
+
+Recebem DataFrames (filtrados ou não) e devolvem Series/DataFrames prontos
+para os gráficos; as agregações sem filtro também vão para o bundle.
+"""
+
+import numpy as np
+import pandas as pd
+
+from metalab.colunas import coluna_idade, coluna_nascimento, coluna_renda
+from metalab.normalizacao import (ORDEM_CATEGORIAS_RENDA, ORDEM_RESPOSTAS_AVALIACAO, normalizar_categoria_renda,
+                                  normalizar_resposta_avaliacao, normalizar_status)
+from metalab.texto import aplicar_por_valor, em_texto
+
+# Faixas etárias do gráfico de idade
+FAIXAS_ETARIAS = [0, 18, 25, 30, 35, 40, 45, 50, 60, 100]
+ROTULOS_FAIXAS_ETARIAS = ['Até 18', '19-25', '26-30', '31-35', '36-40', '41-45', '46-50', '51-60', 'Acima de 60']
+
+
+def calcular_metricas(alunos, inscricoes, contar=None):
+    """
+    Métricas principais: totais, formados, desistentes, cursando e taxa de
+    desistência. contar(df, coluna): contagem do STATUS_NORMALIZADO (padrão
+    contar_valores; o dashboard passa a do planejador).
+    """
+    total_inscricoes = len(inscricoes)
+    total_alunos = len(alunos)
+
+    if 'STATUS_NORMALIZADO' in alunos.columns:
+        # Usar STATUS_NORMALIZADO se disponível (mais confiável): uma contagem para os três status
+        status = (contar or contar_valores)(alunos, 'STATUS_NORMALIZADO')
+        formados = int(status.get('CONCLUÍDO', 0))
+        desistentes = int(status.get('DESISTENTE', 0))
+        cursando = int(status.get('CURSANDO', 0))
+    elif 'STATUS' in alunos.columns:
+        # Usar STATUS original com múltiplas variações
+        status = em_texto(alunos['STATUS']).str.upper()
+        formados = int(status.str.contains('CONCLUIDO|CONCLUÍDO', case=False, na=False, regex=True).sum())
+        desistentes = int(status.str.contains('DESISTENTE', case=False, na=False, regex=True).sum())
+        cursando = int(status.str.contains('CURSANDO|EM CURSO|EM ANDAMENTO', case=False, na=False, regex=True).sum())
+    else:
+        formados = desistentes = cursando = 0
+
+    return {
+        'total_inscricoes': total_inscricoes,
+        'total_alunos': total_alunos,
+        'formados': formados,
+        'desistentes': desistentes,
+        'cursando': cursando,
+        'taxa_desistencia': (desistentes / total_alunos * 100) if total_alunos > 0 else 0,
+    }
+
+
+def contar_por_dimensao(indices):
+    """Contagem de linhas por valor de cada dimensão indexada (bincount dos códigos)"""
+    contagens = {}
+    for dimensao, indice in indices.items():
+        codigos = np.asarray(indice['codigos'])
+        totais = np.bincount(codigos[codigos >= 0], minlength=len(indice['valores']))
+        contagens[dimensao] = dict(zip(map(str, indice['valores']), totais.tolist()))
+    return contagens
+
+
+def calcular_agregados(tabelas, indices):
+    """Agregados sem filtro gravados no bundle"""
+    return {
+        'metricas': calcular_metricas(tabelas['alunos'], tabelas['inscricoes']),
+        'contagens': contar_por_dimensao(indices),
+    }
+
+
+def contar_valores(df, coluna, normalizar=None):
+    """
+    value_counts de uma coluna; com normalizar, conta normalizar(valor) de cada
+    linha descartando os None. É a contagem padrão dos construtores de gráficos
+    (o motor SQL fornece um equivalente, motor_sql.contador).
+    """
+    serie = df[coluna]
+    if normalizar is not None:
+        serie = aplicar_por_valor(serie, normalizar)
+        serie = serie[serie.notna()]
+    return serie.value_counts()
+
+
+def tabela_cruzada(df, linhas, colunas):
+    """pd.crosstab de duas colunas (contagem padrão do gráfico de status por curso)"""
+    return pd.crosstab(df[linhas], df[colunas])
+
+
+def _contar_normalizadas(respostas):
+    respostas_normalizadas = aplicar_por_valor(respostas, normalizar_resposta_avaliacao)
+    return respostas_normalizadas[respostas_normalizadas.notna()].value_counts()
+
+
+def colunas_respostas(avaliacoes_long):
+    """
+    (coluna da pergunta, coluna do valor) do formato longo; None em cada uma
+    que não existir. O valor é a primeira coluna de Nome exibido ou de Resposta
+    de texto livre (esta só com mais de 10% das linhas preenchidas).
+    """
+    coluna_pergunta = None
+    for col in avaliacoes_long.columns:
+        if 'pergunta' in str(col).lower():
+            coluna_pergunta = col
+            break
+
+    # Coluna de valor: Nome exibido ou Resposta de texto livre (a primeira que aparecer)
+    valor_col = None
+    for col in avaliacoes_long.columns:
+        col_lower = str(col).lower()
+        if 'nome exibido' in col_lower:
+            valor_col = col
+            break
+        elif 'resposta de texto livre' in col_lower:
+            if avaliacoes_long[col].notna().sum() > len(avaliacoes_long) * 0.1:
+                valor_col = col
+                break
+    return coluna_pergunta, valor_col
+
+
+def perguntas_correspondentes(pergunta_texto, perguntas):
+    """Perguntas que contêm o texto completo ou palavras-chave (mais de 3 caracteres) dele"""
+    palavras_chave = [p for p in pergunta_texto.lower().split() if len(p) > 3]
+    correspondentes = []
+    for pergunta in perguntas:
+        pergunta_lower = str(pergunta).lower()
+        palavras_encontradas = sum(1 for palavra in palavras_chave if palavra in pergunta_lower)
+        if pergunta_texto.lower() in pergunta_lower or palavras_encontradas >= min(2, len(palavras_chave)):
+            correspondentes.append(pergunta)
+    return correspondentes
+
+
+def respostas_avaliacao(pergunta_texto, avaliacoes_pivot, avaliacoes_long=None):
+    """
+    Respostas (não nulas) de uma pergunta, do DataFrame original (long) se
+    disponível, ou do pivotado como fallback, e o avaliacao_id de cada uma (None
+    se o long não tiver a coluna). Retorna (None, None) se não houver respostas.
+    """
+    # Se temos o DataFrame original (long), buscar diretamente nele
+    if avaliacoes_long is not None and len(avaliacoes_long) > 0:
+        coluna_pergunta, valor_col = colunas_respostas(avaliacoes_long)
+        if coluna_pergunta and valor_col:
+            perguntas = perguntas_correspondentes(pergunta_texto, avaliacoes_long[coluna_pergunta].unique())
+            mask_pergunta = avaliacoes_long[coluna_pergunta].isin(perguntas)
+            if mask_pergunta.any():
+                respostas = avaliacoes_long.loc[mask_pergunta, valor_col]
+                preenchidas = respostas.notna().to_numpy()
+                if preenchidas.any():
+                    ids = None
+                    if 'avaliacao_id' in avaliacoes_long.columns:
+                        ids = avaliacoes_long['avaliacao_id'].to_numpy()[mask_pergunta.to_numpy()][preenchidas]
+                    return respostas[preenchidas], ids
+
+    # Fallback: usar DataFrame pivotado
+    if avaliacoes_pivot is not None and len(avaliacoes_pivot) > 0:
+        for col in avaliacoes_pivot.columns:
+            if pergunta_texto.lower() in str(col).lower():
+                respostas = avaliacoes_pivot[col].dropna()
+                if len(respostas) > 0:
+                    return respostas, respostas.index.to_numpy()
+
+    return None, None
+
+
+def contar_respostas_avaliacao(pergunta_texto, avaliacoes_pivot, avaliacoes_long=None):
+    """
+    Conta todas as respostas de uma pergunta, usando o DataFrame original (long) se disponível,
+    ou o DataFrame pivotado como fallback.
+
+    Args:
+        pergunta_texto: Texto da pergunta para buscar
+        avaliacoes_pivot: DataFrame pivotado (formato largo)
+        avaliacoes_long: DataFrame original (formato longo) - opcional
+
+    Returns:
+        Series com value_counts das respostas normalizadas
+    """
+    respostas, _ = respostas_avaliacao(pergunta_texto, avaliacoes_pivot, avaliacoes_long)
+    if respostas is None:
+        return pd.Series(dtype=int)
+    return _contar_normalizadas(respostas)
+
+
+def matriz_respostas(contagens):
+    """
+    Matriz pergunta x resposta das contagens de várias perguntas (rótulo ->
+    saída de contar_respostas_avaliacao): linhas na ordem dos rótulos, respostas
+    de escala (ORDEM_RESPOSTAS_AVALIACAO) na ordem das escalas e depois as
+    demais da mais citada para a menos. None se nenhuma pergunta tiver respostas.
+    """
+    linhas = {rotulo: serie for rotulo, serie in contagens.items() if serie is not None and len(serie) > 0}
+    if not linhas:
+        return None
+    matriz = pd.DataFrame(linhas).T
+    matriz = matriz.fillna(0).astype('int64')
+    conhecidas = [resposta for resposta in ORDEM_RESPOSTAS_AVALIACAO if resposta in matriz.columns]
+    outras = matriz.drop(columns=conhecidas).sum().sort_values(ascending=False, kind='stable').index.tolist()
+    matriz = matriz[conhecidas + outras]
+    matriz.index.name, matriz.columns.name = 'Pergunta', 'Resposta'
+    return matriz
+
+
+def _datas_nascimento(serie):
+    """Converte datas de nascimento tentando os formatos usuais (brasileiro primeiro)"""
+    tentativas = [
+        dict(dayfirst=True),      # Inferência com dia primeiro (formato brasileiro)
+        dict(format='%d/%m/%Y'),  # DD/MM/AAAA
+        dict(format='%Y-%m-%d'),  # ISO
+        dict(),                   # Deixar o pandas inferir
+    ]
+    datas = None
+    for opcoes in tentativas:
+        try:
+            datas = pd.to_datetime(serie, errors='coerce', **opcoes)
+        except (ValueError, TypeError):
+            continue
+        if not datas.isna().all():
+            return datas
+    return datas
+
+
+def calcular_idades(alunos):
+    """
+    Idades dos alunos entre 10 e 100 anos: da coluna de idade, se houver, ou
+    calculadas a partir da data de nascimento. None se não houver dados.
+    """
+    if alunos is None or len(alunos) == 0:
+        return None
+
+    idades = None
+    col_idade = coluna_idade(alunos)
+    if col_idade:
+        valores = alunos[col_idade].dropna()
+        idades = pd.to_numeric(valores, errors='coerce').dropna()
+        # Se não conseguiu converter, tentar extrair números do texto
+        if len(idades) == 0:
+            idades = pd.to_numeric(em_texto(valores).str.extract(r'(\d+)')[0], errors='coerce').dropna()
+
+    if idades is None or len(idades) == 0:
+        col_nascimento = coluna_nascimento(alunos)
+        if col_nascimento is None:
+            return None
+        datas = _datas_nascimento(alunos[col_nascimento])
+        if datas is None:
+            return None
+        datas = datas.dropna()
+        if len(datas) == 0:
+            return None
+
+        # Diferença em anos, descontando quem ainda não fez aniversário este ano
+        hoje = pd.Timestamp.now()
+        idades = hoje.year - datas.dt.year
+        nao_fez_aniversario = (hoje.month < datas.dt.month) | ((hoje.month == datas.dt.month) & (hoje.day < datas.dt.day))
+        idades = idades - nao_fez_aniversario.astype(int)
+
+    idades = idades[(idades >= 10) & (idades <= 100)]
+    return idades if len(idades) > 0 else None
+
+
+def contar_faixas_etarias(idades):
+    """Quantidade de alunos por faixa etária (somente faixas não vazias, na ordem das faixas)"""
+    faixas = pd.cut(idades, bins=FAIXAS_ETARIAS, labels=ROTULOS_FAIXAS_ETARIAS, include_lowest=True)
+    contagens = faixas.value_counts().sort_index()
+    return contagens[contagens > 0]
+
+
+def contar_renda(alunos, contar=contar_valores):
+    """Contagem das faixas de renda normalizadas, da menor para a maior; None sem dados"""
+    col_renda = coluna_renda(alunos) if alunos is not None else None
+    if col_renda is None:
+        return None
+
+    renda_counts = contar(alunos, col_renda, normalizar_categoria_renda)
+    if len(renda_counts) == 0:
+        return None
+
+    # Faixas conhecidas na ordem lógica, seguidas das demais categorias encontradas
+    # Por posição (e não reindex com a lista) para manter o dtype dos rótulos
+    ordenado = renda_counts.iloc[[renda_counts.index.get_loc(cat) for cat in ORDEM_CATEGORIAS_RENDA
+                                  if cat in renda_counts.index]]
+    outras_categorias = renda_counts.index[~renda_counts.index.isin(ORDEM_CATEGORIAS_RENDA)]
+    if len(outras_categorias) > 0:
+        ordenado = pd.concat([ordenado, renda_counts[outras_categorias]])
+    return ordenado if len(ordenado) > 0 else None
+
+
+def status_detalhado(alunos):
+    """
+    Status de cada aluno agrupado com normalizar_status: a coluna
+    STATUS_DETALHADO do pré-processamento ou, sem ela, calculada da coluna de
+    status (STATUS ou a primeira com 'status' no nome); 'SEM STATUS' sem nenhuma.
+    """
+    if 'STATUS_DETALHADO' in alunos.columns:
+        return alunos['STATUS_DETALHADO']
+    status = None
+    if 'STATUS' in alunos.columns:
+        status = alunos['STATUS']
+    else:
+        # Tentar encontrar coluna de status com variações
+        for col in alunos.columns:
+            if 'status' in str(col).lower():
+                status = alunos[col]
+                break
+
+    if status is not None:
+        return aplicar_por_valor(status, normalizar_status).rename('STATUS_DETALHADO')
+    return pd.Series('SEM STATUS', index=alunos.index, name='STATUS_DETALHADO')
+
+
+def principais_por_grupo(grupos, valores, k=3):
+    """
+    Os k valores mais frequentes de cada grupo (Series grupo -> lista), numa
+    única tabela grupo x valor (bincount) e argpartition por linha. Empates
+    ficam com o valor que aparece primeiro no grupo; nulos não contam.
+    """
+    codigos_grupo, rotulos_grupo = pd.factorize(grupos)
+    codigos_valor, rotulos_valor = pd.factorize(valores)
+    n_grupos, n_valores = len(rotulos_grupo), len(rotulos_valor)
+    validos = np.flatnonzero((codigos_grupo >= 0) & (codigos_valor >= 0))
+    celulas = codigos_grupo[validos] * n_valores + codigos_valor[validos]
+    tabela = np.bincount(celulas, minlength=n_grupos * n_valores)
+
+    # Chave única por célula: contagem e, no empate, a primeira aparição no grupo
+    primeira = np.full(n_grupos * n_valores, len(grupos), dtype=np.int64)
+    ocupadas, posicoes = np.unique(celulas, return_index=True)
+    primeira[ocupadas] = validos[posicoes]
+    chaves = (tabela.astype(np.int64) * (len(grupos) + 1) + (len(grupos) - primeira)).reshape(n_grupos, n_valores)
+    tabela = tabela.reshape(n_grupos, n_valores)
+    k = min(k, n_valores)
+    if 0 < k < n_valores:
+        melhores = np.argpartition(-chaves, k - 1, axis=1)[:, :k]
+    else:
+        melhores = np.tile(np.arange(k), (n_grupos, 1))
+    ordem = np.argsort(-np.take_along_axis(chaves, melhores, axis=1), axis=1)
+    melhores = np.take_along_axis(melhores, ordem, axis=1)
+    contagens = np.take_along_axis(tabela, melhores, axis=1)
+
+    principais = [[rotulos_valor[codigo] for codigo, contagem in zip(linha, linha_contagens) if contagem > 0]
+                  for linha, linha_contagens in zip(melhores, contagens)]
+    return pd.Series(principais, index=rotulos_grupo, dtype=object)
+
+
+def resumo_status(alunos):
+    """
+    Tabela de detalhamento por status: quantidade e principais cursos por status
+    detalhado (status_detalhado), com linha 'OUTROS/NÃO CLASSIFICADOS' se algum
+    aluno ficar de fora.
+
+    Retorna (resumo, total_alunos, total_resumo).
+    """
+    status = status_detalhado(alunos).rename('STATUS_NORMALIZADO')
+
+    # size() conta TODOS os registros, não apenas uma coluna específica
+    resumo = status.groupby(status).size().to_frame('Quantidade')
+    resumo.index.name = 'STATUS_NORMALIZADO'
+
+    if 'CURSO' in alunos.columns:
+        cursos_por_status = principais_por_grupo(status, alunos['CURSO'], k=3)
+        resumo['Principais Cursos'] = resumo.index.map(
+            lambda grupo: ', '.join(str(curso) for curso in cursos_por_status[grupo]))
+    else:
+        resumo['Principais Cursos'] = 'N/A'
+
+    resumo = resumo.sort_values('Quantidade', ascending=False)
+
+    total_alunos = len(alunos)
+    total_resumo = resumo['Quantidade'].sum()
+    diferenca = total_alunos - total_resumo
+    if diferenca > 0:
+        outros = pd.DataFrame([{'Quantidade': diferenca, 'Principais Cursos': 'N/A'}], index=['OUTROS/NÃO CLASSIFICADOS'])
+        resumo = pd.concat([resumo, outros])
+        total_resumo = resumo['Quantidade'].sum()
+    return resumo, total_alunos, total_resumo
+
+
+def inscricoes_por_mes(inscricoes):
+    """
+    Inscrições por mês (colunas Data e Quantidade, em ordem cronológica).
+
+    None se não houver Ano/Mes válidos; DataFrame vazio se nenhuma data for montada.
+    """
+    inscricoes_validas = inscricoes.dropna(subset=['Ano', 'Mes'])
+    if len(inscricoes_validas) == 0:
+        return None
+    return montar_datas_por_mes(inscricoes_validas.groupby(['Ano', 'Mes']).size().reset_index(name='Quantidade'))
+
+
+def montar_datas_por_mes(por_mes):
+    """Acrescenta a coluna Data (dia 1 de cada Ano/Mes) e ordena cronologicamente"""
+    por_mes['Data'] = pd.to_datetime(
+        por_mes['Ano'].astype(int).astype(str) + '-' + por_mes['Mes'].astype(int).astype(str).str.zfill(2) + '-01',
+        errors='coerce'
+    )
+    return por_mes.dropna(subset=['Data']).sort_values('Data')
@@ -0,0 +1,396 @@
+"""
+Armazém SQLite persistente com o histórico de todos os ciclos.
+
+Gerado por `precompute_metalab.py --armazem <arquivo>`: as tabelas já
+processadas (inscrições, alunos, avaliações no formato longo e o pivot) vão
+para um único arquivo SQLite, substituídas numa transação a cada ingestão.
+
+    colunas / tabelas   nomes, tipos e índice originais (as colunas viram c0..cN)
+    alunos              + _ciclo, _local, _status, _genero (indexadas)
+    inscricoes          + _ciclo, _genero, _data (indexadas)
+    avaliacoes_long     + _avaliacao (avaliacao_id, indexada)
+    identidades         (tabela, linha, chave): nome, e-mail, CPF... normalizados,
+                        uma linha por valor, ligando alunos e inscrições
+    metadados           versão, origem, opções dos filtros
+    busca               arrays do índice de busca nos comentários (metalab.busca)
+    canais              arrays dos pares (linha, canal) das inscrições (metalab.canais)
+    funil               arrays das etapas das inscrições no funil (metalab.funil)
+    temporal            arrays do dia de cada inscrição (metalab.temporal)
+    regioes             arrays das palavras de local de cada inscrição (metalab.regioes)
+
+As colunas-chave guardam exatamente o valor que metalab.filtros compara
+(astype(str), upper/strip). O dashboard mantém em memória só os alunos e o
+pivot das avaliações, usados inteiros nos resumos, e busca inscrições e
+respostas com os filtros empurrados para o SQL (consultar_inscricoes,
+consultar_respostas): só as linhas que a visão precisa viram DataFrame.
+"""
+
+import io
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from metalab.colunas import coluna_sexo
+from metalab.filtros import colunas_relacao
+from metalab.texto import em_texto, tipo_texto_arrow
+
+FORMATO_ARMAZEM = 1
+TABELAS_ARMAZEM = ('alunos', 'inscricoes', 'avaliacoes_long', 'avaliacoes')
+# Inteiro que representa NaT nas colunas de data (nanossegundos desde 1970)
+_NAT = np.iinfo(np.int64).min
+
+ESQUEMA_METADADOS = """
+CREATE TABLE IF NOT EXISTS metadados (chave TEXT PRIMARY KEY, valor TEXT);
+CREATE TABLE IF NOT EXISTS ingestoes (id INTEGER PRIMARY KEY AUTOINCREMENT, versao TEXT, criado_em TEXT,
+                                      origem TEXT, linhas TEXT);
+CREATE TABLE IF NOT EXISTS tabelas (tabela TEXT PRIMARY KEY, linhas INTEGER, indice_nome TEXT, indice_tipo TEXT,
+                                    indice_dtype TEXT, chaves TEXT);
+CREATE TABLE IF NOT EXISTS colunas (tabela TEXT, posicao INTEGER, identificador TEXT, nome TEXT, tipo TEXT,
+                                    dtype TEXT, PRIMARY KEY (tabela, posicao));
+CREATE TABLE IF NOT EXISTS busca (nome TEXT PRIMARY KEY, dados BLOB);
+CREATE TABLE IF NOT EXISTS canais (nome TEXT PRIMARY KEY, dados BLOB);
+CREATE TABLE IF NOT EXISTS funil (nome TEXT PRIMARY KEY, dados BLOB);
+CREATE TABLE IF NOT EXISTS temporal (nome TEXT PRIMARY KEY, dados BLOB);
+CREATE TABLE IF NOT EXISTS regioes (nome TEXT PRIMARY KEY, dados BLOB);
+"""
+
+
+def _texto(serie):
+    """Valores de texto (None nos nulos), como o filtro compara: astype(str)"""
+    return em_texto(serie).astype(object).where(serie.notna(), None).tolist()
+
+
+def _maius(serie):
+    """astype(str).str.upper().str.strip() - inclusive 'NAN' nos nulos, como nos filtros"""
+    return em_texto(serie).str.upper().str.strip().tolist()
+
+
+def _tipo(dtype):
+    """(tipo, dtype gravado) de uma coluna, nas mesmas classes do bundle"""
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+        return 'numero', str(dtype)
+    if pd.api.types.is_numeric_dtype(dtype):
+        # Tipos nullable do pandas (Int64, Float64, boolean): nulos viram NaN
+        return 'numero', 'float64'
+    if isinstance(dtype, np.dtype) and dtype.kind == 'M':
+        return 'data', 'datetime64[ns]'
+    return 'texto', 'object'
+
+
+def _valores_sql(serie, tipo, dtype):
+    if tipo == 'numero':
+        if dtype == 'float64':
+            return serie.to_numpy(dtype=dtype, na_value=np.nan).tolist()
+        return serie.to_numpy(dtype=dtype).tolist()
+    if tipo == 'data':
+        inteiros = serie.to_numpy(dtype='datetime64[ns]').view('int64')
+        return [None if valor == _NAT else valor for valor in inteiros.tolist()]
+    return [None if pd.isna(valor) else str(valor) for valor in serie.tolist()]
+
+
+def _restaurar(valores, tipo, dtype, texto_arrow=False):
+    """Coluna lida do SQLite de volta ao dtype original (texto em Arrow, com texto_arrow)"""
+    if tipo == 'numero':
+        if dtype == 'float64':
+            return np.array(valores, dtype='float64')
+        return np.array(valores, dtype=dtype)
+    if tipo == 'data':
+        return np.array([_NAT if valor is None else valor for valor in valores], dtype='int64').view('datetime64[ns]')
+    if texto_arrow:
+        return pd.array(valores, dtype=tipo_texto_arrow())
+    array = np.array(valores, dtype=object)
+    array[pd.isna(array)] = np.nan
+    return array
+
+
+def _array_em_bytes(array):
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _colunas_chave(nome, df):
+    """Colunas-chave indexadas de cada tabela: nome -> lista de valores"""
+    chaves = {}
+    if nome == 'alunos':
+        if 'CICLO' in df.columns:
+            chaves['_ciclo'] = _texto(df['CICLO'])
+        if 'LOCAL' in df.columns:
+            chaves['_local'] = _texto(df['LOCAL'])
+        if 'STATUS_NORMALIZADO' in df.columns:
+            chaves['_status'] = _texto(df['STATUS_NORMALIZADO'])
+        coluna = coluna_sexo(df)
+        if coluna is not None:
+            chaves['_genero'] = _maius(df[coluna])
+    elif nome == 'inscricoes':
+        if 'CICLO' in df.columns:
+            coluna_ciclo = 'CICLO'
+        else:
+            coluna_ciclo = next((col for col in df.columns if 'ciclo' in str(col).lower()), None)
+        if coluna_ciclo is not None:
+            chaves['_ciclo'] = _texto(df[coluna_ciclo])
+        if 'Sexo:' in df.columns:
+            chaves['_genero'] = _maius(df['Sexo:'])
+        if 'Data_Inscricao' in df.columns:
+            chaves['_data'] = _valores_sql(df['Data_Inscricao'], 'data', 'datetime64[ns]')
+    elif nome == 'avaliacoes_long' and 'avaliacao_id' in df.columns:
+        chaves['_avaliacao'] = df['avaliacao_id'].tolist()
+    return chaves
+
+
+def _identidades(alunos, inscricoes):
+    """
+    Linhas (tabela, linha, chave) com os valores de identificação que
+    filtros._relacionar_inscricoes compara: dos alunos, sem os nulos; das
+    inscrições, todos (um nulo vira 'NAN', como no astype(str)).
+    """
+    pares = colunas_relacao(alunos.columns, inscricoes.columns)
+    registros = set()
+    for col_aluno in dict.fromkeys(col for col, _ in pares):
+        posicoes = np.flatnonzero(alunos[col_aluno].notna().to_numpy())
+        registros.update(('alunos', linha, chave) for linha, chave in
+                         zip(posicoes.tolist(), _maius(alunos[col_aluno].iloc[posicoes])))
+    for col_inscricao in dict.fromkeys(col for _, col in pares):
+        registros.update(('inscricoes', linha, chave) for linha, chave in enumerate(_maius(inscricoes[col_inscricao])))
+    return pares, sorted(registros)
+
+
+def _gravar_tabela(conexao, nome, df):
+    colunas = [(f'c{i}', str(col), *_tipo(df[col].dtype)) for i, col in enumerate(df.columns)]
+    chaves = _colunas_chave(nome, df)
+    tipo_indice, dtype_indice = _tipo(df.index.dtype)
+
+    conexao.execute(f'DROP TABLE IF EXISTS {nome}')
+    definicoes = ['_linha INTEGER PRIMARY KEY', '_indice'] + [identificador for identificador, *_ in colunas] + list(chaves)
+    conexao.execute(f'CREATE TABLE {nome} ({", ".join(definicoes)})')
+    for chave in chaves:
+        conexao.execute(f'CREATE INDEX {nome}{chave} ON {nome} ({chave})')
+
+    valores = [range(len(df)), _valores_sql(df.index.to_series(), tipo_indice, dtype_indice)]
+    valores += [_valores_sql(df[df.columns[i]], tipo, dtype) for i, (_, _, tipo, dtype) in enumerate(colunas)]
+    valores += list(chaves.values())
+    marcadores = ', '.join('?' * len(valores))
+    conexao.executemany(f'INSERT INTO {nome} VALUES ({marcadores})', zip(*valores))
+
+    conexao.execute('DELETE FROM colunas WHERE tabela = ?', (nome,))
+    conexao.executemany('INSERT INTO colunas VALUES (?, ?, ?, ?, ?, ?)',
+                        [(nome, posicao, identificador, coluna, tipo, dtype)
+                         for posicao, (identificador, coluna, tipo, dtype) in enumerate(colunas)])
+    conexao.execute('INSERT OR REPLACE INTO tabelas VALUES (?, ?, ?, ?, ?, ?)',
+                    (nome, len(df), None if df.index.name is None else str(df.index.name), tipo_indice, dtype_indice,
+                     json.dumps(list(chaves))))
+
+
+def ingerir(caminho, tabelas, indices=None, origem=None, busca=None, canais=None, funil=None, temporal=None,
+            regioes=None):
+    """
+    Grava as tabelas processadas (dict nome -> DataFrame, TABELAS_ARMAZEM) no
+    armazém em caminho, numa única transação: quem estiver lendo vê a versão
+    anterior inteira até o commit. busca: índice de busca.construir_indice_busca
+    canais: tabela de canais.construir_canais, funil: funil.construir_funil,
+    temporal: temporal.construir_temporal e regioes: regioes.construir_regioes
+    (opcionais), gravados como arrays .npy. Retorna a nova versão.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    agora = datetime.now()
+    conexao = sqlite3.connect(caminho, isolation_level=None)
+    try:
+        conexao.execute('PRAGMA journal_mode=WAL')
+        conexao.executescript(ESQUEMA_METADADOS)
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            for nome in TABELAS_ARMAZEM:
+                if tabelas.get(nome) is not None:
+                    _gravar_tabela(conexao, nome, tabelas[nome])
+                else:
+                    conexao.execute(f'DROP TABLE IF EXISTS {nome}')
+                    conexao.execute('DELETE FROM colunas WHERE tabela = ?', (nome,))
+                    conexao.execute('DELETE FROM tabelas WHERE tabela = ?', (nome,))
+
+            conexao.execute('DROP TABLE IF EXISTS identidades')
+            conexao.execute('CREATE TABLE identidades (tabela TEXT, linha INTEGER, chave TEXT)')
+            pares = []
+            if tabelas.get('alunos') is not None and tabelas.get('inscricoes') is not None:
+                pares, registros = _identidades(tabelas['alunos'], tabelas['inscricoes'])
+                conexao.executemany('INSERT INTO identidades VALUES (?, ?, ?)', registros)
+            conexao.execute('CREATE INDEX identidades_chave ON identidades (tabela, chave)')
+            conexao.execute('CREATE INDEX identidades_linha ON identidades (tabela, linha)')
+
+            for tabela, arrays in (('busca', busca), ('canais', canais), ('funil', funil), ('temporal', temporal),
+                                   ('regioes', regioes)):
+                conexao.execute(f'DELETE FROM {tabela}')
+                conexao.executemany(f'INSERT INTO {tabela} VALUES (?, ?)',
+                                    [(nome, _array_em_bytes(array)) for nome, array in (arrays or {}).items()])
+
+            id_ingestao = conexao.execute(
+                'INSERT INTO ingestoes (criado_em, origem, linhas) VALUES (?, ?, ?)',
+                (agora.isoformat(timespec='seconds'), origem,
+                 json.dumps({nome: len(df) for nome, df in tabelas.items() if df is not None}))).lastrowid
+            versao = f'v{agora.strftime("%Y%m%d-%H%M%S")}-{id_ingestao}'
+            conexao.execute('UPDATE ingestoes SET versao = ? WHERE id = ?', (versao, id_ingestao))
+            metadados = {
+                'formato': FORMATO_ARMAZEM,
+                'versao': versao,
+                'criado_em': agora.isoformat(timespec='seconds'),
+                'origem': origem,
+                'relacao': [[str(col_aluno), str(col_inscricao)] for col_aluno, col_inscricao in pares],
+                'indices': {dimensao: {'tabela': indice['tabela'], 'coluna': indice['coluna'],
+                                       'valores': indice['valores']}
+                            for dimensao, indice in (indices or {}).items()},
+            }
+            conexao.executemany('INSERT OR REPLACE INTO metadados VALUES (?, ?)',
+                                [(chave, json.dumps(valor, ensure_ascii=False, default=str))
+                                 for chave, valor in metadados.items()])
+            conexao.execute('COMMIT')
+        except BaseException:
+            conexao.execute('ROLLBACK')
+            raise
+    finally:
+        conexao.close()
+    return versao
+
+
+def _conectar(caminho):
+    """Conexão só de leitura (uma por consulta: cada sessão do Streamlit roda na sua thread)"""
+    return sqlite3.connect(Path(caminho).resolve().as_uri() + '?mode=ro', uri=True)
+
+
+def versao_armazem(caminho):
+    """Versão da última ingestão no armazém, ou None se não houver armazém válido"""
+    if not caminho or not os.path.isfile(caminho):
+        return None
+    try:
+        conexao = _conectar(caminho)
+        try:
+            linha = conexao.execute("SELECT valor FROM metadados WHERE chave = 'versao'").fetchone()
+        finally:
+            conexao.close()
+    except sqlite3.Error:
+        return None
+    return json.loads(linha[0]) if linha else None
+
+
+def _materializar(conexao, armazem, tabela, onde='', params=()):
+    """Linhas da tabela que satisfazem onde, como DataFrame com colunas, tipos e índice originais"""
+    esquema = armazem['tabelas'][tabela]
+    identificadores = ', '.join(['_indice'] + [entrada['identificador'] for entrada in esquema['colunas']])
+    linhas = conexao.execute(f'SELECT {identificadores} FROM {tabela} {onde} ORDER BY _linha', params).fetchall()
+    valores = list(zip(*linhas)) if linhas else [()] * (len(esquema['colunas']) + 1)
+    dados = {entrada['nome']: _restaurar(coluna, entrada['tipo'], entrada['dtype'], armazem['texto_arrow'])
+             for entrada, coluna in zip(esquema['colunas'], valores[1:])}
+    indice = pd.Index(_restaurar(valores[0], esquema['indice_tipo'], esquema['indice_dtype']),
+                      name=esquema['indice_nome'])
+    return pd.DataFrame(dados, index=indice, columns=[entrada['nome'] for entrada in esquema['colunas']])
+
+
+def abrir_armazem(caminho, texto_arrow=False):
+    """
+    Abre o armazém: retorna dict com 'versao', 'metadados', 'tabelas' (esquema
+    de cada tabela), 'linhas', 'indices' (opções dos filtros, no formato de
+    indices.construir_indices sem os códigos), e os DataFrames 'alunos' e
+    'avaliacoes' (pivot), lidos inteiros, 'busca' (índice de metalab.busca),
+    'canais' (tabela de metalab.canais), 'funil' (de metalab.funil),
+    'temporal' (de metalab.temporal) e 'regioes' (de metalab.regioes), ou None.
+    Com texto_arrow, as colunas de texto destes e das consultas vêm em Arrow
+    (ver metalab.texto).
+    """
+    conexao = _conectar(caminho)
+    try:
+        metadados = {chave: json.loads(valor) for chave, valor in conexao.execute('SELECT chave, valor FROM metadados')}
+        if metadados.get('formato') != FORMATO_ARMAZEM:
+            raise ValueError(f"formato de armazém {metadados.get('formato')} não suportado (esperado {FORMATO_ARMAZEM})")
+
+        armazem = {'caminho': caminho, 'versao': metadados['versao'], 'metadados': metadados, 'tabelas': {},
+                   'texto_arrow': texto_arrow}
+        for tabela, linhas, indice_nome, indice_tipo, indice_dtype, chaves in conexao.execute(
+                'SELECT tabela, linhas, indice_nome, indice_tipo, indice_dtype, chaves FROM tabelas'):
+            armazem['tabelas'][tabela] = {'linhas': linhas, 'indice_nome': indice_nome, 'indice_tipo': indice_tipo,
+                                          'indice_dtype': indice_dtype, 'chaves': json.loads(chaves), 'colunas': []}
+        for tabela, identificador, nome, tipo, dtype in conexao.execute(
+                'SELECT tabela, identificador, nome, tipo, dtype FROM colunas ORDER BY tabela, posicao'):
+            armazem['tabelas'][tabela]['colunas'].append(
+                {'identificador': identificador, 'nome': nome, 'tipo': tipo, 'dtype': dtype})
+
+        armazem['linhas'] = {tabela: esquema['linhas'] for tabela, esquema in armazem['tabelas'].items()}
+        armazem['indices'] = metadados.get('indices', {})
+        armazem['alunos'] = _materializar(conexao, armazem, 'alunos')
+        armazem['avaliacoes'] = (_materializar(conexao, armazem, 'avaliacoes')
+                                 if 'avaliacoes' in armazem['tabelas'] else None)
+        for tabela in ('busca', 'canais', 'funil', 'temporal', 'regioes'):
+            armazem[tabela] = None
+            # Armazéns gravados antes da busca (ou dos canais, do funil, da série, das regiões) não têm a tabela
+            if conexao.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tabela,)).fetchone():
+                armazem[tabela] = {nome: np.load(io.BytesIO(dados), allow_pickle=False)
+                                   for nome, dados in conexao.execute(f'SELECT nome, dados FROM {tabela}')} or None
+    finally:
+        conexao.close()
+    return armazem
+
+
+def _tem_coluna(armazem, tabela, nome):
+    esquema = armazem['tabelas'].get(tabela)
+    return esquema is not None and any(entrada['nome'] == nome for entrada in esquema['colunas'])
+
+
+def _tem_chave(armazem, tabela, chave):
+    esquema = armazem['tabelas'].get(tabela)
+    return esquema is not None and chave in esquema['chaves']
+
+
+def consultar_inscricoes(armazem, ciclo_selecionado, local_selecionado, genero_final):
+    """
+    Inscrições candidatas aos filtros: filtros.aplicar_filtros sobre elas dá o
+    mesmo resultado que sobre a tabela inteira (com genero_final = gênero
+    clicado ou selecionado).
+
+    Vão para o SQL o ciclo (coluna de ciclo das inscrições e relação com os
+    alunos do ciclo, via identidades) e, sem filtro de local, o gênero. O filtro
+    de local mantém tudo quando nenhuma inscrição bate, então o que vem depois
+    dele só pode ser empurrado sem local; a relação com o status fica no pandas.
+    """
+    condicoes, params = [], []
+    if ciclo_selecionado != 'Todos' and _tem_coluna(armazem, 'alunos', 'CICLO'):
+        if _tem_chave(armazem, 'inscricoes', '_ciclo'):
+            condicoes.append('_ciclo = ?')
+            params.append(str(ciclo_selecionado))
+        # Sem nenhum valor de identificação nos alunos do ciclo, nada é descartado
+        chaves_alunos = ("SELECT chave FROM identidades WHERE tabela = 'alunos' "
+                         "AND linha IN (SELECT _linha FROM alunos WHERE _ciclo = ?)")
+        condicoes.append(f"(NOT EXISTS ({chaves_alunos}) OR _linha IN (SELECT linha FROM identidades "
+                         f"WHERE tabela = 'inscricoes' AND chave IN ({chaves_alunos})))")
+        params += [str(ciclo_selecionado)] * 2
+
+    if ((local_selecionado == 'Todos' or not _tem_coluna(armazem, 'alunos', 'LOCAL'))
+            and genero_final != 'Todos' and _tem_chave(armazem, 'inscricoes', '_genero')):
+        condicoes.append('_genero = ?')
+        params.append(genero_final.upper().strip())
+
+    onde = f'WHERE {" AND ".join(condicoes)}' if condicoes else ''
+    conexao = _conectar(armazem['caminho'])
+    try:
+        return _materializar(conexao, armazem, 'inscricoes', onde, params)
+    finally:
+        conexao.close()
+
+
+def consultar_respostas(armazem, avaliacao_ids=None):
+    """
+    Respostas (formato longo) das avaliações com esses avaliacao_id (índice do
+    pivot), na ordem original; None = todas, como filtros.filtrar_respostas_long.
+    """
+    if 'avaliacoes_long' not in armazem['tabelas']:
+        return None
+    onde, params = '', ()
+    if avaliacao_ids is not None and _tem_chave(armazem, 'avaliacoes_long', '_avaliacao'):
+        onde = 'WHERE _avaliacao IN (SELECT value FROM json_each(?))'
+        params = (json.dumps([int(valor) for valor in avaliacao_ids]),)
+    conexao = _conectar(armazem['caminho'])
+    try:
+        return _materializar(conexao, armazem, 'avaliacoes_long', onde, params)
+    finally:
+        conexao.close()
@@ -0,0 +1,309 @@
+"""
+Bundle versionado com os dados já processados do dashboard.
+
+Estrutura em disco (gerada por precompute_metalab.py):
+
+    <diretorio>/
+        ATUAL                   nome da versão corrente (trocado atomicamente)
+        v<data>-<hash>/
+            manifesto.json      tabelas, colunas, índices, agregados e tempos
+            <tabela>/cNNN.npy   uma coluna por arquivo (.npy)
+            <tabela>/cNNN.cat.npy  dicionário das colunas de texto
+            <tabela>/indice.npy índice das linhas, quando não é 0..n-1
+            <tabela>/texto.arrow  colunas de texto já em Arrow (IPC sem compressão), se houver pyarrow
+            indices/<dim>.npy   códigos int32 das dimensões de filtro
+            busca/<array>.npy   índice invertido dos comentários (metalab.busca)
+            canais/<array>.npy  pares (linha, canal) das inscrições (metalab.canais)
+            funil/<array>.npy   etapa de cada inscrição no funil (metalab.funil)
+            temporal/<array>.npy  dia de cada inscrição (metalab.temporal)
+            regioes/<array>.npy   palavras de local de cada inscrição (metalab.regioes)
+
+Números, datas e códigos são lidos com np.load(mmap_mode='r'): o app só mapeia
+os arquivos, sem parse de CSV. Colunas de texto ficam como códigos int32 +
+dicionário e são decodificadas uma vez por processo. No modo Arrow
+(texto_arrow) elas vêm do texto.arrow, também mapeado: os buffers das strings
+são as páginas do arquivo, sem cópia. Assim várias réplicas do app na mesma
+máquina compartilham o snapshot inteiro pelo cache de páginas do sistema, e
+cada versão nova é trocada pelo ATUAL sem afetar quem ainda lê a anterior.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from metalab.texto import texto_arrow_disponivel, tipo_texto_arrow
+
+FORMATO_BUNDLE = 1
+ARQUIVO_MANIFESTO = 'manifesto.json'
+ARQUIVO_VERSAO_ATUAL = 'ATUAL'
+ARQUIVO_TEXTO_ARROW = 'texto.arrow'
+
+
+def _gravar_array(caminho, array, hash_dados):
+    np.save(caminho, np.ascontiguousarray(array), allow_pickle=False)
+    hash_dados.update(np.ascontiguousarray(array).tobytes())
+
+
+def _gravar_coluna(pasta, base, nome, serie, hash_dados, textos=None):
+    """
+    Grava uma coluna em <base>.npy e retorna sua entrada no manifesto. Colunas
+    de texto também vão para textos[base] (pyarrow.Array), se textos for um dict.
+    """
+    arquivo = f'{base}.npy'
+    entrada = {'nome': None if nome is None else str(nome), 'arquivo': arquivo}
+    dtype = serie.dtype
+
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+        entrada['tipo'] = 'numero'
+        dados = serie.to_numpy()
+    elif pd.api.types.is_numeric_dtype(dtype):
+        # Tipos nullable do pandas (Int64, Float64, boolean): nulos viram NaN
+        entrada['tipo'] = 'numero'
+        dados = serie.to_numpy(dtype='float64', na_value=np.nan)
+    elif isinstance(dtype, np.dtype) and dtype.kind == 'M':
+        entrada['tipo'] = 'data'
+        dados = serie.to_numpy(dtype='datetime64[ns]').view('int64')
+    else:
+        entrada['tipo'] = 'texto'
+        entrada['dicionario'] = f'{base}.cat.npy'
+        codigos, categorias = pd.factorize(serie, use_na_sentinel=True)
+        dicionario = np.array([str(valor) for valor in categorias], dtype=str)
+        _gravar_array(os.path.join(pasta, entrada['dicionario']), dicionario, hash_dados)
+        dados = codigos.astype(np.int32)
+        if textos is not None:
+            # Mesmo texto da decodificação pelo dicionário (nulos no código -1)
+            import pyarrow as pa
+            textos[base] = pa.array(dicionario, type=pa.large_string()).take(pa.array(dados, mask=dados < 0))
+            entrada['arrow'] = base
+
+    entrada['dtype'] = str(dados.dtype)
+    _gravar_array(os.path.join(pasta, arquivo), dados, hash_dados)
+    return entrada
+
+
+def _gravar_textos(caminho, textos):
+    """Grava as colunas de texto de uma tabela num arquivo IPC do Arrow, sem compressão (mapeável)"""
+    import pyarrow as pa
+    from pyarrow import ipc
+
+    tabela = pa.table(textos)
+    with pa.OSFile(caminho, 'wb') as f:
+        with ipc.new_file(f, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+
+
+def _mapear_textos(caminho):
+    """Tabela do Arrow com as colunas de texto, lida por memory-map (buffers nas páginas do arquivo)"""
+    import pyarrow as pa
+    from pyarrow import ipc
+
+    return ipc.open_file(pa.memory_map(caminho, 'r')).read_all()
+
+
+def _ler_coluna(pasta, entrada, texto_arrow=False, textos=None):
+    if entrada['tipo'] == 'texto' and texto_arrow and textos is not None and 'arrow' in entrada:
+        return pd.array(textos.column(entrada['arrow']), dtype=tipo_texto_arrow())
+    dados = np.load(os.path.join(pasta, entrada['arquivo']), mmap_mode='r')
+    if entrada['tipo'] == 'data':
+        return dados.view('datetime64[ns]')
+    if entrada['tipo'] == 'texto':
+        dicionario = np.load(os.path.join(pasta, entrada['dicionario']))
+        if texto_arrow:
+            # take do Arrow direto do dicionário, sem uma string Python por linha
+            return pd.array(dicionario, dtype=tipo_texto_arrow()).take(np.asarray(dados), allow_fill=True)
+        # Último elemento NaN: o código -1 (nulo) cai nele via take
+        valores = np.append(dicionario.astype(object), np.nan)
+        return valores.take(dados)
+    return dados
+
+
+def salvar_bundle(diretorio, tabelas, indices=None, agregados=None, etapas=None, origem=None, manter=3, busca=None,
+                  canais=None, funil=None, temporal=None, regioes=None, texto_arrow=True):
+    """
+    Grava um novo bundle versionado em diretorio e o torna o atual.
+
+    tabelas: dict nome -> DataFrame; busca: índice de busca.construir_indice_busca
+    canais: tabela de canais.construir_canais, funil: funil.construir_funil,
+    temporal: temporal.construir_temporal e regioes: regioes.construir_regioes
+    (opcionais). Com texto_arrow (e pyarrow instalado), as colunas de texto
+    também vão para o texto.arrow de cada tabela. A versão é gravada numa pasta temporária e
+    publicada com rename + troca atômica do arquivo ATUAL, então leitores nunca
+    veem um bundle pela metade. Mantém as `manter` versões mais recentes.
+    Retorna (versao, caminho).
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    agora = datetime.now()
+    temporario = os.path.join(diretorio, f'.tmp-{os.getpid()}-{agora.strftime("%Y%m%d%H%M%S%f")}')
+    os.makedirs(temporario)
+    hash_dados = hashlib.sha1()
+
+    try:
+        manifesto = {
+            'formato': FORMATO_BUNDLE,
+            'criado_em': agora.isoformat(timespec='seconds'),
+            'origem': origem,
+            'etapas': etapas or {},
+            'agregados': agregados or {},
+            'tabelas': {},
+            'indices': {},
+            'busca': {},
+            'canais': {},
+            'funil': {},
+            'temporal': {},
+            'regioes': {},
+        }
+
+        gravar_textos = texto_arrow and texto_arrow_disponivel()
+        for nome, df in tabelas.items():
+            pasta = os.path.join(temporario, nome)
+            os.makedirs(pasta)
+            textos = {} if gravar_textos else None
+            colunas = [_gravar_coluna(pasta, f'c{i:03d}', col, df[col], hash_dados, textos)
+                       for i, col in enumerate(df.columns)]
+            manifesto['tabelas'][nome] = {'linhas': len(df), 'colunas': colunas}
+            if textos:
+                _gravar_textos(os.path.join(pasta, ARQUIVO_TEXTO_ARROW), textos)
+                manifesto['tabelas'][nome]['texto_arrow'] = ARQUIVO_TEXTO_ARROW
+            if not df.index.equals(pd.RangeIndex(len(df))):
+                # Ex.: avaliacao_id das avaliações pivotadas
+                manifesto['tabelas'][nome]['indice'] = _gravar_coluna(
+                    pasta, 'indice', df.index.name, df.index.to_series(), hash_dados)
+
+        if indices:
+            os.makedirs(os.path.join(temporario, 'indices'))
+            for dimensao, indice in indices.items():
+                arquivo = f'{dimensao}.npy'
+                _gravar_array(os.path.join(temporario, 'indices', arquivo), indice['codigos'], hash_dados)
+                manifesto['indices'][dimensao] = {
+                    'tabela': indice['tabela'], 'coluna': indice['coluna'],
+                    'valores': indice['valores'], 'arquivo': arquivo,
+                }
+
+        for pasta, arrays in (('busca', busca), ('canais', canais), ('funil', funil), ('temporal', temporal),
+                             ('regioes', regioes)):
+            if not arrays:
+                continue
+            os.makedirs(os.path.join(temporario, pasta))
+            for nome, array in arrays.items():
+                arquivo = f'{nome}.npy'
+                _gravar_array(os.path.join(temporario, pasta, arquivo), array, hash_dados)
+                manifesto[pasta][nome] = arquivo
+
+        versao = f'v{agora.strftime("%Y%m%d-%H%M%S")}-{hash_dados.hexdigest()[:8]}'
+        manifesto['versao'] = versao
+        with open(os.path.join(temporario, ARQUIVO_MANIFESTO), 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=1, default=str)
+
+        destino = os.path.join(diretorio, versao)
+        if os.path.isdir(destino):
+            # Mesma versão (mesmo instante e mesmos dados) já publicada
+            shutil.rmtree(temporario)
+        else:
+            os.rename(temporario, destino)
+    except BaseException:
+        shutil.rmtree(temporario, ignore_errors=True)
+        raise
+
+    publicar_versao(diretorio, versao)
+    limpar_versoes(diretorio, manter)
+    return versao, destino
+
+
+def publicar_versao(diretorio, versao):
+    """Troca atomicamente o ponteiro ATUAL para a versão indicada"""
+    temporario = os.path.join(diretorio, f'.{ARQUIVO_VERSAO_ATUAL}.{os.getpid()}')
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(versao + '\n')
+    os.replace(temporario, os.path.join(diretorio, ARQUIVO_VERSAO_ATUAL))
+
+
+def listar_versoes(diretorio):
+    """Versões gravadas em diretorio, da mais antiga para a mais recente"""
+    if not os.path.isdir(diretorio):
+        return []
+    versoes = [nome for nome in os.listdir(diretorio)
+               if nome.startswith('v') and os.path.isfile(os.path.join(diretorio, nome, ARQUIVO_MANIFESTO))]
+    # Ordenar pela gravação do manifesto (versões do mesmo segundo só diferem no hash)
+    return sorted(versoes, key=lambda nome: (os.path.getmtime(os.path.join(diretorio, nome, ARQUIVO_MANIFESTO)), nome))
+
+
+def limpar_versoes(diretorio, manter=3):
+    """Remove as versões antigas, preservando as `manter` mais recentes e a atual"""
+    atual = versao_atual(diretorio)
+    antigas = listar_versoes(diretorio)[:-manter] if manter > 0 else []
+    for versao in antigas:
+        if versao != atual:
+            shutil.rmtree(os.path.join(diretorio, versao), ignore_errors=True)
+
+
+def versao_atual(diretorio):
+    """Nome da versão publicada em diretorio, ou None se não houver bundle"""
+    try:
+        with open(os.path.join(diretorio, ARQUIVO_VERSAO_ATUAL), encoding='utf-8') as f:
+            versao = f.read().strip()
+    except OSError:
+        return None
+    if not versao or not os.path.isfile(os.path.join(diretorio, versao, ARQUIVO_MANIFESTO)):
+        return None
+    return versao
+
+
+def abrir_bundle(diretorio, versao=None, texto_arrow=False):
+    """
+    Abre um bundle (a versão atual por padrão).
+
+    Retorna dict com 'versao', 'manifesto', 'tabelas' (nome -> DataFrame),
+    'indices' (no mesmo formato de indices.construir_indices), 'agregados' e
+    'busca' (índice de metalab.busca), 'canais' (tabela de metalab.canais),
+    'funil' (etapas de metalab.funil), 'temporal' (dias de metalab.temporal) e
+    'regioes' (de metalab.regioes), mapeados em memória; None se ausentes.
+    Com texto_arrow, as colunas de texto vêm em Arrow (ver metalab.texto),
+    mapeadas do texto.arrow quando o bundle o tiver.
+    """
+    versao = versao or versao_atual(diretorio)
+    if versao is None:
+        raise FileNotFoundError(f'nenhum bundle publicado em {diretorio}')
+    pasta_versao = os.path.join(diretorio, versao)
+    with open(os.path.join(pasta_versao, ARQUIVO_MANIFESTO), encoding='utf-8') as f:
+        manifesto = json.load(f)
+    if manifesto.get('formato') != FORMATO_BUNDLE:
+        raise ValueError(f"formato de bundle {manifesto.get('formato')} não suportado (esperado {FORMATO_BUNDLE})")
+
+    tabelas = {}
+    for nome, tabela in manifesto['tabelas'].items():
+        pasta = os.path.join(pasta_versao, nome)
+        textos = (_mapear_textos(os.path.join(pasta, tabela['texto_arrow']))
+                  if texto_arrow and 'texto_arrow' in tabela else None)
+        colunas = {entrada['nome']: _ler_coluna(pasta, entrada, texto_arrow, textos) for entrada in tabela['colunas']}
+        if 'indice' in tabela:
+            indice = pd.Index(_ler_coluna(pasta, tabela['indice']), name=tabela['indice']['nome'])
+        else:
+            indice = pd.RangeIndex(tabela['linhas'])
+        tabelas[nome] = pd.DataFrame(colunas, index=indice, copy=False)
+
+    indices = {}
+    for dimensao, indice in manifesto['indices'].items():
+        indices[dimensao] = dict(indice, codigos=np.load(
+            os.path.join(pasta_versao, 'indices', indice['arquivo']), mmap_mode='r'))
+
+    arrays = {pasta: {nome: np.load(os.path.join(pasta_versao, pasta, arquivo), mmap_mode='r')
+                      for nome, arquivo in manifesto.get(pasta, {}).items()}
+              for pasta in ('busca', 'canais', 'funil', 'temporal', 'regioes')}
+
+    return {
+        'versao': versao,
+        'manifesto': manifesto,
+        'tabelas': tabelas,
+        'indices': indices,
+        'agregados': manifesto.get('agregados', {}),
+        'busca': arrays['busca'] or None,
+        'canais': arrays['canais'] or None,
+        'funil': arrays['funil'] or None,
+        'temporal': arrays['temporal'] or None,
+        'regioes': arrays['regioes'] or None,
+    }
@@ -0,0 +1,235 @@
+"""
+Busca nos comentários das avaliações (coluna 'Resposta de texto livre').
+
+Cada resposta preenchida vira um documento, e um índice invertido liga cada
+termo aos documentos que o contêm. Os termos saem de remover_acentos, em
+minúsculas e sem acento. O índice é montado uma vez por snapshot: no
+pré-processamento offline (bundle e armazém) ou na carga do dashboard quando
+não há bundle. Fica todo em arrays numpy, e cada consulta só junta listas de
+documentos, sem varrer os textos.
+
+Consultas:
+
+    professor horario       respostas com os dois termos
+    professor OU suporte    com qualquer um dos lados
+    -horario, NAO horario   sem o termo
+    prof*                   com algum termo que comece com 'prof'
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from metalab.normalizacao import remover_acentos
+from metalab.preprocessamento import localizar_colunas_avaliacao
+from metalab.texto import em_texto
+
+PADRAO_TERMO = re.compile(r'[a-z0-9]+')
+TAMANHO_MAXIMO_TERMO = 40  # URLs e afins não viram termos
+OPERADORES_OU = {'OU', 'OR', '|'}
+OPERADORES_NAO = {'NAO', 'NÃO', 'NOT'}
+LIMITE_RESULTADOS = 200
+
+# Termos fora do gráfico de frequência (continuam pesquisáveis)
+PALAVRAS_VAZIAS = {
+    'a', 'o', 'as', 'os', 'um', 'uma', 'de', 'da', 'do', 'das', 'dos', 'em', 'na', 'no', 'nas', 'nos',
+    'e', 'ou', 'que', 'com', 'para', 'pra', 'por', 'pelo', 'pela', 'se', 'mas', 'mais', 'muito', 'muita',
+    'me', 'mim', 'meu', 'minha', 'eu', 'ele', 'ela', 'foi', 'ser', 'ter', 'tem', 'ao', 'aos', 'sao', 'esta',
+    'isso', 'este', 'essa', 'esse', 'como', 'nao', 'sim', 'ja', 'so', 'bem', 'ficou', 'poderia',
+}
+
+# Arrays do índice (nome -> descrição), gravados no bundle e no armazém
+ARRAYS_INDICE = {
+    'termos': 'termos distintos, em ordem (busca por prefixo com searchsorted)',
+    'inicio': 'posição de cada termo em documentos (n_termos + 1)',
+    'documentos': 'documentos de cada termo, em ordem crescente',
+    'textos_bytes': 'textos distintos em UTF-8, concatenados',
+    'textos_inicio': 'posição de cada texto em textos_bytes (n_textos + 1)',
+    'pares_texto': 'texto de cada par (texto, termo)',
+    'pares_termo': 'termo de cada par (texto, termo)',
+    'doc_texto': 'texto de cada documento',
+    'doc_avaliacao': 'avaliacao_id de cada documento (liga a busca aos filtros)',
+    'doc_pergunta': 'pergunta de cada documento',
+    'perguntas': 'perguntas distintas',
+}
+
+
+def coluna_texto_livre(avaliacoes_long):
+    """Coluna 'Resposta de texto livre' do formato longo, ou None"""
+    for col in avaliacoes_long.columns:
+        if 'resposta de texto livre' in str(col).lower():
+            return col
+    return None
+
+
+def tokenizar(texto):
+    """Termos distintos de um texto, sem acento e em minúsculas"""
+    if pd.isna(texto):
+        return []
+    return sorted({termo for termo in PADRAO_TERMO.findall(remover_acentos(str(texto)))
+                   if len(termo) <= TAMANHO_MAXIMO_TERMO})
+
+
+def _empacotar(textos):
+    """Textos -> (bytes UTF-8 concatenados, posição de cada um)"""
+    codificados = [texto.encode('utf-8') for texto in textos]
+    inicio = np.zeros(len(codificados) + 1, dtype=np.int64)
+    np.cumsum([len(texto) for texto in codificados], out=inicio[1:])
+    return np.frombuffer(b''.join(codificados), dtype=np.uint8), inicio
+
+
+def _desempacotar(indice, posicao):
+    inicio, fim = indice['textos_inicio'][posicao], indice['textos_inicio'][posicao + 1]
+    return bytes(indice['textos_bytes'][inicio:fim]).decode('utf-8')
+
+
+def construir_indice_busca(avaliacoes_long):
+    """
+    Índice invertido das respostas de texto livre (dict de arrays, ver
+    ARRAYS_INDICE); None sem a coluna de texto livre ou sem avaliacao_id.
+    """
+    if avaliacoes_long is None or 'avaliacao_id' not in avaliacoes_long.columns:
+        return None
+    coluna = coluna_texto_livre(avaliacoes_long)
+    if coluna is None:
+        return None
+
+    respostas = avaliacoes_long[coluna]
+    preenchidas = np.flatnonzero((respostas.notna() & (em_texto(respostas).str.strip() != '')).to_numpy())
+    respostas = respostas.iloc[preenchidas]
+
+    # Tokeniza cada texto distinto uma vez (comentários repetidos são comuns)
+    doc_texto, textos = pd.factorize(respostas)
+    termos_por_texto = [tokenizar(texto) for texto in textos]
+    termos = sorted(set().union(*termos_por_texto))
+    posicao_termo = {termo: posicao for posicao, termo in enumerate(termos)}
+    pares_texto = np.repeat(np.arange(len(textos), dtype=np.int32), [len(lista) for lista in termos_por_texto])
+    pares_termo = np.array([posicao_termo[termo] for lista in termos_por_texto for termo in lista], dtype=np.int32)
+
+    # Cada par (texto, termo) vale para todos os documentos com aquele texto
+    docs_por_texto = np.bincount(doc_texto, minlength=len(textos))
+    inicio_texto = np.concatenate([[0], np.cumsum(docs_por_texto)])
+    docs_em_ordem_de_texto = np.argsort(doc_texto, kind='stable')
+    repeticoes = docs_por_texto[pares_texto]
+    deslocamento = np.arange(repeticoes.sum()) - np.repeat(np.cumsum(repeticoes) - repeticoes, repeticoes)
+    doc_par = docs_em_ordem_de_texto[np.repeat(inicio_texto[pares_texto], repeticoes) + deslocamento]
+    termo_par = np.repeat(pares_termo, repeticoes)
+    ordem = np.lexsort((doc_par, termo_par))
+
+    inicio = np.zeros(len(termos) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(termo_par, minlength=len(termos)), out=inicio[1:])
+    textos_bytes, textos_inicio = _empacotar(str(texto) for texto in textos)
+
+    coluna_pergunta = localizar_colunas_avaliacao(avaliacoes_long)[0]
+    if coluna_pergunta:
+        doc_pergunta, perguntas = pd.factorize(avaliacoes_long[coluna_pergunta].iloc[preenchidas])
+    else:
+        doc_pergunta, perguntas = np.full(len(preenchidas), -1), []
+
+    return {
+        'termos': np.array(termos, dtype=str),
+        'inicio': inicio,
+        'documentos': doc_par[ordem].astype(np.int32),
+        'textos_bytes': textos_bytes,
+        'textos_inicio': textos_inicio,
+        'pares_texto': pares_texto,
+        'pares_termo': pares_termo,
+        'doc_texto': doc_texto.astype(np.int32),
+        'doc_avaliacao': avaliacoes_long['avaliacao_id'].to_numpy(dtype=np.int64)[preenchidas],
+        'doc_pergunta': np.asarray(doc_pergunta, dtype=np.int32),
+        'perguntas': np.array([str(pergunta) for pergunta in perguntas], dtype=str),
+    }
+
+
+def interpretar_consulta(consulta):
+    """
+    Consulta -> lista de grupos ligados por OU; cada grupo é uma lista de
+    condições (termo, negado, prefixo) que precisam valer juntas.
+    """
+    grupos = [[]]
+    negar = False
+    for palavra in str(consulta or '').split():
+        if palavra in OPERADORES_OU:
+            grupos.append([])
+            continue
+        if palavra.upper() in OPERADORES_NAO and palavra.isupper():
+            negar = True
+            continue
+        negado = negar or (palavra.startswith('-') and len(palavra) > 1)
+        prefixo = palavra.endswith('*')
+        termos = tokenizar(palavra.lstrip('-').rstrip('*'))
+        if prefixo and termos:
+            # Só o último termo da palavra é prefixo ('e-mai*' -> 'e' e 'mai*')
+            ultimo = PADRAO_TERMO.findall(remover_acentos(palavra.lstrip('-').rstrip('*')))[-1]
+            termos = [termo for termo in termos if termo != ultimo]
+            grupos[-1].extend((termo, negado, False) for termo in termos)
+            grupos[-1].append((ultimo, negado, True))
+        else:
+            grupos[-1].extend((termo, negado, False) for termo in termos)
+        negar = False
+    return [grupo for grupo in grupos if grupo]
+
+
+def _documentos_do_termo(indice, termo, prefixo):
+    """Documentos com o termo (ou com algum termo começando por ele): fatia da lista invertida"""
+    termos = indice['termos']
+    inicio = np.searchsorted(termos, termo, side='left')
+    if prefixo:
+        fim = np.searchsorted(termos, termo + chr(0x10FFFF), side='left')
+    else:
+        fim = inicio + 1 if inicio < len(termos) and termos[inicio] == termo else inicio
+    return indice['documentos'][indice['inicio'][inicio]:indice['inicio'][fim]]
+
+
+def buscar(indice, consulta, avaliacao_ids=None):
+    """
+    Posições (em ordem) dos documentos que satisfazem a consulta, restritos às
+    avaliações de avaliacao_ids (as do sidebar) quando informado. Consulta
+    vazia devolve todos os documentos.
+    """
+    total = len(indice['doc_texto'])
+    grupos = interpretar_consulta(consulta)
+    if grupos:
+        encontrados = np.zeros(total, dtype=bool)
+        for grupo in grupos:
+            mascara = np.ones(total, dtype=bool)
+            for termo, negado, prefixo in grupo:
+                com_termo = np.zeros(total, dtype=bool)
+                com_termo[_documentos_do_termo(indice, termo, prefixo)] = True
+                mascara &= ~com_termo if negado else com_termo
+            encontrados |= mascara
+    else:
+        encontrados = np.ones(total, dtype=bool)
+    if avaliacao_ids is not None:
+        encontrados &= np.isin(indice['doc_avaliacao'], np.asarray(avaliacao_ids, dtype=np.int64))
+    return np.flatnonzero(encontrados)
+
+
+def frequencia_termos(indice, documentos, quantidade=15):
+    """Termos mais frequentes (número de respostas com o termo) entre os documentos, sem PALAVRAS_VAZIAS"""
+    termos = indice['termos']
+    pesos = np.bincount(indice['doc_texto'][documentos], minlength=len(indice['textos_inicio']) - 1)
+    contagens = np.bincount(indice['pares_termo'], weights=pesos[indice['pares_texto']], minlength=len(termos))
+    frequencias = pd.Series(contagens.astype(np.int64), index=pd.Index(termos, name='Termo'), name='Respostas')
+    frequencias = frequencias[(frequencias > 0) & (frequencias.index.str.len() >= 3)
+                              & ~frequencias.index.isin(PALAVRAS_VAZIAS)]
+    return frequencias.sort_values(ascending=False, kind='stable').head(quantidade)
+
+
+def resultados_busca(indice, documentos, avaliacoes=None, limite=LIMITE_RESULTADOS):
+    """
+    Tabela das primeiras `limite` respostas encontradas: Pesquisa e CICLO da
+    avaliação (se houver em avaliacoes, o pivot), Pergunta e Resposta.
+    """
+    documentos = documentos[:limite]
+    ids = indice['doc_avaliacao'][documentos]
+    perguntas = indice['perguntas']
+    resultado = pd.DataFrame({'avaliacao_id': ids})
+    if avaliacoes is not None:
+        for col in ('Pesquisa', 'CICLO'):
+            if col in avaliacoes.columns:
+                resultado[col] = avaliacoes[col].reindex(ids).to_numpy()
+    resultado['Pergunta'] = [perguntas[codigo] if codigo >= 0 else None for codigo in indice['doc_pergunta'][documentos]]
+    resultado['Resposta'] = [_desempacotar(indice, texto) for texto in indice['doc_texto'][documentos]]
+    return resultado
@@ -0,0 +1,137 @@
+"""
+Canais de comunicação das inscrições (pergunta de múltipla escolha).
+
+A resposta guarda as opções marcadas separadas por vírgula ("Instagram,
+Cartaz"), e contar a coluna crua conta cada combinação como uma categoria.
+Aqui cada resposta é separada e normalizada uma vez por snapshot (no
+pré-processamento offline ou na carga do dashboard), numa tabela esparsa
+(linha, canal) em arrays numpy. As contagens com qualquer filtro são um
+bincount sobre os pares das linhas selecionadas, sem voltar aos textos.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from metalab.colunas import COLUNA_CANAIS_INSCRICAO
+from metalab.normalizacao import remover_acentos
+from metalab.payload import LIMITE_CATEGORIAS_GRAFICO
+
+SEPARADOR_CANAIS = ','
+PADRAO_ESPACOS = re.compile(r'\s+')
+
+# Arrays da tabela de canais (nome -> descrição), gravados no bundle e no armazém
+ARRAYS_CANAIS = {
+    'canais': 'canais distintos (grafia mais comum de cada um), em ordem de frequência',
+    'ids': 'índice (rótulo) de cada linha das inscrições',
+    'linhas': 'posição em ids de cada par (linha, canal)',
+    'codigos': 'canal de cada par (linha, canal)',
+}
+
+
+def separar_canais(resposta):
+    """Canais marcados numa resposta, sem espaços extras e sem repetição (na ordem da resposta)"""
+    if pd.isna(resposta):
+        return []
+    canais = []
+    for parte in str(resposta).split(SEPARADOR_CANAIS):
+        canal = PADRAO_ESPACOS.sub(' ', parte).strip()
+        if canal and canal not in canais:
+            canais.append(canal)
+    return canais
+
+
+def _chave(canal):
+    """Grafias do mesmo canal (maiúsculas, acentos) caem na mesma chave"""
+    return remover_acentos(canal)
+
+
+def construir_canais(inscricoes, coluna=COLUNA_CANAIS_INSCRICAO):
+    """
+    Tabela esparsa (linha, canal) das inscrições (dict de arrays, ver
+    ARRAYS_CANAIS); None sem a coluna ou com índice não numérico.
+    """
+    if inscricoes is None or coluna not in inscricoes.columns:
+        return None
+    if not pd.api.types.is_integer_dtype(inscricoes.index.dtype):
+        return None
+
+    # Separa cada resposta distinta uma vez (as combinações se repetem muito)
+    linha_resposta, respostas = pd.factorize(inscricoes[coluna])
+    canais_por_resposta = [separar_canais(resposta) for resposta in respostas]
+
+    # Chave normalizada de cada canal; o rótulo é a grafia mais comum
+    por_resposta = np.bincount(linha_resposta[linha_resposta >= 0], minlength=len(respostas))
+    grafias = {}
+    for canais, quantidade in zip(canais_por_resposta, por_resposta):
+        for canal in canais:
+            contagem = grafias.setdefault(_chave(canal), {})
+            contagem[canal] = contagem.get(canal, 0) + int(quantidade)
+    chaves = sorted(grafias, key=lambda chave: (-sum(grafias[chave].values()), chave))
+    posicao_chave = {chave: posicao for posicao, chave in enumerate(chaves)}
+    rotulos = [max(grafias[chave].items(), key=lambda item: (item[1], item[0]))[0] for chave in chaves]
+
+    # Pares (resposta, canal) sem repetir canais da mesma chave numa resposta
+    codigos_por_resposta = [list(dict.fromkeys(posicao_chave[_chave(canal)] for canal in canais))
+                            for canais in canais_por_resposta]
+    tamanhos = np.array([len(codigos) for codigos in codigos_por_resposta] + [0], dtype=np.int64)
+    inicio_resposta = np.concatenate([[0], np.cumsum(tamanhos)])
+    pares_canal = np.array([codigo for codigos in codigos_por_resposta for codigo in codigos], dtype=np.int64)
+
+    # Cada linha recebe os pares da sua resposta (nulos: posição extra, sem pares)
+    linha_resposta = np.where(linha_resposta < 0, len(respostas), linha_resposta)
+    repeticoes = tamanhos[linha_resposta]
+    deslocamento = np.arange(repeticoes.sum()) - np.repeat(np.cumsum(repeticoes) - repeticoes, repeticoes)
+    codigos = pares_canal[np.repeat(inicio_resposta[linha_resposta], repeticoes) + deslocamento]
+
+    return {
+        'canais': np.array(rotulos, dtype=str),
+        'ids': inscricoes.index.to_numpy(dtype=np.int64),
+        'linhas': np.repeat(np.arange(len(inscricoes), dtype=np.int32), repeticoes),
+        'codigos': codigos.astype(np.int16 if len(rotulos) < 2 ** 15 else np.int32),
+    }
+
+
+def _pares_selecionados(canais, inscricoes):
+    """Máscara dos pares cujas linhas estão em inscricoes (já filtradas)"""
+    if len(inscricoes) == len(canais['ids']):
+        return None
+    selecionadas = np.isin(canais['ids'], inscricoes.index.to_numpy())
+    return selecionadas[canais['linhas']]
+
+
+def contar_canais(canais, inscricoes):
+    """Inscrições que marcaram cada canal entre as linhas de inscricoes (value_counts, maiores primeiro)"""
+    codigos = canais['codigos']
+    pares = _pares_selecionados(canais, inscricoes)
+    if pares is not None:
+        codigos = codigos[pares]
+    contagens = pd.Series(np.bincount(codigos, minlength=len(canais['canais'])),
+                          index=pd.Index(canais['canais'], name=COLUNA_CANAIS_INSCRICAO), name='count')
+    return contagens[contagens > 0].sort_values(ascending=False, kind='stable')
+
+
+def coocorrencia_canais(canais, inscricoes, limite=LIMITE_CATEGORIAS_GRAFICO):
+    """
+    Matriz canal x canal com o número de inscrições que marcaram os dois
+    (diagonal: total do canal), para os `limite` canais mais citados (até 62,
+    um bit por canal).
+    """
+    linhas, codigos = canais['linhas'], canais['codigos']
+    pares = _pares_selecionados(canais, inscricoes)
+    if pares is not None:
+        linhas, codigos = linhas[pares], codigos[pares]
+    principais = contar_canais(canais, inscricoes).index[:min(limite, 62)]
+    posicao = np.full(len(canais['canais']), -1, dtype=np.int64)
+    posicao[pd.Index(canais['canais']).get_indexer(principais)] = np.arange(len(principais))
+
+    # Cada linha vira a máscara de bits dos seus canais; as combinações distintas são poucas
+    manter = posicao[codigos] >= 0
+    mascaras = np.zeros(len(canais['ids']), dtype=np.int64)
+    np.bitwise_or.at(mascaras, linhas[manter], np.left_shift(1, posicao[codigos[manter]]))
+    combinacoes, quantidades = np.unique(mascaras[mascaras != 0], return_counts=True)
+    marcados = (combinacoes[:, None] >> np.arange(len(principais))) & 1
+    matriz = (marcados.T * quantidades) @ marcados
+    principais = pd.Index(principais, name='Canal')
+    return pd.DataFrame(matriz, index=principais, columns=principais)
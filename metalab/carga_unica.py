@@ -0,0 +1,133 @@
+"""
+Carga única (single-flight) dos snapshots de dados por processo.
+
+Quando a janela de validade dos dados vira, todas as sessões abertas pedem a
+versão nova ao mesmo tempo. Sem coordenação, cada uma baixaria e
+processaria os dados por conta própria. Aqui cada (nome, versão) tem no máximo
+uma carga em andamento no processo. A primeira sessão a pedir a versão
+executa a carga. As demais recebem a versão anterior, se já houver uma pronta,
+ou esperam a carga terminar. O resultado fica guardado até a próxima versão.
+
+Cada sessão do Streamlit roda o script na sua própria thread, então o estado
+é do processo e protegido por um lock. Os eventos (carga, espera, anterior,
+acerto, erro) vão para metalab.telemetria.
+
+calcular_uma_vez aplica a mesma coordenação a qualquer memória do processo
+(visões, contagens e figuras de cada visão, códigos do planejador): o
+aquecimento e as sessões que pedem a mesma chave ao mesmo tempo fazem um
+cálculo só.
+"""
+
+import threading
+import time
+
+from metalab.telemetria import contar_carga
+
+_lock = threading.Lock()
+_cargas = {}  # nome -> {'versao': v, 'valor': x, 'carregado_em': epoch, 'em_andamento': {versao: voo}}
+_calculos = {}  # (id(memoria), chave) -> evento do cálculo em andamento (calcular_uma_vez)
+
+
+def janela_validade(ttl, agora=None):
+    """Versão dos dados pela janela de ttl segundos: muda ao mesmo tempo para todas as sessões"""
+    return int((time.time() if agora is None else agora) // ttl)
+
+
+def carregar_uma_vez(nome, versao, carregar, esperar=False):
+    """
+    Valor de nome na versão e a versão servida. A primeira chamada da versão
+    executa carregar(); as concorrentes esperam por ela ou, com esperar=False e
+    uma versão anterior pronta, recebem a anterior (e a versão dela). Um erro
+    da carga é repassado a quem esperava, e a próxima chamada tenta de novo.
+    """
+    with _lock:
+        estado = _cargas.setdefault(nome, {'versao': None, 'valor': None, 'carregado_em': None,
+                                           'em_andamento': {}})
+        if estado['carregado_em'] is not None and estado['versao'] == versao:
+            contar_carga(nome, 'acerto')
+            return estado['valor'], versao
+        voo = estado['em_andamento'].get(versao)
+        lider = voo is None
+        if lider:
+            voo = {'pronto': threading.Event(), 'valor': None, 'erro': None}
+            estado['em_andamento'][versao] = voo
+            contar_carga(nome, 'carga')
+        elif not esperar and estado['carregado_em'] is not None:
+            contar_carga(nome, 'anterior')
+            return estado['valor'], estado['versao']
+        else:
+            contar_carga(nome, 'espera')
+
+    if not lider:
+        voo['pronto'].wait()
+        if voo['erro'] is not None:
+            raise voo['erro']
+        return voo['valor'], versao
+
+    try:
+        valor = carregar()
+    except BaseException as e:
+        with _lock:
+            voo['erro'] = e
+            del estado['em_andamento'][versao]
+            contar_carga(nome, 'erro')
+        voo['pronto'].set()
+        raise
+    with _lock:
+        voo['valor'] = valor
+        estado.update(versao=versao, valor=valor, carregado_em=time.time())
+        del estado['em_andamento'][versao]
+    voo['pronto'].set()
+    return valor, versao
+
+
+def carregado_em(nome):
+    """Instante (epoch) em que a versão guardada de nome foi carregada, ou None"""
+    with _lock:
+        estado = _cargas.get(nome)
+        return estado['carregado_em'] if estado else None
+
+
+def descartar_carga(nome):
+    """Esquece a versão guardada de nome (a próxima chamada carrega de novo); cargas em andamento seguem"""
+    with _lock:
+        estado = _cargas.get(nome)
+        if estado:
+            estado.update(versao=None, valor=None, carregado_em=None)
+
+
+def calcular_uma_vez(memoria, chave, calcular, limite=None):
+    """
+    memoria[chave], guardado por calcular() na primeira vez, e se foi calculado
+    nesta chamada. Chamadas concorrentes da mesma chave esperam o cálculo em
+    andamento em vez de repeti-lo; se ele falhar, o erro vai para quem
+    calculou e a próxima chamada tenta de novo. Com limite, memoria é um
+    OrderedDict com no máximo limite itens (sai o usado há mais tempo).
+    """
+    em_andamento = (id(memoria), chave)
+    while True:
+        with _lock:
+            if chave in memoria:
+                if limite is not None:
+                    memoria.move_to_end(chave)
+                return memoria[chave], False
+            pronto = _calculos.get(em_andamento)
+            lider = pronto is None
+            if lider:
+                pronto = _calculos[em_andamento] = threading.Event()
+        if lider:
+            break
+        pronto.wait()
+
+    try:
+        valor = calcular()
+        with _lock:
+            memoria[chave] = valor
+            if limite is not None:
+                while len(memoria) > limite:
+                    memoria.popitem(last=False)
+    finally:
+        with _lock:
+            del _calculos[em_andamento]
+        pronto.set()
+    return valor, True
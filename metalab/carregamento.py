@@ -0,0 +1,160 @@
+"""
+Carregamento dos dados brutos (Google Sheets ou CSVs locais).
+
+As funções aqui não exibem mensagens nem dependem do Streamlit: falhas de
+leitura viram exceções (FileNotFoundError quando faltam arquivos) para que o
+dashboard e o pré-processamento offline decidam como reportá-las.
+"""
+
+import gc
+import os
+
+import pandas as pd
+
+from metalab.texto import converter_texto
+
+ENCODINGS_CSV = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+SEPARADORES_AVALIACOES = [';', ',', None]  # Ponto e vírgula primeiro (mais comum no Brasil)
+
+ARQUIVOS_INSCRICOES = ['Metalab_inscricoes_.csv']
+ARQUIVOS_AVALIACOES = ['Avaliacao_metalab.csv', 'Avaliacao_programando_google_planilha.csv']
+ARQUIVOS_ALUNOS = ['Metalab_Mcom_DadosAlunos.csv']
+
+# Limites usados pelo dashboard quando lê os CSVs direto (proteção contra crashes).
+# O pré-processamento offline não aplica limite: o app só lê o bundle pronto.
+LIMITES_DASHBOARD = {'inscricoes': 20000, 'alunos': 20000, 'avaliacoes': 10000}
+
+URL_EXPORT_SHEETS = 'https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv&gid={gid}'
+
+
+def localizar_arquivo(nomes, diretorio='dados'):
+    """Procura o primeiro arquivo existente em diretorio/ e depois na raiz"""
+    candidatos = [os.path.join(diretorio, nome) for nome in nomes] + list(nomes)
+    for caminho in candidatos:
+        if os.path.exists(caminho):
+            return caminho
+    raise FileNotFoundError(f"nenhum de {', '.join(nomes)} em {diretorio}/ ou na raiz")
+
+
+def ler_csv(caminho, sep=','):
+    """Lê um CSV tentando os encodings usuais das planilhas exportadas"""
+    for encoding in ENCODINGS_CSV:
+        try:
+            return pd.read_csv(caminho, encoding=encoding, low_memory=False, sep=sep)
+        except Exception:
+            continue
+    # Última tentativa: pular linhas quebradas e caracteres inválidos
+    return pd.read_csv(caminho, encoding='utf-8', low_memory=False, sep=sep,
+                       on_bad_lines='skip', encoding_errors='ignore')
+
+
+def eh_formato_long(avaliacoes):
+    """Avaliações no formato longo têm uma linha por pergunta (coluna 'Pergunta')"""
+    return avaliacoes is not None and 'pergunta' in [str(col).lower() for col in avaliacoes.columns]
+
+
+def ler_csv_avaliacoes(caminho):
+    """Lê o CSV de avaliações testando encodings e separadores até achar o formato longo"""
+    avaliacoes = None
+    for encoding in ENCODINGS_CSV:
+        for sep in SEPARADORES_AVALIACOES:
+            try:
+                if sep is None:
+                    avaliacoes = pd.read_csv(caminho, encoding=encoding, sep=None, engine='python')
+                else:
+                    avaliacoes = pd.read_csv(caminho, encoding=encoding, sep=sep, low_memory=False)
+            except Exception:
+                continue
+            if eh_formato_long(avaliacoes):
+                return avaliacoes
+
+    if avaliacoes is None:
+        try:
+            avaliacoes = pd.read_csv(caminho, encoding='utf-8', sep=';', low_memory=False,
+                                     on_bad_lines='skip', encoding_errors='ignore')
+        except Exception:
+            avaliacoes = pd.DataFrame()  # DataFrame vazio como fallback
+    return avaliacoes
+
+
+def carregar_csvs(diretorio='dados', limites=None, texto_arrow=False):
+    """
+    Carrega inscrições, avaliações (formato longo, sem pivot) e alunos dos CSVs.
+
+    limites: dict opcional {'inscricoes': n, 'avaliacoes': n, 'alunos': n} com o
+    número máximo de linhas de cada tabela. texto_arrow: colunas de texto em
+    Arrow (ver metalab.texto) em vez de object.
+    """
+    limites = limites or {}
+    caminho_inscricoes = localizar_arquivo(ARQUIVOS_INSCRICOES, diretorio)
+    caminho_avaliacoes = localizar_arquivo(ARQUIVOS_AVALIACOES, diretorio)
+    caminho_alunos = localizar_arquivo(ARQUIVOS_ALUNOS, diretorio)
+
+    tabelas = {
+        'inscricoes': ler_csv(caminho_inscricoes),
+        'avaliacoes': ler_csv_avaliacoes(caminho_avaliacoes),
+        'alunos': ler_csv(caminho_alunos, sep=','),
+    }
+    for nome, limite in limites.items():
+        if limite and len(tabelas[nome]) > limite:
+            tabelas[nome] = tabelas[nome].head(limite)
+    if texto_arrow:
+        tabelas = {nome: converter_texto(df) for nome, df in tabelas.items()}
+    gc.collect()  # Liberar memória
+
+    return tabelas['inscricoes'], tabelas['avaliacoes'], tabelas['alunos']
+
+
+def urls_google_sheets(config):
+    """
+    Monta as URLs públicas de exportação CSV a partir da seção [google_sheets].
+
+    Suporta planilha única com múltiplas abas (SHEET_ID + GID_*) ou planilhas
+    separadas (SHEET_ID_* + ABA_*). Retorna None se não houver configuração.
+    """
+    sheet_id = config.get('SHEET_ID')  # Planilha única (recomendado)
+    if sheet_id:
+        return {
+            tabela: URL_EXPORT_SHEETS.format(sheet_id=sheet_id, gid=config.get(f'GID_{tabela.upper()}', '0'))
+            for tabela in ('inscricoes', 'avaliacoes', 'alunos')
+        }
+
+    ids = {tabela: config.get(f'SHEET_ID_{tabela.upper()}') for tabela in ('inscricoes', 'avaliacoes', 'alunos')}
+    if all(ids.values()):
+        return {
+            tabela: URL_EXPORT_SHEETS.format(sheet_id=sheet_id, gid=config.get(f'ABA_{tabela.upper()}', '0'))
+            for tabela, sheet_id in ids.items()
+        }
+    return None
+
+
+def carregar_google_sheets(config, texto_arrow=False):
+    """Carrega as três tabelas do Google Sheets (sem autenticação); None se indisponível"""
+    urls = urls_google_sheets(config or {})
+    if urls is None:
+        return None, None, None
+    try:
+        inscricoes = pd.read_csv(urls['inscricoes'], encoding='utf-8', low_memory=False)
+        avaliacoes = pd.read_csv(urls['avaliacoes'], encoding='utf-8', low_memory=False)
+        alunos = pd.read_csv(urls['alunos'], encoding='utf-8', low_memory=False, sep=',')
+        if texto_arrow:
+            return converter_texto(inscricoes), converter_texto(avaliacoes), converter_texto(alunos)
+        return inscricoes, avaliacoes, alunos
+    except Exception:
+        # Se falhar, retornar None para usar CSV como fallback
+        return None, None, None
+
+
+def carregar_dados(config_sheets=None, diretorio='dados', limites=None, texto_arrow=False):
+    """
+    Carrega dados do Google Sheets (se configurado) ou dos CSVs como fallback.
+
+    Retorna (inscricoes, avaliacoes, alunos, origem), com origem 'google_sheets'
+    ou 'csv'. Propaga FileNotFoundError se os CSVs não existirem.
+    """
+    inscricoes, avaliacoes, alunos = carregar_google_sheets(config_sheets, texto_arrow)
+    if inscricoes is not None and avaliacoes is not None and alunos is not None:
+        return inscricoes, avaliacoes, alunos, 'google_sheets'
+
+    inscricoes, avaliacoes, alunos = carregar_csvs(diretorio, limites, texto_arrow)
+    return inscricoes, avaliacoes, alunos, 'csv'
@@ -0,0 +1,100 @@
+"""
+Localização de colunas por palavras-chave.
+
+Os cabeçalhos das planilhas (e as perguntas das avaliações, que viram colunas
+no pivot) mudam de texto entre ciclos, então cada gráfico procura sua coluna
+pelas palavras que ela contém. Todas as funções retornam None quando não acham.
+"""
+
+import pandas as pd
+
+# Colunas com nome fixo nas planilhas atuais
+COLUNA_CANAIS_INSCRICAO = 'Quais foram os canais de comunicação pelos quais você tomou conhecimento do curso MetaLab?'
+COLUNA_REGIAO_INSCRICAO = 'SELECIONE A SUA REGIÃO MAIS PRÓXIMA PARA REALIZAR O CURSO:'
+COLUNA_HORARIO = 'Qual horário do curso?'
+PERGUNTA_ESPACO = 'No que se refere ao espaço físico (Laboratório de Informática), qual seu nível de satisfação?'
+PERGUNTA_INSTALACOES = 'Avalie seu nível de satisfação em relação as demais instalações da ONG (hall de entrada, banheiro, recepção, auditório):'
+
+PALAVRAS_AVALIACAO_CURSO = ['considerei', 'considerou', 'avaliacao', 'avaliação', 'avaliar', 'avaliou', 'curso', 'meta', 'metalab']
+PALAVRAS_AVALIACAO_PROF = ['avalie', 'avaliar', 'avaliou', 'avaliação', 'avaliacao']
+PALAVRAS_PROF = ['professor', 'educador', 'educadora', 'instrutor', 'instrutora', 'docente', 'educador social']
+PALAVRAS_IDADE = ['idade', 'age', 'anos', 'nascimento', 'nasc', 'year']
+PALAVRAS_NASCIMENTO = ['data de nascimento', 'data nascimento', 'nascimento', 'nasc', 'birth', 'birthday',
+                       'data nasc', 'dt nascimento', 'dt nasc', 'datanascimento']
+
+
+def primeira_coluna(df, condicao):
+    """Primeira coluna de df cujo nome (minúsculo) satisfaz condicao"""
+    for col in df.columns:
+        if condicao(str(col).lower()):
+            return col
+    return None
+
+
+def colunas_relacionadas(df, palavras, limite=3):
+    """Até `limite` colunas que contêm alguma das palavras (mensagens de diagnóstico)"""
+    return [col for col in df.columns if any(palavra in str(col).lower() for palavra in palavras)][:limite]
+
+
+def coluna_sexo(df):
+    return primeira_coluna(df, lambda c: 'sexo' in c or 'genero' in c or 'gênero' in c)
+
+
+def coluna_raca(df):
+    return primeira_coluna(df, lambda c: any(p in c for p in ('ibge', 'raça', 'raca', 'cor', 'autodeclara')))
+
+
+def coluna_renda(df):
+    return primeira_coluna(df, lambda c: any(p in c for p in ('renda', 'salario', 'salário', 'familiar')))
+
+
+def coluna_idade(df):
+    """Coluna de idade direta: nome com 'idade'/'age' e amostra com números entre 10 e 100"""
+    for col in df.columns:
+        col_lower = str(col).lower().strip()
+        if any(palavra in col_lower for palavra in ['idade', 'age']):
+            amostra = pd.to_numeric(df[col].dropna().head(10), errors='coerce').dropna()
+            if ((amostra >= 10) & (amostra <= 100)).any():
+                return col
+    return None
+
+
+def coluna_nascimento(df):
+    """Coluna de data de nascimento ('DATA DE NASCIMENTO' tem prioridade)"""
+    return (primeira_coluna(df, lambda c: 'data de nascimento' in c.strip())
+            or primeira_coluna(df, lambda c: any(p in c.strip() for p in PALAVRAS_NASCIMENTO)))
+
+
+def coluna_sabendo_curso(df):
+    return primeira_coluna(df, lambda c: 'sabendo' in c and 'curso' in c)
+
+
+def coluna_avaliacao_curso(df):
+    """Pergunta de avaliação geral do curso (avaliação + curso, ou duas palavras-chave)"""
+    def condicao(c):
+        tem_avaliacao = any(p in c for p in ['considerei', 'considerou', 'avaliacao', 'avaliação', 'avaliar', 'avaliou'])
+        tem_curso = any(p in c for p in ['curso', 'meta', 'metalab'])
+        return (tem_avaliacao and tem_curso) or sum(1 for p in PALAVRAS_AVALIACAO_CURSO if p in c) >= 2
+    return primeira_coluna(df, condicao)
+
+
+def coluna_avaliacao_professor(df):
+    return primeira_coluna(df, lambda c: any(p in c for p in PALAVRAS_AVALIACAO_PROF) and any(p in c for p in PALAVRAS_PROF))
+
+
+def coluna_expectativas(df):
+    return primeira_coluna(df, lambda c: 'expectativas' in c or ('conteudo' in c and 'atendeu' in c))
+
+
+def coluna_indicacao(df):
+    return primeira_coluna(df, lambda c: 'indicaria' in c)
+
+
+def coluna_suporte(df):
+    """Pergunta sobre o suporte da coordenação pedagógica"""
+    def condicao(c):
+        if any(p in c for p in ['recebi suporte', 'suporte coordenacao', 'suporte coordenação',
+                                'suporte pedagogica', 'suporte pedagógica']):
+            return True
+        return 'suporte' in c and any(p in c for p in ['coordenacao', 'coordenação', 'pedagogica', 'pedagógica'])
+    return primeira_coluna(df, condicao)
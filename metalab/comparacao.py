@@ -0,0 +1,250 @@
+"""
+Comparação de ciclos numa única passada agrupada.
+
+Comparar ciclos pelo sidebar é trocar o selectbox e refazer a página inteira
+uma vez por ciclo. Aqui cada linha (aluno, inscrição, avaliação) ganha uma
+linha numa matriz booleana "pertence ao ciclo" (linhas x ciclos escolhidos),
+montada com as mesmas regras do filtro de ciclo de metalab.filtros, e cada
+métrica ou distribuição sai de um único bincount sobre os pares (valor,
+ciclo), para todos os ciclos de uma vez.
+
+As tabelas de entrada já vêm com os demais filtros do sidebar (local, status,
+gênero) e sem o de ciclo. Como em filtros.aplicar_filtros, o ciclo de uma
+inscrição vem da relação com todos os alunos do ciclo, antes dos demais
+filtros: a matriz das inscrições usa os alunos originais.
+"""
+
+import numpy as np
+import pandas as pd
+
+from metalab.agregados import FAIXAS_ETARIAS, ROTULOS_FAIXAS_ETARIAS, calcular_idades, respostas_avaliacao
+from metalab.colunas import coluna_raca, coluna_renda, coluna_sexo
+from metalab.filtros import colunas_relacao, extrair_ciclo_da_pesquisa, normalizar_ciclo
+from metalab.normalizacao import ORDEM_CATEGORIAS_RENDA, normalizar_categoria_renda, normalizar_resposta_avaliacao
+from metalab.texto import aplicar_por_valor, em_texto
+
+# Métricas dos cards (as chaves de agregados.calcular_metricas)
+METRICAS_COMPARACAO = {
+    'total_inscricoes': 'Total de Inscrições',
+    'total_alunos': 'Total de Alunos',
+    'formados': 'Alunos Formados',
+    'desistentes': 'Desistentes',
+    'cursando': 'Alunos Cursando',
+    'taxa_desistencia': 'Taxa de Desistência (%)',
+}
+
+# Padrões de status de calcular_metricas quando não há STATUS_NORMALIZADO
+PADROES_STATUS = {
+    'formados': 'CONCLUIDO|CONCLUÍDO',
+    'desistentes': 'DESISTENTE',
+    'cursando': 'CURSANDO|EM CURSO|EM ANDAMENTO',
+}
+STATUS_NORMALIZADOS = {'formados': 'CONCLUÍDO', 'desistentes': 'DESISTENTE', 'cursando': 'CURSANDO'}
+
+
+def _pertence_por_codigo(codigos, n_ciclos):
+    """Códigos de ciclo (-1 = outro) -> matriz linhas x ciclos"""
+    return np.asarray(codigos)[:, None] == np.arange(n_ciclos)[None, :]
+
+
+def pertence_alunos(alunos, ciclos):
+    """Alunos de cada ciclo: mesma comparação de texto do filtro de ciclo"""
+    if 'CICLO' not in alunos.columns:
+        return np.zeros((len(alunos), len(ciclos)), dtype=bool)
+    codigos = pd.Categorical(em_texto(alunos['CICLO']), categories=list(ciclos)).codes
+    return _pertence_por_codigo(codigos, len(ciclos))
+
+
+def pertence_inscricoes(inscricoes, alunos, pertence_aluno, ciclos):
+    """
+    Inscrições de cada ciclo, como em filtros.aplicar_filtros: a coluna de ciclo
+    das inscrições, se houver, e as colunas de identificação que batem com os
+    alunos do ciclo (todas as inscrições, se o ciclo não tiver valores).
+    """
+    n_ciclos = len(ciclos)
+    pertence = np.ones((len(inscricoes), n_ciclos), dtype=bool)
+    if 'CICLO' not in alunos.columns:
+        return pertence
+
+    if 'CICLO' in inscricoes.columns:
+        colunas_ciclo = ['CICLO']
+    else:
+        colunas_ciclo = [col for col in inscricoes.columns if 'ciclo' in str(col).lower()][:1]
+    for col in colunas_ciclo:
+        codigos = pd.Categorical(em_texto(inscricoes[col]), categories=[str(ciclo) for ciclo in ciclos]).codes
+        pertence &= _pertence_por_codigo(codigos, n_ciclos)
+
+    pares = colunas_relacao(alunos.columns, inscricoes.columns)
+    if not pares:
+        return pertence
+
+    # Chaves dos alunos e das inscrições fatoradas juntas; cada chave guarda os ciclos dos seus alunos
+    chaves, linhas_alunos = [], []
+    for col_aluno in dict.fromkeys(col for col, _ in pares):
+        preenchidas = np.flatnonzero(alunos[col_aluno].notna().to_numpy())
+        chaves.append(em_texto(alunos[col_aluno].iloc[preenchidas]).str.strip().str.upper())
+        linhas_alunos.append(preenchidas)
+    n_chaves_alunos = sum(len(chave) for chave in chaves)
+    colunas_inscricao = list(dict.fromkeys(col for _, col in pares))
+    chaves += [em_texto(inscricoes[col]).str.strip().str.upper() for col in colunas_inscricao]
+    codigos, valores = pd.factorize(pd.concat(chaves, ignore_index=True))
+
+    ciclos_da_chave = np.zeros((len(valores) + 1, n_ciclos), dtype=bool)  # última linha: sem chave
+    np.logical_or.at(ciclos_da_chave, codigos[:n_chaves_alunos], pertence_aluno[np.concatenate(linhas_alunos)])
+    relacionadas = np.zeros_like(pertence)
+    for posicao in range(len(colunas_inscricao)):
+        inicio = n_chaves_alunos + posicao * len(inscricoes)
+        relacionadas |= ciclos_da_chave[codigos[inicio:inicio + len(inscricoes)]]
+
+    # Ciclo sem nenhuma chave nos alunos: a relação não filtra (como em _relacionar_inscricoes)
+    sem_chaves = ~ciclos_da_chave[:-1].any(axis=0)
+    return pertence & (relacionadas | sem_chaves[None, :])
+
+
+def pertence_avaliacoes(avaliacoes, ciclos):
+    """
+    Avaliações de cada ciclo, como em filtros.mascara_ciclo_avaliacoes (nome da
+    Pesquisa e colunas com 'ciclo'); ciclo sem nenhuma avaliação fica com todas,
+    como em filtrar_avaliacoes.
+    """
+    ciclos_normalizados = np.array([normalizar_ciclo(ciclo) for ciclo in ciclos], dtype=object)
+    pertence = np.zeros((len(avaliacoes), len(ciclos)), dtype=bool)
+    for col in avaliacoes.columns:
+        if col == 'Pesquisa':
+            valores = aplicar_por_valor(avaliacoes[col], extrair_ciclo_da_pesquisa)
+        elif 'ciclo' in str(col).lower():
+            valores = aplicar_por_valor(avaliacoes[col], normalizar_ciclo)
+        else:
+            continue
+        pertence |= valores.to_numpy(dtype=object)[:, None] == ciclos_normalizados[None, :]
+    pertence[:, ~pertence.any(axis=0)] = True
+    return pertence
+
+
+def contar_por_ciclo(pertence, valores, ciclos, ordem=None):
+    """
+    Tabela valor x ciclo com as contagens de valores (alinhados às linhas de
+    pertence; nulos ficam de fora) num único bincount sobre os pares (valor,
+    ciclo). Valores em ordem de total decrescente, ou ordem (os listados primeiro).
+    """
+    n_ciclos = len(ciclos)
+    codigos, categorias = pd.factorize(valores)
+    linhas, colunas = np.nonzero(pertence & (codigos >= 0)[:, None])
+    contagens = np.bincount(codigos[linhas] * n_ciclos + colunas, minlength=len(categorias) * n_ciclos)
+    tabela = pd.DataFrame(contagens.reshape(-1, n_ciclos), columns=pd.Index(list(ciclos), name='Ciclo'),
+                          index=pd.Index(categorias, name=getattr(valores, 'name', None)))
+    tabela = tabela[tabela.sum(axis=1) > 0]
+    if ordem is not None:
+        primeiros = [valor for valor in ordem if valor in tabela.index]
+        return tabela.loc[primeiros + [valor for valor in tabela.index if valor not in primeiros]]
+    return tabela.iloc[np.argsort(-tabela.sum(axis=1).to_numpy(), kind='stable')]
+
+
+def _metricas(pertence_aluno, pertence_inscricao, alunos, ciclos):
+    """Métricas dos cards por ciclo (linhas: ciclos; colunas: METRICAS_COMPARACAO)"""
+    marcadores = {}
+    if 'STATUS_NORMALIZADO' in alunos.columns:
+        for metrica, status in STATUS_NORMALIZADOS.items():
+            marcadores[metrica] = (alunos['STATUS_NORMALIZADO'] == status).to_numpy()
+    elif 'STATUS' in alunos.columns:
+        status = em_texto(alunos['STATUS']).str.upper()
+        for metrica, padrao in PADROES_STATUS.items():
+            marcadores[metrica] = status.str.contains(padrao, case=False, na=False, regex=True).to_numpy()
+    else:
+        marcadores = {metrica: np.zeros(len(alunos), dtype=bool) for metrica in PADROES_STATUS}
+
+    # Uma multiplicação de matrizes conta todos os status de todos os ciclos
+    por_status = pertence_aluno.T.astype(np.int64) @ np.column_stack(list(marcadores.values())).astype(np.int64)
+    metricas = pd.DataFrame(por_status, index=pd.Index(list(ciclos), name='Ciclo'), columns=list(marcadores))
+    metricas.insert(0, 'total_alunos', pertence_aluno.sum(axis=0))
+    metricas.insert(0, 'total_inscricoes', pertence_inscricao.sum(axis=0))
+    metricas['taxa_desistencia'] = np.where(metricas['total_alunos'] > 0,
+                                            metricas['desistentes'] / metricas['total_alunos'].clip(lower=1) * 100, 0.0)
+    return metricas[list(METRICAS_COMPARACAO)]
+
+
+def _distribuicoes_alunos(pertence_aluno, alunos, ciclos):
+    """Distribuições do perfil dos alunos por ciclo (as dos gráficos da seção Perfil e Status)"""
+    distribuicoes = {}
+    col_sexo = coluna_sexo(alunos)
+    if col_sexo is not None:
+        distribuicoes['Sexo'] = contar_por_ciclo(pertence_aluno, alunos[col_sexo], ciclos)
+
+    idades = calcular_idades(alunos)
+    if idades is not None:
+        faixas = pd.cut(idades, bins=FAIXAS_ETARIAS, labels=ROTULOS_FAIXAS_ETARIAS, include_lowest=True)
+        faixas = faixas.astype(object).reindex(alunos.index)
+        distribuicoes['Faixa Etária'] = contar_por_ciclo(pertence_aluno, faixas, ciclos, ordem=ROTULOS_FAIXAS_ETARIAS)
+
+    col_raca = coluna_raca(alunos)
+    if col_raca is not None:
+        distribuicoes['Raça/Cor'] = contar_por_ciclo(pertence_aluno, alunos[col_raca], ciclos)
+
+    col_renda = coluna_renda(alunos)
+    if col_renda is not None:
+        renda = aplicar_por_valor(alunos[col_renda], normalizar_categoria_renda)
+        distribuicoes['Renda Familiar'] = contar_por_ciclo(pertence_aluno, renda, ciclos, ordem=ORDEM_CATEGORIAS_RENDA)
+
+    if 'STATUS' in alunos.columns:
+        distribuicoes['Status'] = contar_por_ciclo(pertence_aluno, alunos['STATUS'], ciclos)
+    return distribuicoes
+
+
+def _distribuicoes_avaliacoes(pertence_avaliacao, avaliacoes, avaliacoes_long, perguntas, ciclos):
+    """Respostas normalizadas de cada pergunta (titulo -> pergunta) por ciclo"""
+    distribuicoes = {}
+    for titulo, pergunta in perguntas.items():
+        respostas, ids = respostas_avaliacao(pergunta, avaliacoes, avaliacoes_long)
+        if respostas is None or ids is None:
+            continue
+        posicoes = avaliacoes.index.get_indexer(ids)
+        conhecidas = posicoes >= 0
+        normalizadas = aplicar_por_valor(respostas, normalizar_resposta_avaliacao)
+        tabela = contar_por_ciclo(pertence_avaliacao[posicoes[conhecidas]],
+                                  normalizadas[conhecidas].rename(titulo), ciclos)
+        if len(tabela) > 0:
+            distribuicoes[titulo] = tabela
+    return distribuicoes
+
+
+def comparar_ciclos(ciclos, alunos, inscricoes, avaliacoes=None, avaliacoes_long=None, perguntas=None,
+                    alunos_originais=None):
+    """
+    Métricas e distribuições de todos os ciclos escolhidos numa passada.
+
+    perguntas: titulo -> pergunta das avaliações a comparar. alunos_originais:
+    alunos sem filtro, com quem as inscrições são relacionadas a cada ciclo
+    (padrão: alunos, que só vale sem filtro de local, status ou gênero).
+    Retorna dict com 'ciclos', 'metricas' (DataFrame ciclo x
+    METRICAS_COMPARACAO), 'perfil' e 'avaliacoes' (titulo -> DataFrame valor x
+    ciclo).
+    """
+    ciclos = list(ciclos)
+    pertence_aluno = pertence_alunos(alunos, ciclos)
+    if alunos_originais is None:
+        pertence_inscricao = pertence_inscricoes(inscricoes, alunos, pertence_aluno, ciclos)
+    else:
+        pertence_inscricao = pertence_inscricoes(inscricoes, alunos_originais,
+                                                 pertence_alunos(alunos_originais, ciclos), ciclos)
+    resultado = {
+        'ciclos': ciclos,
+        'metricas': _metricas(pertence_aluno, pertence_inscricao, alunos, ciclos),
+        'perfil': _distribuicoes_alunos(pertence_aluno, alunos, ciclos),
+        'avaliacoes': {},
+    }
+    if avaliacoes is not None and len(avaliacoes) > 0 and perguntas:
+        resultado['avaliacoes'] = _distribuicoes_avaliacoes(pertence_avaliacoes(avaliacoes, ciclos), avaliacoes,
+                                                            avaliacoes_long, perguntas, ciclos)
+    return resultado
+
+
+def percentuais(tabela):
+    """Tabela valor x ciclo em % do total de cada ciclo"""
+    totais = tabela.sum(axis=0).replace(0, np.nan)
+    return (100 * tabela / totais).fillna(0.0).round(1)
+
+
+def diferencas(tabela, referencia=None):
+    """Diferença de cada ciclo para o de referência (o primeiro, por padrão), coluna a coluna"""
+    referencia = tabela.columns[0] if referencia is None else referencia
+    return tabela.sub(tabela[referencia], axis=0).drop(columns=referencia)
@@ -0,0 +1,333 @@
+"""
+Construção do snapshot de dados num processo separado.
+
+O pipeline (carregar → pré-processar → pivot → indexar → agregar → busca →
+canais → funil → temporal → regiões → gravar) é Python puro e segura o GIL:
+rodando dentro do servidor do Streamlit, trava o rerun de todas as sessões
+enquanto um snapshot é montado. Aqui ele roda num processo trabalhador
+(python -m metalab.construcao), que grava um bundle versionado
+(metalab.bundle) e publica a versão com a troca atômica do ATUAL. O app só
+mapeia o bundle pronto em memória.
+
+O trabalhador grava o andamento em <saida>/CONSTRUCAO.json (estado, etapa
+atual, tempos das etapas concluídas, janela de validade e versão gerada), que
+o dashboard lê a cada rerun para exibir o progresso. Uma trava (flock) na
+pasta garante no máximo um trabalhador por vez, mesmo com várias réplicas do
+app apontando para ela; o trabalhador herda a trava e a solta ao terminar.
+precompute_metalab.py usa o mesmo pipeline (construir_snapshot).
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from metalab.agregados import calcular_agregados
+from metalab.armazem import ingerir
+from metalab.bundle import salvar_bundle, versao_atual
+from metalab.busca import construir_indice_busca
+from metalab.canais import construir_canais
+from metalab.carregamento import carregar_dados
+from metalab.funil import construir_funil
+from metalab.indices import construir_indices
+from metalab.preprocessamento import fazer_pivot_avaliacoes, numerar_avaliacoes, preprocessar_dados
+from metalab.regioes import construir_regioes
+from metalab.telemetria import contar_carga
+from metalab.temporal import construir_temporal
+
+ARQUIVO_PROGRESSO = 'CONSTRUCAO.json'
+ARQUIVO_TRAVA = '.construcao.lock'
+ETAPAS_CONSTRUCAO = ('carregar', 'preprocessar', 'pivot', 'indexar', 'agregar', 'busca', 'canais', 'funil',
+                     'temporal', 'regiões', 'gravar')
+# Depois de uma construção com erro, a próxima tentativa da mesma janela espera este intervalo
+ESPERA_APOS_ERRO = 60
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_lock = threading.Lock()
+_construcoes = {}  # pasta -> (Popen, janela) do trabalhador em andamento disparado por este processo
+
+
+def construir_snapshot(config_sheets, dados, saida, limites=None, manter=3, armazem=None, avisar=None,
+                       texto_arrow=True):
+    """
+    Executa o pipeline completo e grava o bundle em saida (e o armazém SQLite,
+    se indicado). avisar(etapa, ms) é chamado no início de cada etapa (ms None)
+    e no fim dela (ms gasto). texto_arrow: grava também o texto.arrow das
+    tabelas (ver metalab.bundle). Retorna o resumo: versao, caminho, origem, linhas
+    por tabela, versão do armazém e ms por etapa. Propaga FileNotFoundError se
+    os dados não existirem.
+    """
+    etapas = {}
+
+    @contextmanager
+    def etapa(nome):
+        if avisar:
+            avisar(nome, None)
+        inicio = time.perf_counter()
+        yield
+        etapas[nome] = round((time.perf_counter() - inicio) * 1000, 1)
+        if avisar:
+            avisar(nome, etapas[nome])
+
+    with etapa('carregar'):
+        inscricoes, avaliacoes_long, alunos, origem = carregar_dados(config_sheets, dados, limites)
+    with etapa('preprocessar'):
+        inscricoes, alunos = preprocessar_dados(inscricoes, alunos)
+    with etapa('pivot'):
+        avaliacoes_long = numerar_avaliacoes(avaliacoes_long)
+        avaliacoes = fazer_pivot_avaliacoes(avaliacoes_long)
+
+    tabelas = {
+        'inscricoes': inscricoes,
+        'alunos': alunos,
+        'avaliacoes_long': avaliacoes_long,
+        'avaliacoes': avaliacoes,
+    }
+    with etapa('indexar'):
+        indices = construir_indices(tabelas)
+    with etapa('agregar'):
+        agregados = calcular_agregados(tabelas, indices)
+    with etapa('busca'):
+        busca = construir_indice_busca(avaliacoes_long)
+    with etapa('canais'):
+        canais = construir_canais(inscricoes)
+    with etapa('funil'):
+        funil = construir_funil(inscricoes, alunos)
+    with etapa('temporal'):
+        temporal = construir_temporal(inscricoes)
+    with etapa('regiões'):
+        regioes = construir_regioes(inscricoes, alunos)
+    with etapa('gravar'):
+        versao, caminho = salvar_bundle(saida, tabelas, indices, agregados,
+                                        etapas=dict(etapas), origem=origem, manter=manter, busca=busca,
+                                        canais=canais, funil=funil, temporal=temporal, regioes=regioes,
+                                        texto_arrow=texto_arrow)
+    versao_armazem = None
+    if armazem:
+        with etapa('armazém'):
+            versao_armazem = ingerir(armazem, tabelas, indices, origem=origem, busca=busca, canais=canais,
+                                     funil=funil, temporal=temporal, regioes=regioes)
+
+    return {
+        'versao': versao,
+        'caminho': caminho,
+        'origem': origem,
+        'linhas': {nome: len(df) for nome, df in tabelas.items()},
+        'armazem': versao_armazem,
+        'etapas_ms': etapas,
+    }
+
+
+# ==========================================
+# ANDAMENTO (arquivo lido pelo app)
+# ==========================================
+
+def ler_progresso(saida):
+    """Andamento da última construção em saida (dict de CONSTRUCAO.json), ou None"""
+    try:
+        with open(os.path.join(saida, ARQUIVO_PROGRESSO), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def gravar_progresso(saida, progresso):
+    """Grava o andamento com troca atômica: o app nunca lê o arquivo pela metade"""
+    os.makedirs(saida, exist_ok=True)
+    temporario = os.path.join(saida, f'.{ARQUIVO_PROGRESSO}.{os.getpid()}')
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dict(progresso, atualizado_em=time.time()), f, ensure_ascii=False)
+    os.replace(temporario, os.path.join(saida, ARQUIVO_PROGRESSO))
+
+
+def processo_vivo(pid):
+    """Se o processo pid ainda existe nesta máquina"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def trabalhador(tarefa):
+    """Corpo do processo trabalhador: constrói o snapshot da tarefa e registra o andamento"""
+    saida = tarefa['saida']
+    progresso = {'pid': os.getpid(), 'janela': tarefa.get('janela'), 'estado': 'construindo', 'etapa': None,
+                 'etapas': {}, 'total_etapas': len(ETAPAS_CONSTRUCAO), 'iniciado_em': time.time(),
+                 'versao': None, 'erro': None}
+    gravar_progresso(saida, progresso)
+
+    def avisar(nome, ms):
+        if ms is None:
+            progresso['etapa'] = nome
+        else:
+            progresso['etapas'][nome] = ms
+        gravar_progresso(saida, progresso)
+
+    try:
+        resumo = construir_snapshot(tarefa.get('config_sheets') or {}, tarefa['dados'], saida,
+                                    limites=tarefa.get('limites'), manter=tarefa.get('manter', 3), avisar=avisar,
+                                    texto_arrow=tarefa.get('texto_arrow', True))
+    except Exception as e:
+        progresso.update(estado='erro', erro=f'{type(e).__name__}: {e}')
+        gravar_progresso(saida, progresso)
+        return 1
+    progresso.update(estado='pronto', etapa=None, versao=resumo['versao'], origem=resumo['origem'],
+                     linhas=resumo['linhas'])
+    gravar_progresso(saida, progresso)
+    return 0
+
+
+# ==========================================
+# COORDENAÇÃO (lado do app)
+# ==========================================
+
+def _travar(saida):
+    """
+    Trava exclusiva (flock) da pasta de construção, ou None se outro processo a
+    detém. Sem fcntl (Windows) não há trava entre processos e vale o pid do andamento.
+    """
+    arquivo = open(os.path.join(saida, ARQUIVO_TRAVA), 'a')
+    if fcntl is None:
+        return arquivo
+    try:
+        fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        arquivo.close()
+        return None
+    return arquivo
+
+
+def iniciar_construcao(saida, dados, config_sheets=None, limites=None, janela=None, manter=3, trava=None,
+                       texto_arrow=True):
+    """
+    Dispara o trabalhador (python -m metalab.construcao) para construir o
+    snapshot em saida. A tarefa, incluindo a configuração do Google Sheets,
+    vai pelo stdin, não pela linha de comando. O trabalhador herda a trava da
+    pasta (de _travar), que fica presa até ele terminar. Retorna o Popen.
+    """
+    os.makedirs(saida, exist_ok=True)
+    ambiente = dict(os.environ)
+    ambiente['PYTHONPATH'] = os.pathsep.join(filter(None, [RAIZ, ambiente.get('PYTHONPATH')]))
+    processo = subprocess.Popen([sys.executable, '-m', 'metalab.construcao'], stdin=subprocess.PIPE,
+                                stdout=subprocess.DEVNULL, cwd=RAIZ, env=ambiente,
+                                pass_fds=(trava.fileno(),) if trava is not None and fcntl is not None else ())
+    tarefa = {'saida': os.path.abspath(saida), 'dados': os.path.abspath(dados), 'config_sheets': config_sheets or {},
+              'limites': limites, 'janela': janela, 'manter': manter, 'texto_arrow': texto_arrow}
+    processo.stdin.write(json.dumps(tarefa, ensure_ascii=False).encode('utf-8'))
+    processo.stdin.close()
+    return processo
+
+
+def _situacao(saida, janela):
+    """Andamento, versão publicada e se ela é da janela pedida"""
+    progresso = ler_progresso(saida)
+    versao = versao_atual(saida)
+    atual = bool(versao and progresso and progresso.get('estado') == 'pronto'
+                 and progresso.get('janela') == janela and progresso.get('versao') == versao)
+    return progresso, versao, atual
+
+
+def _registrar_saida_com_erro(saida, processo, janela):
+    """
+    Andamento de erro para o trabalhador que saiu com código diferente de zero
+    sem gravá-lo (morreu antes do primeiro andamento, ou foi morto): sem isso o
+    arquivo segue o da construção anterior e o erro não conta para ESPERA_APOS_ERRO
+    """
+    progresso = ler_progresso(saida)
+    if not progresso or progresso.get('pid') != processo.pid:
+        # Morreu antes do primeiro andamento: o arquivo ainda é o da construção anterior
+        progresso = {'pid': processo.pid, 'janela': janela, 'etapa': None, 'etapas': {},
+                     'total_etapas': len(ETAPAS_CONSTRUCAO), 'versao': None}
+    elif progresso.get('estado') == 'erro':
+        return  # O próprio trabalhador registrou o erro
+    progresso.update(estado='erro', erro=f'trabalhador saiu com código {processo.returncode}')
+    gravar_progresso(saida, progresso)
+
+
+def acompanhar_construcao(saida, janela, dados, config_sheets=None, limites=None, texto_arrow=True):
+    """
+    Situação do snapshot construído em saida para a janela de validade,
+    disparando o trabalhador quando preciso (texto_arrow: gravar o texto.arrow
+    no bundle). Retorna dict com: versao (publicada em saida, ou None), atual
+    (se ela é da janela pedida), construindo (se há um trabalhador em
+    andamento) e progresso (de ler_progresso).
+
+    Vários processos do app (réplicas na mesma máquina) podem apontar para a
+    mesma pasta: a trava da pasta garante um trabalhador por vez entre todos
+    eles, e os demais só acompanham o andamento e mapeiam a versão publicada.
+    Depois de um erro, a mesma janela só é tentada de novo após ESPERA_APOS_ERRO;
+    um trabalhador deste processo que morre sem registrar o erro (código de
+    saída diferente de zero) ganha aqui o andamento de erro.
+    Os eventos vão para metalab.telemetria como a carga 'construcao':
+    carga (trabalhador disparado), acerto, anterior (serve a versão publicada
+    enquanto a nova é construída), espera (ainda sem versão) e erro.
+    """
+    with _lock:
+        processo, janela_processo = _construcoes.get(saida, (None, None))
+        if processo is not None and processo.poll() is not None:
+            # Trabalhador deste processo terminou (poll recolhe o processo)
+            del _construcoes[saida]
+            if processo.returncode != 0:
+                _registrar_saida_com_erro(saida, processo, janela_processo)
+            processo = None
+        progresso, versao, atual = _situacao(saida, janela)
+
+        construindo = processo is not None
+        if not construindo and progresso and progresso.get('estado') == 'construindo':
+            # Construção disparada por outro processo do app (ou órfã de um processo que morreu)
+            construindo = processo_vivo(progresso.get('pid'))
+
+        falhou_recentemente = bool(progresso and progresso.get('estado') == 'erro'
+                                   and progresso.get('janela') == janela
+                                   and time.time() - progresso.get('atualizado_em', 0) < ESPERA_APOS_ERRO)
+
+        if not atual and not construindo and not falhou_recentemente:
+            os.makedirs(saida, exist_ok=True)
+            trava = _travar(saida)
+            if trava is None:
+                # Outra réplica acabou de disparar o trabalhador
+                construindo = True
+            else:
+                with trava:
+                    # Com a trava, conferir de novo: outra réplica pode ter publicado a versão no meio tempo
+                    progresso, versao, atual = _situacao(saida, janela)
+                    if not atual:
+                        _construcoes[saida] = (iniciar_construcao(saida, dados, config_sheets, limites, janela,
+                                                                  trava=trava, texto_arrow=texto_arrow), janela)
+                        construindo = True
+                        contar_carga('construcao', 'carga')
+                        progresso = None  # O arquivo ainda é o da construção anterior
+
+        if atual:
+            contar_carga('construcao', 'acerto')
+        elif progresso and progresso.get('estado') == 'erro' and not construindo:
+            contar_carga('construcao', 'erro')
+        elif versao:
+            contar_carga('construcao', 'anterior')
+        else:
+            contar_carga('construcao', 'espera')
+    return {'versao': versao, 'atual': atual, 'construindo': construindo, 'progresso': progresso}
+
+
+def main():
+    return trabalhador(json.loads(sys.stdin.read()))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Filtros do dashboard (ciclo, local, status e gênero) e sua propagação entre
+alunos, inscrições e avaliações.
+
+Os valores escolhidos no sidebar - e os "clicados" nos gráficos - chegam como
+argumentos; nada aqui lê estado do Streamlit.
+"""
+
+import re
+
+import pandas as pd
+
+from metalab.perf import etapa
+from metalab.regioes import filtrar_local_inscricoes, palavras_chave_local
+from metalab.texto import aplicar_por_valor, contido_em, em_texto, valores_distintos
+
+# Colunas de identificação que relacionam alunos, inscrições e avaliações
+PALAVRAS_CHAVE_RELACAO = ['email', 'e-mail', 'nome', 'cpf', 'telefone', 'celular', 'whatsapp']
+PALAVRAS_ID_AVALIACAO = ['usuário', 'usuario', 'opinião', 'opiniao', 'pesquisa', 'email', 'e-mail', 'nome']
+
+
+def normalizar_ciclo(valor):
+    """Normaliza valores de ciclo (remove espaços e o '.0' do final)"""
+    if valor is None or pd.isna(valor):
+        return None
+    valor_str = str(valor).strip()
+    if valor_str.endswith('.0'):
+        valor_str = valor_str[:-2]
+    return valor_str.strip()
+
+
+def extrair_ciclo_da_pesquisa(valor):
+    """Extrai o número do ciclo do nome da pesquisa ('Avaliação MCOM 2 CICLO' -> '2')"""
+    if pd.isna(valor):
+        return None
+    valor_str = str(valor).upper().strip()
+    # Se contém "X CICLO" (ex: "2 CICLO", "3 CICLO")
+    match = re.search(r'(\d+)\s*CICLO', valor_str)
+    if match:
+        return match.group(1)
+    # Se não tem número de ciclo explícito, é ciclo 1
+    if 'AVALIAÇÃO' in valor_str and ('MCOM' in valor_str or 'MKT DIGITAL' in valor_str):
+        return '1'
+    return None
+
+
+def _mascara_vazia(df):
+    # Alinhada ao índice do DataFrame (que pode ter sido filtrado antes)
+    return pd.Series(False, index=df.index)
+
+
+def colunas_relacao(colunas_alunos, colunas_inscricoes):
+    """Pares (coluna do aluno, coluna da inscrição) que identificam a mesma pessoa"""
+    pares = []
+    for col_aluno in colunas_alunos:
+        col_aluno_lower = str(col_aluno).lower()
+        for col_inscricao in colunas_inscricoes:
+            col_inscricao_lower = str(col_inscricao).lower()
+            # Match exato ou match por palavra-chave
+            if (col_aluno_lower == col_inscricao_lower or
+                    any(palavra in col_aluno_lower and palavra in col_inscricao_lower for palavra in PALAVRAS_CHAVE_RELACAO)):
+                pares.append((col_aluno, col_inscricao))
+                break
+    return pares
+
+
+def _relacionar_inscricoes(alunos_filtrados, inscricoes_filtradas):
+    """Mantém só as inscrições cujas colunas de identificação batem com os alunos filtrados"""
+    pares = colunas_relacao(alunos_filtrados.columns, inscricoes_filtradas.columns)
+    if not pares:
+        return inscricoes_filtradas
+
+    valores_relacao = valores_distintos(em_texto(alunos_filtrados[col_aluno].dropna()).str.strip().str.upper()
+                                        for col_aluno, _ in pares)
+    if len(valores_relacao) == 0:
+        return inscricoes_filtradas
+
+    mask_inscricoes = _mascara_vazia(inscricoes_filtradas)
+    for _, col_inscricao in pares:
+        valores_inscricao = em_texto(inscricoes_filtradas[col_inscricao]).str.strip().str.upper()
+        mask_inscricoes |= contido_em(valores_inscricao, valores_relacao)
+    return inscricoes_filtradas[mask_inscricoes]
+
+
+def filtrar_status(alunos, status):
+    """Filtra alunos por status (opções do sidebar ou valor exato do STATUS)"""
+    if 'STATUS_NORMALIZADO' in alunos.columns:
+        if status == 'CURSANDO':
+            return alunos[alunos['STATUS_NORMALIZADO'] == 'CURSANDO']
+        if status == 'CONCLUÍDO':
+            return alunos[alunos['STATUS_NORMALIZADO'] == 'CONCLUÍDO']
+        if status == 'CURSANDO + CONCLUÍDO':
+            return alunos[alunos['STATUS_NORMALIZADO'].isin(['CURSANDO', 'CONCLUÍDO'])]
+        return alunos
+
+    if 'STATUS' in alunos.columns:
+        # Normalizar STATUS para comparação (case-insensitive e com regex)
+        status_upper = em_texto(alunos['STATUS']).str.upper().str.strip()
+        if status in ('CONCLUÍDO', 'CONCLUIDO'):
+            return alunos[status_upper.str.contains('CONCLUIDO|CONCLUÍDO', case=False, na=False, regex=True)]
+        if status == 'CURSANDO':
+            return alunos[status_upper.str.contains('CURSANDO|EM CURSO|EM ANDAMENTO', case=False, na=False, regex=True)]
+        if status in ('CONCLUIDO + CURSANDO', 'CURSANDO + CONCLUÍDO'):
+            return alunos[status_upper.str.contains('CONCLUIDO|CONCLUÍDO|CURSANDO|EM CURSO', case=False, na=False, regex=True)]
+        if status == 'DESISTENTE':
+            return alunos[status_upper.str.contains('DESISTENTE', case=False, na=False, regex=True)]
+        # Tentar match exato
+        return alunos[status_upper == status.upper()]
+    return alunos
+
+
+def aplicar_filtros(alunos, inscricoes, ciclo_selecionado, local_selecionado, status_selecionado,
+                    genero_selecionado, status_clicado=None, genero_clicado=None, regioes=None):
+    """
+    Aplica os filtros a alunos e inscrições - FILTROS RELACIONADOS.
+
+    status_clicado/genero_clicado (filtros interativos dos gráficos) têm
+    precedência sobre os selectboxes; regioes é a resolução das colunas de
+    local do snapshot (regioes.construir_regioes), opcional. Retorna
+    (alunos_filtrados, inscricoes_filtradas); sem filtros ativos, retorna os
+    próprios DataFrames de entrada.
+    """
+    alunos_filtrados = alunos
+    inscricoes_filtradas = inscricoes
+
+    # Filtro por ciclo (afeta alunos e pode afetar inscrições relacionadas)
+    if ciclo_selecionado != 'Todos' and 'CICLO' in alunos_filtrados.columns:
+        with etapa('filtro ciclo'):
+            alunos_filtrados = alunos_filtrados[em_texto(alunos_filtrados['CICLO']) == ciclo_selecionado]
+
+            # Se houver coluna de ciclo nas inscrições (CICLO ou outra com 'ciclo'), filtrar também
+            if 'CICLO' in inscricoes_filtradas.columns:
+                colunas_ciclo = ['CICLO']
+            else:
+                colunas_ciclo = [col for col in inscricoes_filtradas.columns if 'ciclo' in str(col).lower()][:1]
+            for col in colunas_ciclo:
+                inscricoes_filtradas = inscricoes_filtradas[em_texto(inscricoes_filtradas[col]) == str(ciclo_selecionado)]
+
+            inscricoes_filtradas = _relacionar_inscricoes(alunos_filtrados, inscricoes_filtradas)
+
+    # Filtro por local - RELAÇÃO INTELIGENTE com inscrições usando nomes de regiões
+    if local_selecionado != 'Todos' and 'LOCAL' in alunos_filtrados.columns:
+        with etapa('filtro local'):
+            alunos_filtrados = alunos_filtrados[alunos_filtrados['LOCAL'] == local_selecionado]
+            # Coluna LOCAL das inscrições e demais colunas de local/região (metalab.regioes)
+            palavras = palavras_chave_local(local_selecionado)
+            inscricoes_filtradas = filtrar_local_inscricoes(inscricoes_filtradas, palavras, regioes)
+
+    # Filtro por status (incluindo filtro interativo de gráfico)
+    status_final = status_clicado or status_selecionado
+    if status_final != 'Todos':
+        with etapa('filtro status'):
+            alunos_filtrados = filtrar_status(alunos_filtrados, status_final)
+            inscricoes_filtradas = _relacionar_inscricoes(alunos_filtrados, inscricoes_filtradas)
+
+    # Filtro por gênero - afeta inscrições E alunos (se houver coluna de sexo/gênero)
+    genero_final = genero_clicado or genero_selecionado
+    if genero_final != 'Todos':
+        with etapa('filtro gênero'):
+            genero_normalizado = genero_final.upper().strip()
+            if 'Sexo:' in inscricoes_filtradas.columns:
+                inscricoes_filtradas = inscricoes_filtradas[em_texto(inscricoes_filtradas['Sexo:']).str.upper().str.strip() == genero_normalizado]
+
+            for col in alunos_filtrados.columns:
+                col_lower = str(col).lower()
+                if 'sexo' in col_lower or 'genero' in col_lower or 'gênero' in col_lower:
+                    alunos_filtrados = alunos_filtrados[em_texto(alunos_filtrados[col]).str.upper().str.strip() == genero_normalizado]
+                    break
+
+    return alunos_filtrados, inscricoes_filtradas
+
+
+def mascara_ciclo_avaliacoes(avaliacoes, ciclo, usar_pesquisa=True, usar_colunas=True):
+    """Avaliações do ciclo: coluna CICLO, nome da Pesquisa e demais colunas com 'ciclo'"""
+    ciclo_normalizado = normalizar_ciclo(ciclo)
+    mask = _mascara_vazia(avaliacoes)
+    for col in avaliacoes.columns:
+        if col == 'Pesquisa':
+            if usar_pesquisa:
+                mask |= aplicar_por_valor(avaliacoes['Pesquisa'], extrair_ciclo_da_pesquisa) == ciclo_normalizado
+        elif usar_colunas and 'ciclo' in str(col).lower():
+            mask |= aplicar_por_valor(avaliacoes[col], normalizar_ciclo) == ciclo_normalizado
+    return mask
+
+
+def _linhas(tabela):
+    return tabela if isinstance(tabela, int) else len(tabela)
+
+
+def filtrar_avaliacoes(avaliacoes, alunos_filtrados, inscricoes_filtradas, alunos_originais,
+                       inscricoes_originais, ciclo_selecionado):
+    """
+    Filtra avaliações (pivotadas) baseado nos filtros aplicados em alunos e inscrições.
+
+    Das tabelas originais só o tamanho importa: alunos_originais e
+    inscricoes_originais podem ser os DataFrames ou seus números de linhas.
+    """
+    if avaliacoes is None or len(avaliacoes) == 0:
+        return avaliacoes
+
+    avaliacoes_filtradas = avaliacoes
+    so_ciclo = (len(alunos_filtrados) == _linhas(alunos_originais)
+                and len(inscricoes_filtradas) == _linhas(inscricoes_originais))
+
+    # Aplicar filtro de ciclo primeiro (CICLO, Pesquisa e outras colunas de ciclo)
+    if ciclo_selecionado != 'Todos':
+        mask_ciclo = mascara_ciclo_avaliacoes(avaliacoes, ciclo_selecionado)
+        if mask_ciclo.any():
+            avaliacoes_filtradas = avaliacoes[mask_ciclo]
+
+    # Se não há outros filtros aplicados além do ciclo, retornar avaliações filtradas por ciclo
+    if so_ciclo:
+        return avaliacoes_filtradas
+
+    # Relacionar avaliações com alunos/inscrições filtrados através de colunas de identificação
+    valores_relacao = valores_distintos(em_texto(df[col].dropna()).str.strip().str.upper()
+                                        for df in (alunos_filtrados, inscricoes_filtradas) for col in df.columns
+                                        if any(palavra in str(col).lower() for palavra in PALAVRAS_CHAVE_RELACAO))
+
+    id_col_avaliacoes = None
+    for col in avaliacoes_filtradas.columns:
+        if any(palavra in str(col).lower() for palavra in PALAVRAS_ID_AVALIACAO):
+            id_col_avaliacoes = col
+            break
+
+    if id_col_avaliacoes and len(valores_relacao) > 0:
+        valores_avaliacoes = em_texto(avaliacoes_filtradas[id_col_avaliacoes]).str.strip().str.upper()
+        avaliacoes_filtradas = avaliacoes_filtradas[contido_em(valores_avaliacoes, valores_relacao)]
+
+    # Se não conseguiu relacionar mas filtrou por ciclo, manter o filtro de ciclo
+    # (primeiro pela Pesquisa, depois pela coluna CICLO)
+    if len(avaliacoes_filtradas) == 0 and ciclo_selecionado != 'Todos':
+        mascaras = []
+        if 'Pesquisa' in avaliacoes.columns:
+            mascaras.append(mascara_ciclo_avaliacoes(avaliacoes, ciclo_selecionado, usar_colunas=False))
+        if 'CICLO' in avaliacoes.columns:
+            mascaras.append(aplicar_por_valor(avaliacoes['CICLO'], normalizar_ciclo) == normalizar_ciclo(ciclo_selecionado))
+        for mask in mascaras:
+            if mask.any():
+                return avaliacoes[mask]
+
+    return avaliacoes_filtradas
+
+
+def selecionar_avaliacoes(avaliacoes_originais, avaliacoes_filtradas, ciclo_selecionado):
+    """
+    Avaliações exibidas no dashboard: as filtradas quando houver; senão, com
+    ciclo selecionado, as do ciclo (pela Pesquisa ou pela coluna CICLO); senão todas.
+    """
+    if avaliacoes_filtradas is not None and len(avaliacoes_filtradas) > 0:
+        avaliacoes = avaliacoes_filtradas
+    else:
+        avaliacoes = avaliacoes_originais
+        if ciclo_selecionado != 'Todos' and avaliacoes_originais is not None and len(avaliacoes_originais) > 0:
+            if 'Pesquisa' in avaliacoes_originais.columns:
+                mask = mascara_ciclo_avaliacoes(avaliacoes_originais, ciclo_selecionado, usar_colunas=False)
+            elif 'CICLO' in avaliacoes_originais.columns:
+                mask = aplicar_por_valor(avaliacoes_originais['CICLO'], normalizar_ciclo) == normalizar_ciclo(ciclo_selecionado)
+            else:
+                mask = None
+            if mask is not None and mask.any():
+                avaliacoes = avaliacoes_originais[mask]
+
+    # Garantir a filtragem por ciclo mesmo se os filtros acima não reduziram nada
+    if (ciclo_selecionado != 'Todos' and avaliacoes is not None and len(avaliacoes) > 0
+            and len(avaliacoes) == len(avaliacoes_originais) and 'Pesquisa' in avaliacoes.columns):
+        mask = mascara_ciclo_avaliacoes(avaliacoes, ciclo_selecionado, usar_colunas=False)
+        if mask.any():
+            avaliacoes = avaliacoes[mask]
+
+    return avaliacoes
+
+
+def filtrar_respostas_long(avaliacoes_long, avaliacoes_originais, avaliacoes):
+    """Linhas do formato longo pertencentes às avaliações exibidas (via avaliacao_id)"""
+    if (avaliacoes_long is None or avaliacoes is None or 'avaliacao_id' not in avaliacoes_long.columns
+            or len(avaliacoes) == len(avaliacoes_originais)):
+        return avaliacoes_long
+    return avaliacoes_long[avaliacoes_long['avaliacao_id'].isin(avaliacoes.index)]
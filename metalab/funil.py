@@ -0,0 +1,221 @@
+"""
+Funil inscrição -> matrícula -> conclusão.
+
+Cada inscrição é ligada ao aluno da mesma pessoa pelas chaves de
+identificação normalizadas (e-mail, CPF, telefone; o nome só quando as
+tabelas não têm nenhuma outra em comum), numa passada vetorizada por tipo de
+chave: as chaves das duas tabelas são fatoradas juntas e cada código fica com
+o aluno de etapa mais avançada. O resultado é uma etapa por inscrição,
+calculada uma vez por snapshot (pré-processamento offline ou carga do
+dashboard). Com qualquer filtro, o funil e as taxas por canal, região e ciclo
+são bincounts sobre as inscrições selecionadas, sem refazer a junção.
+"""
+
+import numpy as np
+import pandas as pd
+
+from metalab.colunas import COLUNA_REGIAO_INSCRICAO
+from metalab.normalizacao import remover_acentos
+from metalab.texto import aplicar_por_valor, em_texto
+
+ETAPAS_FUNIL = ['Inscrições', 'Matrículas', 'Conclusões']
+SEM_MATRICULA = 'Sem matrícula'
+SEM_CICLO = 'Não informado'
+
+# Tipo de chave -> palavras do nome da coluna, na ordem de preferência da ligação
+TIPOS_IDENTIDADE = {
+    'email': ['email', 'e-mail'],
+    'cpf': ['cpf'],
+    'telefone': ['telefone', 'celular', 'whatsapp'],
+    'nome': ['nome'],
+}
+
+# Dimensão -> (array de códigos, array de valores, rótulo); 'canal' vem de metalab.canais
+DIMENSOES_FUNIL = {
+    'canal': (None, None, 'Canal'),
+    'regiao': ('regiao', 'regioes', 'Região'),
+    'ciclo': ('ciclo', 'ciclos', 'Ciclo'),
+}
+
+# Arrays do funil (nome -> descrição), gravados no bundle e no armazém
+ARRAYS_FUNIL = {
+    'ids': 'índice (rótulo) de cada linha das inscrições',
+    'aluno': 'posição do aluno ligado a cada inscrição (-1 = nenhum)',
+    'etapa': 'etapa de cada inscrição (0 = inscrição, 1 = matrícula, 2 = conclusão)',
+    'regiao': 'código da região de cada inscrição (-1 = vazio)',
+    'regioes': 'regiões distintas',
+    'ciclo': 'código do ciclo do aluno ligado a cada inscrição (-1 = sem matrícula)',
+    'ciclos': 'ciclos distintos',
+}
+
+
+def _coluna_identidade(df, palavras):
+    for col in df.columns:
+        if any(palavra in str(col).lower() for palavra in palavras):
+            return col
+    return None
+
+
+def _normalizar_chave(serie, tipo):
+    """Chave comparável de um tipo de identificação; nulos e valores vazios viram NaN"""
+    texto = em_texto(serie).str.strip()
+    if tipo == 'email':
+        chave = texto.str.lower()
+    elif tipo in ('cpf', 'telefone'):
+        chave = texto.str.replace(r'\D', '', regex=True)
+        if tipo == 'telefone':
+            # Sem o código do país: 55 61 9xxxx-xxxx e 61 9xxxx-xxxx são o mesmo telefone
+            chave = chave.str.replace(r'^55(?=\d{10,11}$)', '', regex=True)
+    else:
+        chave = aplicar_por_valor(texto.str.upper(), remover_acentos).str.replace(r'\s+', ' ', regex=True)
+    return chave.where(serie.notna() & ~chave.isin(['', 'nan']))
+
+
+def colunas_identidade(df):
+    """Coluna de cada tipo de identificação (TIPOS_IDENTIDADE) presente em df: tipo -> coluna"""
+    colunas = {}
+    for tipo, palavras in TIPOS_IDENTIDADE.items():
+        col = _coluna_identidade(df, palavras)
+        if col is not None:
+            colunas[tipo] = col
+    return colunas
+
+
+def etapa_alunos(alunos):
+    """Etapa de cada aluno: 2 se concluiu, senão 1 (matriculado)"""
+    if 'STATUS_NORMALIZADO' not in alunos.columns:
+        return np.ones(len(alunos), dtype=np.int8)
+    return np.where((alunos['STATUS_NORMALIZADO'] == 'CONCLUÍDO').to_numpy(), 2, 1).astype(np.int8)
+
+
+def ligar_inscricoes_alunos(inscricoes, alunos, etapas=None):
+    """
+    Posição do aluno ligado a cada inscrição (-1 = nenhum). Havendo mais de um
+    aluno com a mesma chave (ex.: a pessoa cursou dois ciclos), fica o de etapa
+    mais avançada e, entre eles, o primeiro.
+    """
+    etapas = etapa_alunos(alunos) if etapas is None else etapas
+    colunas_inscricoes, colunas_alunos = colunas_identidade(inscricoes), colunas_identidade(alunos)
+    tipos = [tipo for tipo in TIPOS_IDENTIDADE if tipo in colunas_inscricoes and tipo in colunas_alunos]
+    if len(tipos) > 1 and 'nome' in tipos:
+        tipos.remove('nome')  # Nomes se repetem; só servem quando não há outra chave
+
+    # Pontuação de cada aluno: etapa mais avançada primeiro, depois a menor posição
+    n_alunos = len(alunos)
+    pontos_aluno = etapas.astype(np.int64) * n_alunos + (n_alunos - 1 - np.arange(n_alunos))
+    pontos = np.full(len(inscricoes), -1, dtype=np.int64)
+    for tipo in tipos:
+        chaves = [_normalizar_chave(alunos[colunas_alunos[tipo]], tipo),
+                  _normalizar_chave(inscricoes[colunas_inscricoes[tipo]], tipo)]
+        codigos, valores = pd.factorize(pd.concat(chaves, ignore_index=True))
+        codigos_alunos, codigos_inscricoes = codigos[:n_alunos], codigos[n_alunos:]
+        melhor = np.full(len(valores) + 1, -1, dtype=np.int64)  # último: código -1 (sem chave)
+        com_chave = codigos_alunos >= 0
+        np.maximum.at(melhor, codigos_alunos[com_chave], pontos_aluno[com_chave])
+        np.maximum(pontos, melhor[codigos_inscricoes], out=pontos)
+    return np.where(pontos >= 0, n_alunos - 1 - pontos % max(n_alunos, 1), -1)
+
+
+def construir_funil(inscricoes, alunos):
+    """
+    Etapa de cada inscrição e códigos das dimensões do funil (dict de arrays,
+    ver ARRAYS_FUNIL); None sem inscrições ou alunos, ou com índice não numérico.
+    """
+    if inscricoes is None or alunos is None or len(inscricoes) == 0:
+        return None
+    if not pd.api.types.is_integer_dtype(inscricoes.index.dtype):
+        return None
+
+    etapas_alunos = etapa_alunos(alunos)
+    aluno = ligar_inscricoes_alunos(inscricoes, alunos, etapas_alunos)
+    ligado = aluno >= 0
+    etapa = np.zeros(len(inscricoes), dtype=np.int8)
+    etapa[ligado] = etapas_alunos[aluno[ligado]]
+
+    if COLUNA_REGIAO_INSCRICAO in inscricoes.columns:
+        regiao, regioes = pd.factorize(inscricoes[COLUNA_REGIAO_INSCRICAO], sort=True)
+    else:
+        regiao, regioes = np.full(len(inscricoes), -1), []
+    ciclo = np.full(len(inscricoes), -1, dtype=np.int64)
+    ciclos = []
+    if 'CICLO' in alunos.columns:
+        ciclos_alunos = em_texto(alunos['CICLO']).where(alunos['CICLO'].notna(), SEM_CICLO)
+        codigos_ciclo, ciclos = pd.factorize(ciclos_alunos, sort=True)
+        ciclo[ligado] = codigos_ciclo[aluno[ligado]]
+
+    return {
+        'ids': inscricoes.index.to_numpy(dtype=np.int64),
+        'aluno': aluno.astype(np.int32),
+        'etapa': etapa,
+        'regiao': np.asarray(regiao, dtype=np.int32),
+        'regioes': np.array([str(valor) for valor in regioes], dtype=str),
+        'ciclo': ciclo.astype(np.int32),
+        'ciclos': np.array([str(valor) for valor in ciclos], dtype=str),
+    }
+
+
+def _inscricoes_selecionadas(funil, inscricoes):
+    """Máscara das inscrições do funil presentes em inscricoes (já filtradas); None = todas"""
+    if len(inscricoes) == len(funil['ids']):
+        return None
+    return np.isin(funil['ids'], inscricoes.index.to_numpy())
+
+
+def _acumular(por_etapa):
+    """Contagens por etapa exata -> por etapa alcançada (quem concluiu também se matriculou)"""
+    return np.cumsum(por_etapa[..., ::-1], axis=-1)[..., ::-1]
+
+
+def contar_funil(funil, inscricoes):
+    """Inscrições que chegaram a cada etapa (ETAPAS_FUNIL) entre as linhas de inscricoes"""
+    etapa = funil['etapa']
+    selecionadas = _inscricoes_selecionadas(funil, inscricoes)
+    if selecionadas is not None:
+        etapa = etapa[selecionadas]
+    contagens = _acumular(np.bincount(etapa, minlength=len(ETAPAS_FUNIL)))
+    return pd.Series(contagens, index=pd.Index(ETAPAS_FUNIL, name='Etapa'), name='Inscrições')
+
+
+def _tabela_conversao(por_etapa, rotulos, nome):
+    tabela = pd.DataFrame(_acumular(por_etapa), index=pd.Index(rotulos, name=nome), columns=ETAPAS_FUNIL)
+    tabela = tabela[tabela['Inscrições'] > 0]
+    tabela['% Matrícula'] = (100 * tabela['Matrículas'] / tabela['Inscrições']).round(1)
+    tabela['% Conclusão'] = (100 * tabela['Conclusões'] / tabela['Inscrições']).round(1)
+    return tabela.sort_values('Inscrições', ascending=False, kind='stable')
+
+
+def funil_por_dimensao(funil, inscricoes, dimensao, canais=None):
+    """
+    Etapas e taxas de conversão (%) por 'regiao', 'ciclo' (do aluno ligado;
+    inscrições sem matrícula ficam em SEM_MATRICULA) ou 'canal' (tabela de
+    metalab.canais; quem marcou vários canais conta em cada um). None se a
+    dimensão não estiver disponível.
+    """
+    n_etapas = len(ETAPAS_FUNIL)
+    selecionadas = _inscricoes_selecionadas(funil, inscricoes)
+    if dimensao == 'canal':
+        if canais is None or len(canais['ids']) != len(funil['ids']):
+            return None
+        linhas, codigos = canais['linhas'], canais['codigos'].astype(np.int64)
+        if selecionadas is not None:
+            manter = selecionadas[linhas]
+            linhas, codigos = linhas[manter], codigos[manter]
+        rotulos = list(canais['canais'])
+        por_etapa = np.bincount(codigos * n_etapas + funil['etapa'][linhas], minlength=len(rotulos) * n_etapas)
+        return _tabela_conversao(por_etapa.reshape(-1, n_etapas), rotulos, DIMENSOES_FUNIL['canal'][2])
+
+    if dimensao not in DIMENSOES_FUNIL:
+        return None
+    array_codigos, array_valores, nome = DIMENSOES_FUNIL[dimensao]
+    if len(funil[array_valores]) == 0:
+        return None
+    codigos, etapa = funil[array_codigos].astype(np.int64), funil['etapa']
+    if selecionadas is not None:
+        codigos, etapa = codigos[selecionadas], etapa[selecionadas]
+    rotulos = list(funil[array_valores])
+    if dimensao == 'ciclo':
+        rotulos.append(SEM_MATRICULA)
+    com_valor = codigos >= 0 if dimensao == 'regiao' else np.ones(len(codigos), dtype=bool)
+    codigos = np.where(codigos >= 0, codigos, len(rotulos) - 1)
+    por_etapa = np.bincount(codigos[com_valor] * n_etapas + etapa[com_valor], minlength=len(rotulos) * n_etapas)
+    return _tabela_conversao(por_etapa.reshape(-1, n_etapas), rotulos, nome)
@@ -0,0 +1,431 @@
+"""
+Figuras Plotly do dashboard.
+
+Cada função recebe os dados (já filtrados) ou as contagens e retorna a figura
+pronta, ou None quando não há dados para o gráfico. Os templates do tema
+(metalab.tema) precisam estar registrados antes de montar as figuras.
+
+As contagens usam `contar(df, coluna, normalizar=None)` e `cruzar(df, linhas,
+colunas)` - pandas por padrão (agregados.contar_valores/tabela_cruzada) ou os
+equivalentes SQL de metalab.motor_sql.
+"""
+
+import pandas as pd
+import plotly.express as px
+
+from metalab.agregados import calcular_idades, contar_faixas_etarias, contar_renda, contar_valores, tabela_cruzada
+from metalab.colunas import (COLUNA_CANAIS_INSCRICAO, COLUNA_HORARIO, COLUNA_REGIAO_INSCRICAO,
+                             coluna_raca, coluna_sabendo_curso, coluna_sexo)
+from metalab.canais import construir_canais, contar_canais
+from metalab.comparacao import diferencas, percentuais
+from metalab.normalizacao import ORDEM_RESPOSTAS_AVALIACAO
+from metalab.payload import LIMITE_CATEGORIAS_GRAFICO, agrupar_top_n
+from metalab.perf import ETAPA_RERUN
+from metalab.tema import (CORES_METALAB, CORES_STATUS, ESCALA_AZUL, ESCALA_LARANJA, ESCALA_VERDE,
+                          ESCALA_VERMELHA, PALETA_METALAB, TEMPLATE_AVALIACAO)
+
+# Acima disso (ex.: série diária de anos) a linha temporal fica sem marcadores
+LIMITE_PONTOS_MARCADORES = 120
+
+
+def _barras_contagem(contagens, titulo, rotulo_categoria, escala, horizontal=False, rotulo_valor='Quantidade'):
+    """Barras de um value_counts com cor proporcional à quantidade"""
+    eixo_categoria, eixo_valor = ('y', 'x') if horizontal else ('x', 'y')
+    argumentos = {eixo_categoria: contagens.index, eixo_valor: contagens.values}
+    return px.bar(
+        **argumentos,
+        orientation='h' if horizontal else None,
+        title=titulo,
+        labels={eixo_valor: rotulo_valor, eixo_categoria: rotulo_categoria},
+        color=contagens.values,
+        color_continuous_scale=escala
+    )
+
+
+def grafico_sexo(alunos, contar=contar_valores):
+    """Distribuição por sexo (dados de ALUNOS)"""
+    if alunos is None or len(alunos) == 0:
+        return None
+    col_sexo = coluna_sexo(alunos)
+    if col_sexo is None:
+        return None
+
+    sexo_counts = contar(alunos, col_sexo)
+    if len(sexo_counts) == 0:
+        return None
+    fig = px.pie(
+        values=sexo_counts.values,
+        names=sexo_counts.index,
+        title="Distribuição por Sexo",
+        color_discrete_sequence=PALETA_METALAB
+    )
+    fig.update_traces(hovertemplate="Sexo: %{label}<br>Quantidade: %{value}<extra></extra>")
+    return fig
+
+
+def grafico_idade(alunos):
+    """Distribuição por idade agrupada em faixas etárias (dados de ALUNOS)"""
+    idades = calcular_idades(alunos)
+    if idades is None:
+        return None
+    idade_counts = contar_faixas_etarias(idades)
+    if len(idade_counts) == 0:
+        return None
+
+    fig = px.bar(
+        x=idade_counts.index.astype(str),
+        y=idade_counts.values,
+        title="Distribuição por Idade",
+        labels={'x': 'Faixa Etária', 'y': 'Quantidade'},
+        color=idade_counts.values,
+        color_continuous_scale=ESCALA_AZUL
+    )
+    fig.update_traces(
+        hovertemplate="Faixa Etária: %{x} anos<br>Quantidade: %{y}<extra></extra>",
+        marker_line_color='rgba(92, 107, 192, 0.5)',
+        marker_line_width=1
+    )
+    fig.update_layout(
+        xaxis=dict(title="Faixa Etária (anos)", tickangle=-45),
+        yaxis=dict(title="Quantidade de Alunos")
+    )
+    return fig
+
+
+def grafico_raca(alunos, contar=contar_valores):
+    """Distribuição por raça/cor (dados de ALUNOS)"""
+    if alunos is None or len(alunos) == 0:
+        return None
+    col_raca = coluna_raca(alunos)
+    if col_raca is None:
+        return None
+
+    raca_counts = contar(alunos, col_raca)
+    if len(raca_counts) == 0:
+        return None
+    fig = _barras_contagem(raca_counts, "Distribuição por Raça/Cor (IBGE)", 'Raça/Cor', ESCALA_AZUL, horizontal=True)
+    fig.update_traces(hovertemplate="Raça/Cor: %{y}<br>Quantidade: %{x}<extra></extra>")
+    return fig
+
+
+def grafico_renda(alunos, contar=contar_valores):
+    """Distribuição por renda familiar, da menor para a maior faixa (dados de ALUNOS)"""
+    if alunos is None or len(alunos) == 0:
+        return None
+    renda_counts = contar_renda(alunos, contar)
+    if renda_counts is None:
+        return None
+    fig = _barras_contagem(renda_counts, "Distribuição por Renda Familiar", 'Renda', ESCALA_VERDE, horizontal=True)
+    fig.update_traces(hovertemplate="Renda: %{y}<br>Quantidade: %{x}<extra></extra>")
+    return fig
+
+
+def grafico_canais_inscricao(inscricoes, canais=None):
+    """
+    Inscrições que citaram cada canal de comunicação (maiores categorias +
+    'Outros'). canais: tabela de metalab.canais das inscrições originais; sem
+    ela, as respostas filtradas são separadas aqui.
+    """
+    if COLUNA_CANAIS_INSCRICAO not in inscricoes.columns:
+        return None
+    if canais is None:
+        inscricoes = inscricoes.reset_index(drop=True)
+        canais = construir_canais(inscricoes)
+    canais_inscricao = agrupar_top_n(contar_canais(canais, inscricoes))
+    if len(canais_inscricao) == 0:
+        return None
+    fig = _barras_contagem(canais_inscricao, "Canais de Comunicação - Inscrições", 'Canal', ESCALA_LARANJA, horizontal=True)
+    fig.update_traces(hovertemplate="Canal: %{y}<br>Quantidade: %{x}<extra></extra>")
+    return fig
+
+
+def grafico_coocorrencia_canais(matriz):
+    """Mapa de calor de canais.coocorrencia_canais: inscrições que citaram os dois canais"""
+    if matriz is None or len(matriz) < 2:
+        return None
+    fig = px.imshow(
+        matriz,
+        text_auto=True,
+        title="Canais Citados Juntos - Inscrições",
+        labels={'x': 'Canal', 'y': 'Canal', 'color': 'Inscrições'},
+        color_continuous_scale=ESCALA_LARANJA[::-1],
+        aspect='auto'
+    )
+    fig.update_traces(hovertemplate="%{y} + %{x}<br>Inscrições: %{z}<extra></extra>")
+    return fig
+
+
+def grafico_funil(contagens):
+    """Funil inscrição -> matrícula -> conclusão (saída de funil.contar_funil)"""
+    if contagens is None or contagens.iloc[0] == 0:
+        return None
+    fig = px.funnel(
+        x=contagens.values,
+        y=contagens.index,
+        title="Funil: Inscrição → Matrícula → Conclusão",
+        labels={'x': 'Inscrições', 'y': 'Etapa'},
+        color_discrete_sequence=[CORES_METALAB['secondary']]
+    )
+    fig.update_traces(textinfo='value+percent initial',
+                      hovertemplate="%{y}: %{x}<br>%{percentInitial:.1%} das inscrições<extra></extra>")
+    return fig
+
+
+def grafico_conversao(tabela, limite=LIMITE_CATEGORIAS_GRAFICO):
+    """Taxas de matrícula e conclusão (%) por categoria (saída de funil.funil_por_dimensao)"""
+    if tabela is None or len(tabela) == 0:
+        return None
+    tabela = tabela.head(limite)
+    dimensao = tabela.index.name
+    taxas = tabela[['% Matrícula', '% Conclusão']].reset_index().melt(
+        id_vars=dimensao, var_name='Taxa', value_name='Percentual')
+    fig = px.bar(
+        taxas,
+        x=dimensao,
+        y='Percentual',
+        color='Taxa',
+        barmode='group',
+        title=f"Conversão por {dimensao}",
+        labels={'Percentual': '% das inscrições'},
+        color_discrete_sequence=[CORES_METALAB['secondary'], CORES_METALAB['success']]
+    )
+    fig.update_traces(hovertemplate="%{x}<br>%{y:.1f}%<extra></extra>")
+    return fig
+
+
+def grafico_comparacao(tabela, titulo, deltas=False, limite=LIMITE_CATEGORIAS_GRAFICO):
+    """
+    Distribuição por ciclo (tabela valor x ciclo de comparacao.comparar_ciclos)
+    em % de cada ciclo, lado a lado, ou com deltas=True em pontos percentuais
+    de diferença para o primeiro ciclo.
+    """
+    if tabela is None or len(tabela) == 0 or (deltas and tabela.shape[1] < 2):
+        return None
+    percentual = percentuais(tabela.head(limite))
+    valores = diferencas(percentual) if deltas else percentual
+    categoria = tabela.index.name or 'Categoria'
+    rotulo_valor = f"Diferença para {tabela.columns[0]} (p.p.)" if deltas else '% do ciclo'
+    longa = valores.rename_axis(index=categoria, columns='Ciclo').reset_index().melt(
+        id_vars=categoria, var_name='Ciclo', value_name='Valor')
+    longa['Ciclo'] = longa['Ciclo'].astype(str)
+    fig = px.bar(
+        longa,
+        x=categoria,
+        y='Valor',
+        color='Ciclo',
+        barmode='group',
+        title=titulo,
+        labels={'Valor': rotulo_valor},
+        color_discrete_sequence=PALETA_METALAB
+    )
+    fig.update_traces(hovertemplate="%{x}<br>%{y:+.1f} p.p.<extra></extra>" if deltas
+                      else "%{x}<br>%{y:.1f}%<extra></extra>")
+    return fig
+
+
+def grafico_canais_avaliacao(avaliacoes, contar=contar_valores):
+    """Canais de divulgação citados nas avaliações (pizza)"""
+    coluna_canal = coluna_sabendo_curso(avaliacoes)
+    if coluna_canal is None:
+        return None
+    canais_avaliacao = contar(avaliacoes, coluna_canal)
+    return px.pie(
+        values=canais_avaliacao.values,
+        names=canais_avaliacao.index,
+        title="Canais de Divulgação - Avaliações",
+        color_discrete_sequence=PALETA_METALAB
+    )
+
+
+def grafico_status(alunos, contar=contar_valores):
+    """Distribuição de status (pizza)"""
+    status_counts = contar(alunos, 'STATUS')
+    return px.pie(
+        values=status_counts.values,
+        names=status_counts.index,
+        title="Distribuição de Status",
+        color_discrete_map=dict(CORES_STATUS, OUTROS='#90caf9')
+    )
+
+
+def grafico_status_curso(alunos, cruzar=tabela_cruzada):
+    """Status por curso (barras agrupadas); None sem coluna CURSO"""
+    if 'CURSO' not in alunos.columns:
+        return None
+    status_curso = cruzar(alunos, 'CURSO', 'STATUS')
+    return px.bar(
+        status_curso,
+        title="Status por Curso",
+        labels={'value': 'Quantidade', 'index': 'Curso'},
+        barmode='group',
+        color_discrete_map=CORES_STATUS
+    )
+
+
+def grafico_respostas(contagens, titulo, rotulo_resposta, escala, horizontal=False):
+    """
+    Barras de respostas de uma pergunta de avaliação com quantidade e percentual
+    no texto. Horizontais ficam ordenadas da menor para a maior (maior no topo).
+    """
+    if contagens is None or len(contagens) == 0:
+        return None
+    total_respostas = contagens.sum()
+    if horizontal:
+        contagens = contagens.sort_values(ascending=True)
+
+    eixo_resposta, eixo_valor = ('y', 'x') if horizontal else ('x', 'y')
+    argumentos = {eixo_resposta: contagens.index, eixo_valor: contagens.values}
+    fig = px.bar(
+        **argumentos,
+        orientation='h' if horizontal else None,
+        title=f"{titulo} (Total: {total_respostas} respostas)",
+        template=TEMPLATE_AVALIACAO,
+        labels={eixo_resposta: rotulo_resposta, eixo_valor: 'Quantidade de Respostas'},
+        color=contagens.values,
+        color_continuous_scale=escala,
+        text=contagens.values
+    )
+    fig.update_traces(
+        texttemplate='%{text} respostas<br>(%{customdata:.1f}%)',
+        hovertemplate=('<b>%{' + eixo_resposta + '}</b><br>Quantidade: %{' + eixo_valor + '} respostas'
+                       '<br>Percentual: %{customdata:.1f}%<extra></extra>'),
+        customdata=(contagens.values / total_respostas * 100)
+    )
+    return fig
+
+
+def grafico_satisfacao(contagens, titulo):
+    """Pizza de satisfação com quantidade e percentual de cada resposta"""
+    total_respostas = contagens.sum() if len(contagens) > 0 else 0
+    fig = px.pie(
+        values=contagens.values,
+        names=contagens.index,
+        title=f"{titulo} (Total: {total_respostas} respostas)",
+        template=TEMPLATE_AVALIACAO,
+        color_discrete_sequence=PALETA_METALAB
+    )
+    fig.update_traces(
+        textinfo='label+value+percent',
+        texttemplate='%{label}<br>%{value} respostas<br>(%{percent})',
+        hovertemplate='<b>%{label}</b><br>Quantidade: %{value} respostas<br>Percentual: %{percent}<extra></extra>'
+    )
+    return fig
+
+
+def grafico_matriz_respostas(matriz, extras=5):
+    """
+    Mapa de calor de agregados.matriz_respostas: percentual de cada resposta
+    por pergunta (quantidade no hover). Mantém as respostas de escala e as
+    `extras` demais mais citadas; o restante é somado em 'Outras'. None sem a matriz.
+    """
+    if matriz is None or matriz.empty:
+        return None
+    demais = [resposta for resposta in matriz.columns if resposta not in ORDEM_RESPOSTAS_AVALIACAO]
+    if len(demais) > extras:
+        outras = matriz[demais[extras:]].sum(axis=1)
+        matriz = matriz.drop(columns=demais[extras:])
+        matriz['Outras'] = matriz.get('Outras', 0) + outras
+    percentuais = matriz.div(matriz.sum(axis=1).replace(0, 1), axis=0) * 100
+    fig = px.imshow(
+        percentuais,
+        text_auto='.0f',
+        title="Visão Geral das Avaliações (% das respostas de cada pergunta)",
+        labels={'x': 'Resposta', 'y': 'Pergunta', 'color': '%'},
+        color_continuous_scale=ESCALA_AZUL,
+        template=TEMPLATE_AVALIACAO,
+        aspect='auto'
+    )
+    fig.update_traces(customdata=matriz.to_numpy(),
+                      hovertemplate="%{y}<br>%{x}: %{customdata} respostas (%{z:.1f}%)<extra></extra>")
+    return fig
+
+
+def grafico_regiao(inscricoes, contar=contar_valores):
+    """Inscrições por região (maiores categorias + 'Outros')"""
+    if COLUNA_REGIAO_INSCRICAO not in inscricoes.columns:
+        return None
+    regiao_counts = agrupar_top_n(contar(inscricoes, COLUNA_REGIAO_INSCRICAO))
+    return _barras_contagem(regiao_counts, "Inscrições por Região", 'Região', ESCALA_VERMELHA, horizontal=True)
+
+
+def grafico_local(alunos, contar=contar_valores):
+    """Alunos por local (maiores categorias + 'Outros')"""
+    if 'LOCAL' not in alunos.columns:
+        return None
+    local_counts = agrupar_top_n(contar(alunos, 'LOCAL'))
+    return _barras_contagem(local_counts, "Alunos por Local", 'Local', ESCALA_VERDE, horizontal=True)
+
+
+def grafico_temporal(por_periodo, acumulado=False):
+    """
+    Evolução das inscrições (saída de temporal.agregar_serie ou de
+    agregados.inscricoes_por_mes), com a média móvel tracejada se houver a coluna.
+    """
+    fig = px.line(
+        por_periodo,
+        x='Data',
+        y='Quantidade',
+        title="Inscrições Acumuladas ao Longo do Tempo" if acumulado else "Evolução de Inscrições ao Longo do Tempo",
+        markers=len(por_periodo) <= LIMITE_PONTOS_MARCADORES,
+        labels={'Quantidade': 'Número de Inscrições', 'Data': 'Data'}
+    )
+    fig.update_traces(line_color=CORES_METALAB['light'], line_width=3)
+    if 'Média móvel' in por_periodo.columns:
+        fig.update_traces(name='Inscrições', showlegend=True)
+        fig.add_scatter(x=por_periodo['Data'], y=por_periodo['Média móvel'], mode='lines', name='Média móvel',
+                        line=dict(color=CORES_METALAB['secondary'], width=2, dash='dash'))
+    return fig
+
+
+def grafico_horario(avaliacoes, contar=contar_valores):
+    """Distribuição das avaliações por horário do curso"""
+    if COLUNA_HORARIO not in avaliacoes.columns:
+        return None
+    horario_counts = contar(avaliacoes, COLUNA_HORARIO)
+    return _barras_contagem(horario_counts, "Distribuição por Horário do Curso", 'Horário', ESCALA_VERMELHA)
+
+
+def grafico_termos(frequencias):
+    """Termos mais frequentes nas respostas encontradas pela busca (saída de busca.frequencia_termos)"""
+    if frequencias is None or len(frequencias) == 0:
+        return None
+    return _barras_contagem(frequencias.sort_values(ascending=True), "Termos Mais Frequentes nos Comentários",
+                            'Termo', ESCALA_AZUL, horizontal=True, rotulo_valor='Respostas')
+
+
+def grafico_perfil(resultado):
+    """
+    Linha do tempo das etapas de um rerun (saída de perf.finalizar_perfil), em
+    estilo flame graph: o rerun inteiro no topo e cada nível de aninhamento abaixo.
+    """
+    etapas = pd.DataFrame([{'etapa': ETAPA_RERUN, 'caminho': ETAPA_RERUN, 'nivel': -1,
+                            'inicio_ms': 0.0, 'duracao_ms': resultado['total_ms']}] + resultado['etapas'])
+    etapas['nivel'] += 1
+    fig = px.bar(
+        etapas,
+        x='duracao_ms',
+        y='nivel',
+        base='inicio_ms',
+        orientation='h',
+        text='etapa',
+        custom_data=['caminho', 'inicio_ms'],
+        title=f"Etapas do Rerun (Total: {resultado['total_ms']:,.0f} ms)",
+        labels={'duracao_ms': 'ms', 'nivel': 'Nível'},
+        color='duracao_ms',
+        color_continuous_scale=ESCALA_LARANJA
+    )
+    fig.update_traces(
+        textposition='inside',
+        insidetextanchor='start',
+        marker_line_color='rgba(0, 0, 0, 0.4)',
+        marker_line_width=1,
+        hovertemplate='<b>%{customdata[0]}</b><br>Início: %{customdata[1]:.1f} ms<br>Duração: %{x:.1f} ms<extra></extra>'
+    )
+    fig.update_layout(
+        bargap=0.05,
+        height=120 + 40 * (etapas['nivel'].max() + 1),
+        xaxis=dict(title='Tempo desde o início do rerun (ms)'),
+        yaxis=dict(autorange='reversed', dtick=1, title=None, showticklabels=False),
+        coloraxis_showscale=False
+    )
+    return fig
@@ -0,0 +1,48 @@
+"""
+Índices das dimensões de filtro.
+
+Cada dimensão (ciclo, local, status, gênero) vira uma lista ordenada de
+valores distintos e um array int32 de códigos por linha (-1 = vazio). As
+opções do sidebar saem direto da lista de valores, sem varrer as tabelas.
+"""
+
+import numpy as np
+import pandas as pd
+
+from metalab.texto import em_texto
+
+# dimensão -> (tabela, coluna); ciclo é comparado como texto, igual ao filtro
+DIMENSOES_FILTRO = {
+    'ciclo': ('alunos', 'CICLO'),
+    'local': ('alunos', 'LOCAL'),
+    'status': ('alunos', 'STATUS_NORMALIZADO'),
+    'genero': ('inscricoes', 'Sexo:'),
+}
+
+
+def codificar_coluna(serie, como_texto=False):
+    """Retorna (valores ordenados, códigos int32) de uma coluna; nulos viram -1"""
+    if como_texto:
+        serie = em_texto(serie).where(serie.notna())
+    valores = sorted(serie.dropna().unique().tolist())
+    codigos = pd.Categorical(serie, categories=valores).codes.astype(np.int32)
+    return valores, codigos
+
+
+def construir_indices(tabelas):
+    """Monta os índices das dimensões presentes em tabelas ({'alunos': df, 'inscricoes': df})"""
+    indices = {}
+    for dimensao, (tabela, coluna) in DIMENSOES_FILTRO.items():
+        df = tabelas.get(tabela)
+        if df is None or coluna not in df.columns:
+            continue
+        valores, codigos = codificar_coluna(df[coluna], como_texto=(dimensao == 'ciclo'))
+        indices[dimensao] = {'tabela': tabela, 'coluna': coluna, 'valores': valores, 'codigos': codigos}
+    return indices
+
+
+def opcoes_filtro(indices, dimensao):
+    """Opções do selectbox de uma dimensão ('Todos' + valores); None se não indexada"""
+    if dimensao not in indices:
+        return None
+    return ['Todos'] + list(indices[dimensao]['valores'])
@@ -0,0 +1,628 @@
+"""
+Motor SQL opcional: filtros e agregações do dashboard num DuckDB embutido.
+
+Com METALAB_MOTOR=duckdb (e o pacote duckdb instalado), as tabelas do snapshot
+são carregadas uma vez por processo num banco DuckDB em memória e os filtros
+(aplicar_filtros, filtrar_avaliacoes, selecionar_avaliacoes e
+filtrar_respostas_long) e as contagens dos gráficos viram SQL parametrizado.
+Os resultados são os mesmos do caminho pandas (metalab.filtros/agregados):
+
+- as colunas de texto derivadas que os filtros comparam (astype(str), strip,
+  upper, ciclo normalizado) são calculadas com o próprio pandas na carga, e
+  não com as funções de texto do SQL;
+- cada filtro devolve um predicado (sql, parâmetros) sobre a tabela original;
+  recortar() converte o predicado nas linhas (iloc, na ordem original);
+- contagens seguem a ordem do value_counts: primeira ocorrência, depois
+  sort_values decrescente.
+
+Diferença conhecida: numa coluna de texto com tipos misturados (2 e '2'), os
+valores com o mesmo texto são contados juntos.
+"""
+
+import importlib.util
+import threading
+
+import numpy as np
+import pandas as pd
+
+from metalab.agregados import montar_datas_por_mes
+from metalab.filtros import PALAVRAS_CHAVE_RELACAO, PALAVRAS_ID_AVALIACAO, extrair_ciclo_da_pesquisa, normalizar_ciclo
+from metalab.normalizacao import normalizar_resposta_avaliacao
+from metalab.regioes import PALAVRAS_COLUNA_LOCAL, palavras_chave_local
+from metalab.texto import aplicar_por_valor, em_texto
+
+TABELAS_MOTOR = ('alunos', 'inscricoes', 'avaliacoes', 'avaliacoes_long')
+
+# Colunas derivadas (tipo -> transformação pandas da série original)
+DERIVACOES = {
+    'texto': em_texto,
+    'maius': lambda serie: em_texto(serie).str.upper(),
+    'norm': lambda serie: em_texto(serie).str.strip().str.upper(),
+    'ciclo': lambda serie: aplicar_por_valor(serie, normalizar_ciclo),
+    'ciclo_pesquisa': lambda serie: aplicar_por_valor(serie, extrair_ciclo_da_pesquisa),
+}
+
+
+def duckdb_disponivel():
+    return importlib.util.find_spec('duckdb') is not None
+
+
+# ==========================================
+# CARGA
+# ==========================================
+def _para_sql(serie):
+    """Coluna como o DuckDB deve recebê-la: texto (str() de cada valor) para colunas object"""
+    if serie.dtype == object:
+        serie = serie.astype('string')
+    return serie.reset_index(drop=True)
+
+
+def _colunas_derivadas(nome, df):
+    """(tipo, coluna) das colunas derivadas usadas pelos filtros na tabela"""
+    colunas = list(df.columns)
+    derivadas = set()
+    if nome == 'alunos':
+        if 'CICLO' in colunas:
+            derivadas.add(('texto', 'CICLO'))
+        if 'STATUS' in colunas:
+            derivadas.update([('norm', 'STATUS'), ('maius', 'STATUS')])
+        derivadas.update(('norm', col) for col in colunas if _eh_coluna_relacao(col) or _eh_coluna_sexo(col))
+    elif nome == 'inscricoes':
+        derivadas.update(('texto', col) for col in _colunas_ciclo_inscricoes(colunas))
+        derivadas.update(('maius', col) for col in _colunas_local(colunas))
+        if 'LOCAL' in colunas:
+            derivadas.add(('maius', 'LOCAL'))
+        if 'Sexo:' in colunas:
+            derivadas.add(('norm', 'Sexo:'))
+        derivadas.update(('norm', col) for col in colunas if _eh_coluna_relacao(col))
+    elif nome == 'avaliacoes':
+        for col in colunas:
+            if col == 'Pesquisa':
+                derivadas.add(('ciclo_pesquisa', col))
+            elif 'ciclo' in str(col).lower():
+                derivadas.add(('ciclo', col))
+        coluna_id = _coluna_id_avaliacoes(colunas)
+        if coluna_id is not None:
+            derivadas.add(('norm', coluna_id))
+    return sorted(derivadas, key=lambda item: (item[0], colunas.index(item[1])))
+
+
+def criar_motor(tabelas):
+    """
+    Carrega alunos, inscrições e avaliações (pivot e formato longo) num DuckDB
+    em memória. Retorna o motor (dict) usado pelas demais funções; as
+    consultas abrem um cursor próprio, então o motor pode ser compartilhado
+    entre as sessões (threads) do Streamlit.
+    """
+    import duckdb
+
+    conexao = duckdb.connect(':memory:')
+    motor = {'conexao': conexao, 'tabelas': {}, 'colunas': {}, 'derivadas': {}, 'linhas': {},
+             'lock': threading.Lock()}
+    for nome in TABELAS_MOTOR:
+        df = tabelas[nome]
+        motor['tabelas'][nome] = df
+        motor['colunas'][nome] = {col: f'c{i}' for i, col in enumerate(df.columns)}
+        motor['derivadas'][nome] = {}
+        motor['linhas'][nome] = len(df)
+
+        carga = {f'c{i}': _para_sql(df[col]) for i, col in enumerate(df.columns)}
+        for tipo, col in _colunas_derivadas(nome, df):
+            identificador = f'd{len(motor["derivadas"][nome])}'
+            motor['derivadas'][nome][(tipo, col)] = identificador
+            carga[identificador] = _para_sql(DERIVACOES[tipo](df[col]).astype(object))
+        if nome == 'avaliacoes':
+            carga['_indice'] = _para_sql(pd.Series(df.index, index=df.index))
+        carga['_linha'] = np.arange(len(df), dtype=np.int64)
+
+        conexao.register('_carga', pd.DataFrame(carga, copy=False))
+        conexao.execute(f'CREATE TABLE {nome} AS SELECT * FROM _carga')
+        conexao.unregister('_carga')
+    return motor
+
+
+def _coluna(motor, tabela, coluna):
+    return motor['colunas'][tabela][coluna]
+
+
+def _derivada(motor, tabela, tipo, coluna):
+    """Identificador da coluna derivada; calcula e acrescenta à tabela se ainda não existir"""
+    identificador = motor['derivadas'][tabela].get((tipo, coluna))
+    if identificador is not None:
+        return identificador
+    with motor['lock']:
+        identificador = motor['derivadas'][tabela].get((tipo, coluna))
+        if identificador is None:
+            identificador = f'd{len(motor["derivadas"][tabela])}'
+            df = motor['tabelas'][tabela]
+            valores = pd.DataFrame({'_linha': np.arange(len(df), dtype=np.int64),
+                                    'valor': _para_sql(DERIVACOES[tipo](df[coluna]).astype(object))})
+            cursor = motor['conexao'].cursor()
+            try:
+                cursor.register('_derivada', valores)
+                cursor.execute(f'ALTER TABLE {tabela} ADD COLUMN {identificador} VARCHAR')
+                cursor.execute(f'UPDATE {tabela} SET {identificador} = _derivada.valor '
+                               f'FROM _derivada WHERE {tabela}._linha = _derivada._linha')
+                cursor.unregister('_derivada')
+            finally:
+                cursor.close()
+            motor['derivadas'][tabela][(tipo, coluna)] = identificador
+    return identificador
+
+
+# ==========================================
+# CONSULTAS E PREDICADOS
+# ==========================================
+def _executar(motor, sql, params):
+    cursor = motor['conexao'].cursor()
+    try:
+        return cursor.execute(sql, list(params)).fetchall()
+    finally:
+        cursor.close()
+
+
+def _e(*predicados):
+    """AND de predicados (sql, parâmetros); None = sem restrição"""
+    validos = [p for p in predicados if p is not None]
+    if not validos:
+        return None
+    return ' AND '.join(f'({sql})' for sql, _ in validos), [v for _, params in validos for v in params]
+
+
+def _ou(*predicados):
+    validos = [p for p in predicados if p is not None]
+    if not validos:
+        return None
+    return ' OR '.join(f'({sql})' for sql, _ in validos), [v for _, params in validos for v in params]
+
+
+def _onde(predicado):
+    if predicado is None:
+        return '', []
+    return f'WHERE {predicado[0]}', list(predicado[1])
+
+
+def contar_linhas(motor, tabela, predicado):
+    if predicado is None:
+        return motor['linhas'][tabela]
+    onde, params = _onde(predicado)
+    return _executar(motor, f'SELECT count(*) FROM {tabela} {onde}', params)[0][0]
+
+
+def _existe(motor, tabela, predicado):
+    onde, params = _onde(predicado)
+    return bool(_executar(motor, f'SELECT EXISTS (SELECT 1 FROM {tabela} {onde})', params)[0][0])
+
+
+def posicoes(motor, tabela, predicado):
+    """Posições (iloc) das linhas que satisfazem o predicado, em ordem; None = todas"""
+    if predicado is None:
+        return None
+    onde, params = _onde(predicado)
+    cursor = motor['conexao'].cursor()
+    try:
+        return cursor.execute(f'SELECT _linha FROM {tabela} {onde} ORDER BY _linha', params).fetchnumpy()['_linha']
+    finally:
+        cursor.close()
+
+
+def recortar(motor, selecao, tabela, df):
+    """Linhas de df (a tabela original) selecionadas pelo predicado da tabela em selecao"""
+    linhas = posicoes(motor, tabela, selecao.get(tabela))
+    return df if linhas is None else df.iloc[linhas]
+
+
+# ==========================================
+# FILTROS (mesma lógica de metalab.filtros)
+# ==========================================
+def _eh_coluna_relacao(col):
+    return any(palavra in str(col).lower() for palavra in PALAVRAS_CHAVE_RELACAO)
+
+
+def _eh_coluna_sexo(col):
+    col_lower = str(col).lower()
+    return 'sexo' in col_lower or 'genero' in col_lower or 'gênero' in col_lower
+
+
+def _colunas_ciclo_inscricoes(colunas):
+    if 'CICLO' in colunas:
+        return ['CICLO']
+    return [col for col in colunas if 'ciclo' in str(col).lower()][:1]
+
+
+def _colunas_local(colunas):
+    return [col for col in colunas if any(palavra in str(col).lower() for palavra in PALAVRAS_COLUNA_LOCAL)]
+
+
+def _coluna_id_avaliacoes(colunas):
+    for col in colunas:
+        if any(palavra in str(col).lower() for palavra in PALAVRAS_ID_AVALIACAO):
+            return col
+    return None
+
+
+def _valores_chave(motor, fontes):
+    """
+    Subconsulta com os valores de identificação (strip + upper, sem nulos) das
+    colunas de relação; fontes: lista de (tabela, predicado, colunas).
+    """
+    partes = []
+    for tabela, predicado, colunas in fontes:
+        for col in colunas:
+            filtro = _e(predicado, (f'{_coluna(motor, tabela, col)} IS NOT NULL', []))
+            partes.append((f'SELECT {_derivada(motor, tabela, "norm", col)} AS v FROM {tabela} WHERE {filtro[0]}',
+                           filtro[1]))
+    if not partes:
+        return None
+    return ' UNION ALL '.join(sql for sql, _ in partes), [v for _, params in partes for v in params]
+
+
+def _relacionar_inscricoes(motor, pred_alunos):
+    """Inscrições cujas colunas de identificação batem com os alunos selecionados"""
+    colunas_alunos = list(motor['colunas']['alunos'])
+    colunas_inscricoes = list(motor['colunas']['inscricoes'])
+    pares = []
+    for col_aluno in colunas_alunos:
+        col_aluno_lower = str(col_aluno).lower()
+        for col_inscricao in colunas_inscricoes:
+            col_inscricao_lower = str(col_inscricao).lower()
+            if (col_aluno_lower == col_inscricao_lower or
+                    any(palavra in col_aluno_lower and palavra in col_inscricao_lower for palavra in PALAVRAS_CHAVE_RELACAO)):
+                pares.append((col_aluno, col_inscricao))
+                break
+    if not pares:
+        return None
+
+    valores_sql, valores_params = _valores_chave(motor, [('alunos', pred_alunos, [col for col, _ in pares])])
+    # Sem nenhum valor de identificação nos alunos, as inscrições ficam como estão
+    predicados = [(f'NOT EXISTS ({valores_sql})', valores_params)]
+    for _, col_inscricao in pares:
+        predicados.append((f'{_derivada(motor, "inscricoes", "norm", col_inscricao)} IN ({valores_sql})',
+                           valores_params))
+    return _ou(*predicados)
+
+
+def _contem_alguma(motor, tabela, coluna, palavras):
+    maius = _derivada(motor, tabela, 'maius', coluna)
+    return _ou(*[(f'contains({maius}, ?)', [palavra]) for palavra in palavras])
+
+
+def _predicado_status(motor, status):
+    colunas = motor['colunas']['alunos']
+    if 'STATUS_NORMALIZADO' in colunas:
+        coluna = colunas['STATUS_NORMALIZADO']
+        if status in ('CURSANDO', 'CONCLUÍDO'):
+            return f'{coluna} = ?', [status]
+        if status == 'CURSANDO + CONCLUÍDO':
+            return f"{coluna} IN ('CURSANDO', 'CONCLUÍDO')", []
+        return None
+
+    if 'STATUS' in colunas:
+        norm = _derivada(motor, 'alunos', 'norm', 'STATUS')
+        padroes = {
+            'CONCLUÍDO': 'CONCLUIDO|CONCLUÍDO', 'CONCLUIDO': 'CONCLUIDO|CONCLUÍDO',
+            'CURSANDO': 'CURSANDO|EM CURSO|EM ANDAMENTO',
+            'CONCLUIDO + CURSANDO': 'CONCLUIDO|CONCLUÍDO|CURSANDO|EM CURSO',
+            'CURSANDO + CONCLUÍDO': 'CONCLUIDO|CONCLUÍDO|CURSANDO|EM CURSO',
+            'DESISTENTE': 'DESISTENTE',
+        }
+        if status in padroes:
+            return f"regexp_matches({norm}, ?, 'i')", [padroes[status]]
+        return f'{norm} = ?', [status.upper()]
+    return None
+
+
+def aplicar_filtros(motor, ciclo_selecionado, local_selecionado, status_selecionado, genero_selecionado,
+                    status_clicado=None, genero_clicado=None):
+    """
+    Equivalente a filtros.aplicar_filtros. Retorna a seleção: dict tabela ->
+    predicado (None = todas as linhas) com 'alunos' e 'inscricoes'.
+    """
+    colunas_alunos = motor['colunas']['alunos']
+    colunas_inscricoes = motor['colunas']['inscricoes']
+    pred_alunos = pred_inscricoes = None
+
+    if ciclo_selecionado != 'Todos' and 'CICLO' in colunas_alunos:
+        pred_alunos = _e(pred_alunos, (f'{_derivada(motor, "alunos", "texto", "CICLO")} = ?', [ciclo_selecionado]))
+        for col in _colunas_ciclo_inscricoes(list(colunas_inscricoes)):
+            pred_inscricoes = _e(pred_inscricoes, (f'{_derivada(motor, "inscricoes", "texto", col)} = ?',
+                                                   [str(ciclo_selecionado)]))
+        pred_inscricoes = _e(pred_inscricoes, _relacionar_inscricoes(motor, pred_alunos))
+
+    if local_selecionado != 'Todos' and 'LOCAL' in colunas_alunos:
+        pred_alunos = _e(pred_alunos, (f'{colunas_alunos["LOCAL"]} = ?', [local_selecionado]))
+        palavras = palavras_chave_local(local_selecionado)
+        if 'LOCAL' in colunas_inscricoes:
+            pred_inscricoes = _e(pred_inscricoes, _contem_alguma(motor, 'inscricoes', 'LOCAL', palavras))
+        colunas_local = _colunas_local(list(colunas_inscricoes))
+        if colunas_local:
+            mascara = _ou(*[_contem_alguma(motor, 'inscricoes', col, palavras) for col in colunas_local])
+            if _existe(motor, 'inscricoes', _e(pred_inscricoes, mascara)):
+                pred_inscricoes = _e(pred_inscricoes, mascara)
+
+    status_final = status_clicado or status_selecionado
+    if status_final != 'Todos':
+        pred_alunos = _e(pred_alunos, _predicado_status(motor, status_final))
+        pred_inscricoes = _e(pred_inscricoes, _relacionar_inscricoes(motor, pred_alunos))
+
+    genero_final = genero_clicado or genero_selecionado
+    if genero_final != 'Todos':
+        genero_normalizado = genero_final.upper().strip()
+        if 'Sexo:' in colunas_inscricoes:
+            pred_inscricoes = _e(pred_inscricoes, (f'{_derivada(motor, "inscricoes", "norm", "Sexo:")} = ?',
+                                                   [genero_normalizado]))
+        for col in colunas_alunos:
+            if _eh_coluna_sexo(col):
+                pred_alunos = _e(pred_alunos, (f'{_derivada(motor, "alunos", "norm", col)} = ?', [genero_normalizado]))
+                break
+
+    return {'alunos': pred_alunos, 'inscricoes': pred_inscricoes}
+
+
+def _mascara_ciclo_avaliacoes(motor, ciclo, usar_pesquisa=True, usar_colunas=True):
+    ciclo_normalizado = normalizar_ciclo(ciclo)
+    predicados = []
+    for col in motor['colunas']['avaliacoes']:
+        if col == 'Pesquisa':
+            if usar_pesquisa:
+                predicados.append((f'{_derivada(motor, "avaliacoes", "ciclo_pesquisa", col)} = ?', [ciclo_normalizado]))
+        elif usar_colunas and 'ciclo' in str(col).lower():
+            predicados.append((f'{_derivada(motor, "avaliacoes", "ciclo", col)} = ?', [ciclo_normalizado]))
+    return _ou(*predicados)
+
+
+def _mascara_ciclo_coluna(motor, ciclo):
+    return f'{_derivada(motor, "avaliacoes", "ciclo", "CICLO")} = ?', [normalizar_ciclo(ciclo)]
+
+
+def filtrar_avaliacoes(motor, selecao, ciclo_selecionado):
+    """
+    Equivalente a filtros.filtrar_avaliacoes seguido de selecionar_avaliacoes:
+    acrescenta à seleção o predicado das avaliações exibidas ('avaliacoes').
+    """
+    colunas = motor['colunas']['avaliacoes']
+    selecao = dict(selecao)
+    if motor['linhas']['avaliacoes'] == 0:
+        selecao['avaliacoes'] = None
+        return selecao
+
+    # filtrar_avaliacoes
+    pred_alunos, pred_inscricoes = selecao['alunos'], selecao['inscricoes']
+    filtradas = None
+    so_ciclo = (contar_linhas(motor, 'alunos', pred_alunos) == motor['linhas']['alunos']
+                and contar_linhas(motor, 'inscricoes', pred_inscricoes) == motor['linhas']['inscricoes'])
+    if ciclo_selecionado != 'Todos':
+        mascara = _mascara_ciclo_avaliacoes(motor, ciclo_selecionado)
+        if mascara is not None and _existe(motor, 'avaliacoes', mascara):
+            filtradas = mascara
+
+    if not so_ciclo:
+        valores = _valores_chave(motor, [
+            ('alunos', pred_alunos, [col for col in motor['colunas']['alunos'] if _eh_coluna_relacao(col)]),
+            ('inscricoes', pred_inscricoes, [col for col in motor['colunas']['inscricoes'] if _eh_coluna_relacao(col)]),
+        ])
+        coluna_id = _coluna_id_avaliacoes(list(colunas))
+        if coluna_id is not None and valores is not None and _executar(
+                motor, f'SELECT EXISTS ({valores[0]})', valores[1])[0][0]:
+            filtradas = _e(filtradas, (f'{_derivada(motor, "avaliacoes", "norm", coluna_id)} IN ({valores[0]})',
+                                       valores[1]))
+
+        if ciclo_selecionado != 'Todos' and contar_linhas(motor, 'avaliacoes', filtradas) == 0:
+            mascaras = []
+            if 'Pesquisa' in colunas:
+                mascaras.append(_mascara_ciclo_avaliacoes(motor, ciclo_selecionado, usar_colunas=False))
+            if 'CICLO' in colunas:
+                mascaras.append(_mascara_ciclo_coluna(motor, ciclo_selecionado))
+            for mascara in mascaras:
+                if _existe(motor, 'avaliacoes', mascara):
+                    filtradas = mascara
+                    break
+
+    # selecionar_avaliacoes
+    if contar_linhas(motor, 'avaliacoes', filtradas) > 0:
+        exibidas = filtradas
+    else:
+        exibidas = None
+        if ciclo_selecionado != 'Todos':
+            if 'Pesquisa' in colunas:
+                mascara = _mascara_ciclo_avaliacoes(motor, ciclo_selecionado, usar_colunas=False)
+            elif 'CICLO' in colunas:
+                mascara = _mascara_ciclo_coluna(motor, ciclo_selecionado)
+            else:
+                mascara = None
+            if mascara is not None and _existe(motor, 'avaliacoes', mascara):
+                exibidas = mascara
+
+    if ciclo_selecionado != 'Todos' and 'Pesquisa' in colunas:
+        quantidade = contar_linhas(motor, 'avaliacoes', exibidas)
+        if quantidade > 0 and quantidade == motor['linhas']['avaliacoes']:
+            mascara = _e(exibidas, _mascara_ciclo_avaliacoes(motor, ciclo_selecionado, usar_colunas=False))
+            if _existe(motor, 'avaliacoes', mascara):
+                exibidas = mascara
+
+    selecao['avaliacoes'] = exibidas
+    return selecao
+
+
+def filtrar_respostas_long(motor, selecao):
+    """Equivalente a filtros.filtrar_respostas_long: acrescenta 'avaliacoes_long' à seleção"""
+    selecao = dict(selecao)
+    pred_avaliacoes = selecao.get('avaliacoes')
+    if ('avaliacao_id' not in motor['colunas']['avaliacoes_long']
+            or contar_linhas(motor, 'avaliacoes', pred_avaliacoes) == motor['linhas']['avaliacoes']):
+        selecao['avaliacoes_long'] = None
+        return selecao
+    onde, params = _onde(pred_avaliacoes)
+    coluna_id = _coluna(motor, 'avaliacoes_long', 'avaliacao_id')
+    selecao['avaliacoes_long'] = (f'{coluna_id} IN (SELECT _indice FROM avaliacoes {onde})', params)
+    return selecao
+
+
+# ==========================================
+# AGREGAÇÕES (mesmos resultados de metalab.agregados/graficos)
+# ==========================================
+def contar_valores(motor, tabela, predicado, coluna, normalizar=None):
+    """
+    Equivalente a agregados.contar_valores (value_counts, opcionalmente de
+    normalizar(valor) descartando None) sobre as linhas selecionadas.
+    """
+    identificador = _coluna(motor, tabela, coluna)
+    onde, params = _onde(_e(predicado, (f'{identificador} IS NOT NULL', [])))
+    linhas = _executar(motor, f'SELECT min(_linha) AS primeira, count(*) FROM {tabela} {onde} '
+                              f'GROUP BY {identificador} ORDER BY primeira', params)
+    primeiras = np.array([linha[0] for linha in linhas], dtype=np.int64)
+    contagens = np.array([linha[1] for linha in linhas], dtype=np.int64)
+    valores = motor['tabelas'][tabela][coluna].to_numpy()[primeiras]
+
+    if normalizar is not None:
+        # Linhas em ordem de primeira ocorrência: a primeira vez que um valor normalizado
+        # aparece aqui é também a sua primeira ocorrência na coluna normalizada
+        agrupadas = {}
+        for valor, quantidade in zip(valores, contagens.tolist()):
+            normalizado = normalizar(valor)
+            if normalizado is not None and not pd.isna(normalizado):
+                agrupadas[normalizado] = agrupadas.get(normalizado, 0) + quantidade
+        valores = np.array(list(agrupadas), dtype=object)
+        contagens = np.array(list(agrupadas.values()), dtype=np.int64)
+
+    serie = pd.Series(contagens, index=pd.Index(valores, name=coluna), name='count')
+    return serie.sort_values(ascending=False)
+
+
+def tabela_cruzada(motor, tabela, predicado, linhas, colunas):
+    """Equivalente a pd.crosstab(df[linhas], df[colunas]) sobre as linhas selecionadas"""
+    coluna_linhas, coluna_colunas = _coluna(motor, tabela, linhas), _coluna(motor, tabela, colunas)
+    onde, params = _onde(_e(predicado, (f'{coluna_linhas} IS NOT NULL AND {coluna_colunas} IS NOT NULL', [])))
+    resultado = _executar(motor, f'SELECT min(_linha), count(*) FROM {tabela} {onde} '
+                                 f'GROUP BY {coluna_linhas}, {coluna_colunas}', params)
+    base = motor['tabelas'][tabela]
+    primeiras = np.array([linha[0] for linha in resultado], dtype=np.int64)
+    quadro = pd.DataFrame({
+        'linha': base[linhas].to_numpy()[primeiras],
+        'coluna': base[colunas].to_numpy()[primeiras],
+        'n': np.array([linha[1] for linha in resultado], dtype=np.int64),
+    })
+    cruzada = quadro.pivot(index='linha', columns='coluna', values='n').fillna(0).astype('int64')
+    return cruzada.rename_axis(index=linhas, columns=colunas)
+
+
+def inscricoes_por_mes(motor, predicado):
+    """Equivalente a agregados.inscricoes_por_mes sobre as inscrições selecionadas"""
+    colunas = motor['colunas']['inscricoes']
+    ano, mes = colunas['Ano'], colunas['Mes']
+    onde, params = _onde(_e(predicado, (f'{ano} IS NOT NULL AND {mes} IS NOT NULL', [])))
+    cursor = motor['conexao'].cursor()
+    try:
+        por_mes = cursor.execute(f'SELECT {ano} AS "Ano", {mes} AS "Mes", count(*) AS "Quantidade" '
+                                 f'FROM inscricoes {onde} GROUP BY ALL ORDER BY 1, 2', params).df()
+    finally:
+        cursor.close()
+    if len(por_mes) == 0:
+        return None
+    base = motor['tabelas']['inscricoes']
+    por_mes = por_mes.astype({'Ano': base['Ano'].dtype, 'Mes': base['Mes'].dtype, 'Quantidade': 'int64'})
+    return montar_datas_por_mes(por_mes)
+
+
+def calcular_metricas(motor, selecao):
+    """Equivalente a agregados.calcular_metricas sobre alunos e inscrições selecionados"""
+    colunas = motor['colunas']['alunos']
+    pred_alunos = selecao.get('alunos')
+    total_inscricoes = contar_linhas(motor, 'inscricoes', selecao.get('inscricoes'))
+
+    if 'STATUS_NORMALIZADO' in colunas:
+        status = colunas['STATUS_NORMALIZADO']
+        expressoes = [f"{status} = 'CONCLUÍDO'", f"{status} = 'DESISTENTE'", f"{status} = 'CURSANDO'"]
+    elif 'STATUS' in colunas:
+        maius = _derivada(motor, 'alunos', 'maius', 'STATUS')
+        expressoes = [f"regexp_matches({maius}, 'CONCLUIDO|CONCLUÍDO', 'i')",
+                      f"regexp_matches({maius}, 'DESISTENTE', 'i')",
+                      f"regexp_matches({maius}, 'CURSANDO|EM CURSO|EM ANDAMENTO', 'i')"]
+    else:
+        expressoes = ['FALSE'] * 3
+
+    onde, params = _onde(pred_alunos)
+    total_alunos, formados, desistentes, cursando = _executar(
+        motor, f'SELECT count(*), {", ".join(f"coalesce(count_if({e}), 0)" for e in expressoes)} FROM alunos {onde}',
+        params)[0]
+    return {
+        'total_inscricoes': int(total_inscricoes),
+        'total_alunos': int(total_alunos),
+        'formados': int(formados),
+        'desistentes': int(desistentes),
+        'cursando': int(cursando),
+        'taxa_desistencia': (desistentes / total_alunos * 100) if total_alunos > 0 else 0,
+    }
+
+
+def contar_respostas_avaliacao(motor, selecao, pergunta_texto):
+    """Equivalente a agregados.contar_respostas_avaliacao sobre as avaliações selecionadas"""
+    pred_long = selecao.get('avaliacoes_long')
+    colunas_long = list(motor['colunas']['avaliacoes_long'])
+    total_long = contar_linhas(motor, 'avaliacoes_long', pred_long)
+
+    if total_long > 0:
+        coluna_pergunta = next((col for col in colunas_long if 'pergunta' in str(col).lower()), None)
+        valor_col = None
+        for col in colunas_long:
+            col_lower = str(col).lower()
+            if 'nome exibido' in col_lower:
+                valor_col = col
+                break
+            elif 'resposta de texto livre' in col_lower:
+                preenchidas = contar_linhas(motor, 'avaliacoes_long',
+                                            _e(pred_long, (f'{_coluna(motor, "avaliacoes_long", col)} IS NOT NULL', [])))
+                if preenchidas > total_long * 0.1:
+                    valor_col = col
+                    break
+
+        if coluna_pergunta and valor_col:
+            identificador = _coluna(motor, 'avaliacoes_long', coluna_pergunta)
+            onde, params = _onde(pred_long)
+            distintas = [linha[0] for linha in _executar(
+                motor, f'SELECT DISTINCT {identificador} FROM avaliacoes_long {onde}', params)]
+            palavras_chave = [p for p in pergunta_texto.lower().split() if len(p) > 3]
+            perguntas, inclui_nulo = [], False
+            for pergunta in distintas:
+                pergunta_lower = str(np.nan if pergunta is None else pergunta).lower()
+                palavras_encontradas = sum(1 for palavra in palavras_chave if palavra in pergunta_lower)
+                if pergunta_texto.lower() in pergunta_lower or palavras_encontradas >= min(2, len(palavras_chave)):
+                    if pergunta is None:
+                        inclui_nulo = True
+                    else:
+                        perguntas.append(pergunta)
+
+            mascara = _ou(
+                (f'{identificador} IN ({", ".join("?" * len(perguntas))})', perguntas) if perguntas else None,
+                (f'{identificador} IS NULL', []) if inclui_nulo else None,
+            )
+            if mascara is not None:
+                pred_respostas = _e(pred_long, mascara)
+                coluna_valor = _coluna(motor, 'avaliacoes_long', valor_col)
+                if _existe(motor, 'avaliacoes_long', _e(pred_respostas, (f'{coluna_valor} IS NOT NULL', []))):
+                    return contar_valores(motor, 'avaliacoes_long', pred_respostas, valor_col,
+                                          normalizar_resposta_avaliacao)
+
+    pred_avaliacoes = selecao.get('avaliacoes')
+    if contar_linhas(motor, 'avaliacoes', pred_avaliacoes) > 0:
+        for col, identificador in motor['colunas']['avaliacoes'].items():
+            if pergunta_texto.lower() in str(col).lower():
+                pred_coluna = _e(pred_avaliacoes, (f'{identificador} IS NOT NULL', []))
+                if _existe(motor, 'avaliacoes', pred_coluna):
+                    return contar_valores(motor, 'avaliacoes', pred_avaliacoes, col, normalizar_resposta_avaliacao)
+
+    return pd.Series(dtype=int)
+
+
+def contador(motor, selecao, tabela):
+    """Função contar(df, coluna, normalizar=None) dos construtores de gráficos, via SQL"""
+    def contar(df, coluna, normalizar=None):
+        return contar_valores(motor, tabela, selecao.get(tabela), coluna, normalizar)
+    return contar
+
+
+def cruzador(motor, selecao, tabela):
+    """Função cruzar(df, linhas, colunas) dos construtores de gráficos, via SQL"""
+    def cruzar(df, linhas, colunas):
+        return tabela_cruzada(motor, tabela, selecao.get(tabela), linhas, colunas)
+    return cruzar
@@ -0,0 +1,235 @@
+"""
+Normalização de respostas livres: avaliações, faixas de renda e status.
+
+Funções escalares (um valor por chamada), aplicadas com Series.apply pelas
+agregações do pacote.
+"""
+
+import re
+
+import pandas as pd
+
+# Ordem lógica das faixas de renda (da menor para a maior)
+ORDEM_CATEGORIAS_RENDA = [
+    'Não possui renda mensal',
+    'Até meio salário mínimo',
+    'Até um salário mínimo',
+    'De 1 a 2 salários mínimos',
+    'De 2 a 3 salários mínimos',
+    'De 3 a 4 salários mínimos',
+    'Acima de 5 salários mínimos'
+]
+
+# Respostas de escala como saem de normalizar_resposta_avaliacao, da melhor para a pior em cada escala
+ORDEM_RESPOSTAS_AVALIACAO = [
+    'Ótimo', 'Bom', 'Regular', 'Ruim',
+    'Muito Satisfeito', 'Satisfeito', 'Insatisfeito', 'Muito Insatisfeito',
+    'Concordo Totalmente', 'Concordo', 'Neutro', 'Discordo', 'Discordo Totalmente',
+    'Sim', 'Parcialmente', 'Talvez', 'Não',
+]
+
+
+def remover_acentos(texto):
+    """Remove acentos de um texto de forma robusta"""
+    if pd.isna(texto):
+        return texto
+
+    texto_str = str(texto).lower()
+    # Mapeamento completo de acentos
+    acentos = {
+        'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a', 'ä': 'a',
+        'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
+        'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
+        'ó': 'o', 'ò': 'o', 'õ': 'o', 'ô': 'o', 'ö': 'o',
+        'ú': 'u', 'ù': 'u', 'û': 'u', 'ü': 'u',
+        'ç': 'c', 'ć': 'c', 'č': 'c',
+        'ñ': 'n', 'ń': 'n',
+        'ý': 'y', 'ÿ': 'y'
+    }
+    resultado = texto_str
+    for acento, sem_acento in acentos.items():
+        resultado = resultado.replace(acento, sem_acento)
+    return resultado
+
+
+def normalizar_resposta_avaliacao(valor):
+    """Normaliza respostas de avaliações para agrupar variações similares"""
+    if pd.isna(valor) or valor == '':
+        return None
+
+    # Converter para string e normalizar
+    valor_str = str(valor).strip()
+
+    if not valor_str:
+        return None
+
+    # Remover acentos e converter para minúsculas
+    valor_normalizado = remover_acentos(valor_str.lower())
+
+    # Normalizar espaços múltiplos
+    valor_normalizado = re.sub(r'\s+', ' ', valor_normalizado).strip()
+
+    # Mapear variações comuns para valores padronizados (ordem importa - mais específico primeiro)
+    mapeamento_especifico = [
+        ('superou as expectativas', 'Sim'),
+        ('ficou abaixo das expectativas', 'Não'),
+        ('atendeu completamente', 'Sim'),
+        ('atendeu parcialmente', 'Parcialmente'),
+        ('nao atendeu', 'Não'),
+        ('sim, indicaria', 'Sim'),
+        ('nao indicaria', 'Não'),
+        ('sim, com certeza', 'Sim'),
+        ('com certeza', 'Sim'),
+        ('definitivamente', 'Sim'),
+        ('nao tenho certeza', 'Talvez'),
+        ('pode ser', 'Talvez'),
+        ('provavelmente', 'Talvez'),
+        ('muito ruim', 'Ruim'),
+        ('muito bom', 'Ótimo'),
+    ]
+
+    # Verificar correspondências específicas primeiro
+    for chave, valor_padrao in mapeamento_especifico:
+        if chave in valor_normalizado:
+            return valor_padrao
+
+    # Mapeamento simples (exato ou início da palavra)
+    mapeamento_simples = {
+        'otimo': 'Ótimo',
+        'excelente': 'Ótimo',
+        'bom': 'Bom',
+        'regular': 'Regular',
+        'ruim': 'Ruim',
+        'pessimo': 'Ruim',
+        'sim': 'Sim',
+        'nao': 'Não',
+        'talvez': 'Talvez',
+        'atendeu': 'Sim',
+        'superou': 'Sim',
+        'ficou abaixo': 'Não',
+    }
+
+    # Verificar correspondências simples (palavra completa ou início)
+    for chave, valor_padrao in mapeamento_simples.items():
+        if valor_normalizado == chave or valor_normalizado.startswith(chave + ' ') or valor_normalizado.endswith(' ' + chave):
+            return valor_padrao
+
+    # Se não encontrou correspondência, capitalizar primeira letra de cada palavra
+    palavras = valor_normalizado.split()
+    if palavras:
+        resultado = ' '.join(palavra.capitalize() for palavra in palavras)
+        return resultado
+
+    return valor_str  # Retornar original se não conseguir normalizar
+
+
+def normalizar_categoria_renda(valor):
+    """Normaliza e padroniza categorias de renda para agrupar duplicatas de forma robusta"""
+    if pd.isna(valor) or valor == '':
+        return None
+
+    # Converter para string e normalizar
+    valor_str = str(valor).strip()
+
+    # Remover acentos e converter para minúsculas
+    valor_normalizado = remover_acentos(valor_str)
+
+    # Normalizar espaços múltiplos
+    valor_normalizado = re.sub(r'\s+', ' ', valor_normalizado).strip()
+
+    # Remover palavras comuns que podem variar
+    valor_normalizado = valor_normalizado.replace('recebe', '').replace('de', '').strip()
+    valor_normalizado = re.sub(r'\s+', ' ', valor_normalizado).strip()
+
+    # Padrões de correspondência (em ordem de especificidade)
+
+    # 1. Não possui renda mensal (mais específico primeiro)
+    padroes_sem_renda = [
+        'nao possui renda mensal', 'nao possui renda', 'sem renda mensal',
+        'sem renda', 'sem renda familiar', 'nao tem renda'
+    ]
+    if any(padrao in valor_normalizado for padrao in padroes_sem_renda):
+        return 'Não possui renda mensal'
+
+    # 2. Até meio salário mínimo
+    padroes_meio = ['meio salario', '0.5 salario', 'ate meio', 'até meio']
+    if any(padrao in valor_normalizado for padrao in padroes_meio) and 'salario' in valor_normalizado:
+        return 'Até meio salário mínimo'
+
+    # 3. Até um salário mínimo
+    padroes_um = ['ate um', 'até um', 'ate 1', 'até 1', 'um salario', '1 salario']
+    if any(padrao in valor_normalizado for padrao in padroes_um) and 'salario' in valor_normalizado and 'meio' not in valor_normalizado:
+        return 'Até um salário mínimo'
+
+    # 4. De 1 a 2 salários mínimos
+    padroes_1_2 = ['1 a 2', '1-2', '1 ate 2', '1 até 2', 'um a dois']
+    if any(padrao in valor_normalizado for padrao in padroes_1_2) and 'salario' in valor_normalizado:
+        return 'De 1 a 2 salários mínimos'
+
+    # 5. De 2 a 3 salários mínimos (NOVO - estava faltando!)
+    padroes_2_3 = ['2 a 3', '2-3', '2 ate 3', '2 até 3', 'dois a tres', 'dois a três']
+    if any(padrao in valor_normalizado for padrao in padroes_2_3) and 'salario' in valor_normalizado:
+        return 'De 2 a 3 salários mínimos'
+
+    # 6. De 3 a 4 salários mínimos
+    padroes_3_4 = ['3 a 4', '3-4', '3 ate 4', '3 até 4', 'tres a quatro', 'três a quatro']
+    if any(padrao in valor_normalizado for padrao in padroes_3_4) and 'salario' in valor_normalizado:
+        return 'De 3 a 4 salários mínimos'
+
+    # 7. Acima de 5 salários mínimos
+    padroes_5_mais = ['acima de 5', 'mais de 5', 'acima 5', 'mais 5', '5 ou mais', '5+']
+    if any(padrao in valor_normalizado for padrao in padroes_5_mais) and 'salario' in valor_normalizado:
+        return 'Acima de 5 salários mínimos'
+
+    # 8. Correspondência por números e palavras-chave (fallback mais inteligente)
+    # Extrair números do texto
+    numeros = re.findall(r'\d+', valor_normalizado)
+
+    if 'salario' in valor_normalizado or 'salários' in valor_normalizado:
+        if 'meio' in valor_normalizado or '0.5' in valor_normalizado:
+            return 'Até meio salário mínimo'
+        elif 'um' in valor_normalizado or '1' in valor_normalizado:
+            if '2' not in valor_normalizado and '3' not in valor_normalizado:
+                return 'Até um salário mínimo'
+        elif len(numeros) >= 2:
+            num1, num2 = int(numeros[0]), int(numeros[1])
+            if num1 == 1 and num2 == 2:
+                return 'De 1 a 2 salários mínimos'
+            elif num1 == 2 and num2 == 3:
+                return 'De 2 a 3 salários mínimos'
+            elif num1 == 3 and num2 == 4:
+                return 'De 3 a 4 salários mínimos'
+        elif len(numeros) == 1:
+            num = int(numeros[0])
+            if num >= 5:
+                return 'Acima de 5 salários mínimos'
+
+    # Se não encontrou padrão conhecido, retornar o valor original capitalizado
+    return valor_str.title()
+
+
+def normalizar_status(status):
+    """Normaliza e padroniza status para agrupar variações"""
+    if pd.isna(status) or status == '' or str(status).upper().strip() in ['NAN', 'NONE', 'NULL', 'N/A', 'NA']:
+        return 'SEM STATUS'
+
+    status_str = str(status).upper().strip()
+
+    # Padronizar CONCLUÍDO/CONCLUIDO
+    if 'CONCLUIDO' in status_str or 'CONCLUÍDO' in status_str or 'CONCLU' in status_str:
+        return 'CONCLUÍDO'
+
+    # Padronizar CURSANDO/EM CURSO
+    if 'CURSANDO' in status_str or 'EM CURSO' in status_str or 'EM ANDAMENTO' in status_str or 'ANDAMENTO' in status_str:
+        return 'CURSANDO'
+
+    # Padronizar DESISTENTE
+    if 'DESISTENTE' in status_str or 'DESISTIU' in status_str or 'DESISTENCIA' in status_str:
+        return 'DESISTENTE'
+
+    # Padronizar NÃO COMPARECEU
+    if 'NÃO COMPARECEU' in status_str or 'NAO COMPARECEU' in status_str or 'NÃO COMPARECEU' in status_str or 'FALTOU' in status_str:
+        return 'NÃO COMPARECEU'
+
+    # Retornar status original se não encontrou padrão conhecido
+    return status_str
@@ -0,0 +1,129 @@
+"""
+Redução do JSON das figuras Plotly enviado ao navegador.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+# Máximo de barras nos gráficos de categorias longas (canais, regiões, locais)
+LIMITE_CATEGORIAS_GRAFICO = 15
+
+
+def agrupar_top_n(contagens, limite=LIMITE_CATEGORIAS_GRAFICO, rotulo_outros='Outros'):
+    """Mantém as `limite` maiores categorias de um value_counts e soma o restante em uma barra 'Outros'"""
+    if contagens is None or len(contagens) <= limite:
+        return contagens
+
+    contagens = contagens.sort_values(ascending=False)
+    principais = contagens.iloc[:limite]
+    restante = contagens.iloc[limite:].sum()
+    if rotulo_outros in principais.index:
+        principais = principais.copy()
+        principais[rotulo_outros] += restante
+        return principais
+    return pd.concat([principais, pd.Series({rotulo_outros: restante})])
+
+
+def _compactar_array(valores, casas_decimais):
+    """Arredonda arrays numéricos e converte para inteiro quando não há parte decimal"""
+    if valores is None or isinstance(valores, str):
+        return valores
+    try:
+        array = np.asarray(valores)
+    except Exception:
+        return valores
+    if array.dtype.kind == 'O' and array.ndim == 1 and len(array) > 0 and isinstance(array[0], datetime):
+        try:
+            array = pd.to_datetime(array).values
+        except Exception:
+            return valores
+    if array.dtype.kind == 'M' and array.ndim == 1 and len(array) > 0:
+        # Datas sem horário viram 'AAAA-MM-DD' ao invés de 'AAAA-MM-DDT00:00:00'
+        dias = array.astype('datetime64[D]')
+        if (dias == array).all():
+            return np.datetime_as_string(dias)
+        return valores
+    if array.ndim == 0 or array.dtype.kind not in 'iuf':
+        return valores
+    if array.dtype.kind == 'f':
+        array = np.round(array, casas_decimais)
+        if np.isfinite(array).all() and (array == np.trunc(array)).all():
+            array = array.astype(np.int64)
+    return array
+
+
+def otimizar_figura(fig, casas_decimais=1):
+    """
+    Reduz o JSON enviado ao navegador sem alterar o que é exibido.
+
+    - Remove propriedades que o Plotly Express preenche com o próprio padrão do
+      Plotly.js (legendgroup/offsetgroup vazios, textposition 'auto', orientação
+      'v', linha sólida, marcador 'circle', eixos 'x'/'y', domínios [0, 1],
+      padrão de marcador vazio)
+    - Troca o array `text` por referência ao valor da barra quando são iguais
+    - Arredonda arrays numéricos (percentuais são exibidos com 1 casa decimal)
+      e envia inteiros sem '.0'; datas sem horário vão como 'AAAA-MM-DD'
+    """
+    varios_tracos = len(fig.data) > 1
+    for traco in fig.data:
+        for prop, padrao in (('legendgroup', ''), ('offsetgroup', ''), ('textposition', 'auto'),
+                             ('xaxis', 'x'), ('yaxis', 'y')):
+            if prop in traco and traco[prop] == padrao:
+                traco[prop] = None
+        if not varios_tracos:
+            if 'alignmentgroup' in traco and traco['alignmentgroup'] == 'True':
+                traco['alignmentgroup'] = None
+            if traco['name'] == '' and traco['showlegend'] is False:
+                traco['name'] = None
+        if traco.type in ('bar', 'scatter') and traco.orientation == 'v' and not getattr(traco, 'stackgroup', None):
+            traco.orientation = None
+        if traco.type == 'scatter':
+            if traco.line.dash == 'solid':
+                traco.line.dash = None
+            if traco.marker.symbol == 'circle':
+                traco.marker.symbol = None
+            if not traco.marker.to_plotly_json():
+                traco.marker = None
+        if traco.type == 'pie' and traco.domain.x == (0.0, 1.0) and traco.domain.y == (0.0, 1.0):
+            traco.domain = None
+        if 'marker' in traco and 'pattern' in traco.marker and traco.marker.pattern.shape == '':
+            traco.marker.pattern = None
+
+        # Texto da barra igual ao valor: referenciar o eixo ao invés de repetir o array
+        if traco.type == 'bar' and traco.text is not None:
+            eixo_valor = 'x' if traco.orientation == 'h' else 'y'
+            valores = traco[eixo_valor]
+            try:
+                texto_igual = valores is not None and np.array_equal(np.asarray(traco.text, dtype=float), np.asarray(valores, dtype=float))
+            except (TypeError, ValueError):
+                texto_igual = False
+            if texto_igual:
+                for prop_template in ('texttemplate', 'hovertemplate'):
+                    if traco[prop_template]:
+                        traco[prop_template] = traco[prop_template].replace('%{text}', '%{' + eixo_valor + '}')
+                if not traco.texttemplate:
+                    traco.texttemplate = '%{' + eixo_valor + '}'
+                traco.text = None
+
+        for prop in ('x', 'y', 'values', 'customdata'):
+            if prop in traco and traco[prop] is not None:
+                traco[prop] = _compactar_array(traco[prop], casas_decimais)
+        if 'marker' in traco and 'color' in traco.marker and traco.marker.color is not None and not isinstance(traco.marker.color, str):
+            traco.marker.color = _compactar_array(traco.marker.color, casas_decimais)
+
+    for eixo in (fig.layout.xaxis, fig.layout.yaxis):
+        if eixo.domain == (0.0, 1.0):
+            eixo.domain = None
+    if fig.layout.xaxis.anchor == 'y':
+        fig.layout.xaxis.anchor = None
+    if fig.layout.yaxis.anchor == 'x':
+        fig.layout.yaxis.anchor = None
+    return fig
+
+
+def tamanho_payload(fig):
+    """Tamanho em bytes do JSON da figura (o que o st.plotly_chart envia ao navegador)"""
+    return len(pio.to_json(fig, validate=False).encode('utf-8'))
@@ -0,0 +1,111 @@
+"""
+Perfil de desempenho de um rerun do dashboard.
+
+O script abre um perfil no início do rerun (iniciar_perfil), marca as etapas
+com `with etapa('nome'):` - aninháveis - e fecha com finalizar_perfil. As
+funções da camada de dados também marcam suas etapas; sem perfil ativo,
+etapa() só consulta um ContextVar e não mede nada.
+
+O histórico dos últimos reruns (lista de dicts caminho -> ms) alimenta os
+percentis p50/p95 do painel.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+import pandas as pd
+
+# Reruns mantidos no histórico para os percentis
+HISTORICO_RERUNS = 50
+# Nome da etapa raiz (o rerun inteiro) no gráfico e nos percentis
+ETAPA_RERUN = 'rerun'
+SEPARADOR_CAMINHO = ' › '
+
+_perfil_ativo = ContextVar('perfil_metalab', default=None)
+
+
+def iniciar_perfil(ativo=True):
+    """Abre o perfil do rerun (ou desativa a medição, se ativo=False) e o retorna"""
+    perfil = {'inicio': time.perf_counter(), 'etapas': [], 'pilha': [], 'secao': None} if ativo else None
+    _perfil_ativo.set(perfil)
+    return perfil
+
+
+@contextmanager
+def etapa(nome):
+    """Mede o bloco como etapa do perfil ativo, filha da etapa aberta no momento"""
+    perfil = _perfil_ativo.get()
+    if perfil is None:
+        yield
+        return
+
+    pilha = perfil['pilha']
+    registro = {'etapa': nome, 'caminho': SEPARADOR_CAMINHO.join(pilha + [nome]), 'nivel': len(pilha)}
+    pilha.append(nome)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fim = time.perf_counter()
+        pilha.pop()
+        registro['inicio_ms'] = (inicio - perfil['inicio']) * 1000
+        registro['duracao_ms'] = (fim - inicio) * 1000
+        perfil['etapas'].append(registro)
+
+
+def secao(nome):
+    """
+    Abre uma etapa que vai até a próxima seção (ou até finalizar_perfil), para
+    medir trechos do script sem reindentá-los num bloco with. Só no nível de cima.
+    """
+    perfil = _perfil_ativo.get()
+    if perfil is None:
+        return
+    _fechar_secao(perfil)
+    perfil['secao'] = etapa(nome)
+    perfil['secao'].__enter__()
+
+
+def _fechar_secao(perfil):
+    if perfil['secao'] is not None:
+        perfil['secao'].__exit__(None, None, None)
+        perfil['secao'] = None
+
+
+def finalizar_perfil(perfil):
+    """Fecha a seção aberta, desativa a medição e retorna as etapas em ordem de início"""
+    _fechar_secao(perfil)
+    _perfil_ativo.set(None)
+    total_ms = (time.perf_counter() - perfil['inicio']) * 1000
+    etapas = sorted(perfil['etapas'], key=lambda registro: (registro['inicio_ms'], registro['nivel']))
+    return {'total_ms': total_ms, 'etapas': etapas}
+
+
+def registrar_historico(historico, resultado, limite=HISTORICO_RERUNS):
+    """Acrescenta o rerun ao histórico (ms somados por caminho) mantendo só os `limite` últimos"""
+    tempos = {ETAPA_RERUN: resultado['total_ms']}
+    for registro in resultado['etapas']:
+        tempos[registro['caminho']] = tempos.get(registro['caminho'], 0) + registro['duracao_ms']
+    historico.append(tempos)
+    del historico[:-limite]
+    return historico
+
+
+def percentis(historico):
+    """p50/p95 de cada etapa nos reruns do histórico, das mais lentas (p95) para as mais rápidas"""
+    caminhos = {}
+    for tempos in historico:
+        for caminho, ms in tempos.items():
+            caminhos.setdefault(caminho, []).append(ms)
+    linhas = [{
+        'Etapa': caminho,
+        'Reruns': len(valores),
+        'p50 (ms)': round(float(np.percentile(valores, 50)), 1),
+        'p95 (ms)': round(float(np.percentile(valores, 95)), 1),
+        'Último (ms)': round(historico[-1][caminho], 1) if caminho in historico[-1] else None,
+    } for caminho, valores in caminhos.items()]
+    if not linhas:
+        return pd.DataFrame(columns=['Etapa', 'Reruns', 'p50 (ms)', 'p95 (ms)', 'Último (ms)'])
+    return pd.DataFrame(linhas).sort_values('p95 (ms)', ascending=False).set_index('Etapa')
@@ -0,0 +1,291 @@
+"""
+Planejador das agregações dos gráficos.
+
+Os gráficos declaram as agregações de que precisam (pedidos): a contagem de
+uma coluna, com ou sem normalização, a tabela cruzada de duas colunas ou a
+contagem das respostas de uma pergunta de avaliação, ou a matriz pergunta x
+resposta de várias perguntas (que pede as respostas de cada uma e é montada
+com elas, sem outra passada). O planejador junta os
+pedidos, descarta os repetidos e os já calculados e resolve os de cada tabela
+numa passada só. As linhas filtradas viram posições na tabela original uma
+vez. Cada coluna pedida é fatorada em códigos uma vez por snapshot (no estado
+do planejador, uma vez só mesmo com planos concorrentes), e cada contagem é um bincount dos códigos nessas posições. As
+respostas de todas as perguntas saem de uma contagem dos pares (pergunta,
+resposta normalizada).
+
+Os resultados são os mesmos de agregados.contar_valores, tabela_cruzada e
+contar_respostas_avaliacao (rótulos, ordem, nomes e tipos); o pedido é a
+chave do resultado. Sem a tabela original (as inscrições e respostas do
+armazém), os códigos saem da própria tabela filtrada. Um pedido que o caminho
+rápido não cobre (resultado vazio, coluna ausente, rótulos que não se
+ordenam) é calculado pela função de referência, e o motivo de cada recuo
+fica no relatório do plano. A comparação de tempo com as funções de
+referência fica em benchmarks/bench_planejador.py, fora do rerun.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from metalab.agregados import (colunas_respostas, contar_respostas_avaliacao, contar_valores, matriz_respostas,
+                               perguntas_correspondentes, tabela_cruzada)
+from metalab.carga_unica import calcular_uma_vez
+from metalab.normalizacao import normalizar_resposta_avaliacao
+from metalab.texto import aplicar_por_valor
+
+# Tabela das respostas (formato longo) e a pivotada, usada pela referência como fallback
+TABELA_RESPOSTAS = 'avaliacoes_long'
+TABELA_AVALIACOES = 'avaliacoes'
+
+
+def contagem(tabela, coluna, normalizar=None):
+    """Pedido de contar_valores(tabela, coluna, normalizar)"""
+    return ('contar', tabela, coluna, normalizar)
+
+
+def cruzamento(tabela, linhas, colunas):
+    """Pedido de tabela_cruzada(tabela, linhas, colunas)"""
+    return ('cruzar', tabela, linhas, colunas)
+
+
+def respostas(pergunta):
+    """Pedido de contar_respostas_avaliacao(pergunta) sobre as avaliações"""
+    return ('respostas', pergunta)
+
+
+def matriz(perguntas):
+    """Pedido da matriz pergunta x resposta (agregados.matriz_respostas): perguntas é um dict rótulo -> pergunta"""
+    return ('matriz', tuple((rotulo, pergunta) for rotulo, pergunta in perguntas.items() if pergunta))
+
+
+def _expandir(pedidos):
+    """Pedidos com as respostas de cada pergunta das matrizes antes da matriz"""
+    for pedido in pedidos:
+        if pedido[0] == 'matriz':
+            yield from (respostas(pergunta) for _, pergunta in pedido[1])
+        yield pedido
+
+
+def planejar(pedidos):
+    """
+    Pedidos sem repetição por tabela, na ordem da declaração (as respostas
+    das matrizes entram antes delas); descarta os sem coluna ou pergunta
+    """
+    plano = {}
+    for pedido in dict.fromkeys(_expandir(pedidos)):
+        if pedido[0] == 'matriz':
+            if pedido[1]:
+                plano.setdefault(TABELA_RESPOSTAS, []).append(pedido)
+        elif pedido[0] == 'respostas':
+            if pedido[1]:
+                plano.setdefault(TABELA_RESPOSTAS, []).append(pedido)
+        elif all(coluna is not None for coluna in pedido[2:4 if pedido[0] == 'cruzar' else 3]):
+            plano.setdefault(pedido[1], []).append(pedido)
+    return plano
+
+
+def referencia(pedido, tabelas):
+    """Resultado do pedido pela função usada sem o planejador"""
+    if pedido[0] == 'matriz':
+        return matriz_respostas({rotulo: referencia(respostas(pergunta), tabelas) for rotulo, pergunta in pedido[1]})
+    if pedido[0] == 'respostas':
+        return contar_respostas_avaliacao(pedido[1], tabelas.get(TABELA_AVALIACOES), tabelas.get(TABELA_RESPOSTAS))
+    if pedido[0] == 'cruzar':
+        return tabela_cruzada(tabelas[pedido[1]], pedido[2], pedido[3])
+    return contar_valores(tabelas[pedido[1]], pedido[2], pedido[3])
+
+
+def _posicoes(df, original):
+    """Posição de cada linha de df na tabela original; None sem original ou com linhas fora dela"""
+    if original is None:
+        return None
+    if df is original or (len(df) == len(original) and df.index.equals(original.index)):
+        return np.arange(len(df))
+    if not original.index.is_unique:
+        return None
+    posicoes = original.index.get_indexer(df.index)
+    return None if (posicoes < 0).any() else posicoes
+
+
+def _fatorar(serie, normalizar=None):
+    """Códigos (-1 nos nulos) e valores distintos da coluna, normalizada antes se pedido"""
+    if normalizar is not None:
+        serie = aplicar_por_valor(serie, normalizar)
+    return pd.factorize(serie, use_na_sentinel=True)
+
+
+def _fatorar_respostas(avaliacoes_long, coluna_pergunta, valor_col):
+    """Códigos das perguntas e das respostas normalizadas (-1 nas não preenchidas) e as preenchidas"""
+    preenchidas = avaliacoes_long[valor_col].notna().to_numpy()
+    codigos_pergunta, perguntas = pd.factorize(avaliacoes_long[coluna_pergunta], use_na_sentinel=True)
+    codigos_resposta, valores = _fatorar(avaliacoes_long[valor_col], normalizar_resposta_avaliacao)
+    codigos_resposta = np.where(preenchidas, codigos_resposta, -1)
+    return codigos_pergunta, perguntas, codigos_resposta, valores, preenchidas
+
+
+def _contagem(codigos, valores, nome):
+    """value_counts pelos códigos das linhas (na ordem das linhas); None sem nenhum valor"""
+    codigos = codigos[codigos >= 0]
+    if len(codigos) == 0:
+        return None
+    ordem = pd.unique(codigos)  # Ordem de primeira ocorrência, como no value_counts
+    totais = np.bincount(codigos, minlength=len(valores))[ordem]
+    return pd.Series(totais, index=pd.Index(valores.take(ordem), name=nome), name='count').sort_values(ascending=False)
+
+
+def _cruzamento(codigos_linhas, valores_linhas, codigos_colunas, valores_colunas, linhas, colunas):
+    """pd.crosstab pelos códigos das duas colunas: rótulos presentes em ordem crescente; None sem pares"""
+    validos = (codigos_linhas >= 0) & (codigos_colunas >= 0)
+    if not validos.any():
+        return None
+    codigos_linhas, codigos_colunas = codigos_linhas[validos], codigos_colunas[validos]
+    totais = np.bincount(codigos_linhas * len(valores_colunas) + codigos_colunas,
+                         minlength=len(valores_linhas) * len(valores_colunas))
+    totais = totais.reshape(len(valores_linhas), len(valores_colunas))
+    presentes_linhas, presentes_colunas = np.unique(codigos_linhas), np.unique(codigos_colunas)
+    indice = pd.Index(valores_linhas.take(presentes_linhas), name=linhas)
+    cabecalho = pd.Index(valores_colunas.take(presentes_colunas), name=colunas)
+    ordem_linhas, ordem_colunas = indice.argsort(), cabecalho.argsort()
+    return pd.DataFrame(totais[np.ix_(presentes_linhas[ordem_linhas], presentes_colunas[ordem_colunas])],
+                        index=indice.take(ordem_linhas), columns=cabecalho.take(ordem_colunas))
+
+
+def _contar_respostas(pedidos, codigos_pergunta, perguntas, codigos_resposta, valores, preenchidas, valor_col):
+    """
+    Contagens das respostas de cada pergunta numa passada: pares (pergunta,
+    resposta) com total e primeira linha, somados por resposta entre as
+    perguntas correspondentes. Pedido -> Series, ou None se ficou vazio (a
+    referência decide entre o vazio e o fallback do pivotado).
+    """
+    validas = (codigos_pergunta >= 0) & (codigos_resposta >= 0)
+    pares, primeiras, totais = np.unique(codigos_pergunta[validas].astype(np.int64) * len(valores)
+                                         + codigos_resposta[validas], return_index=True, return_counts=True)
+    pergunta_par, resposta_par = pares // len(valores), pares % len(valores)
+    # Ordem dos pares pela primeira linha em que aparecem
+    por_linha = np.argsort(primeiras, kind='stable')
+    pergunta_par, resposta_par, totais = pergunta_par[por_linha], resposta_par[por_linha], totais[por_linha]
+    tem_preenchida = np.bincount(codigos_pergunta[preenchidas & (codigos_pergunta >= 0)],
+                                 minlength=len(perguntas)) > 0
+
+    resultados = {}
+    for pedido in pedidos:
+        correspondentes = np.asarray(pd.Index(perguntas).isin(perguntas_correspondentes(pedido[1], perguntas)))
+        selecionados = correspondentes[pergunta_par]
+        if not (correspondentes & tem_preenchida).any() or not selecionados.any():
+            resultados[pedido] = None
+            continue
+        respostas_pedido = resposta_par[selecionados]
+        ordem = pd.unique(respostas_pedido)
+        soma = np.bincount(respostas_pedido, weights=totais[selecionados], minlength=len(valores))[ordem]
+        resultados[pedido] = pd.Series(soma.astype(np.int64), index=pd.Index(valores.take(ordem), name=valor_col),
+                                       name='count').sort_values(ascending=False)
+    return resultados
+
+
+def _codigos_coluna(estado, tabela, df, original, posicoes, coluna, normalizar=None):
+    """Códigos das linhas de df na coluna e os valores distintos (do snapshot, se houver original)"""
+    if posicoes is None or coluna not in original.columns:
+        return _fatorar(df[coluna], normalizar)
+    codigos, valores = calcular_uma_vez(estado.setdefault('codigos', {}), (tabela, coluna, normalizar),
+                                        lambda: _fatorar(original[coluna], normalizar))[0]
+    return codigos[posicoes], valores
+
+
+def _passada_respostas(estado, pedidos, df, original, posicoes):
+    """Resultados dos pedidos de respostas sobre o formato longo filtrado"""
+    if df is None or len(df) == 0:
+        return {}
+    coluna_pergunta, valor_col = colunas_respostas(df)
+    if not (coluna_pergunta and valor_col):
+        return {}
+    pedidos = [pedido for pedido in pedidos if pedido[0] == 'respostas']
+    if posicoes is None or coluna_pergunta not in original.columns or valor_col not in original.columns:
+        codigos = _fatorar_respostas(df, coluna_pergunta, valor_col)
+    else:
+        codigos_pergunta, perguntas, codigos_resposta, valores, preenchidas = calcular_uma_vez(
+            estado.setdefault('codigos', {}), (TABELA_RESPOSTAS, coluna_pergunta, valor_col),
+            lambda: _fatorar_respostas(original, coluna_pergunta, valor_col))[0]
+        codigos = (codigos_pergunta[posicoes], perguntas, codigos_resposta[posicoes], valores, preenchidas[posicoes])
+    return _contar_respostas(pedidos, *codigos, valor_col)
+
+
+def _passada(estado, tabela, pedidos, df, original, motivos):
+    """
+    Resultados dos pedidos de uma tabela: posições uma vez, depois os códigos
+    de cada coluna. O pedido que o caminho rápido não resolve fica None, com o
+    motivo em motivos (pedido -> motivo)
+    """
+    posicoes = _posicoes(df, original)
+    if tabela == TABELA_RESPOSTAS:
+        return _passada_respostas(estado, pedidos, df, original, posicoes)
+    resultados = {}
+    for pedido in pedidos:
+        try:
+            if pedido[0] == 'cruzar':
+                resultados[pedido] = _cruzamento(*_codigos_coluna(estado, tabela, df, original, posicoes, pedido[2]),
+                                                 *_codigos_coluna(estado, tabela, df, original, posicoes, pedido[3]),
+                                                 pedido[2], pedido[3])
+            else:
+                resultados[pedido] = _contagem(*_codigos_coluna(estado, tabela, df, original, posicoes, pedido[2],
+                                                                pedido[3]), pedido[2])
+        except KeyError:
+            resultados[pedido] = None
+            motivos[pedido] = 'coluna_ausente'
+        except TypeError:
+            resultados[pedido] = None  # argsort de rótulos de tipos misturados no cruzamento
+            motivos[pedido] = 'rotulos_sem_ordem'
+    return resultados
+
+
+def executar_plano(pedidos, tabelas, originais, estado, resultados):
+    """
+    Calcula os pedidos que ainda não estão em resultados (dict pedido ->
+    resultado, preenchido aqui) sobre as tabelas filtradas. originais: tabela
+    -> DataFrame original (ou None); estado: dict do planejador no snapshot
+    (códigos das colunas), vazio na primeira chamada.
+    Retorna o relatório: pedidos, únicos, calculados, passadas (tabelas
+    percorridas), ms, recuos (motivo -> pedidos calculados pela referência:
+    vazio, coluna_ausente, rotulos_sem_ordem, formato_longo, sem_tabela) e
+    erros (pedidos cuja referência também falhou, deixados para o gráfico).
+    """
+    inicio = time.perf_counter()
+    pedidos = list(pedidos)
+    plano = planejar(pedidos)
+    unicos = sum(len(lista) for lista in plano.values())
+    plano = {tabela: [pedido for pedido in lista if pedido not in resultados] for tabela, lista in plano.items()}
+    plano = {tabela: lista for tabela, lista in plano.items() if lista}
+
+    calculados = {}
+    motivos = {}
+    for tabela, lista in plano.items():
+        df = tabelas.get(tabela)
+        if df is None:
+            motivos.update(dict.fromkeys(lista, 'sem_tabela'))
+            continue
+        try:
+            calculados.update(_passada(estado, tabela, lista, df, originais.get(tabela), motivos))
+        except KeyError:
+            # Formato longo sem as colunas esperadas: as respostas vão pela referência abaixo
+            motivos.update(dict.fromkeys(lista, 'formato_longo'))
+    recuos = {}
+    erros = 0
+    for lista in plano.values():
+        for pedido in lista:
+            if pedido[0] != 'matriz' and calculados.get(pedido) is None:
+                motivo = motivos.get(pedido, 'vazio')
+                recuos[motivo] = recuos.get(motivo, 0) + 1
+                try:
+                    calculados[pedido] = referencia(pedido, tabelas)
+                except Exception:
+                    calculados.pop(pedido, None)  # Fica para o gráfico, que mostra o erro na seção dele
+                    erros += 1
+    # Matrizes: montadas com as respostas já calculadas (as que falharam ficam de fora)
+    for pedido in plano.get(TABELA_RESPOSTAS, []):
+        if pedido[0] == 'matriz':
+            calculados[pedido] = matriz_respostas({rotulo: calculados.get(respostas(pergunta),
+                                                                          resultados.get(respostas(pergunta)))
+                                                   for rotulo, pergunta in pedido[1]})
+    resultados.update(calculados)
+    return {'pedidos': len(pedidos), 'unicos': unicos, 'calculados': len(calculados), 'passadas': len(plano),
+            'ms': round((time.perf_counter() - inicio) * 1000, 2), 'recuos': recuos, 'erros': erros}
@@ -0,0 +1,177 @@
+"""
+Pré-processamento: datas das inscrições, status normalizado dos alunos e
+conversão das avaliações do formato longo (uma linha por pergunta) para o
+formato largo (uma linha por avaliação).
+"""
+
+import pandas as pd
+
+from metalab.carregamento import eh_formato_long
+from metalab.normalizacao import normalizar_status
+from metalab.texto import aplicar_por_valor, em_texto
+
+VALORES_CICLO_INVALIDOS = ['IGNORADOS', 'NAN', 'NONE', '', 'NULL']
+
+
+def preprocessar_dados(inscricoes, alunos):
+    """
+    Adiciona Data_Inscricao/Ano/Mes às inscrições e STATUS_NORMALIZADO (filtros
+    e métricas) e STATUS_DETALHADO (tabela de detalhamento por status) aos alunos
+    """
+    inscricoes_proc = inscricoes.copy()
+    alunos_proc = alunos.copy()
+
+    # Limpar colunas de inscrições
+    if 'Carimbo de data/hora' in inscricoes_proc.columns:
+        inscricoes_proc['Data_Inscricao'] = pd.to_datetime(inscricoes_proc['Carimbo de data/hora'], errors='coerce')
+        inscricoes_proc['Ano'] = inscricoes_proc['Data_Inscricao'].dt.year
+        inscricoes_proc['Mes'] = inscricoes_proc['Data_Inscricao'].dt.month
+
+    # Preparar dados de alunos (vetorizado ao invés de apply)
+    if 'STATUS' in alunos_proc.columns:
+        alunos_proc['STATUS'] = em_texto(alunos_proc['STATUS']).str.upper().str.strip()
+
+        mask_concluido = alunos_proc['STATUS'].str.contains('CONCLUIDO|CONCLUÍDO', case=False, na=False, regex=True)
+        mask_cursando = alunos_proc['STATUS'].str.contains('CURSANDO|EM CURSO|EM ANDAMENTO', case=False, na=False, regex=True)
+        mask_desistente = alunos_proc['STATUS'].str.contains('DESISTENTE', case=False, na=False, regex=True)
+
+        # Mesmo dtype do STATUS (object ou Arrow)
+        alunos_proc['STATUS_NORMALIZADO'] = pd.Series('OUTROS', index=alunos_proc.index, dtype=alunos_proc['STATUS'].dtype)
+        alunos_proc.loc[mask_concluido, 'STATUS_NORMALIZADO'] = 'CONCLUÍDO'
+        alunos_proc.loc[mask_cursando, 'STATUS_NORMALIZADO'] = 'CURSANDO'
+        alunos_proc.loc[mask_desistente, 'STATUS_NORMALIZADO'] = 'DESISTENTE'
+
+        # Variações agrupadas com normalizar_status (uma chamada por valor distinto)
+        alunos_proc['STATUS_DETALHADO'] = aplicar_por_valor(alunos_proc['STATUS'], normalizar_status)
+    else:
+        alunos_proc['STATUS_NORMALIZADO'] = 'OUTROS'
+
+    return inscricoes_proc, alunos_proc
+
+
+def localizar_colunas_avaliacao(avaliacoes):
+    """Retorna (coluna_pergunta, id_col, valor_col) do formato longo; None quando ausentes"""
+    coluna_pergunta = None
+    for col in avaliacoes.columns:
+        if 'pergunta' in str(col).lower():
+            coluna_pergunta = col
+            break
+
+    id_col = None
+    for col in avaliacoes.columns:
+        col_lower = str(col).lower()
+        if any(palavra in col_lower for palavra in ['usuário', 'usuario', 'opinião', 'opiniao', 'pesquisa']):
+            id_col = col
+            break
+
+    valor_col = None
+    for col in avaliacoes.columns:
+        if 'resposta de texto livre' in str(col).lower():
+            if avaliacoes[col].notna().sum() > len(avaliacoes) * 0.1:
+                valor_col = col
+                break
+
+    if valor_col is None:
+        for col in avaliacoes.columns:
+            if 'nome exibido' in str(col).lower():
+                valor_col = col
+                break
+
+    return coluna_pergunta, id_col, valor_col
+
+
+def calcular_avaliacao_id(avaliacoes, coluna_pergunta, id_col=None):
+    """
+    Numera as avaliações do formato longo: uma nova avaliação começa a cada
+    ocorrência da primeira pergunta (dentro de cada id_col, se houver).
+    """
+    inicio = avaliacoes[coluna_pergunta] == avaliacoes[coluna_pergunta].iloc[0]
+    if not id_col:
+        return inicio.cumsum()
+    sequencia = inicio.groupby(avaliacoes[id_col], sort=False).cumsum()
+    # Combinar com id_col para que avaliações de grupos diferentes não colidam
+    return sequencia.groupby([avaliacoes[id_col], sequencia], sort=False, dropna=False).ngroup()
+
+
+def numerar_avaliacoes(avaliacoes):
+    """
+    Cópia do formato longo com a coluna 'avaliacao_id' (o índice das linhas do
+    pivot), que liga cada resposta à sua avaliação depois dos filtros.
+    """
+    if avaliacoes is None or len(avaliacoes) == 0 or not eh_formato_long(avaliacoes):
+        return avaliacoes
+    if 'avaliacao_id' in avaliacoes.columns:
+        return avaliacoes
+    coluna_pergunta, id_col, _ = localizar_colunas_avaliacao(avaliacoes)
+    if not coluna_pergunta:
+        return avaliacoes
+    return avaliacoes.assign(avaliacao_id=calcular_avaliacao_id(avaliacoes, coluna_pergunta, id_col))
+
+
+def _ciclo_por_avaliacao(avaliacoes, avaliacao_id, coluna_pergunta, valor_col):
+    """Extrai o valor da pergunta CICLO de cada avaliação (sem o '.0' do final)"""
+    perguntas = em_texto(avaliacoes[coluna_pergunta]).str.upper().str.strip()
+    perguntas_ciclo = [p for p in perguntas.unique() if 'CICLO' in p]
+    if not perguntas_ciclo:
+        return None
+
+    mask_ciclo = perguntas == perguntas_ciclo[0]
+    ciclos = em_texto(avaliacoes.loc[mask_ciclo, valor_col].dropna()).str.strip()
+    ciclos = ciclos.str.replace(r'\.0$', '', regex=True).str.strip()
+    ciclos = ciclos[~ciclos.str.upper().isin(VALORES_CICLO_INVALIDOS)]
+    return pd.Series(ciclos.values, index=avaliacao_id[ciclos.index].values)
+
+
+def fazer_pivot_avaliacoes(avaliacoes):
+    """
+    Converte avaliações de formato longo para formato largo (wide).
+
+    O índice do resultado é o avaliacao_id (a coluna de numerar_avaliacoes, se
+    presente, ou calculado aqui).
+    """
+    if avaliacoes is None or len(avaliacoes) == 0 or not eh_formato_long(avaliacoes):
+        return avaliacoes  # Vazio ou já está em formato largo
+
+    try:
+        coluna_pergunta, id_col, valor_col = localizar_colunas_avaliacao(avaliacoes)
+        if not (coluna_pergunta and valor_col):
+            return avaliacoes
+
+        if 'avaliacao_id' in avaliacoes.columns:
+            avaliacao_id = avaliacoes['avaliacao_id']
+        else:
+            avaliacao_id = calcular_avaliacao_id(avaliacoes, coluna_pergunta, id_col)
+
+        # Extrair CICLO e Pesquisa antes do pivot (o pivot descarta as demais colunas)
+        ciclos = _ciclo_por_avaliacao(avaliacoes, avaliacao_id, coluna_pergunta, valor_col)
+        pesquisas = None
+        if 'Pesquisa' in avaliacoes.columns:
+            primeira_linha = ~avaliacao_id.duplicated()
+            pesquisas = pd.Series(avaliacoes.loc[primeira_linha, 'Pesquisa'].values,
+                                  index=avaliacao_id[primeira_linha].values).dropna()
+
+        avaliacoes_para_pivot = pd.DataFrame({
+            'avaliacao_id': avaliacao_id,
+            'pergunta': avaliacoes[coluna_pergunta],
+            'valor': avaliacoes[valor_col],
+        }).dropna(subset=['pergunta', 'valor'])
+
+        avaliacoes_pivot = avaliacoes_para_pivot.pivot_table(
+            index='avaliacao_id',
+            columns='pergunta',
+            values='valor',
+            aggfunc='first',
+            fill_value=None
+        )
+
+        # Preencher faltantes com a avaliação vizinha (mesma ordem do arquivo)
+        if ciclos is not None and len(ciclos) > 0:
+            ciclos = ciclos[~ciclos.index.duplicated()]
+            avaliacoes_pivot['CICLO'] = ciclos.reindex(avaliacoes_pivot.index).ffill().bfill()
+        if pesquisas is not None and len(pesquisas) > 0:
+            avaliacoes_pivot['Pesquisa'] = pesquisas.reindex(avaliacoes_pivot.index).ffill().bfill()
+
+        avaliacoes_pivot.columns.name = None
+        return avaliacoes_pivot
+    except Exception:
+        return avaliacoes  # Se falhar, retornar original
@@ -0,0 +1,182 @@
+"""
+Resolução das regiões das inscrições para o filtro de local.
+
+O filtro de local procura, nas colunas de endereço/região das inscrições, as
+regiões do DF contidas no LOCAL escolhido. Em vez de um str.contains por
+(coluna, palavra) sobre todas as linhas, todas as palavras possíveis (as
+regiões de REGIOES_DF e os nomes de local sem região conhecida) viram um
+único autômato Aho–Corasick. Cada texto distinto das colunas de local passa
+uma vez pelo autômato, e o resultado fica numa tabela esparsa (texto,
+palavra). As colunas ficam como códigos dos textos distintos. Isso é feito
+uma vez por snapshot: no pré-processamento offline ou na carga do dashboard.
+Com o filtro, as linhas que batem saem de uma indexação nos códigos.
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from metalab.texto import em_texto
+
+# Regiões administrativas do DF usadas para relacionar o LOCAL do aluno com as inscrições
+REGIOES_DF = ['PLANALTINA', 'GAMA', 'CEILANDIA', 'CEILÂNDIA', 'TAGUATINGA', 'SAMAMBAIA',
+              'BRAZLANDIA', 'BRAZLÂNDIA', 'SOBRADINHO', 'GUARA', 'GUARÁ', 'CRUZEIRO',
+              'AGUAS CLARAS', 'ÁGUAS CLARAS', 'RIACHO FUNDO', 'SANTA MARIA',
+              'RECANTO DAS EMAS', 'CANDANGOLANDIA', 'CANDANGOLÂNDIA']
+
+PALAVRAS_COLUNA_LOCAL = ['local', 'região', 'regiao', 'cidade', 'endereco', 'endereço', 'bairro',
+                         'endereco completo', 'endereço completo']
+
+# Arrays da resolução (nome -> descrição), gravados no bundle e no armazém
+ARRAYS_REGIOES = {
+    'palavras': 'palavras procuradas (regiões e nomes de local), sem repetição',
+    'colunas': 'colunas de local das inscrições, na ordem das colunas de codigos',
+    'ids': 'índice (rótulo) de cada linha das inscrições',
+    'codigos': 'texto distinto de cada linha (linhas x colunas)',
+    'pares_texto': 'texto distinto de cada par (texto, palavra contida nele)',
+    'pares_palavra': 'palavra de cada par (texto, palavra contida nele)',
+}
+
+
+def palavras_chave_local(local):
+    """Regiões conhecidas contidas no nome do local (ou o próprio nome, se nenhuma)"""
+    local_upper = str(local).upper().strip()
+    palavras = [regiao for regiao in REGIOES_DF if regiao in local_upper]
+    return palavras or [local_upper]
+
+
+def colunas_local(colunas):
+    """Colunas cujo nome indica local, região ou endereço"""
+    return [col for col in colunas if any(palavra in str(col).lower() for palavra in PALAVRAS_COLUNA_LOCAL)]
+
+
+def compilar_automato(palavras):
+    """Autômato Aho–Corasick das palavras: (transições, falhas, palavras que terminam em cada estado)"""
+    transicoes, saidas = [{}], [[]]
+    for posicao, palavra in enumerate(palavras):
+        estado = 0
+        for caractere in palavra:
+            proximo = transicoes[estado].get(caractere)
+            if proximo is None:
+                proximo = len(transicoes)
+                transicoes[estado][caractere] = proximo
+                transicoes.append({})
+                saidas.append([])
+            estado = proximo
+        saidas[estado].append(posicao)
+
+    # Falha de cada estado: o maior sufixo que também é prefixo de alguma palavra (em largura)
+    falhas = [0] * len(transicoes)
+    fila = deque(transicoes[0].values())
+    while fila:
+        estado = fila.popleft()
+        for caractere, proximo in transicoes[estado].items():
+            fila.append(proximo)
+            falha = falhas[estado]
+            while falha and caractere not in transicoes[falha]:
+                falha = falhas[falha]
+            falhas[proximo] = transicoes[falha].get(caractere, 0) if estado else 0
+            saidas[proximo] = saidas[proximo] + saidas[falhas[proximo]]
+    return transicoes, falhas, saidas
+
+
+def encontrar_palavras(automato, texto):
+    """Posições (em palavras) de todas as palavras contidas no texto, numa passada"""
+    transicoes, falhas, saidas = automato
+    encontradas = set(saidas[0])  # Palavra vazia está em qualquer texto
+    estado = 0
+    for caractere in texto:
+        while estado and caractere not in transicoes[estado]:
+            estado = falhas[estado]
+        estado = transicoes[estado].get(caractere, 0)
+        encontradas.update(saidas[estado])
+    return encontradas
+
+
+def resolver_regioes(inscricoes, palavras, colunas=None):
+    """
+    Tabela (texto, palavra) das colunas de local das inscrições (dict de
+    arrays, ver ARRAYS_REGIOES). Os textos são comparados como no filtro:
+    astype(str) em maiúsculas, com as palavras em maiúsculas.
+    """
+    palavras = list(dict.fromkeys(str(palavra).upper() for palavra in palavras))
+    colunas = colunas_local(inscricoes.columns) if colunas is None else colunas
+    textos = [em_texto(inscricoes[col]).str.upper() for col in colunas]
+    if textos:
+        codigos, distintos = pd.factorize(pd.concat(textos, ignore_index=True))
+        codigos = codigos.reshape(len(colunas), len(inscricoes)).T
+    else:
+        codigos, distintos = np.empty((len(inscricoes), 0), dtype=np.int64), []
+
+    automato = compilar_automato(palavras)
+    pares = [(posicao, palavra) for posicao, texto in enumerate(distintos)
+             for palavra in sorted(encontrar_palavras(automato, texto))]
+    return {
+        'palavras': np.array(palavras, dtype=str),
+        'colunas': np.array([str(col) for col in colunas], dtype=str),
+        'ids': inscricoes.index.to_numpy(dtype=np.int64),
+        'codigos': codigos.astype(np.int32),
+        'pares_texto': np.array([texto for texto, _ in pares], dtype=np.int32),
+        'pares_palavra': np.array([palavra for _, palavra in pares], dtype=np.int32),
+    }
+
+
+def construir_regioes(inscricoes, alunos):
+    """
+    Resolução das inscrições originais com as palavras de todos os locais
+    (valores de LOCAL dos alunos); None sem colunas de local ou com índice não
+    numérico.
+    """
+    if inscricoes is None or not colunas_local(inscricoes.columns):
+        return None
+    if not pd.api.types.is_integer_dtype(inscricoes.index.dtype):
+        return None
+    palavras = list(REGIOES_DF)
+    if alunos is not None and 'LOCAL' in alunos.columns:
+        for local in alunos['LOCAL'].dropna().unique():
+            palavras += palavras_chave_local(local)
+    return resolver_regioes(inscricoes, palavras)
+
+
+def _linhas_resolvidas(regioes, inscricoes):
+    """Posição de cada linha de inscricoes na resolução; None se alguma linha ou coluna não estiver nela"""
+    if list(regioes['colunas']) != [str(col) for col in colunas_local(inscricoes.columns)]:
+        return None
+    if len(inscricoes) == len(regioes['ids']) and np.array_equal(inscricoes.index.to_numpy(), regioes['ids']):
+        return np.arange(len(inscricoes))
+    posicoes = pd.Index(regioes['ids']).get_indexer(inscricoes.index)
+    return None if (posicoes < 0).any() else posicoes
+
+
+def filtrar_local_inscricoes(inscricoes, palavras, regioes=None):
+    """
+    Inscrições do local: com coluna LOCAL, as que contêm alguma das palavras
+    nela; depois, se alguma contiver uma palavra em qualquer coluna de local,
+    só essas (senão, todas). regioes: resolução do snapshot (construir_regioes);
+    sem ela, ou sem as palavras nela, as inscrições são resolvidas aqui.
+    """
+    colunas = colunas_local(inscricoes.columns)
+    if not colunas:
+        return inscricoes
+    palavras = [str(palavra).upper() for palavra in palavras]
+    linhas = None
+    if regioes is not None and set(palavras) <= set(regioes['palavras']):
+        linhas = _linhas_resolvidas(regioes, inscricoes)
+    if linhas is None:
+        regioes = resolver_regioes(inscricoes, palavras, colunas)
+        linhas = np.arange(len(inscricoes))
+
+    # Textos que contêm alguma das palavras (posição extra: código -1, que não ocorre)
+    procuradas = np.isin(regioes['palavras'], palavras)
+    texto_bate = np.zeros(int(regioes['codigos'].max(initial=-1)) + 2, dtype=bool)
+    texto_bate[regioes['pares_texto'][procuradas[regioes['pares_palavra']]]] = True
+    batem = texto_bate[regioes['codigos'][linhas]]
+
+    manter = np.ones(len(inscricoes), dtype=bool)
+    if 'LOCAL' in inscricoes.columns:
+        manter = batem[:, colunas.index('LOCAL')]
+    alguma = manter & batem.any(axis=1)
+    if alguma.any():
+        manter = alguma
+    return inscricoes if manter.all() else inscricoes[manter]
@@ -0,0 +1,322 @@
+"""
+Gerador de dados sintéticos no formato das planilhas do Metalab.
+
+Produz inscrições, alunos e avaliações (formato longo) com os mesmos nomes de
+colunas e perguntas das planilhas reais, incluindo as sujeiras que aparecem
+nelas: acentos ausentes, caixa e espaços variados, ciclos '2.0', datas em outro
+formato, células vazias e o CSV de alunos em cp1252 (exportação do Excel).
+Serve para reproduzir problemas de desempenho sem os dados de produção:
+
+    python -m metalab.sintetico --linhas 100000 --saida /tmp/dados_100k
+    DATA_DIR=/tmp/dados_100k streamlit run dashboard_metalab.py
+
+Tudo é gerado de forma vetorizada (numpy): 1 milhão de inscrições sai em
+poucos segundos e o tempo total fica dominado pela escrita dos CSVs.
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from metalab.carregamento import ARQUIVOS_ALUNOS, ARQUIVOS_AVALIACOES, ARQUIVOS_INSCRICOES
+from metalab.colunas import (COLUNA_CANAIS_INSCRICAO, COLUNA_HORARIO, COLUNA_REGIAO_INSCRICAO, PERGUNTA_ESPACO,
+                             PERGUNTA_INSTALACOES)
+
+# Tamanho das demais tabelas em relação ao número de inscrições
+PROPORCAO_ALUNOS = 0.5
+PROPORCAO_AVALIACOES = 0.1  # Formulários respondidos (cada um vira uma linha por pergunta)
+
+# Posição de cada campo na string ISO 'AAAA-MM-DDTHH:MM:SS'
+POSICOES_ISO = {'Y': range(0, 4), 'm': range(5, 7), 'd': range(8, 10), 'H': range(11, 13), 'M': range(14, 16),
+                'S': range(17, 19)}
+
+# Fração padrão de valores "sujos" (variantes de escrita, vazios, outro formato)
+SUJEIRA_PADRAO = 0.05
+
+CANAIS = ['Instagram', 'Facebook', 'WhatsApp', 'Indicação de amigos', 'Site da ONG', 'Cartaz', 'Escola']
+REGIOES = ['Planaltina', 'Gama', 'Ceilândia', 'Taguatinga', 'Samambaia', 'Sobradinho II', 'Brazlândia',
+           'Santa Maria', 'Recanto das Emas', 'Águas Claras']
+LOCAIS = ['Planaltina - Centro', 'Gama Leste', 'Ceilândia Norte', 'Taguatinga Sul', 'Samambaia Sul',
+          'Sobradinho II']
+CURSOS = ['Marketing Digital', 'Mídias Sociais', 'Design Gráfico', 'Produção de Conteúdo']
+CICLOS = ['1', '2', '3', '4']
+HORARIOS = ['Manhã', 'Tarde', 'Noite']
+
+# (valor limpo, variantes sujas) - as variantes aparecem na fração de sujeira
+SEXOS = [('Feminino', ['feminino', 'FEMININO ', 'Fem']),
+         ('Masculino', ['masculino', 'MASCULINO', 'Masc']),
+         ('Prefiro não dizer', ['Prefiro nao dizer'])]
+RACAS = [('Parda', ['parda', 'PARDO']), ('Preta', ['preta', 'Negra']), ('Branca', ['branca', 'BRANCO']),
+         ('Amarela', ['amarela']), ('Indígena', ['Indigena'])]
+RENDAS = [('Não possui renda mensal', ['Nao possui renda', 'Sem renda']),
+          ('Até meio salário mínimo', ['Ate 1/2 salario minimo', 'Até meio salario']),
+          ('Até um salário mínimo', ['Até 1 salário mínimo', 'ATE UM SALARIO MINIMO']),
+          ('De 1 a 2 salários mínimos', ['De 1 a 2 salarios minimos', '1 a 2 salários']),
+          ('De 2 a 3 salários mínimos', ['De 2 a 3 salarios minimos']),
+          ('De 3 a 4 salários mínimos', ['3 a 4 salários mínimos']),
+          ('Acima de 5 salários mínimos', ['Acima de 5 salarios minimos', 'Mais de 5 salários'])]
+STATUS = [('CONCLUÍDO', ['Concluído', 'CONCLUIDO', 'concluido ']),
+          ('CURSANDO', ['Cursando', 'EM CURSO', 'Em andamento']),
+          ('DESISTENTE', ['Desistente', 'DESISTIU']),
+          ('NÃO COMPARECEU', ['Nao compareceu', 'FALTOU'])]
+PESOS_STATUS = [0.45, 0.3, 0.2, 0.05]
+
+SATISFACAO = ['Muito satisfeito', 'Satisfeito', 'Regular', 'Insatisfeito', 'Muito insatisfeito']
+CONCORDANCIA = ['Concordo totalmente', 'Concordo', 'Neutro', 'Discordo', 'Discordo totalmente']
+NOTAS = ['Ótimo', 'Bom', 'Regular', 'Ruim', 'Péssimo']
+PESOS_POSITIVOS = [0.4, 0.35, 0.15, 0.07, 0.03]
+
+# Perguntas das avaliações no formato longo: (pergunta, respostas, pesos)
+PERGUNTAS_AVALIACAO = [
+    ('Qual ciclo você participou?', CICLOS, None),
+    ('Qual curso você realizou?', CURSOS, None),
+    ('Considerei o curso MetaLab', NOTAS, PESOS_POSITIVOS),
+    ('Avalie o educador social que ministrou o curso', NOTAS, PESOS_POSITIVOS),
+    (PERGUNTA_ESPACO, SATISFACAO, PESOS_POSITIVOS),
+    (PERGUNTA_INSTALACOES, SATISFACAO, PESOS_POSITIVOS),
+    ('Como ficou sabendo do curso?', CANAIS, None),
+    ('O conteúdo atendeu minhas expectativas?', CONCORDANCIA, PESOS_POSITIVOS),
+    ('Você indicaria o curso para familiares e amigos?', ['Sim', 'Não', 'Talvez'], [0.8, 0.05, 0.15]),
+    ('Recebi suporte da coordenação pedagógica', CONCORDANCIA, PESOS_POSITIVOS),
+    (COLUNA_HORARIO, HORARIOS, None),
+    ('Deixe um comentário sobre o curso', None, None),  # Resposta de texto livre
+]
+COMENTARIOS = ['Gostei muito do curso', 'O professor explica muito bem', 'Poderia ter mais aulas práticas',
+               'O horário ficou ruim para mim', 'Suporte excelente', 'Laboratório com computadores lentos']
+
+
+def _escolher(rng, valores, n, pesos=None):
+    """n valores sorteados (object array) com pesos opcionais"""
+    valores = np.asarray(valores, dtype=object)
+    if pesos is not None:
+        pesos = np.asarray(pesos, dtype=float) / np.sum(pesos)
+    return valores[rng.choice(len(valores), size=n, p=pesos)]
+
+
+def _escolher_com_variantes(rng, categorias, n, sujeira, pesos=None, vazios=True):
+    """
+    Sorteia as categorias (valor limpo, variantes) e troca uma fração `sujeira`
+    por uma variante suja da mesma categoria; parte da sujeira vira célula vazia.
+    """
+    limpos = [limpo for limpo, _ in categorias]
+    codigos = rng.choice(len(categorias), size=n, p=None if pesos is None else np.asarray(pesos) / np.sum(pesos))
+    valores = np.asarray(limpos, dtype=object)[codigos]
+    if sujeira <= 0:
+        return valores
+
+    sujos = np.flatnonzero(rng.random(n) < sujeira)
+    for categoria, (_, variantes) in enumerate(categorias):
+        alvo = sujos[codigos[sujos] == categoria]
+        if len(alvo) and variantes:
+            valores[alvo] = _escolher(rng, variantes, len(alvo))
+    if vazios:
+        valores[sujos[rng.random(len(sujos)) < 0.2]] = None
+    return valores
+
+
+def _combinacoes_canais():
+    """Respostas de múltipla escolha (1 a 3 canais, na ordem do formulário) e seus pesos"""
+    respostas, pesos = [], []
+    for k, peso in ((1, 0.55), (2, 0.3), (3, 0.15)):
+        combinacoes = list(itertools.combinations(CANAIS, k))
+        respostas += [', '.join(c) for c in combinacoes]
+        pesos += [peso / len(combinacoes)] * len(combinacoes)
+    return respostas, pesos
+
+
+def _datas(rng, n, inicio, dias):
+    """n datas aleatórias a partir de `inicio` (datetime64[s])"""
+    segundos = rng.integers(0, dias * 86400, size=n)
+    return np.datetime64(inicio, 's') + segundos.astype('timedelta64[s]')
+
+
+def _formatar_datas(datas, formato):
+    """
+    Formata datetime64 como strftime faria, mas vetorizado: reorganiza os
+    caracteres da string ISO (Series.dt.strftime é o gargalo em milhões de linhas).
+    Aceita só %Y %m %d %H %M %S e caracteres literais.
+    """
+    iso = np.datetime_as_string(np.asarray(datas, dtype='datetime64[s]'), unit='s')
+    if len(iso) == 0:
+        return iso.astype(object)
+    caracteres = iso.view(np.uint32).reshape(len(iso), -1)
+    colunas = []
+    partes = iter(formato)
+    for caractere in partes:
+        if caractere == '%':
+            colunas += [caracteres[:, i] for i in POSICOES_ISO[next(partes)]]
+        else:
+            colunas.append(np.full(len(iso), ord(caractere), dtype=np.uint32))
+    saida = np.ascontiguousarray(np.column_stack(colunas)).view(f'<U{len(colunas)}').ravel()
+    return saida.astype(object)
+
+
+def _emails(prefixo, ids):
+    return (prefixo + pd.Series(ids).astype(str) + '@email.com').to_numpy(dtype=object)
+
+
+def gerar_inscricoes(n, rng, sujeira=SUJEIRA_PADRAO):
+    """Inscrições do formulário (uma linha por pessoa, e-mails pessoa<i>@email.com)"""
+    carimbos = _formatar_datas(_datas(rng, n, '2023-01-01', 900), '%Y/%m/%d %H:%M:%S')
+    if sujeira > 0:
+        # Parte das planilhas vem com a data no formato brasileiro
+        outro_formato = np.flatnonzero(rng.random(n) < sujeira)
+        carimbos[outro_formato] = _formatar_datas(_datas(rng, len(outro_formato), '2023-01-01', 900),
+                                                  '%d/%m/%Y %H:%M:%S')
+
+    canais, pesos_canais = _combinacoes_canais()
+    ids = np.arange(n)
+    regioes = _escolher(rng, REGIOES, n)
+    return pd.DataFrame({
+        'Carimbo de data/hora': carimbos,
+        'Nome completo:': ('Pessoa ' + pd.Series(ids).astype(str)).to_numpy(dtype=object),
+        'E-mail:': _emails('pessoa', ids),
+        'Sexo:': _escolher_com_variantes(rng, SEXOS, n, sujeira, pesos=[0.6, 0.37, 0.03]),
+        COLUNA_CANAIS_INSCRICAO: _escolher(rng, canais, n, pesos_canais),
+        COLUNA_REGIAO_INSCRICAO: regioes,
+        'Endereço completo:': ('Quadra ' + pd.Series(rng.integers(1, 60, n)).astype(str) + ', '
+                               + pd.Series(regioes)).to_numpy(dtype=object),
+    })
+
+
+def gerar_alunos(n, rng, sujeira=SUJEIRA_PADRAO, total_inscricoes=None):
+    """
+    Alunos matriculados: parte das pessoas inscritas (mesmos e-mails), com ciclo,
+    local, curso, status, nascimento, raça/cor e renda.
+    """
+    total_inscricoes = max(total_inscricoes or n, n)
+    ids = np.sort(rng.choice(total_inscricoes, size=n, replace=False))
+
+    nascimentos = _formatar_datas(_datas(rng, n, '1960-01-01', 365 * 48), '%d/%m/%Y')
+    ciclos = _escolher(rng, CICLOS, n, [0.35, 0.3, 0.2, 0.15])
+    if sujeira > 0:
+        sujos = np.flatnonzero(rng.random(n) < sujeira)
+        # Datas ISO e vazias; ciclos em branco deixam a coluna numérica ('2.0' depois da leitura)
+        nascimentos[sujos[: len(sujos) // 2]] = _formatar_datas(_datas(rng, len(sujos) // 2, '1960-01-01', 365 * 48),
+                                                                 '%Y-%m-%d')
+        nascimentos[sujos[len(sujos) // 2:]] = None
+        ciclos[sujos[rng.random(len(sujos)) < 0.1]] = None
+
+    return pd.DataFrame({
+        'NOME': ('Pessoa ' + pd.Series(ids).astype(str)).to_numpy(dtype=object),
+        'EMAIL': _emails('pessoa', ids),
+        'SEXO': _escolher_com_variantes(rng, SEXOS[:2], n, sujeira, pesos=[0.6, 0.4]),
+        'DATA DE NASCIMENTO': nascimentos,
+        'RAÇA/COR (IBGE)': _escolher_com_variantes(rng, RACAS, n, sujeira, pesos=[0.5, 0.2, 0.25, 0.03, 0.02]),
+        'RENDA FAMILIAR': _escolher_com_variantes(rng, RENDAS, n, sujeira,
+                                                  pesos=[0.1, 0.15, 0.3, 0.25, 0.1, 0.06, 0.04]),
+        'CICLO': ciclos,
+        'LOCAL': _escolher(rng, LOCAIS, n),
+        'CURSO': _escolher(rng, CURSOS, n),
+        'STATUS': _escolher_com_variantes(rng, STATUS, n, sujeira, pesos=PESOS_STATUS),
+    })
+
+
+def gerar_avaliacoes(n, rng, sujeira=SUJEIRA_PADRAO):
+    """
+    Avaliações no formato longo do Google Forms: uma linha por (formulário,
+    pergunta), com Pesquisa, Usuário, Pergunta, Nome exibido e Resposta de texto livre.
+    """
+    n_perguntas = len(PERGUNTAS_AVALIACAO)
+    ciclos = _escolher(rng, CICLOS, n, [0.35, 0.3, 0.2, 0.15])
+    # O ciclo 1 não tem número no nome da pesquisa
+    pesquisas = np.where(ciclos == '1', 'Avaliação MCOM MKT DIGITAL',
+                         'Avaliação MCOM ' + ciclos.astype(str) + ' CICLO').astype(object)
+
+    respostas = np.empty((n, n_perguntas), dtype=object)
+    texto_livre = np.full((n, n_perguntas), None, dtype=object)
+    for i, (pergunta, opcoes, pesos) in enumerate(PERGUNTAS_AVALIACAO):
+        if opcoes is None:
+            comentarios = _escolher(rng, COMENTARIOS, n)
+            comentarios[rng.random(n) < 0.4] = None  # Comentário é opcional
+            texto_livre[:, i] = comentarios
+        elif opcoes is CICLOS:
+            respostas[:, i] = ciclos
+        else:
+            respostas[:, i] = _escolher(rng, opcoes, n, pesos)
+
+    if sujeira > 0:
+        # Ciclo digitado como número ('2.0') e respostas sem acento
+        ciclo_decimal = rng.random(n) < sujeira
+        respostas[ciclo_decimal, 0] = respostas[ciclo_decimal, 0] + '.0'
+        for i, (_, opcoes, _) in enumerate(PERGUNTAS_AVALIACAO):
+            if opcoes is NOTAS:
+                sem_acento = (rng.random(n) < sujeira) & (respostas[:, i] == 'Ótimo')
+                respostas[sem_acento, i] = 'otimo'
+
+    return pd.DataFrame({
+        'Pesquisa': np.repeat(pesquisas, n_perguntas),
+        'Usuário': np.repeat(_emails('aluno', np.arange(n)), n_perguntas),
+        'Pergunta': np.tile(np.array([p for p, _, _ in PERGUNTAS_AVALIACAO], dtype=object), n),
+        'Nome exibido': respostas.ravel(),
+        'Resposta de texto livre': texto_livre.ravel(),
+    })
+
+
+def gerar_tabelas(linhas, semente=0, sujeira=SUJEIRA_PADRAO, alunos=None, avaliacoes=None):
+    """
+    Gera as três tabelas para `linhas` inscrições (alunos e formulários de
+    avaliação proporcionais, se não informados). Mesma semente, mesmos dados.
+    """
+    rng = np.random.default_rng(semente)
+    n_alunos = int(linhas * PROPORCAO_ALUNOS) if alunos is None else alunos
+    n_avaliacoes = max(int(linhas * PROPORCAO_AVALIACOES), 1) if avaliacoes is None else avaliacoes
+    return {
+        'inscricoes': gerar_inscricoes(linhas, rng, sujeira),
+        'alunos': gerar_alunos(n_alunos, rng, sujeira, total_inscricoes=linhas),
+        'avaliacoes': gerar_avaliacoes(n_avaliacoes, rng, sujeira),
+    }
+
+
+def salvar_csvs(tabelas, diretorio, encoding_alunos='cp1252'):
+    """
+    Grava as tabelas com os nomes de arquivo que o dashboard procura. Avaliações
+    vão com ';' (exportação brasileira) e alunos no encoding do Excel.
+    Retorna dict nome -> caminho.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    formatos = {
+        'inscricoes': (ARQUIVOS_INSCRICOES[0], ',', 'utf-8'),
+        'avaliacoes': (ARQUIVOS_AVALIACOES[0], ';', 'utf-8'),
+        'alunos': (ARQUIVOS_ALUNOS[0], ',', encoding_alunos),
+    }
+    caminhos = {}
+    for nome, df in tabelas.items():
+        arquivo, sep, encoding = formatos[nome]
+        caminhos[nome] = os.path.join(diretorio, arquivo)
+        df.to_csv(caminhos[nome], index=False, sep=sep, encoding=encoding)
+    return caminhos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera CSVs sintéticos no formato das planilhas do Metalab.')
+    parser.add_argument('--linhas', type=int, default=10000, help='número de inscrições (padrão: 10000)')
+    parser.add_argument('--alunos', type=int, help=f'número de alunos (padrão: {PROPORCAO_ALUNOS:g} x linhas)')
+    parser.add_argument('--avaliacoes', type=int,
+                        help=f'formulários de avaliação (padrão: {PROPORCAO_AVALIACOES:g} x linhas)')
+    parser.add_argument('--saida', default='dados_sinteticos', help='pasta de saída (padrão: dados_sinteticos)')
+    parser.add_argument('--semente', type=int, default=0, help='semente do gerador (padrão: 0)')
+    parser.add_argument('--sujeira', type=float, default=SUJEIRA_PADRAO,
+                        help=f'fração de valores sujos, 0 desliga (padrão: {SUJEIRA_PADRAO})')
+    parser.add_argument('--encoding-alunos', default='cp1252', help='encoding do CSV de alunos (padrão: cp1252)')
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    tabelas = gerar_tabelas(args.linhas, args.semente, args.sujeira, args.alunos, args.avaliacoes)
+    gerado = time.perf_counter()
+    caminhos = salvar_csvs(tabelas, args.saida, args.encoding_alunos)
+    fim = time.perf_counter()
+
+    for nome, caminho in caminhos.items():
+        print(f'{nome:<12}{len(tabelas[nome]):>12,} linhas  {os.path.getsize(caminho) / 1024 ** 2:>9,.1f} MB  {caminho}')
+    print(f'gerado em {gerado - inicio:.1f} s, gravado em {fim - gerado:.1f} s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
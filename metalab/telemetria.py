@@ -0,0 +1,285 @@
+"""
+Telemetria de desempenho do dashboard em arquivos locais, sem serviços externos.
+
+Com METALAB_TELEMETRIA apontando para uma pasta, cada rerun medido por
+metalab.perf gera:
+
+    <pasta>/metalab-<host>-<pid>.jsonl   uma linha JSON por rerun (para tail/jq)
+    <pasta>/metalab-<host>-<pid>.prom    métricas acumuladas do processo no formato
+                                         texto do Prometheus (textfile collector
+                                         do node_exporter ou qualquer scraper local)
+
+Um arquivo por processo: réplicas e workers não disputam o mesmo arquivo, e o
+.prom é regravado com rename atômico para o scraper nunca ler pela metade. Os
+contadores são do processo (somam todas as sessões) e protegidos por um lock,
+já que cada sessão do Streamlit roda o script na sua própria thread.
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Limites (segundos) do histograma de duração do rerun, por combinação de filtros
+LIMITES_HISTOGRAMA = [0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+# Profundidade máxima das etapas exportadas no .prom (seções e suas etapas diretas)
+NIVEL_MAXIMO_ETAPAS = 1
+
+_lock = threading.Lock()
+_estado = {
+    'reruns': {},     # combinação de filtros -> {'buckets': [...], 'soma': s, 'total': n}
+    'etapas': {},     # caminho -> {'soma': s, 'total': n}
+    'cache': {},      # função -> {'chamadas': n, 'execucoes': n}
+    'execucoes': {},  # função -> n (corpo da função cacheada executado = cache miss)
+    'ultima_execucao': {},  # função -> instante (epoch) da última execução do corpo
+    'cargas': {},     # snapshot -> {evento: n} (metalab.carga_unica: carga, espera, anterior, acerto, erro)
+    'linhas': {},     # tabela -> linhas carregadas
+    'snapshot': None,  # instante (epoch) em que os dados carregados foram gerados
+    'aquecimento': None,  # relatório do último aquecimento das visões (metalab.visoes.aquecer)
+    'agregacoes': {'planos': 0, 'pedidos': 0, 'calculados': 0, 'passadas': 0, 'ms': 0.0, 'erros': 0,
+                   'recuos': {}},
+}
+
+
+def diretorio_telemetria():
+    """Pasta configurada em METALAB_TELEMETRIA (None = telemetria desligada)"""
+    return os.getenv('METALAB_TELEMETRIA') or None
+
+
+def _identificacao():
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def memoria_rss_bytes():
+    """Memória residente do processo: atual no Linux (/proc), pico (getrusage) nos demais; None no Windows"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo if sys.platform == 'darwin' else maximo * 1024
+
+
+def contar_execucao(funcao):
+    """Chamado dentro do corpo de uma função cacheada: só roda quando o cache falha"""
+    with _lock:
+        _estado['execucoes'][funcao] = _estado['execucoes'].get(funcao, 0) + 1
+        _estado['ultima_execucao'][funcao] = time.time()
+
+
+def contar_carga(nome, evento):
+    """Evento da carga única de um snapshot (ver metalab.carga_unica)"""
+    with _lock:
+        eventos = _estado['cargas'].setdefault(nome, {})
+        eventos[evento] = eventos.get(evento, 0) + 1
+
+
+def ultima_execucao(funcao):
+    """Instante (epoch) da última vez que o corpo da função cacheada executou, ou None"""
+    with _lock:
+        return _estado['ultima_execucao'].get(funcao)
+
+
+def chamar_cacheada(funcao, nome, *args, **kwargs):
+    """Chama a função cacheada e registra se foi acerto (o corpo não executou) ou falha"""
+    with _lock:
+        antes = _estado['execucoes'].get(nome, 0)
+    resultado = funcao(*args, **kwargs)
+    with _lock:
+        contagem = _estado['cache'].setdefault(nome, {'chamadas': 0, 'execucoes': 0})
+        contagem['chamadas'] += 1
+        contagem['execucoes'] += _estado['execucoes'].get(nome, 0) - antes
+    return resultado
+
+
+def registrar_dados(linhas, gerado_em=None):
+    """Linhas carregadas por tabela e instante (epoch) em que os dados foram gerados"""
+    with _lock:
+        _estado['linhas'] = dict(linhas)
+        if gerado_em is not None:
+            _estado['snapshot'] = gerado_em
+
+
+def registrar_aquecimento(relatorio):
+    """Relatório do aquecimento das visões (metalab.visoes.aquecer) do snapshot em uso"""
+    with _lock:
+        _estado['aquecimento'] = dict(relatorio)
+
+
+def registrar_agregacoes(relatorio):
+    """Soma o relatório de um plano de agregações (metalab.planejador.executar_plano) aos totais do processo"""
+    with _lock:
+        totais = _estado['agregacoes']
+        totais['planos'] += 1
+        for chave in ('pedidos', 'calculados', 'passadas', 'ms'):
+            totais[chave] += relatorio[chave]
+        totais['erros'] += relatorio['erros']
+        for motivo, quantidade in relatorio['recuos'].items():
+            totais['recuos'][motivo] = totais['recuos'].get(motivo, 0) + quantidade
+
+
+def estatisticas_cache(nome):
+    """Chamadas e execuções (falhas) registradas por chamar_cacheada para a função"""
+    with _lock:
+        return dict(_estado['cache'].get(nome, {'chamadas': 0, 'execucoes': 0}))
+
+
+def combinacao_filtros(ciclo, local, status, genero):
+    """Rótulo da combinação de filtros ativos ('nenhum', 'ciclo', 'ciclo+local', ...)"""
+    ativos = [nome for nome, valor in (('ciclo', ciclo), ('local', local), ('status', status), ('genero', genero))
+              if valor not in (None, 'Todos')]
+    return '+'.join(ativos) or 'nenhum'
+
+
+def registrar_rerun(resultado, filtros, extras=None):
+    """
+    Registra um rerun (saída de perf.finalizar_perfil) com o rótulo da combinação
+    de filtros: acumula os contadores e grava a linha JSONL e o .prom.
+    """
+    diretorio = diretorio_telemetria()
+    segundos = resultado['total_ms'] / 1000
+    with _lock:
+        histograma = _estado['reruns'].setdefault(
+            filtros, {'buckets': [0] * len(LIMITES_HISTOGRAMA), 'soma': 0.0, 'total': 0})
+        for i, limite in enumerate(LIMITES_HISTOGRAMA):
+            if segundos <= limite:
+                histograma['buckets'][i] += 1
+        histograma['soma'] += segundos
+        histograma['total'] += 1
+
+        etapas = {}
+        for registro in resultado['etapas']:
+            etapas[registro['caminho']] = etapas.get(registro['caminho'], 0) + registro['duracao_ms']
+            if registro['nivel'] <= NIVEL_MAXIMO_ETAPAS:
+                acumulado = _estado['etapas'].setdefault(registro['caminho'], {'soma': 0.0, 'total': 0})
+                acumulado['soma'] += registro['duracao_ms'] / 1000
+                acumulado['total'] += 1
+        linha = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'instancia': _identificacao(),
+            'filtros': filtros,
+            'total_ms': round(resultado['total_ms'], 3),
+            'etapas_ms': {caminho: round(ms, 3) for caminho, ms in etapas.items()},
+            'cache': {nome: dict(contagem) for nome, contagem in _estado['cache'].items()},
+            'cargas': {nome: dict(eventos) for nome, eventos in _estado['cargas'].items()},
+            'aquecimento': _estado['aquecimento'],
+            'linhas': dict(_estado['linhas']),
+            'idade_snapshot_s': round(time.time() - _estado['snapshot'], 1) if _estado['snapshot'] else None,
+            'rss_bytes': memoria_rss_bytes(),
+        }
+        linha.update(extras or {})
+        texto_prometheus = _formatar_prometheus(linha['rss_bytes'])
+
+    if diretorio is None:
+        return linha
+    os.makedirs(diretorio, exist_ok=True)
+    base = os.path.join(diretorio, f'metalab-{_identificacao()}')
+    with open(base + '.jsonl', 'a', encoding='utf-8') as f:
+        f.write(json.dumps(linha, ensure_ascii=False) + '\n')
+    temporario = f'{base}.prom.{threading.get_ident()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(texto_prometheus)
+    os.replace(temporario, base + '.prom')
+    return linha
+
+
+def _rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_prometheus(rss_bytes):
+    """Métricas acumuladas do processo no formato texto do Prometheus (chamar com o lock)"""
+    instancia = f'instancia="{_rotulo(_identificacao())}"'
+    linhas = [
+        '# HELP metalab_rerun_duracao_segundos Duração do rerun do dashboard por combinação de filtros.',
+        '# TYPE metalab_rerun_duracao_segundos histogram',
+    ]
+    for filtros, histograma in sorted(_estado['reruns'].items()):
+        rotulos = f'{instancia},filtros="{_rotulo(filtros)}"'
+        for limite, quantidade in zip(LIMITES_HISTOGRAMA, histograma['buckets']):
+            linhas.append(f'metalab_rerun_duracao_segundos_bucket{{{rotulos},le="{limite}"}} {quantidade}')
+        linhas.append(f'metalab_rerun_duracao_segundos_bucket{{{rotulos},le="+Inf"}} {histograma["total"]}')
+        linhas.append(f'metalab_rerun_duracao_segundos_sum{{{rotulos}}} {histograma["soma"]:.6f}')
+        linhas.append(f'metalab_rerun_duracao_segundos_count{{{rotulos}}} {histograma["total"]}')
+
+    linhas += ['# HELP metalab_etapa_duracao_segundos Tempo acumulado em cada etapa do rerun.',
+               '# TYPE metalab_etapa_duracao_segundos summary']
+    for caminho, acumulado in sorted(_estado['etapas'].items()):
+        rotulos = f'{instancia},etapa="{_rotulo(caminho)}"'
+        linhas.append(f'metalab_etapa_duracao_segundos_sum{{{rotulos}}} {acumulado["soma"]:.6f}')
+        linhas.append(f'metalab_etapa_duracao_segundos_count{{{rotulos}}} {acumulado["total"]}')
+
+    linhas += ['# HELP metalab_cache_chamadas_total Chamadas às funções cacheadas.',
+               '# TYPE metalab_cache_chamadas_total counter']
+    for nome, contagem in sorted(_estado['cache'].items()):
+        linhas.append(f'metalab_cache_chamadas_total{{{instancia},funcao="{_rotulo(nome)}"}} {contagem["chamadas"]}')
+    linhas += ['# HELP metalab_cache_acertos_total Chamadas atendidas pelo cache (corpo da função não executou).',
+               '# TYPE metalab_cache_acertos_total counter']
+    for nome, contagem in sorted(_estado['cache'].items()):
+        acertos = contagem['chamadas'] - contagem['execucoes']
+        linhas.append(f'metalab_cache_acertos_total{{{instancia},funcao="{_rotulo(nome)}"}} {acertos}')
+
+    linhas += ['# HELP metalab_carga_eventos_total Pedidos de snapshot por desfecho: carga (executou), espera '
+               '(aguardou a carga em andamento), anterior (recebeu a versão anterior), acerto e erro.',
+               '# TYPE metalab_carga_eventos_total counter']
+    for nome, eventos in sorted(_estado['cargas'].items()):
+        for evento, quantidade in sorted(eventos.items()):
+            linhas.append(f'metalab_carga_eventos_total{{{instancia},snapshot="{_rotulo(nome)}",'
+                          f'evento="{_rotulo(evento)}"}} {quantidade}')
+
+    if _estado['aquecimento']:
+        aquecimento = _estado['aquecimento']
+        linhas += ['# HELP metalab_aquecimento_segundos Duração do aquecimento das visões do snapshot em uso.',
+                   '# TYPE metalab_aquecimento_segundos gauge',
+                   f'metalab_aquecimento_segundos{{{instancia}}} {aquecimento["ms"] / 1000:.3f}',
+                   '# HELP metalab_aquecimento_visoes Combinações de filtro aquecidas do snapshot em uso.',
+                   '# TYPE metalab_aquecimento_visoes gauge',
+                   f'metalab_aquecimento_visoes{{{instancia}}} {aquecimento["aquecidas"]}',
+                   '# HELP metalab_aquecimento_falhas Combinações de filtro cujo aquecimento falhou no snapshot em uso.',
+                   '# TYPE metalab_aquecimento_falhas gauge',
+                   f'metalab_aquecimento_falhas{{{instancia}}} {aquecimento.get("falhas", 0)}']
+
+    agregacoes = _estado['agregacoes']
+    if agregacoes['planos']:
+        linhas += ['# HELP metalab_agregacoes_pedidos_total Agregações pedidas pelos gráficos ao planejador.',
+                   '# TYPE metalab_agregacoes_pedidos_total counter',
+                   f'metalab_agregacoes_pedidos_total{{{instancia}}} {agregacoes["pedidos"]}',
+                   '# HELP metalab_agregacoes_passadas_total Passadas do planejador sobre as tabelas filtradas.',
+                   '# TYPE metalab_agregacoes_passadas_total counter',
+                   f'metalab_agregacoes_passadas_total{{{instancia}}} {agregacoes["passadas"]}',
+                   '# HELP metalab_agregacoes_segundos_total Tempo gasto pelo planejador de agregações.',
+                   '# TYPE metalab_agregacoes_segundos_total counter',
+                   f'metalab_agregacoes_segundos_total{{{instancia}}} {agregacoes["ms"] / 1000:.6f}',
+                   '# HELP metalab_agregacoes_recuos_total Agregações calculadas pela função de referência em vez '
+                   'do caminho rápido, por motivo.',
+                   '# TYPE metalab_agregacoes_recuos_total counter']
+        for motivo, quantidade in sorted(agregacoes['recuos'].items()):
+            linhas.append(f'metalab_agregacoes_recuos_total{{{instancia},motivo="{_rotulo(motivo)}"}} {quantidade}')
+        linhas += ['# HELP metalab_agregacoes_erros_total Agregações que falharam também na referência '
+                   '(o gráfico mostra o erro).',
+                   '# TYPE metalab_agregacoes_erros_total counter',
+                   f'metalab_agregacoes_erros_total{{{instancia}}} {agregacoes["erros"]}']
+
+    linhas += ['# HELP metalab_linhas_carregadas Linhas de cada tabela carregada.',
+               '# TYPE metalab_linhas_carregadas gauge']
+    for tabela, quantidade in sorted(_estado['linhas'].items()):
+        linhas.append(f'metalab_linhas_carregadas{{{instancia},tabela="{_rotulo(tabela)}"}} {quantidade}')
+
+    if _estado['snapshot']:
+        linhas += ['# HELP metalab_snapshot_idade_segundos Idade dos dados em uso (bundle ou última carga).',
+                   '# TYPE metalab_snapshot_idade_segundos gauge',
+                   f'metalab_snapshot_idade_segundos{{{instancia}}} {time.time() - _estado["snapshot"]:.1f}']
+
+    if rss_bytes is not None:
+        linhas += ['# HELP metalab_processo_rss_bytes Memória residente do processo.',
+                   '# TYPE metalab_processo_rss_bytes gauge',
+                   f'metalab_processo_rss_bytes{{{instancia}}} {rss_bytes}']
+    return '\n'.join(linhas) + '\n'
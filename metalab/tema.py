@@ -0,0 +1,102 @@
+"""
+Identidade visual dos gráficos: cores Metalab e templates Plotly do tema escuro.
+"""
+
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# Cores do projeto Metalab Marketing Digital - Tema Escuro
+CORES_METALAB = {
+    'primary': '#1a237e',      # Azul escuro
+    'secondary': '#3949ab',     # Azul médio
+    'accent': '#5c6bc0',        # Azul claro
+    'light': '#90caf9',         # Azul claro brilhante
+    'success': '#66bb6a',       # Verde claro
+    'warning': '#ffa726',       # Laranja claro
+    'error': '#ef5350',         # Vermelho claro
+    'bg-dark': '#1e1e2e',       # Fundo escuro
+    'card-dark': '#2d2d44',     # Card escuro
+}
+
+# Paleta de cores para gráficos - Tema Escuro
+PALETA_METALAB = ['#5c6bc0', '#90caf9', '#7986cb', '#9fa8da', '#b39ddb']
+
+# Nomes dos templates Plotly registrados pelo dashboard
+TEMPLATE_METALAB = 'metalab_escuro'
+TEMPLATE_AVALIACAO = 'metalab_escuro+metalab_avaliacao'
+
+# Escalas contínuas usadas nas barras (cor proporcional à quantidade)
+ESCALA_AZUL = ['#1a237e', '#3949ab', '#5c6bc0', '#7986cb', '#90caf9']
+ESCALA_AZUL_CLARA = ['#1a237e', '#3949ab', '#5c6bc0', '#7986cb', '#90caf9', '#b3d9ff']
+ESCALA_VERDE = ['#2e7d32', '#43a047', '#66bb6a', '#81c784', '#a5d6a7']
+ESCALA_LARANJA = ['#e65100', '#f57c00', '#ff9800', '#ffb74d', '#ffcc80']
+ESCALA_VERMELHA = ['#c62828', '#e53935', '#ef5350', '#e57373', '#ef9a9a']
+ESCALA_SATISFACAO = ['#c62828', '#ef5350', '#ffa726', '#66bb6a', '#2e7d32']  # Ruim -> Ótimo
+
+# Cores fixas dos status nos gráficos de status
+CORES_STATUS = {
+    'CONCLUIDO': CORES_METALAB['success'],
+    'DESISTENTE': CORES_METALAB['error'],
+    'EM CURSO': CORES_METALAB['light'],
+    'CURSANDO': CORES_METALAB['light'],
+}
+
+
+def registrar_tema_metalab():
+    """
+    Registra os templates Plotly do dashboard uma única vez por processo.
+
+    O template 'metalab_escuro' substitui o antigo update_layout aplicado em cada
+    gráfico: fundo transparente igual à tela, eixos, legenda, fontes e a paleta
+    Metalab. Não herda do template 'plotly' para manter o JSON de cada figura
+    enxuto. O template 'metalab_avaliacao' é uma camada extra (composta com
+    'metalab_escuro+metalab_avaliacao') com as fontes maiores e o texto externo
+    das barras usados nos gráficos de avaliações.
+    """
+    if 'metalab_escuro' not in pio.templates:
+        eixo = dict(
+            gridcolor='rgba(92, 107, 192, 0.2)',
+            linecolor='rgba(92, 107, 192, 0.5)',
+            zerolinecolor='rgba(92, 107, 192, 0.3)',
+            showgrid=True,
+            automargin=True,
+            title=dict(standoff=15)
+        )
+        tema = go.layout.Template()
+        tema.layout = dict(
+            plot_bgcolor='rgba(30, 30, 46, 0)',  # Transparente - igual ao fundo da tela
+            paper_bgcolor='rgba(30, 30, 46, 0)',  # Transparente - igual ao fundo da tela
+            font=dict(color='#e0e0e0', size=12),
+            colorway=PALETA_METALAB,
+            hovermode='closest',
+            hoverlabel=dict(align='left'),
+            xaxis=eixo,
+            yaxis=eixo,
+            legend=dict(
+                bgcolor='rgba(0,0,0,0)',
+                font=dict(color='#e0e0e0'),
+                bordercolor='rgba(92, 107, 192, 0.3)',
+                borderwidth=1
+            ),
+            coloraxis=dict(colorbar=dict(outlinewidth=0, ticks='')),
+            title=dict(font=dict(color=CORES_METALAB['light']))
+        )
+        # Pizzas sempre com rótulos internos em branco
+        tema.data.pie = [go.Pie(textposition='inside', textinfo='percent+label', textfont=dict(color='white'))]
+        pio.templates['metalab_escuro'] = tema
+
+    if 'metalab_avaliacao' not in pio.templates:
+        tema_avaliacao = go.layout.Template()
+        tema_avaliacao.layout = dict(
+            font=dict(size=13),
+            title=dict(font=dict(size=18)),
+            xaxis=dict(title=dict(font=dict(size=14))),
+            yaxis=dict(title=dict(font=dict(size=14)))
+        )
+        tema_avaliacao.data.bar = [go.Bar(textposition='outside', textfont=dict(size=14))]
+        tema_avaliacao.data.pie = [go.Pie(textfont=dict(color='white', size=13))]
+        pio.templates['metalab_avaliacao'] = tema_avaliacao
+
+    px.defaults.template = TEMPLATE_METALAB
+    px.defaults.color_discrete_sequence = PALETA_METALAB
@@ -0,0 +1,115 @@
+"""
+Série temporal das inscrições (seção Análise Temporal).
+
+A data de cada inscrição vira, uma vez por snapshot (pré-processamento
+offline ou carga do dashboard), o número do dia contado desde a primeira
+inscrição. Com qualquer filtro, a contagem diária é um bincount denso sobre
+os dias das inscrições selecionadas; semanas e meses são somas de fatias
+desse array (np.add.reduceat), e o acumulado e a média móvel saem de cumsum,
+sem remontar datas a partir de Ano/Mes.
+"""
+
+import numpy as np
+import pandas as pd
+
+COLUNA_DATA_INSCRICAO = 'Data_Inscricao'
+
+# Granularidade -> rótulo do seletor
+GRANULARIDADES = {'dia': 'Dia', 'semana': 'Semana', 'mes': 'Mês'}
+# Períodos da média móvel em cada granularidade
+JANELAS_MEDIA_MOVEL = {'dia': 7, 'semana': 4, 'mes': 3}
+
+# Arrays da série (nome -> descrição), gravados no bundle e no armazém
+ARRAYS_TEMPORAL = {
+    'ids': 'índice (rótulo) de cada linha das inscrições',
+    'dia': 'dia de cada inscrição contado desde inicio (-1 = sem data)',
+    'inicio': 'data da primeira inscrição (datetime64[D], array de um elemento)',
+}
+
+
+def construir_temporal(inscricoes, coluna=COLUNA_DATA_INSCRICAO):
+    """
+    Dia de cada inscrição (dict de arrays, ver ARRAYS_TEMPORAL); None sem a
+    coluna de data, sem nenhuma data válida ou com índice não numérico.
+    """
+    if inscricoes is None or coluna not in inscricoes.columns or len(inscricoes) == 0:
+        return None
+    if not pd.api.types.is_integer_dtype(inscricoes.index.dtype):
+        return None
+
+    datas = pd.to_datetime(inscricoes[coluna], errors='coerce').to_numpy(dtype='datetime64[ns]')
+    datas = datas.astype('datetime64[D]')
+    validas = ~np.isnat(datas)
+    if not validas.any():
+        return None
+    inicio = datas[validas].min()
+    dia = np.full(len(inscricoes), -1, dtype=np.int32)
+    dia[validas] = (datas[validas] - inicio).astype(np.int64)
+    return {
+        'ids': inscricoes.index.to_numpy(dtype=np.int64),
+        'dia': dia,
+        'inicio': np.array([inicio], dtype='datetime64[D]'),
+    }
+
+
+def serie_diaria(temporal, inscricoes):
+    """
+    Inscrições por dia entre as linhas de inscricoes (já filtradas): Series
+    densa (dias sem inscrição valem 0) da primeira à última data da seleção;
+    None se nenhuma inscrição selecionada tiver data.
+    """
+    dia = temporal['dia']
+    if len(inscricoes) != len(temporal['ids']):
+        dia = dia[np.isin(temporal['ids'], inscricoes.index.to_numpy())]
+    dia = dia[dia >= 0]
+    if len(dia) == 0:
+        return None
+    primeiro = int(dia.min())
+    contagens = np.bincount(dia - primeiro)
+    datas = temporal['inicio'][0] + primeiro + np.arange(len(contagens))
+    return pd.Series(contagens, index=pd.DatetimeIndex(datas, name='Data'), name='Quantidade')
+
+
+def _periodos(datas, granularidade):
+    """Código do período (semana de segunda a domingo ou mês) de cada dia e a data de início de cada código"""
+    dias = datas.astype('datetime64[D]').astype(np.int64)
+    if granularidade == 'semana':
+        # 1970-01-01 foi uma quinta-feira: +3 alinha as semanas à segunda-feira
+        codigos = (dias + 3) // 7
+        return codigos, lambda codigo: (codigo * 7 - 3).astype('datetime64[D]')
+    codigos = datas.astype('datetime64[M]').astype(np.int64)
+    return codigos, lambda codigo: codigo.astype('datetime64[M]').astype('datetime64[D]')
+
+
+def agregar_serie(diaria, granularidade='mes', acumulado=False, media_movel=False):
+    """
+    Série diária (saída de serie_diaria) em 'dia', 'semana' ou 'mes': DataFrame
+    com Data (início do período) e Quantidade, acumulada se pedido, e a coluna
+    'Média móvel' (JANELAS_MEDIA_MOVEL períodos) se media_movel.
+    """
+    if diaria is None:
+        return None
+    if granularidade not in GRANULARIDADES:
+        raise ValueError(f'granularidade desconhecida: {granularidade}')
+
+    valores = diaria.to_numpy()
+    if granularidade == 'dia':
+        datas = diaria.index.to_numpy(dtype='datetime64[D]')
+    else:
+        codigos, inicio_periodo = _periodos(diaria.index.to_numpy(), granularidade)
+        # Os dias são contíguos, então cada período é uma fatia do array
+        inicios = np.flatnonzero(np.r_[True, np.diff(codigos) != 0])
+        valores = np.add.reduceat(valores, inicios)
+        datas = inicio_periodo(codigos[inicios])
+
+    if acumulado:
+        valores = np.cumsum(valores)
+    serie = pd.DataFrame({'Data': pd.DatetimeIndex(datas), 'Quantidade': valores})
+    if media_movel:
+        janela = JANELAS_MEDIA_MOVEL[granularidade]
+        somas = np.cumsum(np.r_[0, valores])
+        posicoes = np.arange(1, len(valores) + 1)
+        inicio_janela = np.maximum(posicoes - janela, 0)
+        # Nos primeiros períodos a janela é o que houver até ali
+        serie['Média móvel'] = ((somas[posicoes] - somas[inicio_janela]) / (posicoes - inicio_janela)).round(2)
+    return serie
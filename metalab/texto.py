@@ -0,0 +1,100 @@
+"""
+Colunas de texto em Arrow (string[pyarrow]).
+
+No modo Arrow (METALAB_TEXTO=arrow no dashboard) as colunas de texto são
+carregadas como strings do Arrow, com a mesma semântica de nulos (NaN) das
+colunas object, e as etapas do pacote usam os helpers daqui para não voltarem
+a object no caminho: astype(str) e Series.apply materializam uma string
+Python por linha.
+"""
+
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+
+def texto_arrow_disponivel():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def tipo_texto_arrow():
+    """dtype de texto em Arrow com nulos NaN (o das colunas object), e não pd.NA"""
+    try:
+        return pd.StringDtype('pyarrow', na_value=np.nan)
+    except TypeError:
+        # pandas < 2.3: o mesmo dtype tinha outro nome
+        return pd.StringDtype('pyarrow_numpy')
+
+
+def eh_texto_arrow(serie):
+    return isinstance(serie.dtype, pd.StringDtype) and serie.dtype.storage != 'python'
+
+
+def converter_texto(df):
+    """Cópia rasa de df com as colunas object que só têm texto (e nulos) em Arrow"""
+    tipo = tipo_texto_arrow()
+    convertido = None
+    for posicao in range(df.shape[1]):
+        serie = df.iloc[:, posicao]
+        if serie.dtype != object or pd.api.types.infer_dtype(serie, skipna=True) != 'string':
+            continue
+        if convertido is None:
+            convertido = df.copy(deep=False)
+        convertido.isetitem(posicao, serie.astype(tipo))
+    return df if convertido is None else convertido
+
+
+def em_texto(serie):
+    """
+    serie.astype(str) sem sair do Arrow: numa coluna Arrow os nulos viram
+    'nan', como no astype(str) de uma coluna object.
+    """
+    if eh_texto_arrow(serie):
+        return serie.fillna('nan')
+    return serie.astype(str)
+
+
+def aplicar_por_valor(serie, funcao):
+    """
+    serie.apply(funcao) chamando funcao uma vez por valor distinto (e uma para
+    os nulos). Numa coluna Arrow, resultados de texto continuam em Arrow.
+    """
+    codigos, valores = pd.factorize(serie, use_na_sentinel=True)
+    # Último resultado: o dos nulos (código -1)
+    resultados = np.empty(len(valores) + 1, dtype=object)
+    resultados[:] = [funcao(valor) for valor in valores] + [funcao(np.nan)]
+    posicoes = np.where(codigos < 0, len(valores), codigos)
+    if eh_texto_arrow(serie) and pd.api.types.infer_dtype(resultados, skipna=True) == 'string':
+        return pd.Series(pd.array(resultados, dtype=serie.dtype).take(posicoes), index=serie.index, name=serie.name)
+    return pd.Series(resultados.take(posicoes), index=serie.index, name=serie.name).infer_objects()
+
+
+def valores_distintos(series):
+    """
+    Valores distintos de várias Series de texto, para comparar com contido_em:
+    um array do Arrow se todas forem Arrow; senão, um set (como antes).
+    """
+    series = list(series)
+    if series and all(eh_texto_arrow(serie) for serie in series):
+        import pyarrow as pa
+        return pa.chunked_array([pa.array(serie) for serie in series], type=pa.large_string()).unique()
+    valores = set()
+    for serie in series:
+        valores.update(serie.unique())
+    return valores
+
+
+def contido_em(serie, valores):
+    """
+    serie.isin(valores). Numa coluna Arrow usa pyarrow.compute.is_in: o isin
+    do pandas passa cada valor procurado pelo Python.
+    """
+    if not eh_texto_arrow(serie):
+        return serie.isin(valores.to_pylist() if hasattr(valores, 'to_pylist') else valores)
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    if not isinstance(valores, pa.Array):
+        valores = pa.array([valor for valor in valores if isinstance(valor, str)], type=pa.large_string())
+    mascara = pc.is_in(pa.array(serie), value_set=valores.cast(pa.large_string()))
+    return pd.Series(mascara.to_numpy(zero_copy_only=False), index=serie.index, name=serie.name)
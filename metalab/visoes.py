@@ -0,0 +1,92 @@
+"""
+Visões materializadas das combinações de filtro mais comuns.
+
+Uma visão é o resultado dos filtros do sidebar para uma combinação (tabelas
+filtradas e métricas) mais as contagens que os gráficos pedirem sobre ela,
+guardadas na própria visão sob o pedido do planejador (metalab.planejador). O dashboard mantém as
+visões por processo e versão do snapshot. Depois de cada carga, o aquecimento
+calcula as visões de 'Todos' e de cada filtro isolado (cada ciclo, local,
+status e gênero), que são a maior parte dos acessos, dentro de um orçamento
+de tempo. O orçamento é curto de propósito: o aquecimento é trabalho do pandas
+dentro do processo do app e, enquanto roda, disputa o GIL com os reruns das
+sessões. O aquecimento roda numa thread sem o contexto do Streamlit: recebe
+as memórias do snapshot prontas e só chama funções comuns.
+"""
+
+import time
+
+from metalab.carga_unica import calcular_uma_vez
+from metalab.planejador import contagem, cruzamento
+
+# Dimensões do sidebar aquecidas uma a uma, na ordem dos seletores
+DIMENSOES_AQUECIMENTO = ('ciclo', 'local', 'status', 'genero')
+
+
+def combinacoes_aquecimento(opcoes):
+    """
+    Combinações a aquecer: todos os filtros em 'Todos' e depois cada valor de
+    cada dimensão com as demais em 'Todos' (dicts ciclo/local/status/genero).
+    opcoes: dimensão -> opções do seletor (None se a dimensão não existe).
+    """
+    todos = dict.fromkeys(DIMENSOES_AQUECIMENTO, 'Todos')
+    combinacoes = [todos]
+    for dimensao in DIMENSOES_AQUECIMENTO:
+        for valor in opcoes.get(dimensao) or []:
+            if valor != 'Todos':
+                combinacoes.append({**todos, dimensao: valor})
+    return combinacoes
+
+
+def aquecer(combinacoes, calcular, orcamento_s):
+    """
+    Chama calcular(combinacao) na ordem até acabar o orçamento (segundos) e
+    retorna o relatório: combinações, aquecidas, falhas, erro (o primeiro, ou
+    None), ms e se o orçamento acabou. Uma combinação que falha não interrompe
+    as demais: a sessão que pedi-la calcula de novo e mostra o erro.
+    """
+    inicio = time.perf_counter()
+    tentadas = aquecidas = 0
+    erro = None
+    for combinacao in combinacoes:
+        if time.perf_counter() - inicio >= orcamento_s:
+            break
+        tentadas += 1
+        try:
+            calcular(combinacao)
+        except Exception as e:
+            erro = erro or f'{type(e).__name__}: {e}'
+            continue
+        aquecidas += 1
+    return {
+        'combinacoes': len(combinacoes),
+        'aquecidas': aquecidas,
+        'falhas': tentadas - aquecidas,
+        'erro': erro,
+        'ms': round((time.perf_counter() - inicio) * 1000, 1),
+        'orcamento_esgotado': tentadas < len(combinacoes),
+    }
+
+
+def memorizar(contagens, chave, calcular):
+    """
+    Resultado guardado em contagens[chave] ou, na primeira vez, calcular(); o
+    aquecimento e as sessões que pedem a mesma chave juntos calculam uma vez só
+    """
+    return calcular_uma_vez(contagens, chave, calcular)[0]
+
+
+def contagem_memorizada(contagens, tabela, contar):
+    """
+    contar(df, coluna, normalizar) sobre a tabela da visão, com cada resultado
+    guardado em contagens sob o pedido do planejador (que pode tê-lo calculado antes)
+    """
+    def contar_memorizado(df, coluna, normalizar=None):
+        return memorizar(contagens, contagem(tabela, coluna, normalizar), lambda: contar(df, coluna, normalizar))
+    return contar_memorizado
+
+
+def cruzamento_memorizado(contagens, tabela, cruzar):
+    """cruzar(df, linhas, colunas) sobre a tabela da visão, guardado em contagens sob o pedido do planejador"""
+    def cruzar_memorizado(df, linhas, colunas):
+        return memorizar(contagens, cruzamento(tabela, linhas, colunas), lambda: cruzar(df, linhas, colunas))
+    return cruzar_memorizado
@@ -0,0 +1,103 @@
+"""
+Pré-processamento offline do Dashboard Metalab.
+
+Executa carregar → pré-processar → pivot → indexar → agregar sem o Streamlit e
+grava um bundle versionado que o dashboard apenas mapeia em memória. Pensado
+para rodar em cron/CI:
+
+    python precompute_metalab.py                      # dados/ → dados/bundle/
+    python precompute_metalab.py --sem-sheets --json  # só CSVs, tempos em JSON
+    python precompute_metalab.py --armazem dados/metalab.sqlite  # também grava o armazém SQLite
+
+Termina com código 1 se não conseguir carregar os dados.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from metalab.construcao import construir_snapshot
+
+DIRETORIO_DADOS_PADRAO = os.getenv('DATA_DIR', 'dados')
+DIRETORIO_BUNDLE_PADRAO = os.getenv('METALAB_BUNDLE', os.path.join('dados', 'bundle'))
+SECRETS_PADRAO = os.path.join('.streamlit', 'secrets.toml')
+
+
+def ler_config_sheets(caminho):
+    """Lê a seção [google_sheets] do secrets.toml do Streamlit (vazio se ausente)"""
+    if not caminho or not os.path.exists(caminho):
+        return {}
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        try:
+            import tomli as tomllib
+        except ImportError:
+            print(f'aviso: tomllib/tomli indisponível, ignorando {caminho}', file=sys.stderr)
+            return {}
+    with open(caminho, 'rb') as f:
+        return tomllib.load(f).get('google_sheets', {})
+
+
+def tamanho_diretorio(caminho):
+    total = 0
+    for raiz, _, arquivos in os.walk(caminho):
+        total += sum(os.path.getsize(os.path.join(raiz, arquivo)) for arquivo in arquivos)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera o bundle de dados do Dashboard Metalab.')
+    parser.add_argument('--dados', default=DIRETORIO_DADOS_PADRAO,
+                        help='pasta com os CSVs (padrão: $DATA_DIR ou dados)')
+    parser.add_argument('--saida', default=DIRETORIO_BUNDLE_PADRAO,
+                        help='pasta do bundle (padrão: $METALAB_BUNDLE ou dados/bundle)')
+    parser.add_argument('--secrets', default=SECRETS_PADRAO,
+                        help='secrets.toml com a seção [google_sheets]')
+    parser.add_argument('--sem-sheets', action='store_true', help='ignora o Google Sheets e usa só os CSVs')
+    parser.add_argument('--manter', type=int, default=3, help='quantas versões antigas manter (padrão: 3)')
+    parser.add_argument('--sem-texto-arrow', action='store_true',
+                        help='não grava o texto.arrow (colunas de texto mapeáveis no modo METALAB_TEXTO=arrow)')
+    parser.add_argument('--armazem', help='também grava as tabelas no armazém SQLite indicado (metalab.armazem)')
+    parser.add_argument('--json', action='store_true', help='imprime o resumo em JSON')
+    args = parser.parse_args(argv)
+
+    def avisar(nome, ms):
+        if ms is not None and not args.json:
+            print(f'{nome:<14}{ms:>10.1f} ms', flush=True)
+
+    config_sheets = {} if args.sem_sheets else ler_config_sheets(args.secrets)
+
+    try:
+        construcao = construir_snapshot(config_sheets, args.dados, args.saida, manter=args.manter,
+                                        armazem=args.armazem, avisar=avisar, texto_arrow=not args.sem_texto_arrow)
+    except FileNotFoundError as e:
+        print(f'erro: arquivo de dados não encontrado: {e}', file=sys.stderr)
+        return 1
+    versao, caminho, origem = construcao['versao'], construcao['caminho'], construcao['origem']
+    versao_armazem, etapas = construcao['armazem'], construcao['etapas_ms']
+
+    resumo = {
+        'versao': versao,
+        'caminho': caminho,
+        'origem': origem,
+        'linhas': construcao['linhas'],
+        'bytes': tamanho_diretorio(caminho),
+        'armazem': {'caminho': args.armazem, 'versao': versao_armazem} if args.armazem else None,
+        'etapas_ms': etapas,
+        'total_ms': round(sum(etapas.values()), 1),
+    }
+    if args.json:
+        print(json.dumps(resumo, ensure_ascii=False))
+    else:
+        print(f"{'total':<14}{resumo['total_ms']:>10.1f} ms")
+        linhas = ', '.join(f'{nome}={n:,}' for nome, n in resumo['linhas'].items())
+        print(f"bundle {versao} ({origem}: {linhas}; {resumo['bytes'] / 1024:,.0f} KB) em {caminho}")
+        if args.armazem:
+            print(f"armazém {versao_armazem} em {args.armazem}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Comparação de ciclos (metalab.comparacao) contra o sidebar: para cada ciclo, as
+métricas de comparar_ciclos devem ser as de filtros.aplicar_filtros com o
+ciclo selecionado e os mesmos demais filtros.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+import warnings
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metalab.comparacao import comparar_ciclos  # noqa: E402
+from metalab.filtros import aplicar_filtros  # noqa: E402
+from metalab.preprocessamento import preprocessar_dados  # noqa: E402
+from metalab.sintetico import gerar_tabelas  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def tabelas():
+    dados = gerar_tabelas(3000, semente=3)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)  # Datas dd/mm/aaaa do sintético
+        inscricoes, alunos = preprocessar_dados(dados['inscricoes'], dados['alunos'])
+    return alunos, inscricoes
+
+
+@pytest.mark.parametrize('local, status, genero', [
+    ('Todos', 'Todos', 'Todos'),
+    ('Todos', 'Todos', 'Feminino'),
+    ('Gama Leste', 'Todos', 'Todos'),
+    ('Gama Leste', 'Todos', 'Masculino'),
+    ('Todos', 'CURSANDO', 'Feminino'),
+    ('Gama Leste', 'CURSANDO + CONCLUÍDO', 'Todos'),
+])
+def test_totais_por_ciclo_iguais_ao_sidebar(tabelas, local, status, genero):
+    alunos, inscricoes = tabelas
+    ciclos = sorted(alunos['CICLO'].dropna().astype(str).unique())
+    alunos_comp, inscricoes_comp = aplicar_filtros(alunos, inscricoes, 'Todos', local, status, genero)
+    metricas = comparar_ciclos(ciclos, alunos_comp, inscricoes_comp, alunos_originais=alunos)['metricas']
+    for ciclo in ciclos:
+        alunos_ciclo, inscricoes_ciclo = aplicar_filtros(alunos, inscricoes, ciclo, local, status, genero)
+        assert metricas.loc[ciclo, 'total_inscricoes'] == len(inscricoes_ciclo), ciclo
+        assert metricas.loc[ciclo, 'total_alunos'] == len(alunos_ciclo), ciclo